@@ -1,21 +1,6 @@
 import re
 import os
-from PyPDF2 import PdfReader
-
-def pdf_to_text(pdf_path):
-    """Đọc toàn bộ nội dung từ file PDF."""
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
-    return text
-
-def clean_text(text):
-    """Loại bỏ các header/footer, số trang, và các chuỗi không cần thiết."""
-    text = re.sub(r'about:blank\s*\d+/\d+', '', text)
-    text = re.sub(r'\d+/\d+/\d+, \d+:\d+ [AP]M', '', text)
-    # Thêm các quy tắc làm sạch khác nếu cần
-    return text.strip()
+from pdf_extraction import stream_pdfs_to_files
 
 def split_text_by_article(text, output_dir, law_year):
     """Tách văn bản thành các file nhỏ theo từng Điều luật."""
@@ -50,21 +35,19 @@ def main():
         2013: 'LuatDatDai2013.pdf'
     }
 
+    jobs = {}
     for year, pdf_file in law_files.items():
-        print(f"--- Bắt đầu xử lý {pdf_file} ---")
         if not os.path.exists(pdf_file):
             print(f"LỖI: Không tìm thấy file {pdf_file}. Bỏ qua...")
             continue
+        jobs[pdf_file] = f"LuatDatDai{year}_full.txt"
 
-        text = pdf_to_text(pdf_file)
-        cleaned_text = clean_text(text)
-        
-        full_text_filename = f"LuatDatDai{year}_full.txt"
-        with open(full_text_filename, 'w', encoding='utf-8') as f:
-            f.write(cleaned_text)
-        print(f"Đã tạo file văn bản đầy đủ: {full_text_filename}")
+    # Các file PDF được trích xuất đồng thời theo trang (pdf_extraction.py), văn bản được ghi dần xuống đĩa
+    print(f"--- Bắt đầu xử lý {', '.join(jobs)} ---")
+    for pdf_file, (num_pages, num_chars) in stream_pdfs_to_files(jobs).items():
+        print(f"Đã tạo file văn bản đầy đủ: {jobs[pdf_file]} ({num_pages} trang, {num_chars} ký tự)")
         
     print("\n--- Hoàn thành tiền xử lý! ---")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,9 +1,11 @@
-import os
+import argparse
 import re
 import json
+import asyncio
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from llm_callers import call_gemini_api as call_llm
+from llm_client import AsyncLLMClient
+from extraction_store import ExtractionStore, pending_ids, source_hash
+from law_structure import LawStructure
 
 def get_extraction_prompt(law_year, article_code, article_content):
     return f"""
@@ -30,60 +32,65 @@ Bạn là một trợ lý pháp lý chuyên nghiệp với nhiệm vụ xây d
 **OUTPUT DƯỚI DẠNG JSON (Không thêm bất kỳ giải thích nào khác):**
 """
 
-def process_single_file(filename, year, input_dir, output_dir):
-    """Hàm này xử lý một file duy nhất, được gọi bởi các luồng."""
-    output_path = os.path.join(output_dir, filename.replace('.txt', '.json'))
-    
-    if os.path.exists(output_path):
-        return f"Bỏ qua: {filename}"
-        
-    input_path = os.path.join(input_dir, filename)
-    
-    with open(input_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    article_code_match = re.search(r'dieu_(\d+)_', filename)
+async def process_single_article(client, law_id, content, year, store):
+    """Xử lý một điều luật; các điều được gửi đồng thời, tốc độ do limiter của client quyết định."""
+    article_code_match = re.search(r'dieu_(\d+)_', law_id)
     if not article_code_match:
-        return f"Lỗi tên file: {filename}"
+        return f"Lỗi ID điều luật: {law_id}"
     article_code = article_code_match.group(1)
 
     prompt = get_extraction_prompt(year, article_code, content)
     
     try:
-        response_text = call_llm(prompt)
+        response_text = await client.generate(prompt)
         json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response_text)
         json_str = json_match.group(1) if json_match else response_text
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(json.loads(json_str), f, ensure_ascii=False, indent=2)
-        return f"Thành công: {filename}"
+        # Upsert vào kho JSONL (extraction_store.py) kèm dấu vân tay nội dung điều luật đã dùng để trích xuất
+        store.put(law_id, json.loads(json_str), source=source_hash(content))
+        return f"Thành công: {law_id}"
             
     except Exception as e:
-        return f"Lỗi: {filename} - {e}"
-
-def process_law_year_parallel(year, input_dir, output_dir, max_workers=5):
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        
-    file_list = [f for f in os.listdir(input_dir) if f.endswith('.txt')]
-    print(f"\n--- Bắt đầu trích xuất song song cho Luật {year} ({len(file_list)} điều) ---")
-
-    # Sử dụng ThreadPoolExecutor để xử lý song song
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Tạo các task
-        futures = {executor.submit(process_single_file, filename, year, input_dir, output_dir): filename for filename in file_list}
-        
-        # Dùng tqdm để theo dõi tiến trình
-        for future in tqdm(as_completed(futures), total=len(file_list), desc=f"Luật {year}"):
-            result = future.result()
-            # Bạn có thể in kết quả nếu muốn, nhưng nó sẽ làm chậm thanh tiến trình
-            print(result)
-            pass
+        return f"Lỗi: {law_id} - {e}"
+
+async def process_law_year_parallel(client, year, store, overwrite=False):
+    # Nội dung các điều luật đọc từ file cấu trúc (law_structure.py)
+    with LawStructure.load(year) as structure:
+        articles = list(structure.iter_article_texts())
+    missing, stale = pending_ids(store, articles)
+    if stale:
+        print(f"Luật {year}: {len(stale)} điều luật có nội dung khác lúc trích xuất, sẽ trích xuất lại: {stale}")
+    if missing:
+        print(f"Luật {year}: {len(missing)} điều luật chưa có kết quả: {missing}")
+    # Chỉ gửi điều luật chưa có kết quả hoặc có nội dung thay đổi, trừ khi overwrite
+    pending = set(missing + stale)
+    articles = [(law_id, content) for law_id, content in articles if overwrite or law_id in pending]
+    print(f"\n--- Bắt đầu trích xuất song song cho Luật {year} ({len(articles)} điều) ---")
+
+    # Gửi tất cả các điều cùng lúc; quota (request/phút, token/phút) của client giới hạn tốc độ thực tế
+    tasks = [process_single_article(client, law_id, content, year, store) for law_id, content in articles]
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc=f"Luật {year}"):
+        result = await task
+        # Bạn có thể in kết quả nếu muốn, nhưng nó sẽ làm chậm thanh tiến trình
+        print(result)
+
+async def run(years=(2024, 2013), overwrite=False):
+    async with AsyncLLMClient() as client:
+        for year in years:
+            with ExtractionStore.open(f'entities_{year}') as store:
+                await process_law_year_parallel(client, year, store, overwrite)
+        print(f"Thống kê gọi LLM: {dict(client.stats)}")
 
 def main():
-    process_law_year_parallel(2024, 'chunks_2024', 'output_json_2024', max_workers=5)
-    process_law_year_parallel(2013, 'chunks_2013', 'output_json_2013', max_workers=5)
+    parser = argparse.ArgumentParser(description="Trích xuất thực thể và quan hệ của từng điều luật bằng LLM.")
+    parser.add_argument('--year', type=int, nargs='+', choices=[2024, 2013], default=[2024, 2013],
+                        help="Chỉ xử lý luật của các năm này (run_pipeline.py chạy mỗi năm một tiến trình).")
+    parser.add_argument('--overwrite', action='store_true',
+                        help="Xử lý lại cả các điều luật đã có kết quả với nội dung không đổi "
+                             "(prompt không đổi sẽ lấy từ cache LLM).")
+    args = parser.parse_args()
+    asyncio.run(run(args.year, args.overwrite))
     print("\n--- Hoàn thành trích xuất thực thể! ---")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
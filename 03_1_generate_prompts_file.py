@@ -1,5 +1,6 @@
-import os
 import re
+from extraction_store import ExtractionStore, pending_ids
+from law_structure import LawStructure
 
 def get_comparison_prompt_for_chat(article_code_2024, article_content_2024, output_file_name):
     return f"""
@@ -24,21 +25,20 @@ def get_comparison_prompt_for_chat(article_code_2024, article_content_2024, outp
     """
 
 def main():
-    input_dir = 'chunks_2024'
-    output_dir = 'comparisons_json'
     prompts_file_path = 'all_remaining_comparison_prompts.txt'
     
-    file_list = sorted([f for f in os.listdir(input_dir) if f.endswith('.txt')])
+    # Nội dung các điều luật 2024 đọc từ file cấu trúc (law_structure.py)
+    with LawStructure.load(2024) as structure:
+        articles = list(structure.iter_article_texts())
     
-    prompts_to_generate = []
-    for filename in file_list:
-        output_filename = filename.replace('.txt', '.json')
-        output_path = os.path.join(output_dir, output_filename)
-        if not os.path.exists(output_path):
-             prompts_to_generate.append((filename, output_filename))
+    # Các điều luật đã có kết quả trong kho so sánh (extraction_store.py) với nội dung không đổi được bỏ qua
+    with ExtractionStore.open('comparisons') as store:
+        missing, stale = pending_ids(store, articles)
+    pending = set(missing + stale)
+    prompts_to_generate = [(law_id, content) for law_id, content in articles if law_id in pending]
 
     if not prompts_to_generate:
-        print("Tất cả các file đã được xử lý. Không có prompt nào được tạo.")
+        print("Tất cả các điều luật đã được xử lý. Không có prompt nào được tạo.")
         return
 
     print(f"Sẽ tạo prompt cho {len(prompts_to_generate)} điều luật còn lại.")
@@ -53,16 +53,12 @@ def main():
         f.write("\n============================================\n\n")
 
         # Ghi các prompt so sánh tiếp theo
-        for i, (filename, output_filename) in enumerate(prompts_to_generate, 1):
-            input_path = os.path.join(input_dir, filename)
-            with open(input_path, 'r', encoding='utf-8') as content_file:
-                content = content_file.read()
-            
-            article_code_match = re.search(r'dieu_(\d+)_', filename)
+        for i, (law_id, content) in enumerate(prompts_to_generate, 1):
+            article_code_match = re.search(r'dieu_(\d+)_', law_id)
             article_code = article_code_match.group(1) if article_code_match else "unknown"
 
-            f.write(f"========== PROMPT {i+1} (So sánh cho {filename}) ==========\n")
-            f.write(get_comparison_prompt_for_chat(article_code, content, output_filename))
+            f.write(f"========== PROMPT {i+1} (So sánh cho {law_id}) ==========\n")
+            f.write(get_comparison_prompt_for_chat(article_code, content, f"{law_id}.json"))
             f.write("\n=======================================================\n\n")
             
     print(f"Đã tạo thành công file '{prompts_file_path}' chứa tất cả các prompt cần chạy.")
@@ -58,6 +58,7 @@ def split_json_array_to_files(input_file_path, output_dir):
         print(f"Tổng số file đã tạo thành công: {success_count}")
         if error_count > 0:
             print(f"Số object bị lỗi hoặc bỏ qua: {error_count}")
+        print(f"Kiểm tra rồi nhập vào kho so sánh: python extraction_store.py import comparisons {output_dir}")
 
     except json.JSONDecodeError:
         print(f"Lỗi: File '{input_file_path}' không chứa nội dung JSON hợp lệ.")
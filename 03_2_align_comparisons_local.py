@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Đối chiếu tự động điều luật 2024 -> 2013 hoàn toàn cục bộ, không gọi LLM
+(thay cho 03_extract_comparisons.py hoặc quy trình thủ công 03_1_*).
+
+    1. Vector hóa mọi điều luật (bỏ dòng "Điều N."): TF-IDF trên âm tiết + bigram (cùng cách tách từ với BM25)
+       và, nếu có, embedding bi-encoder của Vector DB (trung bình các đoạn, chuẩn hóa L2).
+    2. Ma trận tương đồng 2024 x 2013 tính một lần bằng phép nhân ma trận NumPy.
+    3. Gán: mỗi điều luật 2024 nhận điều luật 2013 có điểm cao nhất (nhiều điều 2024 có thể cùng trỏ về
+       một điều 2013); tương đồng từ vựng với điều được chọn dưới NEW_ARTICLE_THRESHOLD -> điều luật mới.
+    4. Phân loại thay đổi theo tỉ lệ giống nhau của chuỗi âm tiết (difflib) giữa hai điều luật:
+       >= UNCHANGED_THRESHOLD -> giu_nguyen, < REPLACED_THRESHOLD -> thay_the_hoan_toan, còn lại sua_doi_bo_sung.
+
+Ngưỡng được hiệu chỉnh (lưới tìm kiếm, --calibrate) trên nhãn LLM hiện có trong kho 'comparisons' (extraction_store.py),
+nên độ đồng thuận đo trên chính kho đó là số trong mẫu (TF-IDF: target_id_2013 81.9% kể cả null, change_type 73.4%).
+Ước lượng ngoài mẫu (cross_validate, 5-fold: ngưỡng tìm lại trên 4/5 nhãn, đo trên phần còn lại, được in cùng báo
+cáo): target_id_2013 79.4% kể cả null (86.2% trên các điều có đối chiếu, phép gán không phụ thuộc ngưỡng),
+change_type 71.8%, so với 63.7% khi luôn đoán sua_doi_bo_sung. Các số này đo trên nội dung điều luật từ file cấu trúc
+(law_structure.py); 39 nhãn LLM của kho được trích xuất từ nội dung cũ (04_1 liệt kê) nên cần đo lại sau khi chạy lại 03.
+Bi-encoder chỉ dùng để xếp hạng; các ngưỡng đều áp trên điểm từ vựng nên không đổi khi bật / tắt mô hình.
+
+Hạn chế: thay_the_hoan_toan thực tế hầu như KHÔNG được nhận diện. Tỉ lệ diff không tách được "thay thế hoàn toàn" khỏi
+"sửa đổi, bổ sung" theo nhãn LLM: với ngưỡng hiện tại chỉ 3/30 điều đúng loại này (trong mẫu), 2/30 ngoài mẫu. Cần
+nhãn LLM / thủ công cho loại này.
+
+Kết quả có cùng dạng với bản ghi của kho 'comparisons' (mỗi điều luật một object source_id_2024 / target_id_2013 /
+change_type), ghi vào OUTPUT_DIR (mỗi điều một file) để so sánh trước khi thay thế. Báo cáo độ đồng thuận với kho
+'comparisons'; --write-store ghi đè kết quả LLM trong kho.
+
+Cách chạy:
+    python 03_2_align_comparisons_local.py
+    python 03_2_align_comparisons_local.py --no-semantic --calibrate
+    python 03_2_align_comparisons_local.py --write-store   # ghi đè kết quả LLM trong kho 'comparisons'
+"""
+import argparse
+import difflib
+import json
+import os
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+from article_alignment import ArticleAlignment, NEW_ARTICLE, normalize_change_type
+from extraction_store import ExtractionStore, source_hash
+from bm25_index import tokenize
+from law_structure import load_article_documents
+from legal_text import syllables, split_passages
+
+OUTPUT_DIR = 'comparisons_json_local'
+# Tỉ trọng của bi-encoder khi xếp hạng (phần còn lại là TF-IDF)
+SEMANTIC_WEIGHT = 0.5
+NEW_ARTICLE_THRESHOLD = 0.26
+UNCHANGED_THRESHOLD = 0.95
+REPLACED_THRESHOLD = 0.15
+PASSAGE_MAX_SYLLABLES = 200
+# Số phần khi ước lượng độ đồng thuận ngoài mẫu (cross_validate)
+CV_FOLDS = 5
+
+_HEADING_PATTERN = re.compile(r'^\s*Điều\s+\d+\.\s*')
+
+
+def article_body(content):
+    """Nội dung điều luật không kèm dòng "Điều N." (số hiệu thay đổi giữa hai luật)."""
+    return _HEADING_PATTERN.sub('', content, count=1)
+
+
+def tfidf_matrices(texts_2024, texts_2013):
+    """Ma trận TF-IDF (log tf, chuẩn hóa L2) của hai tập văn bản trên cùng từ vựng."""
+    counts = [Counter(tokenize(text)) for text in texts_2024 + texts_2013]
+    vocabulary = {}
+    for counter in counts:
+        for term in counter:
+            vocabulary.setdefault(term, len(vocabulary))
+    matrix = np.zeros((len(counts), len(vocabulary)), dtype=np.float32)
+    for row, counter in enumerate(counts):
+        matrix[row, [vocabulary[term] for term in counter]] = list(counter.values())
+    document_frequency = (matrix > 0).sum(axis=0)
+    idf = np.log(1 + len(counts) / (document_frequency + 0.5)).astype(np.float32)
+    matrix = np.log1p(matrix) * idf
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-9)
+    return matrix[:len(texts_2024)], matrix[len(texts_2024):]
+
+
+def article_embeddings(model, texts):
+    """Embedding mỗi điều luật = trung bình embedding các đoạn (như 05_build_vector_db.py), chuẩn hóa L2."""
+    passages, owners = [], []
+    for index, text in enumerate(texts):
+        for _, passage in split_passages(text, PASSAGE_MAX_SYLLABLES) or [(None, text)]:
+            passages.append(passage)
+            owners.append(index)
+    vectors = model.encode(passages, batch_size=32, normalize_embeddings=True, show_progress_bar=False)
+    embeddings = np.zeros((len(texts), vectors.shape[1]), dtype=np.float32)
+    np.add.at(embeddings, np.array(owners), vectors.astype(np.float32))
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-9)
+
+
+def diff_ratio(text_a, text_b):
+    """Tỉ lệ giống nhau của hai chuỗi âm tiết (0..1)."""
+    return difflib.SequenceMatcher(None, syllables(text_a), syllables(text_b), autojunk=False).ratio()
+
+
+def classify(lexical_similarity, ratio, new_threshold=NEW_ARTICLE_THRESHOLD,
+             unchanged_threshold=UNCHANGED_THRESHOLD, replaced_threshold=REPLACED_THRESHOLD):
+    """Loại thay đổi (tên quan hệ trong KG) cho một cặp đã gán."""
+    if lexical_similarity < new_threshold:
+        return NEW_ARTICLE
+    if ratio >= unchanged_threshold:
+        return 'GIU_NGUYEN'
+    if ratio < replaced_threshold:
+        return 'THAY_THE_HOAN_TOAN'
+    return 'SUA_DOI_BO_SUNG'
+
+
+def align(documents_2024, documents_2013, model=None, semantic_weight=SEMANTIC_WEIGHT):
+    """
+    Gán mỗi điều luật 2024 với điều luật 2013 gần nhất.
+
+    Returns:
+        Danh sách (id_2024, id_2013 được chọn, tương đồng từ vựng, tỉ lệ diff) theo thứ tự documents_2024.
+    """
+    texts_2024 = [article_body(content) for _, content in documents_2024]
+    texts_2013 = [article_body(content) for _, content in documents_2013]
+    tfidf_2024, tfidf_2013 = tfidf_matrices(texts_2024, texts_2013)
+    lexical = tfidf_2024 @ tfidf_2013.T
+    scores = lexical
+    if model is not None:
+        semantic = article_embeddings(model, texts_2024) @ article_embeddings(model, texts_2013).T
+        scores = semantic_weight * semantic + (1 - semantic_weight) * lexical
+    best = scores.argmax(axis=1)
+    return [(law_id, documents_2013[j][0], float(lexical[i, j]), diff_ratio(texts_2024[i], texts_2013[j]))
+            for i, ((law_id, _), j) in enumerate(zip(documents_2024, best))]
+
+
+def fit_thresholds(labelled):
+    """
+    Bộ ngưỡng (new, unchanged, replaced) cho độ đồng thuận change_type cao nhất (tìm theo lưới).
+    labelled: [(tương đồng từ vựng, tỉ lệ diff, nhãn change_type tham chiếu)]. Trả về (số mẫu khớp, ngưỡng...).
+    """
+    best = None
+    for new_threshold in np.arange(0.10, 0.50, 0.02):
+        for unchanged_threshold in np.arange(0.80, 1.00, 0.01):
+            for replaced_threshold in np.arange(0.0, 0.40, 0.01):
+                agreement = sum(classify(similarity, ratio, new_threshold, unchanged_threshold, replaced_threshold)
+                                == expected for similarity, ratio, expected in labelled)
+                if best is None or agreement > best[0]:
+                    best = (agreement, new_threshold, unchanged_threshold, replaced_threshold)
+    return best
+
+
+def calibrate(assignments, reference):
+    """Tìm ngưỡng (lưới) cho độ đồng thuận change_type cao nhất với reference (trên toàn bộ nhãn)."""
+    labelled = [(similarity, ratio, reference.forward[law_id][1])
+                for law_id, _, similarity, ratio in assignments if law_id in reference.forward]
+    agreement, new_threshold, unchanged_threshold, replaced_threshold = fit_thresholds(labelled)
+    print(f"Ngưỡng tốt nhất: NEW_ARTICLE_THRESHOLD={new_threshold:.2f}, UNCHANGED_THRESHOLD={unchanged_threshold:.2f}, "
+          f"REPLACED_THRESHOLD={replaced_threshold:.2f} -> change_type {agreement / len(labelled):.1%} (trong mẫu)")
+
+
+def cross_validate(assignments, reference, folds=CV_FOLDS, seed=0):
+    """
+    Độ đồng thuận ngoài mẫu: chia các điều luật có nhãn thành `folds` phần (xáo trộn cố định theo seed), với mỗi
+    phần tìm ngưỡng trên các phần còn lại rồi phân loại phần để riêng. Báo cáo target_id_2013 / change_type trên
+    các dự đoán để riêng và độ phủ (recall) của từng loại thay đổi.
+    """
+    labelled = [(law_id, id_2013, similarity, ratio) for law_id, id_2013, similarity, ratio in assignments
+                if law_id in reference.forward]
+    order = np.random.default_rng(seed).permutation(len(labelled))
+    same_target = same_type = aligned = aligned_hits = 0
+    hits, totals = Counter(), Counter()
+    for held_out in np.array_split(order, folds):
+        held_out_set = set(held_out.tolist())
+        training = [(similarity, ratio, reference.forward[law_id][1])
+                    for index, (law_id, _, similarity, ratio) in enumerate(labelled) if index not in held_out_set]
+        _, new_threshold, unchanged_threshold, replaced_threshold = fit_thresholds(training)
+        for index in held_out:
+            law_id, id_2013, similarity, ratio = labelled[index]
+            expected_target, expected_type = reference.forward[law_id]
+            predicted_type = classify(similarity, ratio, new_threshold, unchanged_threshold, replaced_threshold)
+            predicted_target = None if predicted_type == NEW_ARTICLE else id_2013
+            same_target += predicted_target == expected_target
+            if expected_target:
+                aligned += 1
+                aligned_hits += predicted_target == expected_target
+            same_type += predicted_type == expected_type
+            totals[expected_type] += 1
+            hits[expected_type] += predicted_type == expected_type
+    print(f"\nĐồng thuận ngoài mẫu ({folds}-fold cross-validation, ngưỡng tìm lại trên các phần còn lại) "
+          f"trên {len(labelled)} điều luật 2024:")
+    print(f"  target_id_2013 (kể cả null): {same_target / len(labelled):.1%}")
+    print(f"  target_id_2013 trên {aligned} điều có đối chiếu: {aligned_hits / max(aligned, 1):.1%}")
+    print(f"  change_type: {same_type / len(labelled):.1%}")
+    print("  recall theo loại: " + ", ".join(f"{label} {hits[label]}/{totals[label]}" for label in sorted(totals)))
+
+
+def report_agreement(results, reference):
+    """So kết quả với nhãn hiện có: target_id_2013, change_type, ma trận nhầm lẫn và điều luật mới."""
+    common = [item for item in results if item['source_id_2024'] in reference.forward]
+    if not common:
+        print("Không có nhãn tham chiếu để so sánh.")
+        return
+    same_target = same_type = 0
+    confusion = Counter()
+    for item in common:
+        expected_target, expected_type = reference.forward[item['source_id_2024']]
+        predicted_type = normalize_change_type(item['change_type'])
+        same_target += item['target_id_2013'] == expected_target
+        same_type += predicted_type == expected_type
+        confusion[(expected_type, predicted_type)] += 1
+    aligned = [item for item in common if reference.forward[item['source_id_2024']][0]]
+    aligned_hits = sum(item['target_id_2013'] == reference.forward[item['source_id_2024']][0] for item in aligned)
+    print(f"\nĐồng thuận với kho comparisons trên {len(common)} điều luật 2024 "
+          f"(trong mẫu: ngưỡng đã được hiệu chỉnh trên chính các nhãn này):")
+    print(f"  target_id_2013 (kể cả null): {same_target / len(common):.1%}")
+    print(f"  target_id_2013 trên {len(aligned)} điều có đối chiếu: {aligned_hits / len(aligned):.1%}")
+    print(f"  change_type: {same_type / len(common):.1%}")
+    labels = sorted({label for pair in confusion for label in pair})
+    header = "nhãn LLM / cục bộ"
+    print(f"\n  {header:<20}" + "".join(f"{label[:12]:>14}" for label in labels))
+    for expected in labels:
+        print(f"  {expected[:20]:<20}" + "".join(f"{confusion[(expected, predicted)]:>14}" for predicted in labels))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--no-semantic', action='store_true', help="Chỉ dùng TF-IDF (không nạp bi-encoder).")
+    parser.add_argument('--write-store', action='store_true', help="Ghi kết quả vào kho 'comparisons' (thay kết quả LLM).")
+    parser.add_argument('--calibrate', action='store_true', help="Tìm ngưỡng phân loại theo kho 'comparisons'.")
+    parser.add_argument('--folds', type=int, default=CV_FOLDS,
+                        help="Số phần của cross-validation khi báo cáo độ đồng thuận ngoài mẫu (0: bỏ qua).")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    documents_2024 = load_article_documents((2024,))
+    documents_2013 = load_article_documents((2013,))
+    model = None
+    if not args.no_semantic:
+        from inference_backend import load_bi_encoder
+        from semantic_retriever import MODEL_NAME
+        model = load_bi_encoder(MODEL_NAME)
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assignments = align(documents_2024, documents_2013, model)
+    results = []
+    for law_id, id_2013, similarity, ratio in assignments:
+        change_type = classify(similarity, ratio)
+        results.append({
+            'source_id_2024': law_id,
+            'target_id_2013': None if change_type == NEW_ARTICLE else id_2013,
+            'change_type': change_type.lower(),
+        })
+    align_time = time.perf_counter() - start
+
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+    for item in results:
+        with open(os.path.join(args.output_dir, f"{item['source_id_2024']}.json"), 'w', encoding='utf-8') as f:
+            json.dump(item, f, ensure_ascii=False, indent=2)
+    print(f"Đã đối chiếu {len(documents_2024)} điều luật 2024 với {len(documents_2013)} điều luật 2013 "
+          f"({'TF-IDF' if model is None else 'TF-IDF + bi-encoder'}) trong {align_time:.2f}s "
+          f"(nạp dữ liệu / mô hình {load_time:.2f}s) -> '{args.output_dir}/'")
+    print("Phân bố loại thay đổi:", dict(Counter(item['change_type'] for item in results)))
+
+    # Nhãn tham chiếu được đọc trước khi (có thể) ghi đè kho
+    reference = ArticleAlignment.from_extraction_store()
+    if reference.forward:
+        report_agreement(results, reference)
+        if args.folds > 1:
+            cross_validate(assignments, reference, args.folds)
+        if args.calibrate:
+            print()
+            calibrate(assignments, reference)
+
+    if args.write_store:
+        with ExtractionStore.open('comparisons') as store:
+            store.put_many(((item['source_id_2024'], item) for item in results),
+                           sources={law_id: source_hash(content) for law_id, content in documents_2024})
+        print(f"Đã ghi {len(results)} kết quả vào kho '{store.path}'.")
+
+
+if __name__ == '__main__':
+    main()
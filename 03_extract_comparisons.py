@@ -1,24 +1,39 @@
+import argparse
 import os
 import re
 import json
+import asyncio
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from llm_callers import call_gemini_api as call_llm
+from llm_client import AsyncLLMClient
+from extraction_store import ExtractionStore, pending_ids, source_hash
+from law_structure import LawStructure
+from comparison_candidates import CandidateSelector, CANDIDATE_TOP_N as DEFAULT_CANDIDATE_TOP_N
+
+# Số điều luật 2013 ứng viên (chọn trước bằng BM25) đưa vào mỗi prompt.
+# Đặt 0 để gửi toàn bộ Luật 2013 như trước (chậm, tốn token và quota hơn nhiều).
+CANDIDATE_TOP_N = int(os.getenv("COMPARISON_CANDIDATE_TOP_N", DEFAULT_CANDIDATE_TOP_N))
+# Mặc định chỉ dùng BM25 (top-10 chứa điều 2013 đã đối chiếu ở 92.9% điều luật, tiết kiệm 90.9% token prompt,
+# ~3 ms / điều luật; xem benchmarks/bench_comparison_candidates.py). Đặt 1 để gộp thêm bi-encoder (nạp mô hình,
+# chưa được đo recall trên kho comparisons).
+USE_SEMANTIC_CANDIDATES = os.getenv("COMPARISON_SEMANTIC_CANDIDATES", "0") == "1"
 
 # --- Chuẩn bị dữ liệu ---
-# Đọc toàn bộ nội dung luật cũ vào một biến. 
+# Đọc toàn bộ nội dung luật cũ vào một biến (chỉ cần khi không chọn trước ứng viên).
 # Đảm bảo đã chạy script 01 và có file này.
-try:
-    with open('LuatDatDai2013_full.txt', 'r', encoding='utf-8') as f:
-        luat_2013_full_text = f.read()
-except FileNotFoundError:
-    print("Lỗi: Không tìm thấy file 'LuatDatDai2013_full.txt'.")
-    print("Vui lòng chạy script 01 để tạo file này hoặc đảm bảo nó nằm trong cùng thư mục.")
-    exit()
+luat_2013_full_text = None
+if CANDIDATE_TOP_N <= 0:
+    try:
+        with open('LuatDatDai2013_full.txt', 'r', encoding='utf-8') as f:
+            luat_2013_full_text = f.read()
+    except FileNotFoundError:
+        print("Lỗi: Không tìm thấy file 'LuatDatDai2013_full.txt'.")
+        print("Vui lòng chạy script 01 để tạo file này hoặc đảm bảo nó nằm trong cùng thư mục.")
+        exit()
 
 # --- Định nghĩa Prompt ---
-def get_comparison_prompt(article_code_2024, article_content_2024, luat_2013_full_text):
-    """Prompt 2: So sánh và liên kết."""
+def get_comparison_prompt(article_code_2024, article_content_2024, reference_text,
+                          reference_label="Toàn bộ Luật 2013"):
+    """Prompt 2: So sánh và liên kết. reference_text là toàn bộ Luật 2013 hoặc các điều luật ứng viên."""
     return f"""
         Bạn là một chuyên gia pháp lý cao cấp, chuyên phân tích và so sánh các phiên bản luật.
 
@@ -36,72 +51,89 @@ def get_comparison_prompt(article_code_2024, article_content_2024, luat_2013_ful
         *   **Mã Điều:** {article_code_2024}
         *   **Nội dung:** {article_content_2024}
         ---
-        **VĂN BẢN THAM CHIẾU (Toàn bộ Luật 2013):**
-        {luat_2013_full_text}
+        **VĂN BẢN THAM CHIẾU ({reference_label}):**
+        {reference_text}
         ---
         **JSON OUTPUT:**
     """
 
-# --- Hàm xử lý cho một file ---
-def process_single_comparison(filename, input_dir, output_dir, luat_2013_full_text):
-    """Hàm này xử lý so sánh cho một file duy nhất, được gọi bởi các luồng."""
-    output_path = os.path.join(output_dir, filename.replace('.txt', '.json'))
-    
-    # === BỎ QUA NẾU ĐÃ XỬ LÝ ===
-    if os.path.exists(output_path):
-        print(f'{filename} đã được xử lý. Bỏ qua')
-        return f"Bỏ qua (đã tồn tại): {filename}"
-        
-    input_path = os.path.join(input_dir, filename)
-    
-    with open(input_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-        
-    article_code_match = re.search(r'dieu_(\d+)_', filename)
+# --- Hàm xử lý cho một điều luật ---
+async def process_single_comparison(client, law_id, content, store, selector=None):
+    """Xử lý so sánh cho một điều luật 2024; các điều được gửi đồng thời qua cùng một client."""
+    article_code_match = re.search(r'dieu_(\d+)_', law_id)
     if not article_code_match:
-        return f"Lỗi tên file: {filename}"
+        return f"Lỗi ID điều luật: {law_id}"
     article_code = article_code_match.group(1)
 
-    prompt = get_comparison_prompt(article_code, content, luat_2013_full_text)
+    if selector is not None:
+        # Chọn ứng viên (BM25, có thể kèm encode bằng bi-encoder) tốn CPU: chạy trong luồng riêng để không
+        # chặn event loop, các request LLM khác vẫn được gửi / nhận trong lúc đó
+        candidates = await asyncio.to_thread(selector.select, content, CANDIDATE_TOP_N)
+        prompt = get_comparison_prompt(article_code, content, selector.reference_text(candidates),
+                                       f"{len(candidates)} điều luật của Luật 2013 có nội dung gần nhất")
+    else:
+        prompt = get_comparison_prompt(article_code, content, luat_2013_full_text)
     
     try:
-        response_text = call_llm(prompt)
+        response_text = await client.generate(prompt)
         json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response_text)
         json_str = json_match.group(1) if json_match else response_text
         
         # Kiểm tra nội dung JSON hợp lệ trước khi lưu
         parsed_json = json.loads(json_str)
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(parsed_json, f, ensure_ascii=False, indent=2)
-        return f"Thành công: {filename}"
+        # Upsert vào kho JSONL (extraction_store.py) kèm dấu vân tay nội dung điều luật 2024 đã dùng
+        store.put(law_id, parsed_json, source=source_hash(content))
+        return f"Thành công: {law_id}"
             
     except Exception as e:
         # Khi có lỗi (rate limit, JSON không hợp lệ...), hàm sẽ trả về thông báo lỗi
-        # File output sẽ không được tạo, lần chạy sau sẽ tự động thử lại file này
-        return f"Lỗi: {filename} - {e}"
+        # Bản ghi sẽ không được tạo, lần chạy sau sẽ tự động thử lại điều luật này
+        return f"Lỗi: {law_id} - {e}"
 
 # --- Hàm chính ---
-def main(max_workers=3):
-    input_dir = 'chunks_2024'
-    output_dir = 'comparisons_json'
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        
-    file_list = [f for f in os.listdir(input_dir) if f.endswith('.txt')]
-    
-    print(f"\n--- Bắt đầu so sánh song song Luật 2024 vs 2013 ({len(file_list)} điều) ---")
-    
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(process_single_comparison, filename, input_dir, output_dir, luat_2013_full_text): filename for filename in file_list}
-        
-        for future in tqdm(as_completed(futures), total=len(file_list), desc="So sánh luật"):
-            result = future.result()
-            if "Lỗi" in result:
-                # In ra lỗi để tiện theo dõi
-                print(result)
+async def run(overwrite=False):
+    # Nội dung các điều luật 2024 đọc từ file cấu trúc (law_structure.py)
+    with LawStructure.load(2024) as structure:
+        articles = list(structure.iter_article_texts())
+
+    # Limiter của client điều tiết theo quota (request/phút, token/phút) thay cho số luồng cố định
+    with ExtractionStore.open('comparisons') as store:
+        missing, stale = pending_ids(store, articles)
+        if stale:
+            print(f"{len(stale)} điều luật 2024 có nội dung khác lúc so sánh, sẽ so sánh lại: {stale}")
+        if missing:
+            print(f"{len(missing)} điều luật 2024 chưa có kết quả: {missing}")
+        # Điều luật đã có kết quả với nội dung không đổi được bỏ qua, trừ khi overwrite
+        pending = set(missing + stale)
+        articles = [(law_id, content) for law_id, content in articles if overwrite or law_id in pending]
+        print(f"\n--- Bắt đầu so sánh song song Luật 2024 vs 2013 ({len(articles)} điều) ---")
+
+        selector = None
+        if CANDIDATE_TOP_N > 0 and articles:
+            selector = CandidateSelector.from_law_structure(use_semantic=USE_SEMANTIC_CANDIDATES)
+            print(f"Chọn trước {CANDIDATE_TOP_N} điều luật 2013 ứng viên cho mỗi điều luật 2024 "
+                  f"({'BM25 + bi-encoder' if USE_SEMANTIC_CANDIDATES else 'BM25'}, {len(selector.texts)} điều luật 2013)")
+
+        async with AsyncLLMClient() as client:
+            tasks = [process_single_comparison(client, law_id, content, store, selector)
+                     for law_id, content in articles]
+            for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="So sánh luật"):
+                result = await task
+                if "Lỗi" in result:
+                    # In ra lỗi để tiện theo dõi
+                    print(result)
+            print(f"Thống kê gọi LLM: {dict(client.stats)}")
 
     print("\n--- Hoàn thành trích xuất so sánh! ---")
 
+def main():
+    parser = argparse.ArgumentParser(description="So sánh từng điều luật 2024 với Luật 2013 bằng LLM.")
+    parser.add_argument('--overwrite', action='store_true',
+                        help="Xử lý lại cả các điều luật đã có kết quả với nội dung không đổi "
+                             "(prompt không đổi sẽ lấy từ cache LLM).")
+    args = parser.parse_args()
+    asyncio.run(run(args.overwrite))
+
 if __name__ == "__main__":
-    main(max_workers=10)
\ No newline at end of file
+    main()
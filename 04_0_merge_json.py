@@ -1,37 +1,26 @@
 import os
 import json
-from glob import glob
 from tqdm import tqdm
+from extraction_store import ExtractionStore
 
-def merge_json_files(input_glob_pattern: str, output_file_path: str):
+def merge_json_files(store_name: str, output_file_path: str):
     """
-    Tìm tất cả các file JSON theo một mẫu, đọc nội dung của chúng,
-    và gộp tất cả vào một file JSON duy nhất chứa một mảng các object.
+    Đọc tất cả các bản ghi của một kho trích xuất (extraction_store.py)
+    và gộp vào một file JSON duy nhất chứa một mảng các object, để xem / phân tích.
+    Các bước 04_x đọc thẳng từ kho nên không cần chạy script này trong pipeline.
     
     Args:
-        input_glob_pattern (str): Mẫu để tìm các file input, ví dụ: 'output_json_2013/*.json'
+        store_name (str): Tên kho, ví dụ: 'entities_2013'
         output_file_path (str): Đường dẫn đến file JSON output.
     """
-    json_files = glob(input_glob_pattern)
-    
-    if not json_files:
-        print(f"Cảnh báo: Không tìm thấy file nào khớp với mẫu '{input_glob_pattern}'. Bỏ qua.")
-        return
+    with ExtractionStore.open(store_name) as store:
+        if not len(store):
+            print(f"Cảnh báo: Kho '{store.path}' trống hoặc không tồn tại. Bỏ qua.")
+            return
+
+        print(f"\n--- Bắt đầu gộp {len(store)} bản ghi từ '{store.path}' ---")
+        merged_data = [data for _, data in tqdm(store.items(), total=len(store), desc=f"Đang xử lý {store_name}")]
 
-    print(f"\n--- Bắt đầu gộp {len(json_files)} file từ '{input_glob_pattern}' ---")
-    
-    merged_data = []
-    
-    for file_path in tqdm(json_files, desc=f"Đang xử lý {os.path.dirname(input_glob_pattern)}"):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                merged_data.append(data)
-        except json.JSONDecodeError:
-            print(f"\nCảnh báo: File '{file_path}' không chứa JSON hợp lệ, đã bỏ qua.")
-        except Exception as e:
-            print(f"\nLỗi khi đọc file '{file_path}': {e}")
-            
     # Đảm bảo thư mục output tồn tại
     output_dir = os.path.dirname(output_file_path)
     if output_dir and not os.path.exists(output_dir):
@@ -48,12 +37,12 @@ def merge_json_files(input_glob_pattern: str, output_file_path: str):
 
 
 def main():
-    # Cấu hình các thư mục và file output
+    # Cấu hình các kho và file output
     tasks = [
-        {"input": "output_json_2013/*.json", "output": "analysis/output_2013_merged.json"},
-        {"input": "output_json_2024/*.json", "output": "analysis/output_2024_merged.json"},
-        # Bạn cũng có thể gộp cả file so sánh nếu muốn
-        {"input": "comparisons_json/*.json", "output": "analysis/comparisons_merged.json"}
+        {"input": "entities_2013", "output": "analysis/output_2013_merged.json"},
+        {"input": "entities_2024", "output": "analysis/output_2024_merged.json"},
+        # Bạn cũng có thể gộp cả kết quả so sánh nếu muốn
+        {"input": "comparisons", "output": "analysis/comparisons_merged.json"}
     ]
     
     for task in tasks:
@@ -1,15 +1,11 @@
-import os
-import json
-from glob import glob
 from tqdm import tqdm
+from extraction_store import ExtractionStore, pending_ids
+from law_structure import LawStructure
 
-def validate_internal_extraction_file(file_path):
-    """Kiểm tra một file trích xuất nội tại (output_json_...)."""
+def validate_internal_extraction(data):
+    """Kiểm tra một bản ghi trích xuất nội tại (kho entities_20xx)."""
     issues = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
         # 1. Kiểm tra cấu trúc tổng thể
         graph_data = data.get("graph", data)
         if not isinstance(graph_data, dict):
@@ -44,20 +40,15 @@ def validate_internal_extraction_file(file_path):
             if 'relationship_type' not in rel or not rel['relationship_type']:
                 issues.append(f"Relationship ở vị trí {i} thiếu 'relationship_type'.")
 
-    except json.JSONDecodeError:
-        issues.append("File không chứa JSON hợp lệ.")
     except Exception as e:
         issues.append(f"Lỗi không xác định: {e}")
         
     return issues
 
-def validate_comparison_file(file_path):
-    """Kiểm tra một file so sánh (comparisons_json/...)."""
+def validate_comparison(data):
+    """Kiểm tra một bản ghi so sánh (kho comparisons)."""
     issues = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
         if not isinstance(data, dict):
             issues.append("Cấu trúc JSON không phải là một object.")
             return issues
@@ -74,49 +65,64 @@ def validate_comparison_file(file_path):
         if "type" not in data and "change_type" not in data:
             issues.append("Thiếu cả key 'type' và 'change_type'")
 
-    except json.JSONDecodeError:
-        issues.append("File không chứa JSON hợp lệ.")
     except Exception as e:
         issues.append(f"Lỗi không xác định: {e}")
         
     return issues
 
+def validate_store(store_name, validate, problematic_records):
+    """Kiểm tra mọi bản ghi của một kho trích xuất (đọc tuần tự một lượt)."""
+    with ExtractionStore.open(store_name) as store:
+        if not len(store):
+            print(f"Cảnh báo: Kho '{store.path}' trống hoặc không tồn tại, bỏ qua.")
+            return
+        print(f"\n--- Bắt đầu kiểm tra {len(store)} bản ghi trong '{store.path}' ---")
+        try:
+            for record_id, data in tqdm(store.items(), total=len(store), desc=f"Kiểm tra {store_name}"):
+                issues = validate(data)
+                if issues:
+                    problematic_records.append({"file": f"{store.path}#{record_id}", "issues": issues})
+        except ValueError as e:
+            problematic_records.append({"file": store.path, "issues": [f"Kho chứa dòng JSON không hợp lệ: {e}"]})
+
+def check_coverage(store_name, year, problematic_records):
+    """
+    Đối chiếu kho với các điều luật hiện tại (law_structure.py): điều luật chưa có bản ghi, bản ghi được trích
+    xuất từ nội dung khác (văn bản đã được phân tích lại) và bản ghi của ID không còn trong văn bản.
+    """
+    with LawStructure.load(year) as structure:
+        articles = list(structure.iter_article_texts())
+    with ExtractionStore.open(store_name) as store:
+        missing, stale = pending_ids(store, articles)
+        known_ids = {law_id for law_id, _ in articles}
+        orphans = [record_id for record_id in store.ids() if record_id not in known_ids]
+        for ids, issue in ((missing, "Chưa có bản ghi cho điều luật (chạy lại bước trích xuất)"),
+                           (stale, "Bản ghi được trích xuất từ nội dung điều luật cũ (chạy lại bước trích xuất)"),
+                           (orphans, f"Bản ghi của ID không có trong Luật {year}")):
+            if ids:
+                problematic_records.append({"file": store.path, "issues": [f"{issue}: {', '.join(ids)}"]})
+
 def main():
     all_problematic_files = []
 
-    # --- Kiểm tra các thư mục output_json ---
-    internal_dirs = ['output_json_2013', 'output_json_2024']
-    for directory in internal_dirs:
-        if not os.path.isdir(directory):
-            print(f"Cảnh báo: Thư mục '{directory}' không tồn tại, bỏ qua.")
-            continue
-        
-        files = glob(os.path.join(directory, '*.json'))
-        print(f"\n--- Bắt đầu kiểm tra {len(files)} file trong '{directory}' ---")
-        for file_path in tqdm(files, desc=f"Kiểm tra {directory}"):
-            issues = validate_internal_extraction_file(file_path)
-            if issues:
-                all_problematic_files.append({"file": file_path, "issues": issues})
-
-    # --- Kiểm tra thư mục comparisons_json ---
-    comp_dir = 'comparisons_json'
-    if not os.path.isdir(comp_dir):
-        print(f"Cảnh báo: Thư mục '{comp_dir}' không tồn tại, bỏ qua.")
-    else:
-        files = glob(os.path.join(comp_dir, '*.json'))
-        print(f"\n--- Bắt đầu kiểm tra {len(files)} file trong '{comp_dir}' ---")
-        for file_path in tqdm(files, desc=f"Kiểm tra {comp_dir}"):
-            issues = validate_comparison_file(file_path)
-            if issues:
-                all_problematic_files.append({"file": file_path, "issues": issues})
+    # --- Kiểm tra các kho trích xuất nội tại ---
+    for store_name in ['entities_2013', 'entities_2024']:
+        validate_store(store_name, validate_internal_extraction, all_problematic_files)
+
+    # --- Kiểm tra kho so sánh ---
+    validate_store('comparisons', validate_comparison, all_problematic_files)
+
+    # --- Kiểm tra độ phủ so với văn bản luật ---
+    for store_name, year in [('entities_2013', 2013), ('entities_2024', 2024), ('comparisons', 2024)]:
+        check_coverage(store_name, year, all_problematic_files)
 
     # --- In kết quả tổng hợp ---
     if not all_problematic_files:
-        print("\n\n✅ Tuyệt vời! Tất cả các file JSON đều hợp lệ về mặt cấu trúc.")
+        print("\n\n✅ Tuyệt vời! Tất cả các bản ghi JSON đều hợp lệ về mặt cấu trúc.")
     else:
-        print(f"\n\n❌ Phát hiện {len(all_problematic_files)} file có vấn đề:")
+        print(f"\n\n❌ Phát hiện {len(all_problematic_files)} bản ghi có vấn đề:")
         for item in all_problematic_files:
-            print(f"\n- File: {item['file']}")
+            print(f"\n- Bản ghi: {item['file']}")
             for issue in item['issues']:
                 print(f"  - {issue}")
                 
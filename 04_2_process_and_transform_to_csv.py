@@ -1,23 +1,10 @@
 import os
-import json
-from glob import glob
 import pandas as pd
 from tqdm import tqdm
-import re
-from unidecode import unidecode
-
-# ==============================================================================
-# --- CÁC HÀM CHUẨN HÓA ---
-# ==============================================================================
-def normalize_string(s: str, case='snake') -> str:
-    if not isinstance(s, str) or not s: return ""
-    s = unidecode(s.strip())
-    s = re.sub(r'[^a-zA-Z0-9]+', '_', s)
-    s = s.strip('_')
-    if case == 'snake': return s.lower()
-    if case == 'pascal': return "".join(word.capitalize() for word in s.split('_') if word)
-    if case == 'upper': return s.upper()
-    return s
+from law_structure import LawStructure
+from extraction_store import ExtractionStore
+# Chuẩn hóa có ghi nhớ: tên thuộc tính / ID lặp lại giữa các thực thể chỉ được chuẩn hóa một lần
+from normalization import normalize_string
 
 # ==============================================================================
 # --- HÀM CHÍNH ---
@@ -29,61 +16,55 @@ def main():
     all_nodes_info = {}
     all_relationships_raw = []
 
-    # === BƯỚC 1: ĐỌC VÀ CHUẨN HÓA DỮ LIỆU THÔ TỪ JSON ===
+    # === BƯỚC 1: ĐỌC VÀ CHUẨN HÓA DỮ LIỆU THÔ TỪ KHO TRÍCH XUẤT ===
     
-    # Xử lý file nội tại (output_json_2013 và output_json_2024)
-    json_files_internal = glob('output_json_2013/*.json') + glob('output_json_2024/*.json')
-    print(f"Bắt đầu xử lý {len(json_files_internal)} file trích xuất nội tại...")
-    
-    for file_path in tqdm(json_files_internal, desc="Đang đọc và chuẩn hóa file nội tại"):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f: data = json.load(f)
-            graph_data = data.get("graph", data)
-            
-            # Đọc nội dung text gốc để gán cho :DieuLuat
-            text_dir = os.path.dirname(file_path).replace('output_json', 'chunks')
-            text_filename = os.path.basename(file_path).replace('.json', '.txt')
-            text_path = os.path.join(text_dir, text_filename)
-            full_content = ""
-            if os.path.exists(text_path):
-                with open(text_path, 'r', encoding='utf-8') as f_text: full_content = f_text.read()
+    # Xử lý kết quả trích xuất nội tại (kho entities_2013 và entities_2024, extraction_store.py)
+    for year in (2013, 2024):
+        # Nội dung điều luật được đọc theo vị trí trong LuatDatDai20xx_full.txt (file cấu trúc của 01_preprocess_pdfs.py)
+        with ExtractionStore.open(f'entities_{year}') as store, LawStructure.load(year) as structure:
+            print(f"Bắt đầu xử lý {len(store)} bản ghi trích xuất nội tại {year}...")
+            for law_id, data in tqdm(store.items(), total=len(store), desc=f"Đang đọc và chuẩn hóa kho entities_{year}"):
+                try:
+                    graph_data = data.get("graph", data)
+                    
+                    # Nội dung text gốc để gán cho :DieuLuat
+                    full_content = structure.article_text(law_id) or ""
 
-            for entity in graph_data.get('entities', []):
-                node_id = entity.get('id')
-                if node_id:
-                    normalized_id = normalize_string(node_id, 'snake')
-                    properties = {normalize_string(k, 'snake'): v for k, v in entity.items() if k not in ['id', 'label']}
+                    for entity in graph_data.get('entities', []):
+                        node_id = entity.get('id')
+                        if node_id:
+                            normalized_id = normalize_string(node_id, 'snake')
+                            properties = {normalize_string(k, 'snake'): v for k, v in entity.items() if k not in ['id', 'label']}
+                            
+                            # Gán nội dung đầy đủ nếu là DieuLuat
+                            label = normalize_string(entity.get('label'), 'pascal')
+                            if label == 'Dieuluat':
+                                properties['noi_dung'] = full_content
+                                
+                            all_nodes_info[normalized_id] = {'label': label, 'properties': properties}
                     
-                    # Gán nội dung đầy đủ nếu là DieuLuat
-                    label = normalize_string(entity.get('label'), 'pascal')
-                    if label == 'Dieuluat':
-                        properties['noi_dung'] = full_content
-                        
-                    all_nodes_info[normalized_id] = {'label': label, 'properties': properties}
-            
-            for rel in graph_data.get('relationships', []):
-                if rel.get('source_id') and rel.get('target_id'):
-                    all_relationships_raw.append({
-                        'source_id': normalize_string(rel['source_id'], 'snake'),
-                        'target_id': normalize_string(rel['target_id'], 'snake'),
-                        'relationship_type': normalize_string(rel.get('relationship_type'), 'upper')
-                    })
-        except Exception as e: print(f"\nLỗi khi đọc file nội tại {file_path}: {e}")
+                    for rel in graph_data.get('relationships', []):
+                        if rel.get('source_id') and rel.get('target_id'):
+                            all_relationships_raw.append({
+                                'source_id': normalize_string(rel['source_id'], 'snake'),
+                                'target_id': normalize_string(rel['target_id'], 'snake'),
+                                'relationship_type': normalize_string(rel.get('relationship_type'), 'upper')
+                            })
+                except Exception as e: print(f"\nLỗi khi xử lý bản ghi nội tại {law_id}: {e}")
 
-    # Xử lý file so sánh
-    comparison_files = glob('comparisons_json/*.json')
-    print(f"Bắt đầu xử lý {len(comparison_files)} file so sánh...")
-    for file_path in tqdm(comparison_files, desc="Đang đọc và chuẩn hóa file so sánh"):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f: data = json.load(f)
-            if data.get('target_id_2013') is not None and data.get('source_id_2024'):
-                 all_relationships_raw.append({
-                    'source_id': normalize_string(data['source_id_2024'], 'snake'),
-                    'target_id': normalize_string(data['target_id_2013'], 'snake'),
-                    'relationship_type': 'THAY_THE_CHO',
-                    'properties': {'change_type': normalize_string(data.get('type') or data.get('change_type'), 'snake')}
-                })
-        except Exception as e: print(f"\nLỗi khi đọc file so sánh {file_path}: {e}")
+    # Xử lý kết quả so sánh
+    with ExtractionStore.open('comparisons') as store:
+        print(f"Bắt đầu xử lý {len(store)} bản ghi so sánh...")
+        for law_id, data in tqdm(store.items(), total=len(store), desc="Đang đọc và chuẩn hóa kho comparisons"):
+            try:
+                if data.get('target_id_2013') is not None and data.get('source_id_2024'):
+                     all_relationships_raw.append({
+                        'source_id': normalize_string(data['source_id_2024'], 'snake'),
+                        'target_id': normalize_string(data['target_id_2013'], 'snake'),
+                        'relationship_type': 'THAY_THE_CHO',
+                        'properties': {'change_type': normalize_string(data.get('type') or data.get('change_type'), 'snake')}
+                    })
+            except Exception as e: print(f"\nLỗi khi xử lý bản ghi so sánh {law_id}: {e}")
 
     # === BƯỚC 2: TẠO FILE CSV SẠCH CHO NODES ===
     print("\nĐang tạo file CSV cho các nút...")
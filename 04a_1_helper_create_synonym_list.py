@@ -1,38 +1,36 @@
-import json
-import os
 import pandas as pd
 from collections import defaultdict
+from extraction_store import ExtractionStore
 
 # --- Cấu hình ---
-INPUT_FILES = [
-    'analysis/output_2024_merged.json',
-    'analysis/output_2013_merged.json'
+# Đọc thẳng từ kho trích xuất (extraction_store.py), không cần bước gộp analysis/*_merged.json
+INPUT_STORES = [
+    'entities_2024',
+    'entities_2013'
 ]
 
 OUTPUT_CSV_FILE = 'entities_for_review.csv'
 
-def extract_and_review_entities(input_files, output_filename):
+def extract_and_review_entities(input_stores, output_filename):
     """
-    Trích xuất tất cả các thực thể duy nhất từ nhiều file JSON,
+    Trích xuất tất cả các thực thể duy nhất từ nhiều kho trích xuất,
     sắp xếp chúng và xuất ra file CSV để rà soát.
     """
     unique_entities = {}
 
     print("Bắt đầu đọc và tổng hợp thực thể từ các file nguồn...")
-    for file_path in input_files:
-        if not os.path.exists(file_path):
-            print(f"Cảnh báo: Bỏ qua file không tồn tại: {file_path}")
-            continue
+    for store_name in input_stores:
+        with ExtractionStore.open(store_name) as store:
+            if not len(store):
+                print(f"Cảnh báo: Bỏ qua kho trống: {store.path}")
+                continue
 
-        print(f"Đang xử lý file: {file_path}")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        for article_data in data:
-            for entity in article_data.get('entities', []):
-                entity_id = entity.get('id')
-                if entity_id and entity_id not in unique_entities:
-                    unique_entities[entity_id] = entity
+            print(f"Đang xử lý kho: {store.path}")
+            for _, article_data in store.items():
+                for entity in article_data.get('entities', []):
+                    entity_id = entity.get('id')
+                    if entity_id and entity_id not in unique_entities:
+                        unique_entities[entity_id] = entity
     
     if not unique_entities:
         print("Lỗi: Không tìm thấy thực thể nào. Vui lòng kiểm tra lại file input.")
@@ -70,4 +68,4 @@ def extract_and_review_entities(input_files, output_filename):
 
 # --- Main Execution ---
 if __name__ == "__main__":
-    extract_and_review_entities(INPUT_FILES, OUTPUT_CSV_FILE)
\ No newline at end of file
+    extract_and_review_entities(INPUT_STORES, OUTPUT_CSV_FILE)
\ No newline at end of file
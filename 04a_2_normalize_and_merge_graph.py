@@ -6,16 +6,17 @@ Mục đích:
 1.  Đọc và gộp nhiều file CSV chứa thông tin về các nút (nodes).
 2.  Thực hiện bước quan trọng nhất: **Loại bỏ các nút bị trùng lặp** dựa trên ID duy nhất ('nodeId:ID'),
     đảm bảo mỗi thực thể chỉ tồn tại một lần duy nhất trong đồ thị.
-3.  **CHUẨN HÓA CỘT LABEL:** Loại bỏ dấu tiếng Việt và định dạng PascalCase cho các label.
+3.  **CHUẨN HÓA CỘT LABEL:** Loại bỏ dấu tiếng Việt và định dạng PascalCase cho các label
+    (normalization.py: mỗi label / ID phân biệt chỉ được chuẩn hóa một lần).
 4.  Đọc và gộp nhiều file CSV chứa thông tin về các cạnh (relationships) thành một file duy nhất.
 5.  Xuất ra 2 file CSV cuối cùng, sẵn sàng để sử dụng với lệnh `neo4j-admin database import full`.
 """
 
+import argparse
 import pandas as pd
 import os
 import sys
-from unidecode import unidecode
-import re
+from normalization import normalize_id, normalize_label, map_unique
 
 # --- CẤU HÌNH ---
 NODE_FILES = ['result_final/graph_nodes_2013.csv', 'result_final/graph_nodes_2024.csv']
@@ -99,41 +100,12 @@ def create_semantic_mapping(synonym_groups):
                 mapping[synonym] = canonical_id
     return mapping
 
-def normalize_id(entity_id):
-    if not isinstance(entity_id, str): return ""
-    normalized = unidecode(entity_id)
-    normalized = normalized.lower()
-    normalized = re.sub(r'[\s\W]+', '_', normalized)
-    return normalized.strip('_')
+def canonical_ids(series, semantic_map):
+    """Chuẩn hóa ID rồi ánh xạ sang ID chuẩn của nhóm đồng nghĩa, một lần cho mỗi ID phân biệt."""
+    return map_unique(series, lambda x: semantic_map.get(normalize_id(x), normalize_id(x)))
 
-def normalize_label(label):
-    """
-    Hàm mới để chuẩn hóa label:
-    1. Bỏ dấu (ví dụ: "ĐiềuLuật" -> "DieuLuat")
-    2. Chuyển thành PascalCase (ví dụ: "hanh vi phap ly" -> "HanhViPhapLy")
-    """
-    if not isinstance(label, str): return "UnknownLabel"
-    
-    # Bỏ dấu
-    no_accent_label = unidecode(label)
-    
-    # Tạo PascalCase: Chuyển các từ được phân tách bởi khoảng trắng hoặc gạch dưới
-    # thành dạng viết hoa chữ cái đầu và nối lại.
-    words = re.split(r'[\s_-]+', no_accent_label)
-    pascal_case_label = "".join(word.capitalize() for word in words)
-    
-    return pascal_case_label
-
-def finalize_files_for_import(node_files, edge_files, final_node_file, final_edge_file, synonym_groups):
-    """
-    Hàm chính để thực hiện việc gộp và chuẩn hóa dữ liệu.
-    """
-    print("--- Tạo từ điển ánh xạ ngữ nghĩa ---")
-    semantic_map = create_semantic_mapping(synonym_groups)
-    
-    # ==========================================================================
-    # PHẦN 1: XỬ LÝ VÀ HỢP NHẤT NODE
-    # ==========================================================================
+def finalize_nodes(node_files, final_node_file, semantic_map):
+    """Gộp, chuẩn hóa label / ID và loại bỏ trùng lặp các file Node."""
     print("\n--- Bắt đầu gộp và chuẩn hóa các file Node ---")
     
     node_dfs_list = [pd.read_csv(f) for f in node_files if os.path.exists(f)]
@@ -145,12 +117,10 @@ def finalize_files_for_import(node_files, edge_files, final_node_file, final_edg
     
     # *** BƯỚC MỚI: CHUẨN HÓA CỘT LABEL ***
     print("Áp dụng chuẩn hóa cho cột ':LABEL'...")
-    combined_nodes_df[':LABEL'] = combined_nodes_df[':LABEL'].apply(normalize_label)
+    combined_nodes_df[':LABEL'] = map_unique(combined_nodes_df[':LABEL'], normalize_label)
 
     print("Áp dụng chuẩn hóa và ánh xạ ngữ nghĩa cho cột 'nodeId:ID'...")
-    combined_nodes_df['nodeId:ID'] = combined_nodes_df['nodeId:ID'].apply(
-        lambda x: semantic_map.get(normalize_id(x), normalize_id(x))
-    )
+    combined_nodes_df['nodeId:ID'] = canonical_ids(combined_nodes_df['nodeId:ID'], semantic_map)
 
     initial_node_count = len(combined_nodes_df)
     final_nodes_df = combined_nodes_df.drop_duplicates(subset=['nodeId:ID'], keep='last')
@@ -160,9 +130,8 @@ def finalize_files_for_import(node_files, edge_files, final_node_file, final_edg
     final_nodes_df.to_csv(final_node_file, index=False, encoding='utf-8')
     print(f"Đã tạo file node cuối cùng: '{final_node_file}'")
 
-    # ==========================================================================
-    # PHẦN 2: XỬ LÝ VÀ HỢP NHẤT EDGE
-    # ==========================================================================
+def finalize_edges(edge_files, final_edge_file, semantic_map):
+    """Gộp các file Edge và ánh xạ ngữ nghĩa START_ID / END_ID (không phụ thuộc phần Node)."""
     print("\n--- Bắt đầu gộp các file Edge ---")
     edge_dfs_list = [pd.read_csv(f) for f in edge_files if os.path.exists(f)]
     if not edge_dfs_list:
@@ -173,12 +142,8 @@ def finalize_files_for_import(node_files, edge_files, final_node_file, final_edg
     print(f"Tổng số mối quan hệ ban đầu: {len(final_edges_df)}")
 
     print("Áp dụng ánh xạ ngữ nghĩa cho START_ID và END_ID của các mối quan hệ...")
-    final_edges_df[':START_ID'] = final_edges_df[':START_ID'].apply(
-        lambda x: semantic_map.get(normalize_id(x), normalize_id(x))
-    )
-    final_edges_df[':END_ID'] = final_edges_df[':END_ID'].apply(
-        lambda x: semantic_map.get(normalize_id(x), normalize_id(x))
-    )
+    final_edges_df[':START_ID'] = canonical_ids(final_edges_df[':START_ID'], semantic_map)
+    final_edges_df[':END_ID'] = canonical_ids(final_edges_df[':END_ID'], semantic_map)
     
     final_edges_df.drop_duplicates(inplace=True)
     print(f"Số mối quan hệ sau khi chuẩn hóa và loại bỏ trùng lặp: {len(final_edges_df)}")
@@ -186,7 +151,30 @@ def finalize_files_for_import(node_files, edge_files, final_node_file, final_edg
     final_edges_df.to_csv(final_edge_file, index=False, encoding='utf-8')
     print(f"Đã tạo file edge cuối cùng: '{final_edge_file}'")
 
+def finalize_files_for_import(node_files, edge_files, final_node_file, final_edge_file, synonym_groups, part='all'):
+    """
+    Hàm chính để thực hiện việc gộp và chuẩn hóa dữ liệu.
+    part: 'nodes' hoặc 'edges' chỉ xử lý một phần (run_pipeline.py chạy song song hai phần), 'all' cả hai.
+    """
+    print("--- Tạo từ điển ánh xạ ngữ nghĩa ---")
+    semantic_map = create_semantic_mapping(synonym_groups)
+    
+    # ==========================================================================
+    # PHẦN 1: XỬ LÝ VÀ HỢP NHẤT NODE
+    # ==========================================================================
+    if part in ('all', 'nodes'):
+        finalize_nodes(node_files, final_node_file, semantic_map)
+
+    # ==========================================================================
+    # PHẦN 2: XỬ LÝ VÀ HỢP NHẤT EDGE
+    # ==========================================================================
+    if part in ('all', 'edges'):
+        finalize_edges(edge_files, final_edge_file, semantic_map)
+
 # --- Main Execution ---
 if __name__ == "__main__":
-    finalize_files_for_import(NODE_FILES, EDGE_FILES, FINAL_NODE_FILE, FINAL_EDGE_FILE, synonym_groups)
+    parser = argparse.ArgumentParser(description="Gộp và chuẩn hóa các file Node / Edge cho Neo4j bulk import.")
+    parser.add_argument('--part', choices=['all', 'nodes', 'edges'], default='all')
+    args = parser.parse_args()
+    finalize_files_for_import(NODE_FILES, EDGE_FILES, FINAL_NODE_FILE, FINAL_EDGE_FILE, synonym_groups, args.part)
     print("\n--- Hoàn tất! Dữ liệu đã được chuẩn hóa. Hãy chạy lại script 06 để kiểm tra lần cuối trước khi import. ---")
\ No newline at end of file
@@ -1,31 +1,23 @@
-import json
 import pandas as pd
-import os
+from extraction_store import ExtractionStore
 
 # --- Cấu hình ---
-INPUT_JSON_FILE = 'analysis/comparisons_merged.json' 
+# Đọc thẳng từ kho trích xuất (extraction_store.py), không cần bước gộp analysis/comparisons_merged.json
+INPUT_STORE = 'comparisons'
 OUTPUT_CSV_FILE = 'result_final/graph_edges_comparison.csv'
 
-def create_comparison_edges(input_file, output_file):
+def create_comparison_edges(input_store, output_file):
     """
-    Đọc file JSON chứa dữ liệu so sánh đã hợp nhất,
+    Đọc dữ liệu so sánh từ kho trích xuất,
     chuyển đổi nó thành file CSV chứa các cạnh (edges) theo chuẩn Neo4j.
     """
-    if not os.path.exists(input_file):
-        print(f"Lỗi: Không tìm thấy file đầu vào '{input_file}'.")
-        return
+    with ExtractionStore.open(input_store) as store:
+        if not len(store):
+            print(f"Lỗi: Kho so sánh '{store.path}' trống hoặc không tồn tại.")
+            return
 
-    print(f"Bắt đầu xử lý file so sánh: '{input_file}'...")
-
-    try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            comparisons = json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"Lỗi: File JSON không hợp lệ. Vui lòng kiểm tra lại. Lỗi: {e}")
-        return
-    except Exception as e:
-        print(f"Lỗi không xác định khi đọc file: {e}")
-        return
+        print(f"Bắt đầu xử lý kho so sánh: '{store.path}'...")
+        comparisons = [item for _, item in store.items()]
 
     edge_list = []
     new_articles_count = 0
@@ -71,4 +63,4 @@ def create_comparison_edges(input_file, output_file):
 
 # --- Main Execution ---
 if __name__ == "__main__":
-    create_comparison_edges(INPUT_JSON_FILE, OUTPUT_CSV_FILE)
\ No newline at end of file
+    create_comparison_edges(INPUT_STORE, OUTPUT_CSV_FILE)
\ No newline at end of file
@@ -1,3 +1,5 @@
+import argparse
+import hashlib
 import json
 import numpy as np
 import faiss
@@ -6,17 +8,102 @@ from tqdm import tqdm
 import os
 import sys
 from kg_connector import KGConnector # Đảm bảo file kg_connector.py ở cùng thư mục
+from article_store import write_article_store
+from legal_text import split_passages
+from vector_index import build_index, add_vectors, remove_vectors, parse_index_params, INDEX_TYPES
+from vector_db_snapshot import (SnapshotWriter, resolve_vector_db_files, VECTOR_DB_DIR, FAISS_INDEX_FILE,
+                                LAW_IDS_FILE, ARTICLE_STORE_FILE, MANIFEST_FILE)
 
 # --- Cấu hình ---
 # Sử dụng mô hình được tối ưu cho tiếng Việt để có độ chính xác cao nhất.
 MODEL_NAME = 'bkai-foundation-models/vietnamese-bi-encoder'
-FAISS_INDEX_PATH = "faiss_index.bin"
-LAW_IDS_PATH = "law_ids.json"
+# Độ chi tiết khi index:
+#   - 'article': mỗi điều luật là một vector (mặc định).
+#   - 'clause' : mỗi khoản (hoặc điểm, với khoản dài) là một vector; law_ids.json khi đó
+#                chứa ID điều luật của từng vector (lặp lại), chính là ánh xạ đoạn -> điều luật.
+GRANULARITIES = ('article', 'clause')
+# Khoản dài hơn ngưỡng này (âm tiết) được tách tiếp theo điểm
+PASSAGE_MAX_SYLLABLES = 200
 
-def build_vector_database():
+def article_passages(law, granularity='article'):
+    """Các văn bản cần embedding của một điều luật (một văn bản, hoặc một văn bản cho mỗi khoản/điểm)."""
+    name = law.get('name', '')
+    content = law.get('content', '') or ''
+    if granularity == 'article':
+        passages = [content]
+    else:
+        passages = [text for _, text in split_passages(content, PASSAGE_MAX_SYLLABLES)] or [content]
+    return [f"Tên điều luật: {name}. Nội dung: {text}" for text in passages]
+
+def build_embedding_corpus(all_laws, granularity='article'):
+    """
+    Tạo danh sách văn bản cần embedding và ID điều luật tương ứng của từng văn bản.
+
+    Returns:
+        tuple (vector_ids, contents_to_embed): hai danh sách cùng độ dài.
+    """
+    vector_ids = []
+    contents_to_embed = []
+    for law in all_laws:
+        for text in article_passages(law, granularity):
+            vector_ids.append(law['id'])
+            contents_to_embed.append(text)
+    return vector_ids, contents_to_embed
+
+def passages_hash(passages):
+    """Hash nội dung các văn bản embedding của một điều luật, dùng để phát hiện điều luật bị sửa."""
+    return hashlib.sha256("\x1f".join(passages).encode('utf-8')).hexdigest()
+
+def load_embedding_model():
+    """Tải mô hình embedding fp32 (PyTorch), dùng GPU nếu có."""
+    import torch
+    print(f"Đang tải mô hình embedding: '{MODEL_NAME}' (có thể mất một lúc)...")
+    # Sử dụng GPU nếu có, nếu không tự động chuyển về CPU
+    return SentenceTransformer(MODEL_NAME, device='cuda' if torch.cuda.is_available() else 'cpu')
+
+def load_manifest(manifest_path):
+    """Đọc manifest của lần build trước, trả về None nếu không có hoặc không đọc được."""
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Cảnh báo: Không đọc được manifest '{manifest_path}': {e}")
+        return None
+
+def _incremental_blocker(previous, manifest, granularity, index_type, index_params):
+    """Trả về lý do không thể cập nhật tăng dần từ snapshot trước, hoặc None nếu có thể."""
+    if manifest is None:
+        return f"chưa có manifest '{previous['manifest']}'"
+    if not os.path.exists(previous['index']):
+        return f"không tìm thấy '{previous['index']}'"
+    if manifest.get('model') != MODEL_NAME:
+        return f"mô hình thay đổi ('{manifest.get('model')}' -> '{MODEL_NAME}')"
+    if manifest.get('granularity') != granularity:
+        return f"độ chi tiết thay đổi ('{manifest.get('granularity')}' -> '{granularity}')"
+    old_index = manifest.get('index', {})
+    if old_index.get('type') != index_type or any(
+            old_index.get('params', {}).get(k) != v for k, v in (index_params or {}).items()):
+        return "cấu hình index thay đổi"
+    return None
+
+def build_vector_database(granularity='article', index_type='flat', index_params=None, incremental=False):
     """
     Kết nối đến Neo4j, lấy dữ liệu các điều luật, tạo vector embedding,
-    xây dựng index FAISS và lưu kết quả một cách an toàn.
+    xây dựng index FAISS và lưu kết quả thành một snapshot mới trong VECTOR_DB_DIR
+    (xem vector_db_snapshot.py); snapshot chỉ được công bố khi tất cả các file đã ghi xong.
+
+    Mỗi vector mang một ID số nguyên (vị trí của nó trong law_ids.json). Manifest ghi lại với mỗi
+    điều luật: hash nội dung và ID các vector của nó. Ở chế độ tăng dần (incremental), chỉ các
+    điều luật mới hoặc bị sửa được embedding lại, các điều luật bị xóa được gỡ khỏi index;
+    vị trí của vector đã xóa trong law_ids.json được để null.
+
+    Args:
+        granularity (str): 'article' hoặc 'clause' (xem GRANULARITIES).
+        index_type (str): Loại index FAISS (xem vector_index.INDEX_TYPES).
+        index_params (dict): Tham số của index, ghi đè tham số mặc định.
+        incremental (bool): Cập nhật tăng dần từ lần build trước nếu có thể.
     """
     
     # --- Bước 1: Kết nối và lấy dữ liệu từ Knowledge Graph ---
@@ -36,58 +123,138 @@ def build_vector_database():
 
     print(f"Đã lấy thành công {len(all_laws)} điều luật từ KG.")
 
-    # Tách riêng ID và nội dung để embedding
-    law_ids = [law['id'] for law in all_laws]
-    contents_to_embed = [
-        f"Tên điều luật: {law.get('name', '')}. Nội dung: {law.get('content', '')}" 
-        for law in all_laws
-    ]
+    # Văn bản cần embedding và hash nội dung của từng điều luật
+    passages = {law['id']: article_passages(law, granularity) for law in all_laws}
+    hashes = {law_id: passages_hash(texts) for law_id, texts in passages.items()}
+    print(f"Độ chi tiết index: '{granularity}' -> {sum(len(t) for t in passages.values())} đoạn văn bản.")
 
-    # --- Bước 2: Tải mô hình và tạo Embeddings ---
-    try:
-        print(f"Đang tải mô hình embedding: '{MODEL_NAME}' (có thể mất một lúc)...")
-        # Sử dụng GPU nếu có, nếu không tự động chuyển về CPU
-        model = SentenceTransformer(MODEL_NAME, device='cuda' if torch.cuda.is_available() else 'cpu') 
-    except Exception as e:
-        print(f"Lỗi khi tải mô hình SentenceTransformer: {e}", file=sys.stderr)
-        print("Hãy đảm bảo bạn đã cài đặt: pip install sentence-transformers torch", file=sys.stderr)
-        sys.exit(1)
+    manifest = None
+    previous = resolve_vector_db_files()
+    if incremental:
+        manifest = load_manifest(previous['manifest'])
+        reason = _incremental_blocker(previous, manifest, granularity, index_type, index_params)
+        if reason:
+            print(f"Không thể cập nhật tăng dần ({reason}), chuyển sang build toàn bộ.")
+            manifest = None
 
-    print("Bắt đầu tạo vector embeddings...")
-    embeddings = model.encode(
-        contents_to_embed, 
-        show_progress_bar=True, 
-        convert_to_numpy=True,
-        normalize_embeddings=True
-    )
-    
-    if embeddings is None or embeddings.shape[0] != len(law_ids):
-        print("Lỗi: Quá trình encoding thất bại hoặc số lượng vector không khớp với số lượng ID.", file=sys.stderr)
-        sys.exit(1)
-        
-    print(f"Đã tạo thành công {embeddings.shape[0]} vector với chiều là {embeddings.shape[1]}.")
+    if manifest is not None:
+        old_articles = manifest['articles']
+        added = [law_id for law_id in passages if law_id not in old_articles]
+        changed = [law_id for law_id in passages if law_id in old_articles and old_articles[law_id]['hash'] != hashes[law_id]]
+        deleted = [law_id for law_id in old_articles if law_id not in passages]
+        to_encode = added + changed
+        print(f"Cập nhật tăng dần: {len(added)} điều luật mới, {len(changed)} bị sửa, {len(deleted)} bị xóa, "
+              f"{len(passages) - len(to_encode)} giữ nguyên.")
+    else:
+        to_encode = list(passages)
+
+    # --- Bước 2: Tải mô hình và tạo Embeddings (chỉ cho các điều luật cần embedding) ---
+    contents_to_embed = [text for law_id in to_encode for text in passages[law_id]]
+    embeddings = None
+    if contents_to_embed:
+        try:
+            model = load_embedding_model()
+        except Exception as e:
+            print(f"Lỗi khi tải mô hình SentenceTransformer: {e}", file=sys.stderr)
+            print("Hãy đảm bảo bạn đã cài đặt: pip install sentence-transformers torch", file=sys.stderr)
+            sys.exit(1)
+
+        print(f"Bắt đầu tạo vector embeddings cho {len(contents_to_embed)} đoạn văn bản...")
+        embeddings = model.encode(
+            contents_to_embed, 
+            show_progress_bar=True, 
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+
+        if embeddings is None or embeddings.shape[0] != len(contents_to_embed):
+            print("Lỗi: Quá trình encoding thất bại hoặc số lượng vector không khớp với số lượng đoạn văn bản.", file=sys.stderr)
+            sys.exit(1)
+
+        print(f"Đã tạo thành công {embeddings.shape[0]} vector với chiều là {embeddings.shape[1]}.")
 
-    # --- Bước 3 & 4: Xây dựng và Lưu Index FAISS và IDs ---
+    # --- Bước 3 & 4: Xây dựng (hoặc cập nhật) và Lưu Index FAISS và IDs ---
     try:
-        print("Đang xây dựng FAISS index...")
-        dimension = embeddings.shape[1]
-        
-        # IndexFlatIP (Inner Product) là lựa chọn tối ưu khi normalize_embeddings=True
-        # vì nó tương đương với Cosine Similarity và rất nhanh cho brute-force.
-        index = faiss.IndexFlatIP(dimension)
-        
-        # FAISS yêu cầu kiểu dữ liệu là float32
-        index.add(embeddings.astype('float32'))
-        
+        # Cấp ID vector mới, nối tiếp ID lớn nhất đã dùng
+        next_vector_id = manifest['next_vector_id'] if manifest is not None else 0
+        articles = {law_id: dict(entry) for law_id, entry in manifest['articles'].items()} if manifest is not None else {}
+        new_vector_ids = []
+        for law_id in to_encode:
+            count = len(passages[law_id])
+            ids = list(range(next_vector_id, next_vector_id + count))
+            next_vector_id += count
+            new_vector_ids.extend(ids)
+            articles[law_id] = {'hash': hashes[law_id], 'vector_ids': ids}
+
+        if manifest is None:
+            print(f"Đang xây dựng FAISS index (loại '{index_type}')...")
+            # Mặc định IndexFlatIP (Inner Product) là lựa chọn tối ưu khi normalize_embeddings=True
+            # vì nó tương đương với Cosine Similarity và rất nhanh cho brute-force với vài nghìn vector.
+            # Với kho lớn hơn, dùng HNSW / IVF (xem vector_index.py).
+            index, index_params = build_index(embeddings, index_type, index_params, ids=new_vector_ids)
+        else:
+            index_params = manifest['index']['params']
+            print(f"Đang cập nhật FAISS index từ '{previous['index']}'...")
+            index = faiss.read_index(previous['index'])
+            stale_ids = [i for law_id in changed + deleted for i in old_articles[law_id]['vector_ids']]
+            index = remove_vectors(index, index_type, index_params, stale_ids)
+            for law_id in deleted:
+                del articles[law_id]
+            if embeddings is not None:
+                add_vectors(index, embeddings, new_vector_ids)
+        print(f"-> Tham số index: {index_params}")
+
+        # law_ids[vector_id] = ID điều luật, null tại vị trí của vector đã bị xóa
+        law_ids = [None] * next_vector_id
+        for law_id, entry in articles.items():
+            for vector_id in entry['vector_ids']:
+                law_ids[vector_id] = law_id
+        if index.ntotal != sum(1 for law_id in law_ids if law_id is not None):
+            raise ValueError("Số vector trong index không khớp với manifest, vui lòng build lại toàn bộ (bỏ --incremental).")
+
         # --- Lưu file một cách an toàn ---
-        # Chỉ ghi các file khi tất cả các bước trước đó đã thành công
-        print("Đang lưu các file index và ID...")
-        faiss.write_index(index, FAISS_INDEX_PATH)
-        print(f"-> Đã lưu FAISS index vào: '{FAISS_INDEX_PATH}'")
-
-        with open(LAW_IDS_PATH, 'w', encoding='utf-8') as f:
-            json.dump(law_ids, f)
-        print(f"-> Đã lưu danh sách ID điều luật vào: '{LAW_IDS_PATH}'")
+        # Chỉ ghi các file khi tất cả các bước trước đó đã thành công. Các file được ghi vào
+        # thư mục snapshot tạm; nếu có lỗi, thư mục tạm bị xóa và snapshot đang dùng không bị ảnh hưởng.
+        print(f"Đang lưu snapshot mới vào '{VECTOR_DB_DIR}'...")
+        with SnapshotWriter() as writer:
+            faiss.write_index(index, writer.path(FAISS_INDEX_FILE))
+
+            with open(writer.path(LAW_IDS_FILE), 'w', encoding='utf-8') as f:
+                json.dump(law_ids, f)
+
+            # Kho lưu trữ nội dung điều luật, theo thứ tự xuất hiện trong law_ids.json,
+            # để luồng online không cần gọi Neo4j khi lấy nội dung ứng viên.
+            laws_by_id = {law['id']: law for law in all_laws}
+            write_article_store(writer.path(ARTICLE_STORE_FILE), [
+                {
+                    'nodeId': law_id,
+                    'name': laws_by_id[law_id].get('name'),
+                    'noi_dung': laws_by_id[law_id].get('content'),
+                    'ma_dieu': laws_by_id[law_id].get('ma_dieu'),
+                    'phien_ban': laws_by_id[law_id].get('phien_ban'),
+                }
+                for law_id in dict.fromkeys(law_ids) if law_id is not None
+            ])
+
+            with open(writer.path(MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'model': MODEL_NAME,
+                    'granularity': granularity,
+                    'index': {'type': index_type, 'params': index_params},
+                    'next_vector_id': next_vector_id,
+                    'articles': articles,
+                }, f, ensure_ascii=False)
+
+            snapshot_path = writer.commit({
+                'model': MODEL_NAME,
+                'granularity': granularity,
+                'num_vectors': index.ntotal,
+                'num_articles': len(all_laws),
+                'index': {'type': index_type, 'params': index_params},
+                'incremental_from': previous['build_id'] if manifest is not None else None,
+            })
+        print(f"-> Đã lưu snapshot '{writer.build_id}' vào: '{snapshot_path}' (index, ID, kho lưu trữ điều luật, manifest, meta)")
+        print(f"-> '{VECTOR_DB_DIR}/CURRENT' đã trỏ tới snapshot mới.")
     
     except Exception as e:
         print(f"Lỗi trong quá trình xây dựng hoặc lưu file FAISS: {e}", file=sys.stderr)
@@ -102,4 +269,14 @@ if __name__ == "__main__":
     except ImportError:
         print("Lỗi: Thư viện PyTorch chưa được cài đặt. Vui lòng cài đặt: pip install torch", file=sys.stderr)
         sys.exit(1)
-    build_vector_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Xây dựng Vector Database (FAISS) từ Knowledge Graph.")
+    parser.add_argument('--granularity', choices=GRANULARITIES, default='article',
+                        help="'article': một vector cho mỗi điều luật; 'clause': một vector cho mỗi khoản/điểm.")
+    parser.add_argument('--index-type', choices=INDEX_TYPES, default='flat',
+                        help="Loại index FAISS: 'flat' (chính xác), 'hnsw', 'ivf_flat', 'ivf_pq' (xấp xỉ, cho kho lớn).")
+    parser.add_argument('--index-param', action='append', default=[], metavar='TÊN=GIÁ_TRỊ',
+                        help="Tham số index, ví dụ: --index-param nlist=1024 --index-param nprobe=32 (lặp lại được).")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Chỉ embedding lại các điều luật mới / bị sửa và gỡ các điều luật đã xóa (dựa trên manifest).")
+    args = parser.parse_args()
+    build_vector_database(args.granularity, args.index_type, parse_index_params(args.index_param), args.incremental)
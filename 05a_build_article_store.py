@@ -0,0 +1,71 @@
+import json
+import os
+import shutil
+import sys
+from kg_connector import KGConnector
+from article_store import write_article_store, ArticleStore
+from vector_db_snapshot import (SnapshotWriter, resolve_vector_db_files, load_snapshot_meta,
+                                ARTICLE_STORE_FILE, META_FILE)
+
+def build_article_store():
+    """
+    Tạo lại kho lưu trữ điều luật cục bộ từ KG mà không cần tạo lại embedding.
+    Thứ tự bản ghi được giữ đúng theo thứ tự xuất hiện đầu tiên trong 'law_ids.json'.
+    (05_build_vector_db.py đã tự ghi kho này; script này dùng khi đã có sẵn index.)
+
+    Snapshot là bất biến, nên kết quả được ghi thành một snapshot mới gồm các file của
+    snapshot hiện tại (index, ID, manifest) và kho lưu trữ vừa tạo.
+    Với bố cục cũ (chưa có snapshot), kho được ghi đè tại thư mục gốc.
+    """
+    files = resolve_vector_db_files()
+    if not os.path.exists(files['law_ids']):
+        print(f"Lỗi: Không tìm thấy '{files['law_ids']}'. Vui lòng chạy 05_build_vector_db.py trước.", file=sys.stderr)
+        sys.exit(1)
+
+    with open(files['law_ids'], 'r', encoding='utf-8') as f:
+        # Index theo khoản ('clause') lặp lại ID điều luật cho mỗi đoạn, chỉ giữ lần xuất hiện đầu tiên;
+        # vị trí null là vector đã bị xóa khi build tăng dần
+        law_ids = [law_id for law_id in dict.fromkeys(json.load(f)) if law_id is not None]
+    print(f"Đã đọc {len(law_ids)} ID điều luật từ '{files['law_ids']}'.")
+
+    try:
+        with KGConnector() as kg:
+            # Một truy vấn duy nhất cho toàn bộ danh sách ID
+            nodes, missing_ids = kg.get_nodes_by_ids(law_ids)
+    except Exception as e:
+        print(f"Lỗi nghiêm trọng khi kết nối hoặc lấy dữ liệu từ Neo4j: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if missing_ids:
+        print(f"Lỗi: {len(missing_ids)} ID trong '{files['law_ids']}' không có trong KG. "
+              f"Index và KG không đồng bộ, vui lòng chạy lại 05_build_vector_db.py.", file=sys.stderr)
+        sys.exit(1)
+
+    records = [{**nodes[law_id], 'nodeId': law_id} for law_id in law_ids]
+
+    if files['build_id'] is None:
+        write_article_store(files['article_store'], records)
+        store_path = files['article_store']
+    else:
+        with SnapshotWriter() as writer:
+            for name in os.listdir(files['dir']):
+                if name not in (ARTICLE_STORE_FILE, META_FILE):
+                    shutil.copy2(os.path.join(files['dir'], name), writer.path(name))
+            write_article_store(writer.path(ARTICLE_STORE_FILE), records)
+            meta = {key: value for key, value in load_snapshot_meta(files['dir']).items()
+                    if key not in ('build_id', 'created_at', 'checksums')}
+            snapshot_path = writer.commit({**meta, 'article_store_rebuilt_from': files['build_id']})
+        store_path = os.path.join(snapshot_path, ARTICLE_STORE_FILE)
+        print(f"-> Đã tạo snapshot mới '{writer.build_id}' (từ '{files['build_id']}').")
+
+    # Kiểm tra lại file vừa ghi
+    with ArticleStore(store_path) as store:
+        if store.ids != law_ids:
+            print("Lỗi: Thứ tự bản ghi trong kho không khớp với law_ids.json.", file=sys.stderr)
+            sys.exit(1)
+        print(f"-> Đã lưu {len(store)} điều luật vào: '{store_path}' ({os.path.getsize(store_path)} bytes)")
+
+    print("\n--- Hoàn thành xây dựng kho lưu trữ điều luật! ---")
+
+if __name__ == "__main__":
+    build_article_store()
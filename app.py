@@ -1,88 +1,151 @@
 import streamlit as st
 from kg_connector import KGConnector
 from semantic_retriever import SemanticRetriever
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from article_alignment import ArticleAlignment, CHANGE_TYPE_LABELS
 from reranker import Reranker
-from llm_callers import call_gemini_api
-import re
-
-# --- CÁC HÀM TIỆN ÍCH ---
-def clean_query(query: str) -> str:
-    """
-    Hàm làm sạch câu hỏi của người dùng trước khi xử lý.
-    """
-    if not isinstance(query, str):
-        return ""
-    
-    cleaned = query.lower()
-    trigger_words = [
-        "ok google", "hey siri", "alexa", "cho tôi hỏi", "cho mình hỏi", 
-        "giúp tôi với", "giải thích", "định nghĩa", "là gì", "[help]"
-    ]
-    for word in trigger_words:
-        cleaned = cleaned.replace(word, "")
-    
-    cleaned = re.sub(r'[^a-zA-Z0-9àáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ\s]', '', cleaned)
-    cleaned = " ".join(cleaned.split())
-    return cleaned.strip()
+from llm_callers import stream_gemini_api
+from query_utils import clean_query, parse_article_references, resolve_article_references, has_search_content
 
 @st.cache_resource
 def initialize_components():
     """
-    Khởi tạo và cache lại các đối tượng KGConnector, SemanticRetriever và Reranker.
+    Khởi tạo và cache lại các đối tượng KGConnector, SemanticRetriever, BM25Index, Reranker
+    và bảng đối chiếu điều luật 2013 <-> 2024.
     """
     print("--- Đang khởi tạo các thành phần cốt lõi (chỉ chạy một lần) ---")
     try:
         kg = KGConnector()
+        try:
+            kg.ensure_schema()
+        except Exception as e:
+            # Lỗi DDL hoặc hết thời gian chờ index không chặn khởi động: truy vấn vẫn chạy, chỉ chậm hơn
+            print(f"Cảnh báo: Không tạo/kiểm tra được schema KG ({e}). Tiếp tục khởi động.")
         retriever = SemanticRetriever()
+        # Tự động chuyển sang snapshot Vector Database mới sau khi build lại, không cần khởi động lại ứng dụng
+        retriever.start_auto_reload()
+        bm25 = BM25Index.from_law_structures()
         reranker = Reranker()
+        alignment = ArticleAlignment.load()
         print("--- Khởi tạo hoàn tất ---")
-        return kg, retriever, reranker
+        return kg, retriever, bm25, reranker, alignment
     except Exception as e:
         raise RuntimeError(f"Lỗi khởi tạo thành phần cốt lõi: {e}")
 
 try:
-    kg_connector, semantic_retriever, reranker = initialize_components()
+    kg_connector, semantic_retriever, bm25_index, reranker, article_alignment = initialize_components()
 except RuntimeError as e:
     st.error(f"Không thể khởi động ứng dụng. {e}")
     st.stop()
 
-@st.cache_data(show_spinner=False)
-def retrieval_pipeline(_query: str, initial_k: int = 20, final_k: int = 5):
+def fetch_candidate_docs(law_ids: list[str]) -> dict:
     """
-    Thực hiện pipeline truy xuất hoàn chỉnh: Search -> Rerank.
-    Sử dụng _query với gạch dưới để Streamlit hiểu đây là hàm cache.
+    Lấy nội dung các điều luật theo ID, trả về {id: tài liệu} theo định dạng đầu vào của Reranker.
+    Nội dung lấy từ kho lưu trữ cục bộ (không gọi mạng); ID nào thiếu mới lấy từ KG, trong MỘT truy vấn
+    thay vì từng ID một.
     """
-    print(f"\n[PIPELINE] Bắt đầu truy xuất cho câu hỏi: '{_query}'")
-    
-    candidate_results = semantic_retriever.search(_query, top_k=initial_k, score_threshold=0.3)
-    if not candidate_results:
-        print("[PIPELINE] Không tìm thấy ứng viên nào từ Semantic Search.")
-        return []
-        
-    print(f"[PIPELINE] -> Tìm thấy {len(candidate_results)} ứng viên.")
-
-    candidate_docs = []
-    for law_id, semantic_score in candidate_results:
-        node_properties = kg_connector.get_node_by_id(law_id)
+    nodes, missing_ids = semantic_retriever.get_articles(law_ids)
+    if missing_ids:
+        kg_nodes, _ = kg_connector.get_nodes_by_ids(missing_ids)
+        nodes.update(kg_nodes)
+    docs = {}
+    for law_id in law_ids:
+        node_properties = nodes.get(law_id)
         if node_properties:
             super_content = f"Tên điều luật: {node_properties.get('name', '')}. Nội dung: {node_properties.get('noi_dung', '')}"
-            candidate_docs.append({
+            docs[law_id] = {
                 'id': law_id,
                 'name': node_properties.get('name', ''),
                 'phien_ban': node_properties.get('phien_ban', ''),
                 'ma_dieu': node_properties.get('ma_dieu', ''),
                 'content': super_content,
                 'raw_content': node_properties.get('noi_dung', ''),
-                'semantic_score': semantic_score
-            })
+            }
+    return docs
+
+@st.cache_data(show_spinner=False)
+def retrieval_pipeline(_query: str, initial_k: int = 20, final_k: int = 5, index_build_id: str = None):
+    """
+    Thực hiện pipeline truy xuất hoàn chỉnh: Search (ngữ nghĩa + BM25, gộp bằng RRF) -> Rerank.
+    Nếu câu hỏi trích dẫn trực tiếp điều luật ("Điều 81 Luật 2024", "K3 Đ45 LĐĐ 2013"), các điều luật đó
+    được lấy thẳng theo ID và đứng đầu kết quả; chỉ phần còn lại của câu hỏi (nếu có nội dung) mới đi qua Search -> Rerank.
+    Sử dụng _query với gạch dưới để Streamlit hiểu đây là hàm cache.
+    `index_build_id` là một phần của khóa cache để kết quả cũ không được dùng lại sau khi index được tải lại.
+    """
+    print(f"\n[PIPELINE] Bắt đầu truy xuất cho câu hỏi: '{_query}'")
+
+    search_query = _query
+    direct_docs = []
+    references, remainder = parse_article_references(_query)
+    direct_hits = resolve_article_references(references, semantic_retriever.article_id_map)
+    if direct_hits:
+        docs = fetch_candidate_docs([law_id for law_id, _ in direct_hits])
+        # Điều luật được trích dẫn trực tiếp không cần chấm điểm lại (rerank_score = None)
+        direct_docs = [{**docs[law_id], 'cited_clause': clause, 'rerank_score': None}
+                       for law_id, clause in direct_hits if law_id in docs]
+    if direct_docs:
+        print(f"[PIPELINE] -> Trích dẫn trực tiếp: {', '.join(doc['id'] for doc in direct_docs)}.")
+        if not has_search_content(remainder):
+            return direct_docs
+        search_query = remainder
+        print(f"[PIPELINE] -> Tìm kiếm thêm cho phần còn lại: '{search_query}'")
+    direct_ids = {doc['id'] for doc in direct_docs}
+
+    semantic_results = semantic_retriever.search(search_query, top_k=initial_k, score_threshold=0.3)
+    # BM25 bắt các thuật ngữ chính xác (số hiệu điều luật, "lấn biển", "hạn mức"...) mà bi-encoder dễ bỏ sót
+    lexical_results = bm25_index.search(search_query, top_k=initial_k)
+    candidate_results = [(law_id, score) for law_id, score
+                         in reciprocal_rank_fusion([semantic_results, lexical_results], limit=initial_k)
+                         if law_id not in direct_ids]
+    if not candidate_results:
+        print("[PIPELINE] Không tìm thấy ứng viên nào từ Semantic Search và BM25.")
+        return direct_docs
+        
+    print(f"[PIPELINE] -> Tìm thấy {len(candidate_results)} ứng viên "
+          f"({len(semantic_results)} ngữ nghĩa, {len(lexical_results)} BM25).")
+    semantic_scores = dict(semantic_results)
+    lexical_scores = dict(lexical_results)
+
+    docs = fetch_candidate_docs([law_id for law_id, _ in candidate_results])
+    candidate_docs = [{**docs[law_id],
+                       'semantic_score': semantic_scores.get(law_id),
+                       'bm25_score': lexical_scores.get(law_id),
+                       'rrf_score': rrf_score}
+                      for law_id, rrf_score in candidate_results if law_id in docs]
 
     print(f"[PIPELINE] Bước 2: Sắp xếp lại {len(candidate_docs)} ứng viên...")
-    reranked_docs = reranker.rerank(_query, candidate_docs)
-    final_results = reranked_docs[:final_k]
+    reranked_docs = reranker.rerank(search_query, candidate_docs)
+    final_results = direct_docs + reranked_docs[:max(final_k - len(direct_docs), 0)]
     
     print("[PIPELINE] -> Hoàn thành truy xuất và reranking.")
     return final_results
 
+def pair_comparison_docs(retrieved_docs: list[dict]) -> list[tuple]:
+    """
+    Ghép mỗi điều luật truy xuất được với điều luật tương ứng ở phiên bản kia theo bảng đối chiếu
+    trong bộ nhớ (không truy vấn KG); nội dung điều luật tương ứng lấy từ kho lưu trữ cục bộ.
+
+    Returns:
+        Danh sách (tài liệu 2024 hoặc None, tài liệu 2013 hoặc None, loại thay đổi hoặc None).
+    """
+    pairs = article_alignment.pair([doc['id'] for doc in retrieved_docs])
+    docs = {doc['id']: doc for doc in retrieved_docs}
+    docs.update(fetch_candidate_docs([law_id for pair in pairs for law_id in pair[:2] if law_id and law_id not in docs]))
+    pairs = [(docs.get(id_2024), docs.get(id_2013), change_type) for id_2024, id_2013, change_type in pairs]
+    return [pair for pair in pairs if pair[0] or pair[1]]
+
+def doc_label(doc: dict) -> str:
+    return f"Điều {doc['ma_dieu']} Luật Đất đai {int(float(doc['phien_ban']))}"
+
+def format_doc_heading(doc: dict) -> str:
+    """Tiêu đề hiển thị của một điều luật (kèm điểm rerank hoặc ghi chú trích dẫn trực tiếp nếu có)."""
+    if doc.get('rerank_score') is not None:
+        return f"**{doc_label(doc)} (Điểm liên quan: {doc['rerank_score']:.4f})**"
+    if 'cited_clause' in doc:
+        clause = f", khoản {doc['cited_clause']}" if doc['cited_clause'] else ""
+        return f"**{doc_label(doc)} (Trích dẫn trực tiếp{clause})**"
+    return f"**{doc_label(doc)}**"
+
 # --- CÁC HÀM TẠO PROMPT ---
 def build_qa_prompt(query, context):
     return f"""
@@ -108,6 +171,10 @@ st.set_page_config(layout="wide", page_title="Trợ lý Pháp lý Đất đai")
 st.title("🏛️ Trợ lý Pháp lý Thông minh về Luật Đất đai")
 st.write("Hỏi đáp, tra cứu và so sánh về Luật Đất đai 2013 và 2024.")
 
+# Thống kê cache (dùng chung cho mọi session trong tiến trình này)
+with st.sidebar.expander("📈 Thống kê cache"):
+    st.json({'query_embeddings': semantic_retriever.cache_stats(), 'rerank_scores': reranker.cache_stats()})
+
 # Khởi tạo session state để quản lý trạng thái
 if 'qa_query_count' not in st.session_state:
     st.session_state['qa_query_count'] = 0
@@ -133,7 +200,8 @@ with tab1:
             cleaned_query = clean_query(user_query_qa)
             st.info(f"Đang tìm kiếm cho: '{cleaned_query}'")
             
-            retrieved_docs = retrieval_pipeline(cleaned_query, initial_k=20, final_k=5)
+            retrieved_docs = retrieval_pipeline(cleaned_query, initial_k=20, final_k=5,
+                                                index_build_id=semantic_retriever.index_build_id)
             
             context = ""
             if not retrieved_docs:
@@ -143,40 +211,41 @@ with tab1:
                     doc_info = f"Trích dẫn từ Điều {doc['ma_dieu']} Luật Đất đai {int(float(doc['phien_ban']))}"
                     context += f"--- {doc_info} ---\n{doc['raw_content']}\n\n"
 
-            if context:
-                final_prompt = build_qa_prompt(user_query_qa, context)
-                try:
-                    final_answer = call_gemini_api(final_prompt)
-                    st.markdown("### 📝 Câu trả lời:")
-                    st.markdown(final_answer)
-
-                    # --- PHẦN PHẢN HỒI NGƯỜI DÙNG ---
-                    st.write("")
-                    feedback_key = f"feedback_qa_{st.session_state['qa_query_count']}"
-                    if feedback_key not in st.session_state:
-                        st.session_state[feedback_key] = None
-                    
-                    col1, col2, _ = st.columns([1, 1, 8])
-                    if col1.button("👍 Hữu ích", key=f"up_{feedback_key}"):
-                        st.session_state[feedback_key] = "positive"
-                    if col2.button("👎 Không hữu ích", key=f"down_{feedback_key}"):
-                        st.session_state[feedback_key] = "negative"
-                    
-                    if st.session_state[feedback_key] == "positive":
-                        st.success("Cảm ơn bạn đã đánh giá!")
-                    elif st.session_state[feedback_key] == "negative":
-                        st.warning("Cảm ơn bạn đã đánh giá! Chúng tôi sẽ xem xét để cải thiện câu trả lời này.")
-                    # --- KẾT THÚC PHẦN PHẢN HỒI ---
-
-                    with st.expander("🔍 Xem các điều luật liên quan nhất đã được sử dụng"):
-                        for doc in retrieved_docs:
-                            st.markdown(f"**Điều {doc['ma_dieu']} Luật Đất đai {int(float(doc['phien_ban']))} (Điểm liên quan: {doc.get('rerank_score'):.4f})**")
-                            st.text(doc['raw_content'])
-                except Exception as e:
-                    st.error(f"Đã có lỗi xảy ra khi gọi đến mô hình ngôn ngữ: {e}")
-            else:
-                # Thông báo này được hiển thị khi retriever không tìm thấy gì
-                st.error("Không thể xây dựng ngữ cảnh từ các điều luật truy xuất được.")
+        if context:
+            # Hiển thị các điều luật ngay khi truy xuất xong, trước khi mô hình ngôn ngữ trả lời
+            with st.expander("🔍 Xem các điều luật liên quan nhất đã được sử dụng"):
+                for doc in retrieved_docs:
+                    st.markdown(format_doc_heading(doc))
+                    st.text(doc['raw_content'])
+
+            final_prompt = build_qa_prompt(user_query_qa, context)
+            try:
+                st.markdown("### 📝 Câu trả lời:")
+                # Hiển thị dần câu trả lời theo từng đoạn mô hình sinh ra
+                final_answer = st.write_stream(stream_gemini_api(final_prompt))
+
+                # --- PHẦN PHẢN HỒI NGƯỜI DÙNG ---
+                st.write("")
+                feedback_key = f"feedback_qa_{st.session_state['qa_query_count']}"
+                if feedback_key not in st.session_state:
+                    st.session_state[feedback_key] = None
+                
+                col1, col2, _ = st.columns([1, 1, 8])
+                if col1.button("👍 Hữu ích", key=f"up_{feedback_key}"):
+                    st.session_state[feedback_key] = "positive"
+                if col2.button("👎 Không hữu ích", key=f"down_{feedback_key}"):
+                    st.session_state[feedback_key] = "negative"
+                
+                if st.session_state[feedback_key] == "positive":
+                    st.success("Cảm ơn bạn đã đánh giá!")
+                elif st.session_state[feedback_key] == "negative":
+                    st.warning("Cảm ơn bạn đã đánh giá! Chúng tôi sẽ xem xét để cải thiện câu trả lời này.")
+                # --- KẾT THÚC PHẦN PHẢN HỒI ---
+            except Exception as e:
+                st.error(f"Đã có lỗi xảy ra khi gọi đến mô hình ngôn ngữ: {e}")
+        else:
+            # Thông báo này được hiển thị khi retriever không tìm thấy gì
+            st.error("Không thể xây dựng ngữ cảnh từ các điều luật truy xuất được.")
 
 # --- XỬ LÝ TAB 2: SO SÁNH LUẬT ---
 with tab2:
@@ -194,44 +263,64 @@ with tab2:
             cleaned_query = clean_query(comparison_query)
             st.info(f"Đang tìm kiếm cho: '{cleaned_query}'")
 
-            retrieved_docs = retrieval_pipeline(cleaned_query, initial_k=30, final_k=5)
+            # Không cần lấy nhiều ứng viên để mong cả hai phiên bản cùng xuất hiện:
+            # mỗi điều luật được ghép với điều luật tương ứng theo bảng đối chiếu
+            retrieved_docs = retrieval_pipeline(cleaned_query, initial_k=20, final_k=5,
+                                                index_build_id=semantic_retriever.index_build_id)
             
             context = ""
+            comparison_pairs = pair_comparison_docs(retrieved_docs) if retrieved_docs else []
             if not retrieved_docs:
                 st.warning("Không tìm thấy điều luật nào liên quan đến chủ đề này.")
             else:
-                for doc in retrieved_docs:
-                    doc_info = f"Trích dẫn từ Điều {doc['ma_dieu']} Luật Đất đai {int(float(doc['phien_ban']))}"
-                    context += f"--- {doc_info} ---\n{doc['raw_content']}\n\n"
+                for doc_2024, doc_2013, change_type in comparison_pairs:
+                    if doc_2024 and doc_2013:
+                        doc_info = f"{doc_label(doc_2024)} ({CHANGE_TYPE_LABELS.get(change_type, change_type)} {doc_label(doc_2013)})"
+                    elif doc_2024:
+                        doc_info = f"{doc_label(doc_2024)} ({CHANGE_TYPE_LABELS.get(change_type) or 'chưa có dữ liệu đối chiếu'})"
+                    else:
+                        doc_info = f"{doc_label(doc_2013)} (không có điều luật tương ứng trong Luật Đất đai 2024)"
+                    context += f"--- {doc_info} ---\n"
+                    for doc in (doc_2024, doc_2013):
+                        if doc:
+                            context += f"[{doc_label(doc)}]\n{doc['raw_content']}\n"
+                    context += "\n"
+
+        if context:
+            # Hiển thị các cặp điều luật ngay khi truy xuất xong, trước khi mô hình ngôn ngữ trả lời
+            with st.expander("🔍 Xem các điều luật liên quan đã được sử dụng để so sánh"):
+                for doc_2024, doc_2013, change_type in comparison_pairs:
+                    st.markdown(f"**{CHANGE_TYPE_LABELS.get(change_type, 'Không có điều luật tương ứng')}**")
+                    col_2024, col_2013 = st.columns(2)
+                    for column, doc in ((col_2024, doc_2024), (col_2013, doc_2013)):
+                        with column:
+                            if doc:
+                                st.markdown(format_doc_heading(doc))
+                                st.text(doc['raw_content'])
+                            else:
+                                st.caption("Không có điều luật tương ứng.")
+
+            final_prompt = build_comparison_prompt(comparison_query, context)
+            try:
+                st.markdown("### 📊 Bài phân tích so sánh:")
+                final_answer = st.write_stream(stream_gemini_api(final_prompt))
 
-            if context:
-                final_prompt = build_comparison_prompt(comparison_query, context)
-                try:
-                    final_answer = call_gemini_api(final_prompt)
-                    st.markdown("### 📊 Bài phân tích so sánh:")
-                    st.markdown(final_answer)
-
-                    # --- PHẦN PHẢN HỒI NGƯỜI DÙNG ---
-                    st.write("")
-                    feedback_key = f"feedback_comp_{st.session_state['comp_query_count']}"
-                    if feedback_key not in st.session_state:
-                        st.session_state[feedback_key] = None
-                    
-                    col3, col4, _ = st.columns([1, 1, 8])
-                    if col3.button("👍 Hữu ích", key=f"up_{feedback_key}"):
-                        st.session_state[feedback_key] = "positive"
-                    if col4.button("👎 Không hữu ích", key=f"down_{feedback_key}"):
-                        st.session_state[feedback_key] = "negative"
-                    
-                    if st.session_state[feedback_key] == "positive":
-                        st.success("Cảm ơn bạn đã đánh giá!")
-                    elif st.session_state[feedback_key] == "negative":
-                        st.warning("Cảm ơn bạn đã đánh giá!")
-                    # --- KẾT THÚC PHẦN PHẢN HỒI ---
-
-                    with st.expander("🔍 Xem các điều luật liên quan đã được sử dụng để so sánh"):
-                        for doc in retrieved_docs:
-                            st.markdown(f"**Điều {doc['ma_dieu']} Luật Đất đai {int(float(doc['phien_ban']))} (Điểm liên quan: {doc.get('rerank_score'):.4f})**")
-                            st.text(doc['raw_content'])
-                except Exception as e:
-                    st.error(f"Đã có lỗi xảy ra khi gọi đến mô hình ngôn ngữ: {e}")
\ No newline at end of file
+                # --- PHẦN PHẢN HỒI NGƯỜI DÙNG ---
+                st.write("")
+                feedback_key = f"feedback_comp_{st.session_state['comp_query_count']}"
+                if feedback_key not in st.session_state:
+                    st.session_state[feedback_key] = None
+                
+                col3, col4, _ = st.columns([1, 1, 8])
+                if col3.button("👍 Hữu ích", key=f"up_{feedback_key}"):
+                    st.session_state[feedback_key] = "positive"
+                if col4.button("👎 Không hữu ích", key=f"down_{feedback_key}"):
+                    st.session_state[feedback_key] = "negative"
+                
+                if st.session_state[feedback_key] == "positive":
+                    st.success("Cảm ơn bạn đã đánh giá!")
+                elif st.session_state[feedback_key] == "negative":
+                    st.warning("Cảm ơn bạn đã đánh giá!")
+                # --- KẾT THÚC PHẦN PHẢN HỒI ---
+            except Exception as e:
+                st.error(f"Đã có lỗi xảy ra khi gọi đến mô hình ngôn ngữ: {e}")
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Bảng đối chiếu điều luật 2013 <-> 2024 trong bộ nhớ.
+
+Được build một lần từ kho kết quả so sánh 'extractions/comparisons.jsonl' (extraction_store.py, mỗi bản ghi
+một điều luật 2024: source_id_2024, target_id_2013, change_type), hoặc từ 'result_final/graph_edges_comparison.csv'
+nếu chưa có kho này. Tab "So sánh Luật" dùng bảng này để ghép mỗi điều luật truy xuất được với
+điều luật tương ứng của phiên bản kia mà không cần truy vấn KG (thay cho
+KGConnector.find_comparison_by_law_id, một truy vấn Cypher cho mỗi điều luật).
+
+    - 2024 -> 2013: mỗi điều luật 2024 có tối đa một điều luật 2013 tương ứng và loại thay đổi;
+                    điều luật 2024 không có tương ứng là điều luật mới ('DIEU_LUAT_MOI').
+    - 2013 -> 2024: một điều luật 2013 có thể được tách / gộp vào nhiều điều luật 2024;
+                    điều luật 2013 không có tương ứng là điều luật không còn trong Luật 2024.
+"""
+import csv
+import glob
+import json
+import os
+
+from extraction_store import ExtractionStore
+
+COMPARISONS_STORE = "comparisons"
+COMPARISONS_DIR = "comparisons_json"  # bố cục cũ: mỗi điều luật một file JSON
+COMPARISON_EDGES_CSV = "result_final/graph_edges_comparison.csv"
+
+# Loại thay đổi (tên quan hệ trong KG) và nhãn hiển thị
+NEW_ARTICLE = 'DIEU_LUAT_MOI'
+CHANGE_TYPE_LABELS = {
+    'SUA_DOI_BO_SUNG': "Sửa đổi, bổ sung",
+    'THAY_THE_HOAN_TOAN': "Thay thế hoàn toàn",
+    'GIU_NGUYEN': "Giữ nguyên",
+    NEW_ARTICLE: "Điều luật mới",
+}
+
+
+def normalize_change_type(change_type: str) -> str:
+    """'sua_doi_bo_sung' -> 'SUA_DOI_BO_SUNG' (cùng cách chuẩn hóa với 04a_3_process_comparisons.py)."""
+    return change_type.strip().upper().replace(" ", "_") if change_type else ""
+
+
+def law_year(law_id: str):
+    """Năm của điều luật từ ID dạng 'dieu_<số>_<năm>', None nếu không đúng dạng."""
+    year = law_id.rsplit('_', 1)[-1] if law_id else ''
+    return int(year) if year.isdigit() else None
+
+
+class ArticleAlignment:
+    """Bảng đối chiếu hai chiều giữa các điều luật 2024 và 2013."""
+    def __init__(self, records):
+        """
+        Args:
+            records: Các bộ (id_2024, id_2013 hoặc None, loại thay đổi) như trong kho comparisons.
+        """
+        self.forward = {}   # id_2024 -> (id_2013 hoặc None, loại thay đổi)
+        self.backward = {}  # id_2013 -> [(id_2024, loại thay đổi), ...]
+        for id_2024, id_2013, change_type in records:
+            if not id_2024:
+                continue
+            change_type = normalize_change_type(change_type)
+            if not id_2013:
+                self.forward[id_2024] = (None, change_type or NEW_ARTICLE)
+                continue
+            self.forward[id_2024] = (id_2013, change_type)
+            self.backward.setdefault(id_2013, []).append((id_2024, change_type))
+
+    @staticmethod
+    def _records(items):
+        records = []
+        for data in items:
+            for item in data if isinstance(data, list) else [data]:
+                records.append((item.get('source_id_2024'), item.get('target_id_2013'), item.get('change_type')))
+        return records
+
+    @classmethod
+    def from_extraction_store(cls, name: str = COMPARISONS_STORE):
+        """Build từ kho kết quả so sánh (đọc tuần tự file JSONL một lượt)."""
+        with ExtractionStore.open(name) as store:
+            return cls(cls._records(data for _, data in store.items()))
+
+    @classmethod
+    def from_comparisons_dir(cls, directory: str = COMPARISONS_DIR):
+        """Build từ các file JSON kết quả so sánh (mỗi file một object hoặc một danh sách object)."""
+        items = []
+        for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                items.append(json.load(f))
+        return cls(cls._records(items))
+
+    @classmethod
+    def from_edges_csv(cls, path: str = COMPARISON_EDGES_CSV):
+        """Build từ file cạnh so sánh dạng import Neo4j (:START_ID là 2024, :END_ID là 2013)."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls([(row[':START_ID'], row[':END_ID'], row[':TYPE']) for row in csv.DictReader(f)])
+
+    @classmethod
+    def load(cls):
+        """Build từ kho COMPARISONS_STORE nếu có, ngược lại từ COMPARISONS_DIR (bố cục cũ), cuối cùng từ COMPARISON_EDGES_CSV."""
+        with ExtractionStore.open(COMPARISONS_STORE) as store:
+            if len(store):
+                return cls(cls._records(data for _, data in store.items()))
+        if os.path.isdir(COMPARISONS_DIR) and glob.glob(os.path.join(COMPARISONS_DIR, '*.json')):
+            return cls.from_comparisons_dir()
+        return cls.from_edges_csv()
+
+    def edges(self) -> set:
+        """Tập các cạnh (id_2024, id_2013, loại thay đổi), cùng dạng với quan hệ so sánh trong KG."""
+        return {(id_2024, id_2013, change_type)
+                for id_2024, (id_2013, change_type) in self.forward.items() if id_2013}
+
+    def is_new(self, law_id: str) -> bool:
+        """Điều luật 2024 không có điều luật 2013 tương ứng."""
+        return self.forward.get(law_id, (None, None))[1] == NEW_ARTICLE
+
+    def counterparts(self, law_id: str) -> list[tuple[str, str]]:
+        """Các điều luật tương ứng ở phiên bản kia: [(id, loại thay đổi)], rỗng nếu không có."""
+        if law_id in self.forward:
+            id_2013, change_type = self.forward[law_id]
+            return [(id_2013, change_type)] if id_2013 else []
+        return list(self.backward.get(law_id, []))
+
+    def pair(self, law_ids: list[str]) -> list[tuple]:
+        """
+        Ghép mỗi điều luật với điều luật tương ứng của phiên bản kia.
+
+        Returns:
+            Danh sách (id_2024 hoặc None, id_2013 hoặc None, loại thay đổi hoặc None), không trùng lặp,
+            theo thứ tự của law_ids. id_2013 là None với điều luật mới; id_2024 là None (loại thay đổi None)
+            với điều luật 2013 không còn trong Luật 2024.
+        """
+        pairs = {}
+        for law_id in law_ids:
+            if law_year(law_id) == 2013:
+                matches = [(id_2024, law_id, change_type) for id_2024, change_type in self.backward.get(law_id, [])]
+                for match in matches or [(None, law_id, None)]:
+                    pairs.setdefault(match, None)
+            else:
+                id_2013, change_type = self.forward.get(law_id, (None, None))
+                pairs.setdefault((law_id, id_2013, change_type), None)
+        return list(pairs)
+
+    def stats(self) -> dict:
+        """Số điều luật 2024 đã đối chiếu, số điều luật mới và số điều luật 2013 có tương ứng."""
+        return {
+            'articles_2024': len(self.forward),
+            'new_articles': sum(1 for _, change_type in self.forward.values() if change_type == NEW_ARTICLE),
+            'articles_2013_aligned': len(self.backward),
+            'edges': len(self.edges()),
+        }
+
+
+# --- Ví dụ sử dụng và kiểm tra ---
+if __name__ == '__main__':
+    alignment = ArticleAlignment.load()
+    print("Bảng đối chiếu:", alignment.stats())
+    for test_id in ['dieu_100_2024', 'dieu_81_2013', 'dieu_1_2024']:
+        print(f"{test_id}: {alignment.counterparts(test_id)} (điều luật mới: {alignment.is_new(test_id)})")
+    print("Ghép cặp:", alignment.pair(['dieu_100_2024', 'dieu_81_2013', 'dieu_64_2013']))
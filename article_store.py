@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Kho lưu trữ nội dung Điều Luật cục bộ, ánh xạ bộ nhớ (memory-mapped).
+
+Luồng online chỉ cần `name`, `noi_dung`, `ma_dieu`, `phien_ban` của các nút DieuLuat.
+Thay vì truy vấn Neo4j cho mỗi câu hỏi, các trường này được ghi sẵn vào một file nhị phân gọn:
+
+    [header][bảng offsets (uint64)][blob UTF-8]
+
+- header: magic, phiên bản định dạng, số bản ghi, số trường.
+- bảng offsets: (số bản ghi * số trường + 1) offset tích lũy vào blob,
+  trường j của bản ghi i nằm trong blob[offsets[i*F + j] : offsets[i*F + j + 1]].
+- Thứ tự bản ghi trùng với thứ tự xuất hiện đầu tiên của mỗi ID trong `law_ids.json`
+  (với index theo khoản, một điều luật ứng với nhiều dòng liên tiếp trong `law_ids.json`).
+
+File được mmap nên việc đọc một điều luật chỉ là cắt bytes và decode UTF-8,
+không có lời gọi mạng và không parse JSON cho mỗi truy vấn.
+"""
+import mmap
+import os
+import struct
+
+import numpy as np
+
+ARTICLE_STORE_PATH = "article_store.bin"
+
+STORE_MAGIC = b'LDAS'
+STORE_VERSION = 1
+# Thứ tự các trường được lưu. Thay đổi danh sách này phải tăng STORE_VERSION.
+STORE_FIELDS = ('nodeId', 'name', 'noi_dung', 'ma_dieu', 'phien_ban')
+
+_HEADER_FORMAT = '<4sIII'
+_HEADER_SIZE = struct.calcsize(_HEADER_FORMAT)
+
+
+def write_article_store(path: str, records: list[dict]):
+    """
+    Ghi danh sách điều luật ra file kho lưu trữ.
+
+    Args:
+        path (str): Đường dẫn file output.
+        records (list[dict]): Mỗi dict chứa các khóa trong STORE_FIELDS
+                              (thiếu khóa nào sẽ được lưu thành chuỗi rỗng).
+    """
+    chunks = []
+    offsets = [0]
+    for record in records:
+        for field in STORE_FIELDS:
+            value = record.get(field)
+            encoded = ('' if value is None else str(value)).encode('utf-8')
+            chunks.append(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+
+    header = struct.pack(_HEADER_FORMAT, STORE_MAGIC, STORE_VERSION, len(records), len(STORE_FIELDS))
+    offsets_bytes = np.asarray(offsets, dtype='<u8').tobytes()
+
+    # Ghi vào file tạm rồi đổi tên để không bao giờ để lại file ghi dở
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(offsets_bytes)
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ArticleStore:
+    """
+    Bộ đọc kho lưu trữ điều luật. Mở file một lần và tái sử dụng cho mọi truy vấn.
+    Hỗ trợ context manager ('with ArticleStore() as store:').
+    """
+    def __init__(self, path: str = ARTICLE_STORE_PATH):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        magic, version, num_records, num_fields = struct.unpack_from(_HEADER_FORMAT, self._mm, 0)
+        if magic != STORE_MAGIC:
+            self.close()
+            raise ValueError(f"File '{path}' không phải là kho lưu trữ điều luật hợp lệ.")
+        if version != STORE_VERSION or num_fields != len(STORE_FIELDS):
+            self.close()
+            raise ValueError(
+                f"Kho lưu trữ '{path}' có phiên bản {version} ({num_fields} trường), "
+                f"cần phiên bản {STORE_VERSION}. Vui lòng build lại."
+            )
+
+        self._num_records = num_records
+        self._num_fields = num_fields
+        num_offsets = num_records * num_fields + 1
+        self._offsets = np.frombuffer(self._mm, dtype='<u8', count=num_offsets, offset=_HEADER_SIZE)
+        self._blob_start = _HEADER_SIZE + num_offsets * 8
+
+        # Bảng tra ID -> số dòng, chỉ xây một lần khi mở file
+        self._row_by_id = {self._read_field(row, 0): row for row in range(num_records)}
+
+    def close(self):
+        """Giải phóng mmap và file handle."""
+        # Bỏ tham chiếu tới buffer của mmap trước khi đóng, nếu không mmap.close() sẽ báo lỗi
+        self._offsets = None
+        if getattr(self, '_mm', None) is not None:
+            self._mm.close()
+            self._mm = None
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self._num_records
+
+    def __contains__(self, law_id):
+        return law_id in self._row_by_id
+
+    @property
+    def ids(self):
+        """Danh sách ID theo đúng thứ tự dòng trong kho."""
+        return list(self._row_by_id)
+
+    def _read_field(self, row: int, field_index: int) -> str:
+        position = row * self._num_fields + field_index
+        start = self._blob_start + int(self._offsets[position])
+        end = self._blob_start + int(self._offsets[position + 1])
+        return self._mm[start:end].decode('utf-8')
+
+    def get_row(self, row: int) -> dict:
+        """Lấy bản ghi theo số dòng trong kho."""
+        return {field: self._read_field(row, j) for j, field in enumerate(STORE_FIELDS)}
+
+    def get(self, law_id: str):
+        """Lấy bản ghi theo ID điều luật. Trả về None nếu không có."""
+        row = self._row_by_id.get(law_id)
+        return self.get_row(row) if row is not None else None
+
+    def get_many(self, law_ids: list[str]):
+        """
+        Lấy nhiều bản ghi. Cùng định dạng trả về với KGConnector.get_nodes_by_ids
+        để có thể thay thế trực tiếp.
+
+        Returns:
+            tuple (nodes, missing_ids): nodes là {id: bản_ghi} theo thứ tự đầu vào.
+        """
+        nodes = {}
+        missing_ids = []
+        for law_id in dict.fromkeys(law_ids):
+            row = self._row_by_id.get(law_id)
+            if row is None:
+                missing_ids.append(law_id)
+            else:
+                nodes[law_id] = self.get_row(row)
+        return nodes, missing_ids
+
+
+# --- Ví dụ sử dụng và kiểm tra ---
+if __name__ == '__main__':
+    try:
+        with ArticleStore() as store:
+            print(f"Kho lưu trữ '{store.path}' chứa {len(store)} điều luật.")
+            nodes, missing = store.get_many(["dieu_27_2024", "dieu_81_2024", "dieu_khong_ton_tai"])
+            for law_id, record in nodes.items():
+                print(f" - {law_id}: {record['name']} (Luật {record['phien_ban']}, {len(record['noi_dung'])} ký tự)")
+            print(f" - Không tìm thấy: {missing}")
+    except FileNotFoundError:
+        print(f"Không tìm thấy '{ARTICLE_STORE_PATH}'. Vui lòng chạy 05_build_vector_db.py hoặc 05a_build_article_store.py trước.")
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark và kiểm tra tính nhất quán của bảng đối chiếu điều luật 2013 <-> 2024 (article_alignment.py).
+
+Báo cáo:
+    - thời gian build bảng từ kho 'extractions/comparisons.jsonl' và từ 'result_final/graph_edges_comparison.csv',
+    - độ trễ ghép cặp cho một lượt truy xuất (5 điều luật) bằng bảng trong bộ nhớ,
+    - so khớp các cạnh của bảng với file cạnh CSV và (với --neo4j) với quan hệ so sánh trong KG,
+      kèm độ trễ của cách cũ: KGConnector.find_comparison_by_law_id cho từng điều luật,
+    - các ID trong bảng không có trong Luật 2013 / 2024 (law_structure.py) và các điều luật 2024 chưa được đối chiếu.
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_article_alignment.py
+    python benchmarks/bench_article_alignment.py --neo4j
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import numpy as np
+
+from article_alignment import ArticleAlignment, law_year
+from law_structure import load_article_documents
+
+
+def compare_edges(name, expected, actual):
+    """In số cạnh khác nhau giữa bảng đối chiếu (expected) và nguồn khác (actual)."""
+    only_table, only_other = expected - actual, actual - expected
+    status = "khớp" if not only_table and not only_other else "KHÔNG KHỚP"
+    print(f"Bảng đối chiếu vs {name}: {len(expected)} / {len(actual)} cạnh -> {status}")
+    for label, edges in (("chỉ có trong bảng", only_table), (f"chỉ có trong {name}", only_other)):
+        for edge in sorted(edges)[:5]:
+            print(f"   - {label}: {edge}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10000, help="Số lượt ghép cặp khi đo độ trễ.")
+    parser.add_argument('--batch', type=int, default=5, help="Số điều luật mỗi lượt (final_k của tab So sánh).")
+    parser.add_argument('--neo4j', action='store_true', help="So khớp thêm với KG và đo find_comparison_by_law_id.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    alignment = ArticleAlignment.from_extraction_store()
+    store_build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    csv_alignment = ArticleAlignment.from_edges_csv()
+    csv_build_time = time.perf_counter() - start
+    print(f"Bảng đối chiếu: {alignment.stats()}")
+    print(f"Thời gian build: kho comparisons {store_build_time * 1000:.1f} ms, CSV {csv_build_time * 1000:.1f} ms")
+
+    # Độ trễ ghép cặp trên các lượt truy xuất ngẫu nhiên (lẫn điều luật 2013 và 2024)
+    known_ids = [doc_id for doc_id, _ in load_article_documents()]
+    rng = random.Random(args.seed)
+    batches = [rng.sample(known_ids, args.batch) for _ in range(args.repeat)]
+    latencies = []
+    for batch in batches:
+        start = time.perf_counter()
+        alignment.pair(batch)
+        latencies.append(time.perf_counter() - start)
+    print(f"Ghép cặp {args.batch} điều luật: p50 {np.percentile(latencies, 50) * 1e6:.1f} µs, "
+          f"p99 {np.percentile(latencies, 99) * 1e6:.1f} µs")
+
+    # Tính nhất quán
+    print()
+    compare_edges("graph_edges_comparison.csv", alignment.edges(), csv_alignment.edges())
+    known = set(known_ids)
+    referenced = set(alignment.forward) | set(alignment.backward)
+    unknown = sorted(law_id for law_id in referenced if law_id not in known)
+    print(f"ID trong bảng không có trong Luật 2013 / 2024: {len(unknown)} {unknown[:10]}")
+    unaligned = sorted(law_id for law_id in known if law_year(law_id) == 2024 and law_id not in alignment.forward)
+    print(f"Điều luật 2024 chưa được đối chiếu: {len(unaligned)} {unaligned[:10]}")
+    wrong_direction = sorted(edge for edge in alignment.edges() if law_year(edge[0]) != 2024 or law_year(edge[1]) != 2013)
+    print(f"Cạnh sai chiều (không phải 2024 -> 2013): {len(wrong_direction)} {wrong_direction[:5]}")
+
+    if args.neo4j:
+        from kg_connector import KGConnector
+        with KGConnector() as kg:
+            compare_edges("KG", alignment.edges(), kg.get_comparison_edges())
+            sample = [law_id for law_id in alignment.forward][:args.batch * 4]
+            start = time.perf_counter()
+            for law_id in sample:
+                kg.find_comparison_by_law_id(law_id)
+            per_article = (time.perf_counter() - start) / len(sample)
+            print(f"find_comparison_by_law_id: {per_article * 1000:.2f} ms / điều luật "
+                  f"(~{per_article * args.batch * 1000:.1f} ms cho {args.batch} điều luật)")
+
+
+if __name__ == '__main__':
+    main()
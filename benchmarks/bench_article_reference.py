@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Kiểm tra đường tắt trích dẫn trực tiếp (query_utils.parse_article_references + resolve_article_references).
+
+Báo cáo:
+    - độ chính xác trên các khối trích dẫn trong đáp án chuẩn ("K1, Đ3, LĐĐ 2013", "So sánh Đ5 LĐĐ 2013 & Đ4 LĐĐ 2024"),
+      so với eval_data.parse_cited_articles,
+    - độ chính xác trên các câu hỏi sinh từ trích dẫn theo nhiều cách viết ("Điều 81 Luật 2024 quy định gì",
+      "khoản 3 điều 45 LĐĐ 2013 ..."), có và không qua clean_query như trong app.py,
+    - độ chính xác trên các câu hỏi liệt kê nhiều điều ("Điều 3, 4 và 5 Luật 2024 quy định gì?"; clean_query bỏ dấu
+      phẩy), kể cả việc phần còn lại không bị coi là nội dung tìm kiếm (ứng dụng trả lời từ mọi điều được liệt kê),
+    - số câu hỏi tình huống (không trích dẫn điều luật) bị nhận nhầm là trích dẫn,
+    - độ trễ parse + tra ID (micro giây), và nếu có --compare-semantic, độ trễ của SemanticRetriever.search.
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_article_reference.py
+    python benchmarks/bench_article_reference.py --compare-semantic
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import numpy as np
+
+from vector_db_snapshot import resolve_vector_db_files
+from query_utils import (clean_query, parse_article_references, resolve_article_references, has_search_content,
+                         build_article_id_map)
+from eval_data import load_eval_answers, load_eval_citations, load_eval_questions, citation_blocks, parse_cited_articles
+
+# Các cách viết trích dẫn trong câu hỏi: {a} số điều, {y} năm
+QUERY_TEMPLATES = [
+    "Điều {a} Luật {y} quy định gì?",
+    "Nội dung Điều {a} Luật Đất đai {y}",
+    "khoản 2 điều {a} LĐĐ {y} áp dụng cho hộ gia đình như thế nào",
+    "K1, Đ{a}, LĐĐ {y}",
+    "Theo Điều {a} Luật {y}, người sử dụng đất có quyền chuyển nhượng không?",
+]
+# Câu hỏi liệt kê nhiều điều: {a}, {b}, {c} số điều, {y} năm
+LIST_QUERY_TEMPLATES = [
+    "Điều {a}, {b} và {c} Luật {y} quy định gì?",
+    "Đ{a}, {b}, {c} LĐĐ {y}",
+]
+
+
+def resolve(query, id_map):
+    references, remainder = parse_article_references(query)
+    return [law_id for law_id, _ in resolve_article_references(references, id_map)], remainder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200, help="Số lần lặp khi đo độ trễ.")
+    parser.add_argument('--compare-semantic', action='store_true',
+                        help="Đo thêm độ trễ SemanticRetriever.search (cần mô hình và Vector Database).")
+    args = parser.parse_args()
+
+    # Cùng nguồn với ứng dụng: danh sách ID của Vector Database đang dùng
+    with open(resolve_vector_db_files()['law_ids'], 'r', encoding='utf-8') as f:
+        id_map = build_article_id_map(json.load(f))
+    print(f"Bảng tra ID: {len(id_map)} điều luật.")
+
+    # 1. Khối trích dẫn trong đáp án chuẩn
+    blocks = [block for answer in load_eval_answers() for block in citation_blocks(answer)]
+    block_cases = [(block, parse_cited_articles(f"**({block})**")) for block in blocks]
+    known_ids = set(id_map.values())
+    # Điều luật không có trong Vector Database thì không thể tra trực tiếp, được thống kê riêng
+    missing_ids = {law_id for _, expected in block_cases for law_id in expected if law_id not in known_ids}
+    block_cases = [(block, [law_id for law_id in expected if law_id in known_ids]) for block, expected in block_cases]
+    block_cases = [(block, expected) for block, expected in block_cases if expected]
+    block_errors = [(block, expected, resolve(block, id_map)[0]) for block, expected in block_cases
+                    if set(resolve(block, id_map)[0]) != set(expected)]
+
+    # 2. Câu hỏi sinh từ trích dẫn
+    cited = sorted({law_id for _, ids in load_eval_citations() for law_id in ids if law_id in known_ids})
+    generated = []
+    for law_id in cited:
+        _, article, year = law_id.split('_')
+        for template in QUERY_TEMPLATES:
+            generated.append((template.format(a=article, y=year), law_id))
+    rows = []
+    for name, prepare in (("nguyên văn", lambda q: q), ("clean_query", clean_query)):
+        correct = sum(resolve(prepare(q), id_map)[0] == [law_id] for q, law_id in generated)
+        rows.append((name, correct))
+
+    # Liệt kê nhiều điều: ba điều liên tiếp (theo thứ tự số) được trích dẫn của cùng một luật
+    by_year = {}
+    for law_id in cited:
+        _, article, year = law_id.split('_')
+        by_year.setdefault(year, []).append(int(article))
+    list_cases = []
+    for year, articles in by_year.items():
+        articles.sort()
+        for i in range(len(articles) - 2):
+            triple = articles[i:i + 3]
+            for template in LIST_QUERY_TEMPLATES:
+                list_cases.append((template.format(a=triple[0], b=triple[1], c=triple[2], y=year),
+                                   [f"dieu_{a}_{year}" for a in triple]))
+    list_rows = []
+    for name, prepare in (("nguyên văn", lambda q: q), ("clean_query", clean_query)):
+        correct = 0
+        for q, expected in list_cases:
+            found, remainder = resolve(prepare(q), id_map)
+            correct += found == expected and not has_search_content(remainder)
+        list_rows.append((name, correct))
+
+    # 3. Câu hỏi tình huống: không nên bị nhận là trích dẫn
+    questions = [clean_query(q) for q in load_eval_questions()]
+    triggered = [q for q in questions if resolve(q, id_map)[0]]
+    direct_only = [q for q in triggered if not has_search_content(resolve(q, id_map)[1])]
+
+    print(f"\nKhối trích dẫn trong đáp án chuẩn: {len(block_cases) - len(block_errors)}/{len(block_cases)} khớp "
+          f"({len(missing_ids)} điều luật được trích dẫn không có trong Vector Database: {', '.join(sorted(missing_ids))})")
+    for block, expected, found in block_errors[:5]:
+        print(f"   - '{block}': mong đợi {expected}, nhận {found}")
+    for name, correct in rows:
+        print(f"Câu hỏi sinh từ trích dẫn ({name}): {correct}/{len(generated)} khớp")
+    for name, correct in list_rows:
+        print(f"Câu hỏi liệt kê nhiều điều ({name}): {correct}/{len(list_cases)} khớp")
+    print(f"Câu hỏi tình huống có trích dẫn: {len(triggered)}/{len(questions)} "
+          f"(trả lời chỉ bằng trích dẫn, bỏ qua tìm kiếm: {len(direct_only)})")
+    for q in triggered[:5]:
+        print(f"   - '{q[:100]}' -> {resolve(q, id_map)[0]}")
+
+    # 4. Độ trễ
+    samples = [clean_query(q) for q, _ in generated] + questions
+    latencies = []
+    for _ in range(args.repeat):
+        for q in samples:
+            start = time.perf_counter()
+            resolve(q, id_map)
+            latencies.append(time.perf_counter() - start)
+    print(f"\nĐộ trễ parse + tra ID: p50 {np.percentile(latencies, 50) * 1e6:.1f} µs, "
+          f"p99 {np.percentile(latencies, 99) * 1e6:.1f} µs ({len(latencies)} lần)")
+
+    if args.compare_semantic:
+        from semantic_retriever import SemanticRetriever
+        import semantic_retriever as semantic_retriever_module
+        semantic_retriever_module.QUERY_CACHE_PATH = None
+        retriever = SemanticRetriever()
+        semantic_latencies = []
+        for q, _ in generated:
+            # Thêm số thứ tự để không trúng cache embedding câu hỏi
+            query = f"{clean_query(q)} {len(semantic_latencies)}"
+            start = time.perf_counter()
+            retriever.search(query, top_k=20)
+            semantic_latencies.append(time.perf_counter() - start)
+        print(f"Độ trễ SemanticRetriever.search: p50 {np.percentile(semantic_latencies, 50) * 1e3:.2f} ms, "
+              f"p99 {np.percentile(semantic_latencies, 99) * 1e3:.2f} ms (chưa tính lấy nội dung và rerank)")
+
+
+if __name__ == '__main__':
+    main()
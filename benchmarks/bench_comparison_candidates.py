@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Đánh giá bước chọn trước điều luật 2013 ứng viên (comparison_candidates.py) của 03_extract_comparisons.py.
+
+Báo cáo:
+    - token prompt (ước lượng bằng llm_client.estimate_tokens) cho toàn bộ điều luật 2024: gửi toàn bộ Luật 2013
+      so với chỉ gửi top-N ứng viên, và phần trăm tiết kiệm;
+    - recall@N: tỉ lệ điều luật 2024 mà điều luật 2013 đã được đối chiếu trong kho 'comparisons' nằm trong
+      top-N ứng viên, cho BM25, bi-encoder và RRF (ứng viên sai thì LLM không thể đối chiếu đúng);
+      các đối chiếu trỏ tới điều luật không có trong Luật 2013 được đếm riêng;
+    - thời gian chọn ứng viên cho một điều luật;
+    - với --llm K: chạy lại K prompt mới qua LLM (có cache) và so target_id_2013 / change_type với
+      kho 'comparisons' (độ đồng thuận thực tế).
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_comparison_candidates.py
+    python benchmarks/bench_comparison_candidates.py --top-n 1 3 5 10 15
+    python benchmarks/bench_comparison_candidates.py --semantic     # BM25 + bi-encoder (cần mô hình)
+    python benchmarks/bench_comparison_candidates.py --llm 40
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+from article_alignment import ArticleAlignment, normalize_change_type
+from bm25_index import reciprocal_rank_fusion
+from comparison_candidates import CandidateSelector, CANDIDATE_TOP_N
+from law_structure import load_article_documents
+from llm_client import AsyncLLMClient, estimate_tokens
+
+comparisons = importlib.import_module('03_extract_comparisons')
+
+
+def article_code(law_id):
+    return law_id.split('_')[1]
+
+
+def print_recall(name, ranked_lists, targets, top_ns):
+    hits = {n: sum(target in ranked[:n] for ranked, target in zip(ranked_lists, targets)) for n in top_ns}
+    print(f"{name:<10} | " + " | ".join(f"{hits[n] / len(targets):>6.1%}" for n in top_ns))
+
+
+async def run_llm(selector, articles, alignment, top_n):
+    """Chạy lại prompt mới cho các điều luật và so với kết quả đã có trong kho comparisons."""
+    same_target = same_type = parsed = 0
+    async with AsyncLLMClient() as client:
+        async def compare(law_id, content):
+            candidates = await asyncio.to_thread(selector.select, content, top_n)
+            prompt = comparisons.get_comparison_prompt(
+                article_code(law_id), content, selector.reference_text(candidates),
+                f"{len(candidates)} điều luật của Luật 2013 có nội dung gần nhất")
+            response_text = await client.generate(prompt)
+            json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response_text)
+            return law_id, json.loads(json_match.group(1) if json_match else response_text)
+
+        for task in asyncio.as_completed([compare(law_id, content) for law_id, content in articles]):
+            try:
+                law_id, result = await task
+            except Exception as e:
+                print(f"Lỗi: {e}")
+                continue
+            parsed += 1
+            expected_target, expected_type = alignment.forward[law_id]
+            same_target += (result.get('target_id_2013') or None) == expected_target
+            same_type += normalize_change_type(result.get('change_type')) == expected_type
+        print(f"LLM: {dict(client.stats)}")
+    print(f"Đồng thuận với kho comparisons trên {parsed}/{len(articles)} điều luật: "
+          f"target_id_2013 {same_target / max(parsed, 1):.1%}, change_type {same_type / max(parsed, 1):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top-n', type=int, nargs='+', default=[1, 3, 5, 10, 15])
+    parser.add_argument('--semantic', action=argparse.BooleanOptionalAction,
+                        default=comparisons.USE_SEMANTIC_CANDIDATES,
+                        help="Gộp thêm bi-encoder với BM25 (mặc định theo COMPARISON_SEMANTIC_CANDIDATES như 03: "
+                             "chỉ BM25).")
+    parser.add_argument('--llm', type=int, default=0, help="Số điều luật chạy lại qua LLM để đo độ đồng thuận.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    selector = CandidateSelector.from_law_structure(use_semantic=args.semantic)
+    print(f"Build bộ chọn ứng viên ({len(selector.texts)} điều luật 2013, "
+          f"{'BM25 + bi-encoder' if args.semantic else 'BM25'}): {time.perf_counter() - start:.1f}s")
+
+    articles_2024 = load_article_documents((2024,))
+    alignment = ArticleAlignment.from_extraction_store()
+
+    # --- Token ---
+    with open('LuatDatDai2013_full.txt', 'r', encoding='utf-8') as f:
+        full_text = f.read()
+    full_tokens = candidate_tokens = 0
+    latencies = []
+    for law_id, content in articles_2024:
+        full_tokens += estimate_tokens(comparisons.get_comparison_prompt(article_code(law_id), content, full_text))
+        start = time.perf_counter()
+        candidates = selector.select(content, CANDIDATE_TOP_N)
+        latencies.append(time.perf_counter() - start)
+        candidate_tokens += estimate_tokens(comparisons.get_comparison_prompt(
+            article_code(law_id), content, selector.reference_text(candidates),
+            f"{len(candidates)} điều luật của Luật 2013 có nội dung gần nhất"))
+    print(f"\nToken prompt cho {len(articles_2024)} điều luật 2024 (top-{CANDIDATE_TOP_N}): "
+          f"toàn bộ Luật 2013 ~{full_tokens:,}, ứng viên ~{candidate_tokens:,} "
+          f"-> tiết kiệm {1 - candidate_tokens / full_tokens:.1%}")
+    print(f"Chọn ứng viên: p50 {statistics.median(latencies) * 1000:.1f} ms / điều luật")
+
+    # --- Recall@N so với kho comparisons ---
+    contents = dict(articles_2024)
+    aligned = [(law_id, id_2013) for law_id, (id_2013, _) in sorted(alignment.forward.items())
+               if id_2013 and law_id in contents]
+    missing = [(law_id, id_2013) for law_id, id_2013 in aligned if id_2013 not in selector.texts]
+    evaluated = [(law_id, id_2013) for law_id, id_2013 in aligned if id_2013 in selector.texts]
+    print(f"\nĐối chiếu có điều luật 2013: {len(aligned)}; bỏ qua {len(missing)} đối chiếu tới điều luật "
+          f"không có trong Luật 2013 {sorted({id_2013 for _, id_2013 in missing})}")
+    print(f"Điều luật mới (không có điều 2013 tương ứng): {sum(alignment.is_new(law_id) for law_id in contents)}")
+
+    rankings = [selector.rankings(contents[law_id], max(args.top_n)) for law_id, _ in evaluated]
+    targets = [id_2013 for _, id_2013 in evaluated]
+    print(f"\n{'recall@N':<10} | " + " | ".join(f"{'N=' + str(n):>6}" for n in args.top_n))
+    for name in rankings[0]:
+        print_recall(name, [[law_id for law_id, _ in ranking[name]] for ranking in rankings], targets, args.top_n)
+    fused = [[law_id for law_id, _ in reciprocal_rank_fusion(list(ranking.values()))] for ranking in rankings]
+    print_recall('RRF', fused, targets, args.top_n)
+
+    if args.llm:
+        print()
+        asyncio.run(run_llm(selector, [(law_id, contents[law_id]) for law_id, _ in evaluated[:args.llm]],
+                            alignment, CANDIDATE_TOP_N))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+So sánh các bước 04_x đọc kết quả trích xuất theo bố cục cũ (một file JSON mỗi điều luật trong
+output_json_2013/, output_json_2024/, comparisons_json/, cộng bước gộp 04_0 ghi analysis/*_merged.json cho
+04a_1 / 04a_3) với kho JSONL chỉ ghi nối (extraction_store.py), mà mọi bước đọc thẳng.
+
+Dữ liệu của hai cách giống nhau: kho hiện tại được xuất ra bố cục cũ (export_json_dir, indent=2 như 02 / 03
+cũ) trong một thư mục tạm; script cũ được lấy từ git (--old-rev, mặc định là commit ngay trước khi chuyển
+sang kho). Mỗi script chạy trong một tiến trình riêng có audit hook, báo cáo:
+    - số lần mở file dữ liệu trích xuất để đọc (output_json_*, comparisons_json, analysis, extractions),
+    - tổng kích thước các file đã mở và số byte / ký tự được đưa vào bộ parse JSON (json.load / json.loads;
+      phần ID của mỗi dòng JSONL được đọc bằng raw_decode khi lập chỉ mục và không được tính),
+    - thời gian chạy (tốt nhất trong --repeat lần) của từng script và tổng cộng.
+Cuối cùng so sánh các file CSV đầu ra của hai cách: thứ tự bản ghi trong kho là thứ tự ghi (sau import là thứ
+tự tên file), còn cách cũ theo thứ tự liệt kê thư mục của hệ thống file.
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_extraction_store.py
+    python benchmarks/bench_extraction_store.py --repeat 5
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+from extraction_store import ExtractionStore, STORE_NAMES, EXTRACTION_DIR, export_json_dir
+from law_structure import FULL_TEXT_PATH, STRUCTURE_PATH
+
+OLD_LAYOUT = {'entities_2013': 'output_json_2013', 'entities_2024': 'output_json_2024',
+              'comparisons': 'comparisons_json'}
+DATA_DIRS = ('output_json_2013', 'output_json_2024', 'comparisons_json', 'analysis', EXTRACTION_DIR)
+
+OLD_SCRIPTS = ['04_1_validate_output_and_comparision_json.py', '04_0_merge_json.py',
+               '04_2_process_and_transform_to_csv.py', '04_3_create_vectordb_data.py',
+               '04a_1_helper_create_synonym_list.py', '04a_3_process_comparisons.py']
+NEW_SCRIPTS = [script for script in OLD_SCRIPTS if script != '04_0_merge_json.py']
+OUTPUT_FILES = ['final_csv/nodes_final.csv', 'final_csv/relationships_final.csv', 'final_csv/data_for_vectordb.csv',
+                'entities_for_review.csv', 'result_final/graph_edges_comparison.csv']
+
+# Chạy một script với audit hook đếm các lần mở file dữ liệu và json.loads đếm số byte được parse
+RUNNER = r'''
+import json, os, runpy, sys
+script, stats_path, data_dirs = sys.argv[1], sys.argv[2], tuple(sys.argv[3].split(','))
+stats = {"files_opened": 0, "file_bytes": 0, "parsed_bytes": 0}
+write_flags = os.O_WRONLY | os.O_RDWR
+
+def is_data_file(path):
+    if not isinstance(path, str):
+        return False
+    parts = os.path.relpath(os.path.abspath(path)).split(os.sep)
+    return len(parts) > 1 and parts[0] in data_dirs
+
+def hook(event, args):
+    if event != "open" or not is_data_file(args[0]):
+        return
+    mode, flags = args[1], args[2]
+    if (mode is not None and ("w" in mode or "a" in mode)) or (mode is None and flags & write_flags):
+        return
+    if os.path.isfile(args[0]):
+        stats["files_opened"] += 1
+        stats["file_bytes"] += os.path.getsize(args[0])
+
+original_loads = json.loads
+def counting_loads(s, *a, **kw):
+    stats["parsed_bytes"] += len(s)
+    return original_loads(s, *a, **kw)
+json.loads = counting_loads
+
+sys.addaudithook(hook)
+sys.argv = [script]
+try:
+    runpy.run_path(script, run_name="__main__")
+finally:
+    with open(stats_path, "w") as f:
+        json.dump(stats, f)
+'''
+
+
+def default_old_rev():
+    """Commit ngay trước commit chuyển 04_2 từ các file output_json_* sang kho trích xuất."""
+    result = subprocess.run(['git', 'log', '--format=%H', "-S", "glob('output_json_2013/*.json')", '--',
+                             '04_2_process_and_transform_to_csv.py'], capture_output=True, text=True, check=True)
+    return result.stdout.split()[0] + '^'
+
+
+def prepare_work_dir(work_dir, layout):
+    """Thư mục làm việc với văn bản luật + file cấu trúc và dữ liệu trích xuất theo bố cục 'old' hoặc 'new'."""
+    for year in (2013, 2024):
+        for path in (FULL_TEXT_PATH.format(year=year), STRUCTURE_PATH.format(year=year)):
+            os.symlink(os.path.abspath(path), os.path.join(work_dir, path))
+    os.makedirs(os.path.join(work_dir, 'result_final'))
+    for name in STORE_NAMES:
+        with ExtractionStore.open(name) as store:
+            if layout == 'old':
+                export_json_dir(store, os.path.join(work_dir, OLD_LAYOUT[name]))
+            else:
+                os.makedirs(os.path.join(work_dir, EXTRACTION_DIR), exist_ok=True)
+                shutil.copy(store.path, os.path.join(work_dir, EXTRACTION_DIR))
+
+
+def run_script(script_path, work_dir):
+    stats_path = os.path.join(work_dir, '.bench_stats.json')
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR, EXTRACTION_DIR=EXTRACTION_DIR)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', RUNNER, script_path, stats_path, ','.join(DATA_DIRS)],
+                            cwd=work_dir, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{script_path} lỗi:\n{result.stderr[-2000:]}")
+    with open(stats_path) as f:
+        stats = json.load(f)
+    stats['time'] = elapsed
+    return stats
+
+
+def run_layout(scripts, work_dir, repeat):
+    """Chạy lần lượt các script, trả về {script: số liệu}; thời gian là tốt nhất trong `repeat` lần."""
+    results = {}
+    for _ in range(repeat):
+        for script_name, script_path in scripts:
+            stats = run_script(script_path, work_dir)
+            if script_name in results:
+                stats['time'] = min(stats['time'], results[script_name]['time'])
+            results[script_name] = stats
+    return results
+
+
+def print_table(name, results):
+    print(f"\n{name}")
+    print(f"{'script':<46} | {'file mở':>8} | {'KB file':>9} | {'KB parse':>9} | {'tg (s)':>7}")
+    totals = {'files_opened': 0, 'file_bytes': 0, 'parsed_bytes': 0, 'time': 0.0}
+    for script_name, stats in results.items():
+        print(f"{script_name:<46} | {stats['files_opened']:>8} | {stats['file_bytes'] / 1024:>9.0f} | "
+              f"{stats['parsed_bytes'] / 1024:>9.0f} | {stats['time']:>7.2f}")
+        for key in totals:
+            totals[key] += stats[key]
+    print(f"{'TỔNG':<46} | {totals['files_opened']:>8} | {totals['file_bytes'] / 1024:>9.0f} | "
+          f"{totals['parsed_bytes'] / 1024:>9.0f} | {totals['time']:>7.2f}")
+    return totals
+
+
+def compare_outputs(old_dir, new_dir):
+    """
+    So các file CSV đầu ra. Một thực thể có thể xuất hiện (cùng ID) trong nhiều điều luật: 04_2 giữ bản ghi đọc sau
+    cùng, 04a_1 giữ bản ghi đọc đầu tiên, nên khi thứ tự đọc khác nhau, thuộc tính của các ID trùng có thể khác.
+    """
+    for path in OUTPUT_FILES:
+        with open(os.path.join(old_dir, path), 'r', encoding='utf-8-sig') as f:
+            old_rows = list(csv.reader(f))
+        with open(os.path.join(new_dir, path), 'r', encoding='utf-8-sig') as f:
+            new_rows = list(csv.reader(f))
+        if old_rows == new_rows:
+            status = "giống hệt"
+        elif old_rows[:1] == new_rows[:1] and sorted(old_rows) == sorted(new_rows):
+            status = "cùng tập dòng (khác thứ tự)"
+        elif old_rows[:1] == new_rows[:1] and sorted(row[0] for row in old_rows) == sorted(row[0] for row in new_rows):
+            different = len({tuple(row) for row in new_rows} - {tuple(row) for row in old_rows})
+            status = f"cùng tập ID, {different} dòng khác thuộc tính (ID trùng giữa các điều luật)"
+        else:
+            status = f"KHÁC ({len({tuple(row) for row in old_rows} ^ {tuple(row) for row in new_rows})} dòng)"
+        print(f"  {path:<42} {len(new_rows) - 1:>6} dòng: {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--old-rev', default=None, help="Revision git chứa các script 04_x cũ.")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    old_rev = args.old_rev or default_old_rev()
+
+    with tempfile.TemporaryDirectory() as old_dir, tempfile.TemporaryDirectory() as new_dir, \
+            tempfile.TemporaryDirectory() as old_scripts_dir:
+        old_scripts = []
+        for script in OLD_SCRIPTS:
+            source = subprocess.run(['git', 'show', f'{old_rev}:{script}'], capture_output=True, text=True,
+                                    check=True).stdout
+            with open(os.path.join(old_scripts_dir, script), 'w', encoding='utf-8') as f:
+                f.write(source)
+            old_scripts.append((script, os.path.join(old_scripts_dir, script)))
+        new_scripts = [(script, os.path.join(ROOT_DIR, script)) for script in NEW_SCRIPTS]
+
+        prepare_work_dir(old_dir, 'old')
+        prepare_work_dir(new_dir, 'new')
+        print(f"Script cũ từ {old_rev}; {args.repeat} lần chạy mỗi script, thời gian tốt nhất")
+        old_totals = print_table("Bố cục cũ (mỗi điều luật một file JSON + 04_0 gộp)",
+                                 run_layout(old_scripts, old_dir, args.repeat))
+        new_totals = print_table("Kho JSONL (extraction_store.py)",
+                                 run_layout(new_scripts, new_dir, args.repeat))
+
+        print("\nGiảm:")
+        for key, label in (('files_opened', "số file mở"), ('file_bytes', "byte file đọc"),
+                           ('parsed_bytes', "byte parse JSON"), ('time', "thời gian 04_x")):
+            print(f"  {label:<16} {old_totals[key]:>12,.2f} -> {new_totals[key]:>12,.2f} "
+                  f"({1 - new_totals[key] / old_totals[key]:.0%})")
+        print("\nĐầu ra:")
+        compare_outputs(old_dir, new_dir)
+
+
+if __name__ == '__main__':
+    main()
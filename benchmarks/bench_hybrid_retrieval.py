@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Đánh giá truy xuất kết hợp (hybrid): Semantic Search, BM25 và gộp hai bên bằng Reciprocal Rank Fusion.
+
+Trên bộ câu hỏi đánh giá (các điều luật được trích dẫn trong đáp án chuẩn), báo cáo recall@k của:
+    - semantic    : SemanticRetriever.search (như app.py, ngưỡng --score-threshold),
+    - bm25        : BM25Index (có dấu / bỏ dấu),
+    - rrf         : gộp semantic + bm25 bằng reciprocal_rank_fusion (đúng danh sách ứng viên đưa vào Reranker).
+Kèm theo thời gian build index BM25 và độ trễ chấm điểm BM25 cho một câu hỏi (p50 / p99).
+
+Cách chạy (từ thư mục gốc của dự án, cần Vector Database đã build):
+    python benchmarks/bench_hybrid_retrieval.py --ks 1 3 5 10 20
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import numpy as np
+
+from bm25_index import BM25Index, reciprocal_rank_fusion, RRF_K
+from law_structure import load_article_documents
+from semantic_retriever import SemanticRetriever
+from eval_data import load_eval_citations
+
+
+def recall_at_k(rankings, citations, k):
+    """Trung bình tỉ lệ điều luật được trích dẫn nằm trong top-k."""
+    return float(np.mean([len(set(ranked[:k]) & set(cited)) / len(cited)
+                          for ranked, cited in zip(rankings, citations)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ks', type=int, nargs='+', default=[1, 3, 5, 10, 20])
+    parser.add_argument('--score-threshold', type=float, default=0.3,
+                        help="Ngưỡng điểm của Semantic Search (app.py dùng 0.3).")
+    parser.add_argument('--rrf-k', type=int, default=RRF_K)
+    parser.add_argument('--repeat', type=int, default=20, help="Số lần lặp khi đo độ trễ BM25.")
+    args = parser.parse_args()
+    max_k = max(args.ks)
+
+    documents = load_article_documents()
+    known_ids = {doc_id for doc_id, _ in documents}
+    eval_set = [(q, cited) for q, cited in load_eval_citations() if all(i in known_ids for i in cited)]
+    questions = [q for q, _ in eval_set]
+    citations = [cited for _, cited in eval_set]
+    print(f"{len(documents)} điều luật, {len(eval_set)} câu hỏi có trích dẫn nằm trong kho.")
+
+    retriever = SemanticRetriever()
+    semantic = retriever.search_batch(questions, top_k=max_k, score_threshold=args.score_threshold)
+
+    methods = {'semantic': [[law_id for law_id, _ in hits] for hits in semantic]}
+    latency_rows = []
+    for fold in (False, True):
+        name = 'bm25/bỏ dấu' if fold else 'bm25'
+        start = time.perf_counter()
+        bm25 = BM25Index(documents, fold_diacritics=fold)
+        build_time = time.perf_counter() - start
+
+        lexical = [bm25.search(q, top_k=max_k) for q in questions]
+        latencies = []
+        for _ in range(args.repeat):
+            for q in questions:
+                start = time.perf_counter()
+                bm25.search(q, top_k=max_k)
+                latencies.append(time.perf_counter() - start)
+        latency_rows.append((name, build_time, len(bm25.vocabulary), latencies))
+
+        methods[name] = [[law_id for law_id, _ in hits] for hits in lexical]
+        methods[f"rrf(semantic+{name})"] = [
+            [law_id for law_id, _ in reciprocal_rank_fusion([s, l], k=args.rrf_k, limit=max_k)]
+            for s, l in zip(semantic, lexical)
+        ]
+
+    print(f"\n{'phương pháp':<26} | " + " | ".join(f"R@{k:<3}" for k in args.ks))
+    for name, rankings in methods.items():
+        print(f"{name:<26} | " + " | ".join(f"{recall_at_k(rankings, citations, k):.3f}" for k in args.ks))
+
+    print(f"\n{'index':<12} | {'build (s)':>9} | {'số từ':>7} | {'p50 (ms)':>8} | {'p99 (ms)':>8}")
+    for name, build_time, vocabulary_size, latencies in latency_rows:
+        print(f"{name:<12} | {build_time:>9.2f} | {vocabulary_size:>7} | {np.percentile(latencies, 50) * 1000:>8.3f} | "
+              f"{np.percentile(latencies, 99) * 1000:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark build Vector Database toàn bộ so với build tăng dần (05_build_vector_db.py --incremental).
+
+Không cần Neo4j: các điều luật được đọc từ 'result_final/nodes_final.csv' và thay cho
+KGConnector.get_all_laws_for_vectordb. Các snapshot được ghi vào một thư mục tạm.
+
+Kịch bản:
+    1. Build toàn bộ.
+    2. Sửa nội dung một điều luật -> build tăng dần.
+    3. Xóa một điều luật và thêm một điều luật mới -> build tăng dần.
+Sau mỗi bước tăng dần, kết quả tìm kiếm được so sánh với một lần build toàn bộ trên cùng dữ liệu.
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_incremental_rebuild.py --index-type flat
+"""
+import argparse
+import contextlib
+import csv
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import faiss
+
+from vector_index import INDEX_TYPES, configure_search
+from vector_db_snapshot import resolve_vector_db_files, load_snapshot_meta
+
+NODES_CSV_PATH = os.path.join(ROOT_DIR, 'result_final', 'nodes_final.csv')
+
+# Tên file bắt đầu bằng số nên phải nạp bằng importlib
+_spec = importlib.util.spec_from_file_location('build_vector_db', os.path.join(ROOT_DIR, '05_build_vector_db.py'))
+build_vector_db = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(build_vector_db)
+
+
+def load_laws():
+    laws = []
+    with open(NODES_CSV_PATH, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row[':LABEL'] == 'DieuLuat' and row['noi_dung'].strip():
+                laws.append({'id': row['nodeId:ID'], 'name': row['name'], 'content': row['noi_dung'],
+                             'ma_dieu': row['ma_dieu'], 'phien_ban': row['phien_ban']})
+    return laws
+
+
+class _StubKGConnector:
+    """Thay cho KGConnector trong 05_build_vector_db: trả về danh sách điều luật hiện tại."""
+    laws = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def get_all_laws_for_vectordb(self):
+        return list(self.laws)
+
+
+class _CountingModel:
+    """Bọc mô hình embedding để đếm số đoạn văn bản được encode."""
+    def __init__(self, model):
+        self.model = model
+        self.encoded = 0
+
+    def encode(self, sentences, **kwargs):
+        self.encoded += len(sentences)
+        return self.model.encode(sentences, **kwargs)
+
+
+def run_build(workdir, laws, model, index_type, incremental):
+    """Chạy build_vector_database trong `workdir`, trả về (thời gian, số đoạn được encode)."""
+    _StubKGConnector.laws = laws
+    model.encoded = 0
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_vector_db.build_vector_database(index_type=index_type, incremental=incremental)
+        return time.perf_counter() - start, model.encoded
+    finally:
+        os.chdir(previous_dir)
+
+
+def search_results(workdir, queries, k=10):
+    """Top-k ID điều luật cho các vector truy vấn, đọc từ snapshot hiện tại trong `workdir`."""
+    files = resolve_vector_db_files(os.path.join(workdir, build_vector_db.VECTOR_DB_DIR))
+    index = faiss.read_index(files['index'])
+    config = load_snapshot_meta(files['dir'])['index']
+    configure_search(index, config['type'], config['params'])
+    with open(files['law_ids'], 'r', encoding='utf-8') as f:
+        law_ids = json.load(f)
+    _, indices = index.search(queries, k)
+    return [[law_ids[i] for i in row if i >= 0] for row in indices]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--index-type', choices=INDEX_TYPES, default='flat')
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    laws = load_laws()
+    print(f"Đã đọc {len(laws)} điều luật từ '{NODES_CSV_PATH}'.")
+
+    # Tải mô hình một lần, không tính vào thời gian build
+    model = _CountingModel(build_vector_db.load_embedding_model())
+    build_vector_db.load_embedding_model = lambda: model
+    build_vector_db.KGConnector = _StubKGConnector
+
+    queries = model.model.encode([law['name'] for law in laws[:args.queries]],
+                                 normalize_embeddings=True, convert_to_numpy=True).astype('float32')
+
+    edited = [dict(law) for law in laws]
+    edited[0]['content'] += "\nNội dung được bổ sung để kiểm tra build tăng dần."
+    replaced = edited[:-1] + [{**laws[-1], 'id': 'dieu_9999_2024', 'content': laws[-1]['content'] + " (mới)"}]
+    steps = [("sửa 1 điều luật", edited), ("xóa 1 + thêm 1 điều luật", replaced)]
+
+    with tempfile.TemporaryDirectory() as incremental_dir, tempfile.TemporaryDirectory() as full_dir:
+        full_time, full_encoded = run_build(incremental_dir, laws, model, args.index_type, incremental=False)
+        print(f"\n{'bước':<26} | {'chế độ':<10} | {'thời gian (s)':>13} | {'đoạn encode':>11} | khớp build toàn bộ")
+        print(f"{'build ban đầu':<26} | {'toàn bộ':<10} | {full_time:>13.2f} | {full_encoded:>11} |")
+        for name, step_laws in steps:
+            inc_time, inc_encoded = run_build(incremental_dir, step_laws, model, args.index_type, incremental=True)
+            ref_time, ref_encoded = run_build(full_dir, step_laws, model, args.index_type, incremental=False)
+            same = search_results(incremental_dir, queries) == search_results(full_dir, queries)
+            print(f"{name:<26} | {'toàn bộ':<10} | {ref_time:>13.2f} | {ref_encoded:>11} |")
+            print(f"{name:<26} | {'tăng dần':<10} | {inc_time:>13.2f} | {inc_encoded:>11} | {'có' if same else 'KHÔNG'}")
+
+
+if __name__ == '__main__':
+    main()
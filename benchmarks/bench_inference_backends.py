@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Kiểm tra độ tương đương (parity) và đo độ trễ của các backend suy luận trên CPU:
+PyTorch fp32 (tham chiếu), ONNX Runtime fp32 và ONNX int8.
+
+Với mỗi câu hỏi trong bộ đánh giá:
+    encode câu hỏi -> FAISS top-k -> Cross-Encoder chấm điểm các ứng viên.
+Báo cáo cho từng backend so với fp32:
+    - độ trùng top-k của FAISS và top-n sau rerank,
+    - độ lệch embedding câu hỏi (1 - cosine) và độ lệch điểm Cross-Encoder trên cùng các cặp,
+    - độ trễ p50/p95 mỗi câu hỏi (encode + search + rerank).
+Script trả về mã lỗi 1 nếu độ trùng trung bình thấp hơn ngưỡng --min-overlap.
+
+Yêu cầu: đã export mô hình ONNX (python inference_backend.py export), có faiss_index.bin,
+law_ids.json và article_store.bin.
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_inference_backends.py --backends torch onnx onnx-int8
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '')
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import faiss
+import numpy as np
+
+from inference_backend import load_bi_encoder, load_cross_encoder, BACKENDS
+from semantic_retriever import MODEL_NAME
+from reranker import RERANKER_MODEL_NAME, RERANKER_MAX_LENGTH
+from article_store import ArticleStore
+from vector_db_snapshot import resolve_vector_db_files
+from query_utils import clean_query
+from eval_data import load_eval_questions
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def run_backend(backend, queries, index, law_ids, store, top_k, final_k, reference_pairs=None):
+    """Chạy toàn bộ câu hỏi với một backend. Trả về kết quả từng câu và độ trễ."""
+    bi_encoder = load_bi_encoder(MODEL_NAME, backend=backend, device='cpu')
+    cross_encoder = load_cross_encoder(RERANKER_MODEL_NAME, RERANKER_MAX_LENGTH, backend=backend, device='cpu')
+    # Warm-up
+    bi_encoder.encode(queries[:2], normalize_embeddings=True)
+    cross_encoder.predict([[queries[0], "khởi động"]], show_progress_bar=False)
+
+    outputs = []
+    latencies = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        vector = bi_encoder.encode([query], normalize_embeddings=True, show_progress_bar=False).astype('float32')
+        _, indices = index.search(vector, top_k)
+        candidate_ids = [law_ids[j] for j in indices[0] if j >= 0]
+        nodes, _ = store.get_many(candidate_ids)
+        pairs = [[query, f"Tên điều luật: {p['name']}. Nội dung: {p['noi_dung']}"] for p in nodes.values()]
+        scores = cross_encoder.predict(pairs, show_progress_bar=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        reranked = [law_id for _, law_id in sorted(zip(scores, nodes), key=lambda x: -x[0])][:final_k]
+        # Chấm điểm lại đúng các cặp của backend tham chiếu để đo độ lệch điểm trên cùng đầu vào
+        same_pair_scores = None
+        if reference_pairs is not None:
+            same_pair_scores = cross_encoder.predict(reference_pairs[i], show_progress_bar=False)
+        outputs.append({
+            'vector': vector[0], 'candidates': candidate_ids, 'reranked': reranked,
+            'pairs': pairs, 'scores': np.asarray(scores), 'same_pair_scores': same_pair_scores,
+        })
+    return outputs, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--final-k', type=int, default=5)
+    parser.add_argument('--min-overlap', type=float, default=0.8,
+                        help="Ngưỡng tối thiểu cho độ trùng top-k trung bình so với fp32.")
+    args = parser.parse_args()
+
+    files = resolve_vector_db_files()
+    index = faiss.read_index(files['index'])
+    with open(files['law_ids'], 'r', encoding='utf-8') as f:
+        law_ids = json.load(f)
+    store = ArticleStore(files['article_store'])
+    queries = [clean_query(q) for q in load_eval_questions()]
+
+    print(f"Backend tham chiếu: torch (fp32), {len(queries)} câu hỏi, top_k={args.top_k}")
+    reference, reference_latencies = run_backend('torch', queries, index, law_ids, store, args.top_k, args.final_k)
+    reference_pairs = [r['pairs'] for r in reference]
+
+    failed = False
+    header = (f"{'backend':>10} | {'p50 (ms)':>8} | {'p95 (ms)':>8} | {'top-k overlap':>13} | "
+              f"{'top-n rerank':>12} | {'emb drift':>9} | {'score drift':>11}")
+    print("\n" + header)
+    print(f"{'torch':>10} | {statistics.median(reference_latencies):>8.1f} | "
+          f"{_percentile(reference_latencies, 0.95):>8.1f} | {1:>13.3f} | {1:>12.3f} | {0:>9.5f} | {0:>11.4f}")
+
+    for backend in args.backends:
+        if backend == 'torch':
+            continue
+        outputs, latencies = run_backend(backend, queries, index, law_ids, store,
+                                         args.top_k, args.final_k, reference_pairs=reference_pairs)
+        topk_overlap = np.mean([
+            len(set(o['candidates']) & set(r['candidates'])) / max(1, len(r['candidates']))
+            for o, r in zip(outputs, reference)
+        ])
+        rerank_overlap = np.mean([
+            len(set(o['reranked']) & set(r['reranked'])) / max(1, len(r['reranked']))
+            for o, r in zip(outputs, reference)
+        ])
+        embedding_drift = np.mean([1 - float(np.dot(o['vector'], r['vector'])) for o, r in zip(outputs, reference)])
+        score_drift = np.mean([
+            float(np.max(np.abs(np.asarray(o['same_pair_scores']) - r['scores']))) if len(r['scores']) else 0.0
+            for o, r in zip(outputs, reference)
+        ])
+        print(f"{backend:>10} | {statistics.median(latencies):>8.1f} | {_percentile(latencies, 0.95):>8.1f} | "
+              f"{topk_overlap:>13.3f} | {rerank_overlap:>12.3f} | {embedding_drift:>9.5f} | {score_drift:>11.4f}")
+        if topk_overlap < args.min_overlap or rerank_overlap < args.min_overlap:
+            print(f"   -> KHÔNG ĐẠT: độ trùng thấp hơn ngưỡng {args.min_overlap}")
+            failed = True
+
+    store.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: so sánh độ trễ giữa việc lấy ứng viên từng ID một (get_node_by_id)
+và lấy theo lô trong một truy vấn UNWIND (get_nodes_by_ids).
+
+Không cần Neo4j thật: sử dụng một driver giả lập, nạp dữ liệu từ
+'result_final/nodes_final.csv' và mô phỏng độ trễ mạng cho mỗi lần session.run().
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_kg_batch_fetch.py --rtt-ms 2 --k 20 30 --repeat 20
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from kg_connector import KGConnector
+
+NODES_CSV_PATH = os.path.join(ROOT_DIR, 'result_final', 'nodes_final.csv')
+LAW_IDS_PATH = os.path.join(ROOT_DIR, 'law_ids.json')
+
+
+class _FakeRecord:
+    def __init__(self, data):
+        self._data = data
+
+    def data(self):
+        return self._data
+
+
+class _FakeSession:
+    """Mô phỏng một session Neo4j: mỗi lần run() tốn một round trip mạng."""
+    def __init__(self, driver):
+        self._driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def run(self, query, parameters=None):
+        parameters = parameters or {}
+        self._driver.round_trips += 1
+        rows = []
+        if 'node_ids' in parameters:
+            for node_id in parameters['node_ids']:
+                props = self._driver.law_nodes.get(node_id)
+                if props is not None:
+                    rows.append({'node_id': node_id, 'properties': props})
+        elif 'node_id' in parameters:
+            props = self._driver.all_nodes.get(parameters['node_id'])
+            if props is not None:
+                rows.append({'properties': props})
+        # Độ trễ = round trip cố định + chi phí truyền tải theo số dòng trả về
+        time.sleep(self._driver.rtt_s + self._driver.per_row_s * len(rows))
+        return [_FakeRecord(row) for row in rows]
+
+
+class FakeNeo4jDriver:
+    """Driver giả lập đủ dùng cho KGConnector._run_query."""
+    def __init__(self, nodes_csv_path, rtt_ms=2.0, per_row_ms=0.05):
+        self.rtt_s = rtt_ms / 1000.0
+        self.per_row_s = per_row_ms / 1000.0
+        self.round_trips = 0
+        self.all_nodes = {}
+        self.law_nodes = {}
+        with open(nodes_csv_path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                node_id = row.pop('nodeId:ID')
+                label = row.pop(':LABEL')
+                props = {k: v for k, v in row.items() if v != ''}
+                props['nodeId'] = node_id
+                self.all_nodes[node_id] = props
+                if label == 'DieuLuat':
+                    self.law_nodes[node_id] = props
+
+    def session(self):
+        return _FakeSession(self)
+
+    def close(self):
+        pass
+
+
+def _time_it(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rtt-ms', type=float, default=2.0, help="Độ trễ mô phỏng cho mỗi round trip (ms).")
+    parser.add_argument('--per-row-ms', type=float, default=0.05, help="Chi phí mô phỏng cho mỗi dòng trả về (ms).")
+    parser.add_argument('--k', type=int, nargs='+', default=[5, 20, 30], help="Số ứng viên cần lấy.")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    driver = FakeNeo4jDriver(NODES_CSV_PATH, rtt_ms=args.rtt_ms, per_row_ms=args.per_row_ms)
+    kg = KGConnector(driver=driver)
+    with open(LAW_IDS_PATH, 'r', encoding='utf-8') as f:
+        law_ids = json.load(f)
+
+    print(f"Driver giả lập: {len(driver.all_nodes)} nút ({len(driver.law_nodes)} DieuLuat), RTT={args.rtt_ms} ms")
+    print(f"{'k':>4} | {'per-id p50 (ms)':>16} | {'batch p50 (ms)':>15} | {'speedup':>8} | round trips")
+    for k in args.k:
+        ids = law_ids[:k]
+
+        def per_id():
+            return [kg.get_node_by_id(node_id) for node_id in ids]
+
+        def batched():
+            return kg.get_nodes_by_ids(ids)
+
+        # Kiểm tra hai cách trả về cùng một kết quả
+        nodes, missing = batched()
+        assert list(nodes.values()) == [p for p in per_id() if p is not None] and not missing
+
+        driver.round_trips = 0
+        per_id_p50, _ = _time_it(per_id, args.repeat)
+        per_id_trips = driver.round_trips // args.repeat
+        driver.round_trips = 0
+        batch_p50, _ = _time_it(batched, args.repeat)
+        batch_trips = driver.round_trips // args.repeat
+
+        print(f"{k:>4} | {per_id_p50:>16.2f} | {batch_p50:>15.2f} | {per_id_p50 / batch_p50:>7.1f}x | {per_id_trips} -> {batch_trips}")
+
+
+if __name__ == '__main__':
+    main()
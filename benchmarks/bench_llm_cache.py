@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Kiểm tra cache phản hồi LLM (llm_cache.py) trên pipeline trích xuất thật, với server giả lập
+benchmarks/fake_llm_server.py thay cho API:
+
+    1. Chạy lần đầu 02_extract_entities.py / 03_extract_comparisons.py (cache rỗng): mỗi điều luật một lời gọi API.
+    2. Xóa kho kết quả (extractions/*.jsonl, như sau khi sửa phần parse JSON) và chạy lại: kỳ vọng 0 lời gọi API.
+    3. Chạy lại với LLM_CACHE=0 để so sánh thời gian.
+
+Báo cáo số lời gọi API server nhận được, thời gian mỗi lần chạy, dung lượng cache và độ trễ tra cache.
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_llm_cache.py --script 02 --files 30
+    python benchmarks/bench_llm_cache.py --script 03 --files 10 --latency 2
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+from llm_cache import LLMResponseCache, cache_key
+from extraction_store import EXTRACTION_DIR, ExtractionStore
+from law_structure import copy_law_structure
+from fake_llm_server import FakeLLMServer
+
+# Script -> các kho kết quả (extraction_store.py) mà script ghi vào
+SCRIPTS = {'02': ('02_extract_entities.py', ('entities_2024', 'entities_2013')),
+           '03': ('03_extract_comparisons.py', ('comparisons',))}
+
+
+def prepare_work_dir(work_dir, num_files):
+    # Văn bản luật + file cấu trúc chỉ giữ num_files điều luật đầu tiên mỗi năm
+    for year in (2013, 2024):
+        copy_law_structure(year, work_dir, num_files)
+
+
+def store_file(work_dir, store_name):
+    return os.path.join(work_dir, EXTRACTION_DIR, f"{store_name}.jsonl")
+
+
+def run_once(name, server, script, output_stores, work_dir, env):
+    for store_name in output_stores:
+        if os.path.exists(store_file(work_dir, store_name)):
+            os.remove(store_file(work_dir, store_name))
+    calls_before = server.stats['requests']
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.join(ROOT_DIR, script)], cwd=work_dir, env=env,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    outputs = 0
+    for store_name in output_stores:
+        with ExtractionStore(store_file(work_dir, store_name)) as store:
+            outputs += len(store)
+    print(f"{name:<38} | {elapsed:>7.2f} | {server.stats['requests'] - calls_before:>8} | {outputs:>6}"
+          + ("" if result.returncode == 0 else f" | exit {result.returncode}: {result.stderr[-300:]}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--script', choices=sorted(SCRIPTS), default='02')
+    parser.add_argument('--files', type=int, default=30, help="Số điều luật mỗi năm.")
+    parser.add_argument('--latency', type=float, default=0.5, help="Thời gian xử lý mỗi request của server.")
+    args = parser.parse_args()
+    script, output_stores = SCRIPTS[args.script]
+
+    with tempfile.TemporaryDirectory() as work_dir, FakeLLMServer(rpm=10 ** 6, latency=args.latency) as server:
+        prepare_work_dir(work_dir, args.files)
+        cache_path = os.path.join(work_dir, 'cache', 'llm_responses.sqlite')
+        env = dict(os.environ, GEMINI_API_BASE=server.url, GOOGLE_API_KEY='fake-key', LLM_CACHE_PATH=cache_path,
+                   GEMINI_REQUESTS_PER_MINUTE='100000', GEMINI_TOKENS_PER_MINUTE=str(10 ** 10))
+
+        print(f"{script}, {args.files} điều luật mỗi năm, độ trễ server {args.latency}s\n")
+        print(f"{'lần chạy':<38} | {'tg (s)':>7} | {'gọi API':>8} | {'output':>6}")
+        run_once("1. cache rỗng", server, script, output_stores, work_dir, env)
+        run_once("2. xóa output, chạy lại (cache)", server, script, output_stores, work_dir, env)
+        run_once("3. xóa output, chạy lại (LLM_CACHE=0)", server, script, output_stores, work_dir,
+                 dict(env, LLM_CACHE='0'))
+
+        cache = LLMResponseCache(cache_path)
+        stats = cache.stats()
+        print(f"\nCache: {stats['entries']} bản ghi, {stats['size_mb']} MB, {stats['models']}")
+        keys = [entry['key'] for entry in cache.entries(limit=10 ** 6)]
+        latencies = []
+        for key in keys * max(1, 1000 // max(len(keys), 1)):
+            start = time.perf_counter()
+            cache.get(key)
+            latencies.append(time.perf_counter() - start)
+        prompt = open(os.path.join(work_dir, 'LuatDatDai2013_full.txt'), encoding='utf-8').read() \
+            if args.script == '03' else "x" * 3000
+        start = time.perf_counter()
+        for _ in range(100):
+            cache_key('gemini', 'gemini-2.0-flash', prompt, {})
+        print(f"Tra cache: p50 {statistics.median(latencies) * 1e6:.0f} µs; "
+              f"tính khóa cho prompt {len(prompt)} ký tự: {(time.perf_counter() - start) / 100 * 1e3:.2f} ms")
+        cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+So sánh cách gọi LLM cũ (ThreadPoolExecutor + thử lại 3 lần với time.sleep(5) cố định) với
+llm_client.AsyncLLMClient (pool kết nối dùng chung, token bucket theo quota, backoff + jitter
+tôn trọng Retry-After) trên server giả lập benchmarks/fake_llm_server.py có áp quota như API thật.
+
+Báo cáo cho mỗi cách: thời gian, số request thành công / thất bại, số lần bị 429, thông lượng thực tế
+so với quota và số request lớn nhất trong một cửa sổ 60 giây bất kỳ. AsyncLLMClient được chạy cả với
+generate() và stream() (luồng SSE, như llm_callers.stream_* dùng trong app.py).
+
+Với AsyncLLMClient (cả hai chế độ), benchmark kiểm tra và thoát với mã khác 0 nếu không đạt:
+    - mọi request đều thành công,
+    - số lần bị 429 không vượt quá --max-rate-limited (mặc định 1% số request, tối thiểu 1),
+    - thông lượng thực tế không thấp hơn --min-rpm-fraction x quota request/phút.
+
+Với --scripts, chạy thêm 02_extract_entities.py / 03_extract_comparisons.py thật (trong thư mục tạm,
+GEMINI_API_BASE trỏ tới server giả lập) để kiểm tra toàn bộ luồng xử lý.
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_llm_client.py --requests 200 --rpm 300 --latency 0.3
+    python benchmarks/bench_llm_client.py --requests 60 --rpm 120 --scripts 02 03
+    python benchmarks/bench_llm_client.py --skip-old --max-rate-limited 0 --min-rpm-fraction 0.9
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import httpx
+
+import llm_client
+from llm_client import AsyncLLMClient, RateLimiter
+from law_structure import copy_law_structure, load_article_documents
+from extraction_store import EXTRACTION_DIR, STORE_NAMES, ExtractionStore
+from fake_llm_server import FakeLLMServer
+
+
+def build_prompts(num_requests):
+    """Prompt có kích thước thật: nội dung các điều luật của Luật 2013 / 2024."""
+    documents = load_article_documents()
+    return [f"Mã Điều: {doc_id.split('_')[1]}\nNội dung: {text}"
+            for doc_id, text in (documents * (num_requests // len(documents) + 1))[:num_requests]]
+
+
+def old_call(url, prompt, retries=3, sleep=5.0):
+    """Mô phỏng llm_callers.call_gemini_api trước đây: thử lại 3 lần, chờ cố định giữa các lần."""
+    body = {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+    for i in range(retries):
+        response = httpx.post(url, json=body, timeout=llm_client.LLM_TIMEOUT)
+        if response.status_code == 200:
+            return True
+        if i < retries - 1:
+            time.sleep(sleep)
+    return False
+
+
+def run_old(server, prompts, workers, sleep):
+    url = f"{server.url}/v1beta/models/{llm_client.GEMINI_MODEL_NAME}:generateContent"
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(old_call, url, prompt, sleep=sleep) for prompt in prompts]
+        return sum(future.result() for future in as_completed(futures))
+
+
+async def collect_stream(client, prompt):
+    return "".join([chunk async for chunk in client.stream(prompt)])
+
+
+async def run_new(prompts, rpm, tpm, stream=False):
+    client = AsyncLLMClient(limiters={'gemini': RateLimiter(rpm, tpm)}, use_cache=False)
+    call = (lambda prompt: collect_stream(client, prompt)) if stream else client.generate
+    async with client:
+        results = await asyncio.gather(*(call(prompt) for prompt in prompts), return_exceptions=True)
+    # Câu trả lời rỗng (luồng không có token nào) cũng tính là thất bại
+    return sum(bool(result) and not isinstance(result, Exception) for result in results)
+
+
+def max_in_window(times, window=60.0):
+    """Số request được chấp nhận lớn nhất trong một cửa sổ `window` giây bất kỳ."""
+    times = sorted(times)
+    return max((i - bisect_left(times, t - window) + 1 for i, t in enumerate(times)), default=0)
+
+
+def report(name, server, succeeded, total, elapsed, rpm):
+    """In một dòng kết quả, trả về (số lần bị 429, thông lượng request/phút)."""
+    times = server.admitted_times
+    span = times[-1] - times[0] if len(times) > 1 else 0.0
+    throughput = (len(times) - 1) / span * 60 if span else float('nan')
+    print(f"{name:<28} | {elapsed:>7.1f} | {succeeded:>4}/{total:<4} | {server.stats['rate_limited']:>5} | "
+          f"{throughput:>8.0f} / {rpm:<5} | {max_in_window(times):>6}")
+    return server.stats['rate_limited'], throughput
+
+
+def check_client(name, succeeded, total, rate_limited, throughput, args):
+    """Các điều kiện AsyncLLMClient phải đạt; trả về danh sách lỗi."""
+    max_rate_limited = args.max_rate_limited if args.max_rate_limited is not None else max(1, total // 100)
+    failures = []
+    if succeeded != total:
+        failures.append(f"{name}: {total - succeeded}/{total} request thất bại")
+    if rate_limited > max_rate_limited:
+        failures.append(f"{name}: {rate_limited} lần bị 429 (cho phép tối đa {max_rate_limited})")
+    # throughput là NaN khi chỉ có một request được chấp nhận: không đủ dữ liệu để kiểm tra
+    if throughput < args.min_rpm_fraction * args.rpm:
+        failures.append(f"{name}: thông lượng {throughput:.0f} request/phút < "
+                        f"{args.min_rpm_fraction:g} x quota {args.rpm}")
+    return failures
+
+
+def count_extractions(work_dir):
+    """Số bản ghi trong các kho kết quả (extraction_store.py) của một thư mục làm việc."""
+    total = 0
+    for name in STORE_NAMES:
+        with ExtractionStore(os.path.join(work_dir, EXTRACTION_DIR, f"{name}.jsonl")) as store:
+            total += len(store)
+    return total
+
+
+def run_scripts(server, scripts, num_files, rpm, tpm):
+    """Chạy các script trích xuất thật trên num_files điều luật đầu tiên mỗi năm, trong thư mục tạm."""
+    env = dict(os.environ, GEMINI_API_BASE=server.url, GOOGLE_API_KEY='fake-key',
+               GEMINI_REQUESTS_PER_MINUTE=str(rpm), GEMINI_TOKENS_PER_MINUTE=str(tpm or 10 ** 9), LLM_CACHE='0')
+    for script in scripts:
+        path = os.path.join(ROOT_DIR, {'02': '02_extract_entities.py', '03': '03_extract_comparisons.py'}[script])
+        with tempfile.TemporaryDirectory() as work_dir:
+            for year in (2013, 2024):
+                copy_law_structure(year, work_dir, num_files)
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, path], cwd=work_dir, env=env, capture_output=True, text=True)
+            elapsed = time.perf_counter() - start
+            outputs = count_extractions(work_dir)
+            print(f"{script}: exit {result.returncode}, {elapsed:.1f}s, {outputs} bản ghi mới "
+                  f"({result.stdout.strip().splitlines()[-2:] if result.stdout.strip() else result.stderr[-300:]})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--rpm', type=int, default=300, help="Quota request/phút của server giả lập.")
+    parser.add_argument('--tpm', type=int, default=0, help="Quota token/phút (0: không giới hạn).")
+    parser.add_argument('--latency', type=float, default=0.3, help="Thời gian xử lý mỗi request của server.")
+    parser.add_argument('--workers', type=int, default=10, help="Số luồng của cách cũ (max_workers=10 trong 03).")
+    parser.add_argument('--old-sleep', type=float, default=5.0, help="Thời gian chờ cố định giữa các lần thử của cách cũ.")
+    parser.add_argument('--skip-old', action='store_true')
+    parser.add_argument('--max-rate-limited', type=int, default=None,
+                        help="Số lần bị 429 tối đa cho phép với AsyncLLMClient (mặc định 1%% số request, tối thiểu 1).")
+    parser.add_argument('--min-rpm-fraction', type=float, default=0.8,
+                        help="Thông lượng tối thiểu của AsyncLLMClient, tính theo phần quota request/phút.")
+    parser.add_argument('--scripts', nargs='*', choices=['02', '03'], default=[])
+    parser.add_argument('--script-files', type=int, default=20, help="Số điều luật mỗi năm khi chạy --scripts.")
+    args = parser.parse_args()
+
+    prompts = build_prompts(args.requests)
+    print(f"{len(prompts)} request, quota {args.rpm} request/phút, {args.tpm or 'không giới hạn'} token/phút, "
+          f"độ trễ server {args.latency}s\n")
+    print(f"{'cách gọi':<28} | {'tg (s)':>7} | {'thành công':>9} | {'429':>5} | {'req/phút / quota':>16} | {'max/60s':>6}")
+
+    if not args.skip_old:
+        with FakeLLMServer(rpm=args.rpm, tpm=args.tpm, latency=args.latency) as server:
+            start = time.perf_counter()
+            succeeded = run_old(server, prompts, args.workers, args.old_sleep)
+            report(f"ThreadPool({args.workers}) + sleep({args.old_sleep:g})", server, succeeded, len(prompts),
+                   time.perf_counter() - start, args.rpm)
+
+    failures = []
+    for name, stream in (("AsyncLLMClient", False), ("AsyncLLMClient (stream)", True)):
+        with FakeLLMServer(rpm=args.rpm, tpm=args.tpm, latency=args.latency) as server:
+            llm_client.GEMINI_API_BASE = server.url
+            start = time.perf_counter()
+            succeeded = asyncio.run(run_new(prompts, args.rpm, args.tpm, stream=stream))
+            rate_limited, throughput = report(name, server, succeeded, len(prompts), time.perf_counter() - start,
+                                              args.rpm)
+        failures += check_client(name, succeeded, len(prompts), rate_limited, throughput, args)
+
+    if args.scripts:
+        print()
+        with FakeLLMServer(rpm=args.rpm, tpm=args.tpm, latency=args.latency) as server:
+            run_scripts(server, args.scripts, args.script_files, args.rpm, args.tpm)
+            print(f"Server: {dict(server.stats)}")
+
+    if failures:
+        print("\nKHÔNG ĐẠT:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nĐạt: AsyncLLMClient không vượt quá số lần bị 429 cho phép và giữ thông lượng gần quota.")
+
+
+if __name__ == '__main__':
+    main()
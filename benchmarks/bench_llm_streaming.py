@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Đo thời gian đến token đầu tiên (TTFT) so với tổng thời gian sinh câu trả lời khi gọi LLM dạng streaming
+(llm_callers.stream_gemini_api / stream_openai_api), trên các câu hỏi của bộ đánh giá.
+
+Với cách gọi cũ (call_gemini_api) người dùng chờ trọn tổng thời gian trước khi thấy chữ nào;
+với streaming, thời gian chờ cảm nhận được là TTFT.
+
+Cách chạy (từ thư mục gốc của dự án, cần API key trong .env):
+    python benchmarks/bench_llm_streaming.py --provider gemini --num-questions 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from llm_callers import stream_gemini_api, stream_openai_api
+from eval_data import load_eval_questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--provider', choices=['gemini', 'openai'], default='gemini')
+    parser.add_argument('--num-questions', type=int, default=10)
+    args = parser.parse_args()
+
+    stream = stream_gemini_api if args.provider == 'gemini' else stream_openai_api
+    rows = []
+    for question in load_eval_questions()[:args.num_questions]:
+        prompt = f"Trả lời ngắn gọn câu hỏi sau theo Luật Đất đai Việt Nam:\n{question}"
+        start = time.perf_counter()
+        first_token_time, num_chars = None, 0
+        for chunk in stream(prompt):
+            if first_token_time is None:
+                first_token_time = time.perf_counter() - start
+            num_chars += len(chunk)
+        rows.append((first_token_time or float('nan'), time.perf_counter() - start, num_chars))
+
+    print(f"\n{'#':>3} | {'TTFT (s)':>8} | {'tổng (s)':>8} | {'ký tự':>6}")
+    for i, (ttft, total, num_chars) in enumerate(rows, start=1):
+        print(f"{i:>3} | {ttft:>8.2f} | {total:>8.2f} | {num_chars:>6}")
+    print(f"p50 | {statistics.median(r[0] for r in rows):>8.2f} | {statistics.median(r[1] for r in rows):>8.2f} |")
+
+
+if __name__ == '__main__':
+    main()
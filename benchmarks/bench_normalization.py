@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+So sánh chuẩn hóa ID / label cũ (unidecode + regex cho từng dòng / từng khóa, không ghi nhớ) với normalization.py
+(mỗi chuỗi phân biệt chỉ chuẩn hóa một lần; cột pandas được xử lý theo giá trị phân biệt bằng map_unique).
+
+Hai phần được đo, trên dữ liệu hiện tại nhân lên --scales lần (bản sao thứ i có thêm hậu tố "_i" ở mọi ID, nên
+số ID phân biệt tăng theo kích thước như một đồ thị lớn hơn; label và tên thuộc tính giữ nguyên):
+    - 04a_2: chuẩn hóa cột ':LABEL', 'nodeId:ID' (kèm ánh xạ đồng nghĩa) của result_final/graph_nodes_*.csv và
+      ':START_ID' / ':END_ID' của result_final/graph_edges_*.csv; cách cũ là `.apply(lambda ...)` từng dòng.
+    - 04_2: chuẩn hóa ID, label, tên thuộc tính của thực thể và ID / loại quan hệ trong kho trích xuất
+      (extraction_store.py); cách cũ là normalize_string không ghi nhớ.
+Mỗi lần đo bắt đầu với bộ nhớ đệm rỗng. Kết quả của hai cách được so sánh (phải giống hệt).
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_normalization.py
+    python benchmarks/bench_normalization.py --scales 1 10 100 --repeat 3
+"""
+import argparse
+import importlib
+import os
+import re
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import pandas as pd
+from unidecode import unidecode
+
+import normalization
+from extraction_store import ExtractionStore
+
+merge_graph = importlib.import_module('04a_2_normalize_and_merge_graph')
+
+
+def old_normalize_id(entity_id):
+    """normalize_id cũ của 04a_2_normalize_and_merge_graph.py."""
+    if not isinstance(entity_id, str): return ""
+    normalized = unidecode(entity_id)
+    normalized = normalized.lower()
+    normalized = re.sub(r'[\s\W]+', '_', normalized)
+    return normalized.strip('_')
+
+
+def old_normalize_label(label):
+    """normalize_label cũ của 04a_2_normalize_and_merge_graph.py."""
+    if not isinstance(label, str): return "UnknownLabel"
+    no_accent_label = unidecode(label)
+    words = re.split(r'[\s_-]+', no_accent_label)
+    return "".join(word.capitalize() for word in words)
+
+
+def old_normalize_string(s: str, case='snake') -> str:
+    """normalize_string cũ của 04_2_process_and_transform_to_csv.py."""
+    if not isinstance(s, str) or not s: return ""
+    s = unidecode(s.strip())
+    s = re.sub(r'[^a-zA-Z0-9]+', '_', s)
+    s = s.strip('_')
+    if case == 'snake': return s.lower()
+    if case == 'pascal': return "".join(word.capitalize() for word in s.split('_') if word)
+    if case == 'upper': return s.upper()
+    return s
+
+
+def scale_frame(df, id_columns, scale):
+    """Nối `scale` bản sao của df; bản sao thứ i (i >= 1) thêm hậu tố "_i" vào các cột ID."""
+    copies = [df]
+    for i in range(1, scale):
+        copy = df.copy()
+        for column in id_columns:
+            copy[column] = copy[column].astype(str) + f"_{i}"
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def graph_old(nodes, edges, semantic_map):
+    nodes, edges = nodes.copy(), edges.copy()
+    nodes[':LABEL'] = nodes[':LABEL'].apply(old_normalize_label)
+    nodes['nodeId:ID'] = nodes['nodeId:ID'].apply(lambda x: semantic_map.get(old_normalize_id(x), old_normalize_id(x)))
+    edges[':START_ID'] = edges[':START_ID'].apply(lambda x: semantic_map.get(old_normalize_id(x), old_normalize_id(x)))
+    edges[':END_ID'] = edges[':END_ID'].apply(lambda x: semantic_map.get(old_normalize_id(x), old_normalize_id(x)))
+    return nodes, edges
+
+
+def graph_new(nodes, edges, semantic_map):
+    nodes, edges = nodes.copy(), edges.copy()
+    nodes[':LABEL'] = normalization.map_unique(nodes[':LABEL'], normalization.normalize_label)
+    nodes['nodeId:ID'] = merge_graph.canonical_ids(nodes['nodeId:ID'], semantic_map)
+    edges[':START_ID'] = merge_graph.canonical_ids(edges[':START_ID'], semantic_map)
+    edges[':END_ID'] = merge_graph.canonical_ids(edges[':END_ID'], semantic_map)
+    return nodes, edges
+
+
+def load_extractions(scale):
+    """Các bản ghi (entities, relationships) của hai kho thực thể, nhân `scale` lần với hậu tố ID."""
+    records = []
+    for name in ('entities_2013', 'entities_2024'):
+        with ExtractionStore.open(name) as store:
+            records += [data.get("graph", data) for _, data in store.items()]
+    scaled = []
+    for i in range(scale):
+        suffix = f"_{i}" if i else ""
+        for graph_data in records:
+            entities = [dict(entity, id=f"{entity['id']}{suffix}") if entity.get('id') else entity
+                        for entity in graph_data.get('entities', [])]
+            relationships = [dict(rel, source_id=f"{rel.get('source_id')}{suffix}", target_id=f"{rel.get('target_id')}{suffix}")
+                             for rel in graph_data.get('relationships', [])]
+            scaled.append((entities, relationships))
+    return scaled
+
+
+def extraction_pass(records, normalize_string):
+    """Phần chuẩn hóa của bước 1 trong 04_2_process_and_transform_to_csv.py."""
+    nodes, relationships = {}, []
+    for entities, rels in records:
+        for entity in entities:
+            node_id = entity.get('id')
+            if node_id:
+                properties = {normalize_string(k, 'snake'): v for k, v in entity.items() if k not in ['id', 'label']}
+                nodes[normalize_string(node_id, 'snake')] = (normalize_string(entity.get('label'), 'pascal'), properties)
+        for rel in rels:
+            if rel.get('source_id') and rel.get('target_id'):
+                relationships.append((normalize_string(rel['source_id'], 'snake'),
+                                      normalize_string(rel['target_id'], 'snake'),
+                                      normalize_string(rel.get('relationship_type'), 'upper')))
+    return nodes, relationships
+
+
+def best_time(func, repeat):
+    """(thời gian tốt nhất, kết quả); bộ nhớ đệm của normalization.py được xóa trước mỗi lần."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        normalization.clear_caches()
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    semantic_map = merge_graph.create_semantic_mapping(merge_graph.synonym_groups)
+    base_nodes = pd.concat([pd.read_csv(f) for f in merge_graph.NODE_FILES], ignore_index=True)
+    base_edges = pd.concat([pd.read_csv(f) for f in merge_graph.EDGE_FILES], ignore_index=True)
+
+    print(f"{'bước':<6} | {'x':>4} | {'dòng / khóa':>12} | {'phân biệt':>10} | {'cũ (s)':>8} | {'mới (s)':>8} | "
+          f"{'tăng tốc':>8} | kết quả")
+    for scale in args.scales:
+        nodes = scale_frame(base_nodes, ['nodeId:ID'], scale)
+        edges = scale_frame(base_edges, [':START_ID', ':END_ID'], scale)
+        repeat = 1 if scale >= 100 else args.repeat
+        old_time, (old_nodes, old_edges) = best_time(lambda: graph_old(nodes, edges, semantic_map), repeat)
+        new_time, (new_nodes, new_edges) = best_time(lambda: graph_new(nodes, edges, semantic_map), repeat)
+        same = old_nodes.equals(new_nodes) and old_edges.equals(new_edges)
+        rows = len(nodes) * 2 + len(edges) * 2
+        distinct = (nodes['nodeId:ID'].nunique() + nodes[':LABEL'].nunique()
+                    + pd.concat([edges[':START_ID'], edges[':END_ID']]).nunique())
+        print(f"{'04a_2':<6} | {scale:>4} | {rows:>12,} | {distinct:>10,} | {old_time:>8.2f} | {new_time:>8.2f} | "
+              f"{old_time / new_time:>7.1f}x | {'giống hệt' if same else 'KHÁC'}")
+
+        records = load_extractions(scale)
+        old_time, old_result = best_time(lambda: extraction_pass(records, old_normalize_string), repeat)
+        new_time, new_result = best_time(lambda: extraction_pass(records, normalization.normalize_string), repeat)
+        info = normalization.cache_info()['normalize_string']
+        print(f"{'04_2':<6} | {scale:>4} | {info.hits + info.misses:>12,} | {info.misses:>10,} | {old_time:>8.2f} | "
+              f"{new_time:>8.2f} | {old_time / new_time:>7.1f}x | {'giống hệt' if old_result == new_result else 'KHÁC'}")
+
+
+if __name__ == '__main__':
+    main()
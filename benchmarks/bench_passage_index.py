@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark index theo điều luật ('article') so với index theo khoản/điểm ('clause') trên
+các điều luật của Luật 2013 và 2024 (law_structure.py).
+
+Báo cáo:
+    - thời gian build (embedding + thêm vào FAISS), số vector, kích thước index, bộ nhớ đỉnh khi build,
+    - recall@k trên bộ câu hỏi đánh giá (các điều luật được trích dẫn trong đáp án chuẩn),
+      với index theo khoản được gộp điểm bằng 'max' và 'sum_top_n'.
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_passage_index.py --ks 1 3 5 10
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import faiss
+import numpy as np
+
+from inference_backend import load_bi_encoder
+from law_structure import load_article_documents
+from legal_text import split_clauses, split_passages
+from semantic_retriever import MODEL_NAME, PASSAGE_TOP_N, aggregate_passage_hits
+from eval_data import load_eval_citations
+
+PASSAGE_MAX_SYLLABLES = 200
+
+
+def load_articles():
+    """Đọc các điều luật từ file cấu trúc. Trả về danh sách dict {'id', 'name', 'content'}."""
+    articles = []
+    for law_id, content in load_article_documents():
+        header, _ = split_clauses(content)
+        articles.append({
+            'id': law_id,
+            'name': re.sub(r'\s+', ' ', header or content[:200]).strip(),
+            'content': content,
+        })
+    return articles
+
+
+def build_index(model, articles, granularity):
+    """Build index FAISS trong bộ nhớ, cùng cách tạo văn bản như 05_build_vector_db.py."""
+    vector_ids, texts = [], []
+    for article in articles:
+        if granularity == 'article':
+            passages = [article['content']]
+        else:
+            passages = [text for _, text in split_passages(article['content'], PASSAGE_MAX_SYLLABLES)] \
+                or [article['content']]
+        for text in passages:
+            vector_ids.append(article['id'])
+            texts.append(f"Tên điều luật: {article['name']}. Nội dung: {text}")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    embeddings = model.encode(texts, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False)
+    index = faiss.IndexFlatIP(embeddings.shape[1])
+    index.add(embeddings.astype('float32'))
+    build_time = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = {
+        'build_time': build_time,
+        'num_vectors': index.ntotal,
+        'index_bytes': len(faiss.serialize_index(index)),
+        'peak_memory': peak_memory,
+    }
+    return index, vector_ids, stats
+
+
+def recall_at_k(rankings, citations, k):
+    """Trung bình tỉ lệ điều luật được trích dẫn nằm trong top-k."""
+    return float(np.mean([len(set(ranked[:k]) & set(cited)) / len(cited)
+                          for ranked, cited in zip(rankings, citations)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ks', type=int, nargs='+', default=[1, 3, 5, 10])
+    parser.add_argument('--overfetch', type=int, default=8,
+                        help="Số đoạn lấy từ FAISS = max(k) * overfetch khi index theo khoản.")
+    args = parser.parse_args()
+    max_k = max(args.ks)
+
+    articles = load_articles()
+    known_ids = {a['id'] for a in articles}
+    eval_set = [(q, cited) for q, cited in load_eval_citations() if all(i in known_ids for i in cited)]
+    questions = [q for q, _ in eval_set]
+    citations = [cited for _, cited in eval_set]
+    print(f"{len(articles)} điều luật, {len(eval_set)} câu hỏi có trích dẫn nằm trong kho.")
+
+    model = load_bi_encoder(MODEL_NAME)
+    query_vectors = model.encode(questions, convert_to_numpy=True, normalize_embeddings=True,
+                                 show_progress_bar=False).astype('float32')
+
+    rows = []
+    for granularity in ('article', 'clause'):
+        index, vector_ids, stats = build_index(model, articles, granularity)
+        if granularity == 'article':
+            _, indices = index.search(query_vectors, max_k)
+            methods = {'article': [[vector_ids[i] for i in row if i >= 0] for row in indices]}
+        else:
+            scores, indices = index.search(query_vectors, min(max_k * args.overfetch, index.ntotal))
+            methods = {}
+            for aggregation in ('max', 'sum_top_n'):
+                methods[f"clause/{aggregation}"] = [
+                    [law_id for law_id, _ in aggregate_passage_hits(row_indices, row_scores, vector_ids, max_k,
+                                                                     -1.0, aggregation, PASSAGE_TOP_N)]
+                    for row_indices, row_scores in zip(indices, scores)
+                ]
+        for name, rankings in methods.items():
+            rows.append((name, stats, [recall_at_k(rankings, citations, k) for k in args.ks]))
+
+    print(f"\n{'chế độ':<16} | {'vector':>6} | {'build (s)':>9} | {'index (MB)':>10} | {'peak (MB)':>9} | "
+          + " | ".join(f"R@{k:<3}" for k in args.ks))
+    for name, stats, recalls in rows:
+        print(f"{name:<16} | {stats['num_vectors']:>6} | {stats['build_time']:>9.2f} | "
+              f"{stats['index_bytes'] / 2**20:>10.2f} | {stats['peak_memory'] / 2**20:>9.1f} | "
+              + " | ".join(f"{r:.3f}" for r in recalls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+So sánh trích xuất PDF cũ (pdf_to_text: một luồng, `text += page.extract_text()`, rồi clean_text cả văn bản)
+với pdf_extraction.stream_pdfs_to_files (song song theo trang trong ProcessPoolExecutor, làm sạch từng trang,
+ghi dần xuống đĩa theo thứ tự).
+
+Mỗi cách chạy trong một tiến trình riêng để đo bộ nhớ đỉnh (ru_maxrss) độc lập: với cách mới, báo cáo cả
+tiến trình chính và tiến trình con lớn nhất. So sánh file văn bản đầu ra của hai cách: khác biệt duy nhất
+được chờ đợi là các dòng đầu trang mà cách cũ làm mất số thứ tự khoản (footer "about:blank 1/159" bị nối với
+"7. ..." của trang sau rồi regex ăn luôn "7"); các dòng khác biệt kiểu khác được in ra.
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_pdf_extraction.py
+    python benchmarks/bench_pdf_extraction.py --pdf LuatDatDai2024.pdf LuatDatDai2013.pdf --workers 4
+"""
+import argparse
+import difflib
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+from PyPDF2 import PdfReader
+
+from pdf_extraction import stream_pdfs_to_files, MAX_WORKERS, PAGES_PER_TASK
+
+
+def old_pdf_to_text(pdf_path):
+    """pdf_to_text cũ của 00_preprocess_pdfs_to_txt.py / 01_preprocess_pdfs.py."""
+    reader = PdfReader(pdf_path)
+    text = ""
+    for page in reader.pages:
+        text += page.extract_text() or ""
+    return text
+
+
+def old_clean_text(text):
+    text = re.sub(r'about:blank\s*\d+/\d+', '', text)
+    text = re.sub(r'\d+/\d+/\d+, \d+:\d+ [AP]M', '', text)
+    return text.strip()
+
+
+def compare_outputs(old_path, new_path):
+    """(số dòng được khôi phục số khoản, các cặp dòng khác biệt kiểu khác)."""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old_lines = f.read().splitlines()
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new_lines = f.read().splitlines()
+    restored, other = 0, []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        pairs = list(zip(old_lines[i1:i2], new_lines[j1:j2])) if i2 - i1 == j2 - j1 else []
+        for old_line, new_line in pairs:
+            if re.fullmatch(r'\d+', new_line[:len(new_line) - len(old_line)]) and new_line.endswith(old_line):
+                restored += 1
+            else:
+                other.append((old_line, new_line))
+        if not pairs:
+            other.append(('\n'.join(old_lines[i1:i2]), '\n'.join(new_lines[j1:j2])))
+    return restored, other
+
+
+def run_mode(mode, jobs, workers, pages_per_task):
+    """Chạy một cách trích xuất trong tiến trình hiện tại, in kết quả dạng JSON."""
+    start = time.perf_counter()
+    if mode == 'old':
+        for pdf_path, output_path in jobs.items():
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(old_clean_text(old_pdf_to_text(pdf_path)))
+    else:
+        stream_pdfs_to_files(jobs, max_workers=workers, pages_per_task=pages_per_task)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'elapsed': elapsed,
+        'maxrss_main_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'maxrss_child_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pdf', nargs='+', default=['LuatDatDai2024.pdf'])
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    parser.add_argument('--pages-per-task', type=int, default=PAGES_PER_TASK)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--mode', choices=['old', 'new'], help=argparse.SUPPRESS)
+    parser.add_argument('--jobs', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, json.loads(args.jobs), args.workers, args.pages_per_task)
+        return
+
+    pages = {pdf_path: len(PdfReader(pdf_path).pages) for pdf_path in args.pdf}
+    print(f"PDF: {pages}, {args.workers} tiến trình con, {args.pages_per_task} trang / nhóm, "
+          f"{os.cpu_count()} CPU\n")
+    print(f"{'cách':<5} | {'tg tốt nhất (s)':>15} | {'RSS chính (MB)':>14} | {'RSS con (MB)':>12}")
+    with tempfile.TemporaryDirectory() as output_dir:
+        outputs = {}
+        for mode in ('old', 'new'):
+            jobs = {pdf_path: os.path.join(output_dir, f"{mode}_{os.path.basename(pdf_path)}.txt")
+                    for pdf_path in args.pdf}
+            runs = []
+            for _ in range(args.repeat):
+                result = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--mode', mode, '--jobs', json.dumps(jobs),
+                     '--workers', str(args.workers), '--pages-per-task', str(args.pages_per_task)],
+                    capture_output=True, text=True, check=True)
+                runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+            best = min(runs, key=lambda run: run['elapsed'])
+            child = f"{best['maxrss_child_mb']:.0f}" if mode == 'new' else "-"
+            print(f"{mode:<5} | {best['elapsed']:>15.2f} | {best['maxrss_main_mb']:>14.0f} | {child:>12}")
+            outputs[mode] = jobs
+
+        for pdf_path in args.pdf:
+            restored, other = compare_outputs(outputs['old'][pdf_path], outputs['new'][pdf_path])
+            print(f"{pdf_path}: {restored} dòng đầu trang được khôi phục số khoản, "
+                  f"{len(other)} khác biệt khác so với cách cũ")
+            for old_line, new_line in other[:5]:
+                print(f"    cũ: {old_line[:100]!r}\n    mới: {new_line[:100]!r}")
+
+
+if __name__ == '__main__':
+    main()
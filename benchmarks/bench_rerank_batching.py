@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark micro-batch theo độ dài và cắt gọn theo khoản của Reranker trên các điều luật thật
+của Luật 2013 và 2024 (law_structure.py).
+
+Với mỗi câu hỏi trong bộ đánh giá, ghép với N điều luật (chọn ngẫu nhiên, cố định seed) và so sánh:
+    - trước: model.predict() trên toàn bộ cặp theo thứ tự ban đầu, batch_size cố định,
+    - sau:   Reranker.predict_scores() (cắt gọn theo khoản + sắp xếp theo độ dài + micro-batch).
+Báo cáo tổng số token được xử lý (tính cả padding) và thời gian chạy.
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_rerank_batching.py --docs-per-query 20 --num-questions 50
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '')
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import reranker as reranker_module
+from law_structure import load_article_documents
+from query_utils import clean_query
+from eval_data import load_eval_questions
+
+
+def baseline_tokens(tokenizer, query, contents, batch_size, max_length):
+    """Số token (tính cả padding) khi chấm điểm theo thứ tự ban đầu với batch_size cố định."""
+    query_length = len(tokenizer(query, add_special_tokens=False)['input_ids'])
+    lengths = [min(max_length, query_length + len(ids) + 3)
+               for ids in tokenizer(contents, add_special_tokens=False)['input_ids']]
+    return sum(len(lengths[i:i + batch_size]) * max(lengths[i:i + batch_size])
+               for i in range(0, len(lengths), batch_size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs-per-query', type=int, default=20)
+    parser.add_argument('--num-questions', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=32, help="batch_size của cách làm cũ.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    articles = [content for _, content in load_article_documents()]
+    print(f"Đã đọc {len(articles)} điều luật của Luật 2013 và 2024.")
+
+    reranker_module.RERANK_CACHE_PATH = None
+    reranker = reranker_module.Reranker()
+    model = reranker.model
+    tokenizer = model.tokenizer
+
+    rng = random.Random(args.seed)
+    questions = [clean_query(q) for q in load_eval_questions()[:args.num_questions]]
+    workload = [(q, rng.sample(articles, args.docs_per_query)) for q in questions]
+
+    # Warm-up
+    model.predict([[questions[0], articles[0]]], show_progress_bar=False)
+
+    before_tokens = 0
+    start = time.perf_counter()
+    for query, contents in workload:
+        model.predict([[query, c] for c in contents], batch_size=args.batch_size, show_progress_bar=False)
+        before_tokens += baseline_tokens(tokenizer, query, contents, args.batch_size, reranker_module.RERANKER_MAX_LENGTH)
+    before_time = time.perf_counter() - start
+
+    reranker.tokens_processed = 0
+    start = time.perf_counter()
+    for query, contents in workload:
+        reranker.predict_scores(query, contents)
+    after_time = time.perf_counter() - start
+    after_tokens = reranker.tokens_processed
+
+    print(f"\n{len(workload)} câu hỏi x {args.docs_per_query} điều luật")
+    print(f"{'':>6} | {'tokens (kể cả padding)':>22} | {'thời gian (s)':>13}")
+    print(f"{'trước':>6} | {before_tokens:>22,} | {before_time:>13.2f}")
+    print(f"{'sau':>6} | {after_tokens:>22,} | {after_time:>13.2f}")
+    print(f"\nGiảm {1 - after_tokens / before_tokens:.1%} token, nhanh hơn {before_time / after_time:.2f}x.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark cache điểm rerank trên bộ câu hỏi trong 'evaluation/ragkg_results.csv'.
+
+Chạy pipeline Search -> Rerank cho toàn bộ câu hỏi hai lượt với một cache rỗng (tạo trong
+thư mục tạm): lượt 1 (cache lạnh) và lượt 2 (cache nóng, mô phỏng các câu hỏi lặp lại).
+Báo cáo tỷ lệ trúng cache và mức giảm độ trễ của bước rerank.
+
+Yêu cầu: đã có faiss_index.bin, law_ids.json và article_store.bin (không cần Neo4j).
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_rerank_cache.py --initial-k 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import reranker as reranker_module
+from semantic_retriever import SemanticRetriever
+from query_utils import clean_query
+from eval_data import load_eval_questions
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--initial-k', type=int, default=20)
+    parser.add_argument('--score-threshold', type=float, default=0.3)
+    args = parser.parse_args()
+
+    # Dùng cache riêng trong thư mục tạm để lượt đầu tiên thực sự là cache lạnh
+    tmp_dir = tempfile.mkdtemp(prefix='rerank_cache_bench_')
+    reranker_module.RERANK_CACHE_PATH = os.path.join(tmp_dir, 'rerank_scores.sqlite')
+
+    retriever = SemanticRetriever()
+    if retriever.article_store is None:
+        print("Lỗi: Cần có article_store.bin để chạy benchmark mà không cần Neo4j.")
+        sys.exit(1)
+    reranker = reranker_module.Reranker()
+
+    # Chuẩn bị sẵn ứng viên cho mọi câu hỏi để chỉ đo bước rerank
+    workload = []
+    for question in load_eval_questions():
+        query = clean_query(question)
+        candidates = retriever.search(query, top_k=args.initial_k, score_threshold=args.score_threshold)
+        nodes, _ = retriever.get_articles([law_id for law_id, _ in candidates])
+        workload.append((query, [
+            {'id': law_id,
+             'content': f"Tên điều luật: {props.get('name', '')}. Nội dung: {props.get('noi_dung', '')}"}
+            for law_id, props in nodes.items()
+        ]))
+
+    results = {}
+    for run_name in ('cold', 'warm'):
+        before = reranker.cache_stats()['memory']
+        latencies = []
+        for query, docs in workload:
+            start = time.perf_counter()
+            reranker.rerank(query, [dict(doc) for doc in docs])
+            latencies.append((time.perf_counter() - start) * 1000)
+        after = reranker.cache_stats()['memory']
+        lookups = (after['hits'] + after['misses']) - (before['hits'] + before['misses'])
+        results[run_name] = {
+            'p50': statistics.median(latencies),
+            'p95': _percentile(latencies, 0.95),
+            'total': sum(latencies),
+            'hit_ratio': (after['hits'] - before['hits']) / lookups if lookups else 0.0,
+        }
+
+    print(f"\nSố câu hỏi: {len(workload)}, số ứng viên mỗi câu: {args.initial_k}")
+    print(f"{'lượt':>5} | {'hit ratio':>9} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'tổng (s)':>8}")
+    for run_name, r in results.items():
+        print(f"{run_name:>5} | {r['hit_ratio']:>9.1%} | {r['p50']:>9.1f} | {r['p95']:>9.1f} | {r['total'] / 1000:>8.2f}")
+    reduction = 1 - results['warm']['total'] / results['cold']['total']
+    print(f"\nĐộ trễ rerank giảm {reduction:.1%} khi câu hỏi lặp lại.")
+    print("Thống kê cache:", reranker.cache_stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark thông lượng (queries/giây) của SemanticRetriever trên CPU:
+so sánh gọi search() từng câu một với search_batch() ở các kích thước batch khác nhau.
+Dùng bộ 100 câu hỏi trong 'evaluation/' (lặp lại để đủ số lượng cần đo).
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_semantic_search_batch.py --batch-sizes 1 8 32 128 --num-queries 256
+"""
+import argparse
+import os
+import sys
+import time
+
+# Ép chạy trên CPU để số liệu phản ánh đúng môi trường triển khai
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '')
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+from semantic_retriever import SemanticRetriever
+from eval_data import load_eval_questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32, 128])
+    parser.add_argument('--num-queries', type=int, default=256, help="Tổng số câu hỏi cho mỗi cấu hình.")
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=None, help="Số luồng torch (mặc định: để torch tự chọn).")
+    args = parser.parse_args()
+
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    questions = load_eval_questions()
+    queries = [questions[i % len(questions)] for i in range(args.num_queries)]
+
+    retriever = SemanticRetriever()
+    # Warm-up để loại bỏ chi phí khởi tạo lần đầu
+    retriever.search_batch(queries[:8], top_k=args.top_k)
+
+    # Kiểm tra search_batch cho kết quả giống search từng câu
+    single = [retriever.search(q, top_k=args.top_k) for q in queries[:8]]
+    batched = retriever.search_batch(queries[:8], top_k=args.top_k)
+    for a, b in zip(single, batched):
+        assert [i for i, _ in a] == [i for i, _ in b], "search_batch trả về kết quả khác search()"
+
+    print(f"\n{'batch':>6} | {'queries/s':>10} | {'ms/query':>9}")
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(queries), batch_size):
+            retriever.search_batch(queries[i:i + batch_size], top_k=args.top_k)
+        elapsed = time.perf_counter() - start
+        print(f"{batch_size:>6} | {len(queries) / elapsed:>10.1f} | {elapsed * 1000 / len(queries):>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
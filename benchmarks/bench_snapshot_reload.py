@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Kiểm tra tải lại nóng (hot reload) snapshot Vector Database trong SemanticRetriever.
+
+Trong một thư mục tạm, tạo hai snapshot A và B cùng kích thước (các vector hiện có được nhân lên
+--scale lần, nhiễu nhẹ khác nhau), khởi động SemanticRetriever trên A, chạy liên tục các truy vấn
+trên nhiều luồng rồi gọi reload() ở luồng nền để chuyển sang B. Báo cáo:
+    - số truy vấn lỗi trong suốt quá trình (phải bằng 0),
+    - độ trễ truy vấn p50 / max trước và trong khi chuyển snapshot,
+    - RSS của tiến trình: trước, đỉnh trong lúc chuyển và sau khi bản cũ được giải phóng.
+
+Cách chạy (từ thư mục gốc của dự án):
+    python benchmarks/bench_snapshot_reload.py --scale 20 --threads 4
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import faiss
+import numpy as np
+
+import semantic_retriever as semantic_retriever_module
+from vector_db_snapshot import (SnapshotWriter, resolve_vector_db_files, FAISS_INDEX_FILE, LAW_IDS_FILE,
+                                ARTICLE_STORE_FILE)
+from vector_index import build_index
+from eval_data import load_eval_questions
+
+
+def rss_mb():
+    """RSS hiện tại của tiến trình (MB), đọc từ /proc (Linux)."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float('nan')
+
+
+def write_snapshot(vectors, law_ids, article_store_path):
+    """Ghi một snapshot (index flat gắn ID) vào VECTOR_DB_DIR của thư mục hiện tại."""
+    index, params = build_index(vectors, 'flat', ids=np.arange(len(law_ids)))
+    with SnapshotWriter() as writer:
+        faiss.write_index(index, writer.path(FAISS_INDEX_FILE))
+        with open(writer.path(LAW_IDS_FILE), 'w', encoding='utf-8') as f:
+            json.dump(law_ids, f)
+        shutil.copy2(article_store_path, writer.path(ARTICLE_STORE_FILE))
+        writer.commit({'model': semantic_retriever_module.MODEL_NAME, 'granularity': 'article',
+                       'num_vectors': index.ntotal, 'index': {'type': 'flat', 'params': params}})
+    return writer.build_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=200,
+                        help="Mỗi snapshot có số vector gấp scale lần index hiện có (vector nhiễu nhẹ quanh vector gốc).")
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--warmup-seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    files = resolve_vector_db_files(os.path.join(ROOT_DIR, 'vector_db'))
+    if files['build_id'] is None:
+        files = {key: os.path.join(ROOT_DIR, value) if isinstance(value, str) else value
+                 for key, value in files.items()}
+    index = faiss.read_index(files['index'])
+    with open(files['law_ids'], 'r', encoding='utf-8') as f:
+        law_ids = json.load(f)
+    # Vị trí trong law_ids.json là ID của vector (cũng là số dòng với index không gắn ID)
+    vectors = np.vstack([index.reconstruct(i) for i, law_id in enumerate(law_ids) if law_id is not None])
+    live_ids = [law_id for law_id in law_ids if law_id is not None]
+    questions = load_eval_questions()
+
+    snapshot_ids = live_ids * args.scale
+
+    def scaled_vectors(seed):
+        rng = np.random.default_rng(seed)
+        scaled = np.vstack([vectors + 0.01 * rng.standard_normal(vectors.shape, dtype=np.float32)
+                            for _ in range(args.scale)])
+        faiss.normalize_L2(scaled)
+        return scaled
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        semantic_retriever_module.QUERY_CACHE_PATH = None
+        build_a = write_snapshot(scaled_vectors(1), snapshot_ids, files['article_store'])
+        retriever = semantic_retriever_module.SemanticRetriever()
+        gc.collect()
+        rss_before = rss_mb()
+
+        latencies = {'before': [], 'during': []}
+        errors = []
+        phase = ['before']
+        stop = threading.Event()
+
+        def worker(offset):
+            i = offset
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    retriever.search(questions[i % len(questions)], top_k=10, score_threshold=-1.0)
+                except Exception as e:
+                    errors.append(e)
+                latencies[phase[0]].append(time.perf_counter() - start)
+                i += args.threads
+
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+        for thread in workers:
+            thread.start()
+        time.sleep(args.warmup_seconds)
+
+        build_b = write_snapshot(scaled_vectors(2), snapshot_ids, files['article_store'])
+        gc.collect()
+        peak_rss = [rss_mb()]
+        phase[0] = 'during'
+        reload_thread = threading.Thread(target=retriever.reload)
+        reload_start = time.perf_counter()
+        reload_thread.start()
+        while reload_thread.is_alive():
+            peak_rss.append(rss_mb())
+            time.sleep(0.01)
+        reload_time = time.perf_counter() - reload_start
+        time.sleep(0.5)
+        stop.set()
+        for thread in workers:
+            thread.join()
+        gc.collect()
+        rss_after = rss_mb()
+        os.chdir(ROOT_DIR)
+
+    print(f"Snapshot A '{build_a}' -> snapshot B '{build_b}', mỗi snapshot {len(snapshot_ids)} vector "
+          f"(~{len(snapshot_ids) * vectors.shape[1] * 4 / 2**20:.1f} MB)")
+    print(f"Retriever đang dùng: '{retriever.index_build_id}' ({'đúng' if retriever.index_build_id == build_b else 'SAI'})")
+    print(f"Thời gian tải snapshot B ở luồng nền: {reload_time:.2f}s, số truy vấn lỗi: {len(errors)}")
+    for name, values in latencies.items():
+        if values:
+            print(f"Độ trễ truy vấn {name:<6}: {len(values):>6} truy vấn, p50 {statistics.median(values) * 1000:.2f} ms, "
+                  f"max {max(values) * 1000:.2f} ms")
+    print(f"RSS: trước {rss_before:.1f} MB, đỉnh khi chuyển {max(peak_rss):.1f} MB, sau khi chuyển {rss_after:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Các hàm tiện ích đọc bộ 100 câu hỏi đánh giá trong thư mục 'evaluation/' cho các benchmark."""
+import os
+import re
+
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EVAL_CSV_PATH = os.path.join(ROOT_DIR, 'evaluation', 'ragkg_results.csv')
+
+# Trích dẫn trong đáp án chuẩn có dạng "**(K1, Đ3, LĐĐ 2013)**" hoặc "**(So sánh Đ5 LĐĐ 2013 & Đ4 LĐĐ 2024)**"
+_CITATION_BLOCK_PATTERN = re.compile(r'\*\*\((.*?)\)\*\*', re.DOTALL)
+_ARTICLE_PATTERN = re.compile(r'Đ(\d+)')
+_YEAR_PATTERN = re.compile(r'(2013|2024)')
+
+
+def load_eval_questions(csv_path: str = EVAL_CSV_PATH) -> list[str]:
+    """Trả về danh sách câu hỏi của bộ đánh giá, theo thứ tự 'stt'."""
+    df = pd.read_csv(csv_path)
+    return [str(q).strip() for q in df['question'].tolist()]
+
+
+def citation_blocks(answer: str) -> list[str]:
+    """Các khối trích dẫn "**(...)**" trong một đáp án chuẩn (phần bên trong ngoặc)."""
+    return _CITATION_BLOCK_PATTERN.findall(str(answer).replace('\\', ''))
+
+
+def parse_cited_articles(answer: str) -> list[str]:
+    """
+    Lấy ID các điều luật (dạng 'dieu_<số>_<năm>') được trích dẫn trong một đáp án chuẩn.
+    Mỗi "Đ<số>" được gắn với năm xuất hiện ngay sau nó trong cùng khối trích dẫn.
+    """
+    article_ids = []
+    for block in citation_blocks(answer):
+        for m in _ARTICLE_PATTERN.finditer(block):
+            year = _YEAR_PATTERN.search(block, m.end())
+            if year:
+                article_ids.append(f"dieu_{m.group(1)}_{year.group(1)}")
+    return list(dict.fromkeys(article_ids))
+
+
+def load_eval_answers(csv_path: str = EVAL_CSV_PATH) -> list[str]:
+    """Trả về danh sách đáp án chuẩn của bộ đánh giá, theo thứ tự 'stt'."""
+    df = pd.read_csv(csv_path)
+    return [str(a) for a in df['ground_truth_answer'].tolist()]
+
+
+def load_eval_citations(csv_path: str = EVAL_CSV_PATH) -> list[tuple[str, list[str]]]:
+    """
+    Trả về danh sách (câu hỏi, [ID điều luật được trích dẫn trong đáp án chuẩn]).
+    Các câu hỏi không có trích dẫn nào bị bỏ qua.
+    """
+    df = pd.read_csv(csv_path)
+    pairs = [(str(q).strip(), parse_cited_articles(a)) for q, a in zip(df['question'], df['ground_truth_answer'])]
+    return [(q, ids) for q, ids in pairs if ids]
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Server LLM giả lập để benchmark client (llm_client.py) mà không tốn quota thật.
+
+Phục vụ các endpoint cùng dạng với API thật:
+    POST /v1beta/models/<model>:generateContent                 (Gemini, trả về candidates + usageMetadata)
+    POST /v1beta/models/<model>:streamGenerateContent?alt=sse   (Gemini streaming, các sự kiện SSE)
+    POST /v1/chat/completions                                    (OpenAI, trả về choices + usage; "stream": true
+                                                                  trả về các sự kiện SSE kết thúc bằng [DONE])
+
+và áp quota theo cửa sổ trượt giống nhà cung cấp: vượt số request / phút hoặc token / phút thì trả
+HTTP 429 kèm header Retry-After. Câu trả lời là một khối ```json``` hợp lệ để các script 02 / 03 xử lý được;
+khi streaming, câu trả lời được chia thành STREAM_CHUNKS đoạn, cách nhau chunk_delay giây.
+
+Cách chạy độc lập (từ thư mục gốc của dự án):
+    python benchmarks/fake_llm_server.py --port 8765 --rpm 60 --tpm 1000000 --latency 0.5
+    GEMINI_API_BASE=http://127.0.0.1:8765 python 02_extract_entities.py
+"""
+import argparse
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_RESPONSE = {"source_id_2024": "dieu_{code}_2024", "target_id_2013": "dieu_{code}_2013",
+                 "change_type": "SUA_DOI_BO_SUNG", "entities": [], "relationships": []}
+STREAM_CHUNKS = 4
+
+
+class QuotaWindow:
+    """Cửa sổ trượt `window` giây đếm request và token, giống cách nhà cung cấp tính quota."""
+    def __init__(self, rpm: int, tpm: int, window: float = 60.0):
+        self.rpm, self.tpm, self.window = rpm, tpm, window
+        self.events = deque()  # (thời điểm, số token)
+        self.tokens = 0
+        self.lock = threading.Lock()
+
+    def admit(self, tokens: int):
+        """Ghi nhận request nếu còn quota; ngược lại trả về số giây cần chờ (Retry-After)."""
+        with self.lock:
+            now = time.monotonic()
+            while self.events and self.events[0][0] <= now - self.window:
+                self.tokens -= self.events.popleft()[1]
+            if len(self.events) >= self.rpm or (self.tpm and self.tokens + tokens > self.tpm):
+                oldest = self.events[0][0] if self.events else now
+                return max(1, math.ceil(oldest + self.window - now))
+            self.events.append((now, tokens))
+            self.tokens += tokens
+            return None
+
+
+class FakeLLMServer:
+    """Chạy server giả lập trên một luồng nền; dùng làm context manager trong benchmark."""
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, rpm: int = 60, tpm: int = 0,
+                 latency: float = 0.2, window: float = 60.0, output_tokens: int = 200, chunk_delay: float = 0.05):
+        self.quota = QuotaWindow(rpm, tpm, window)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.output_tokens = output_tokens
+        self.stats = Counter()
+        self.admitted_times = []
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload, headers=None):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_events(self, events):
+                """Phản hồi text/event-stream (chunked), mỗi sự kiện cách nhau chunk_delay giây."""
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    for i, event in enumerate(events):
+                        if i:
+                            time.sleep(server.chunk_delay)
+                        data = f"data: {event if isinstance(event, str) else json.dumps(event, ensure_ascii=False)}\n\n"
+                        data = data.encode('utf-8')
+                        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client dừng đọc giữa chừng và đóng kết nối
+                    server.stats['stream_aborted'] += 1
+                    self.close_connection = True
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                is_gemini = ':generateContent' in self.path or ':streamGenerateContent' in self.path
+                is_stream = ':streamGenerateContent' in self.path or bool(request.get('stream'))
+                if is_gemini:
+                    prompt = "".join(part.get('text', '') for content in request.get('contents', [])
+                                     for part in content.get('parts', []))
+                else:
+                    prompt = "".join(message.get('content', '') for message in request.get('messages', []))
+                total_tokens = len(prompt) // 3 + 1 + server.output_tokens
+                server.stats['requests'] += 1
+                retry_after = server.quota.admit(total_tokens)
+                if retry_after is not None:
+                    server.stats['rate_limited'] += 1
+                    self._send(429, {'error': {'code': 429, 'status': 'RESOURCE_EXHAUSTED',
+                                               'message': 'Quota exceeded (fake server).'}},
+                               {'Retry-After': str(retry_after)})
+                    return
+                server.admitted_times.append(time.monotonic())
+                time.sleep(server.latency)
+                server.stats['ok'] += 1
+                code = re.search(r'Mã Điều:\**\s*(\d+)', prompt)
+                answer = json.dumps(FAKE_RESPONSE, ensure_ascii=False).replace('{code}', code.group(1) if code else '1')
+                text = f"```json\n{answer}\n```"
+                if is_stream:
+                    size = math.ceil(len(text) / STREAM_CHUNKS)
+                    pieces = [text[i:i + size] for i in range(0, len(text), size)]
+                    if is_gemini:
+                        events = [{'candidates': [{'content': {'role': 'model', 'parts': [{'text': piece}]}}]}
+                                  for piece in pieces]
+                        events[-1]['usageMetadata'] = {'totalTokenCount': total_tokens}
+                    else:
+                        events = [{'choices': [{'delta': {'content': piece}}]} for piece in pieces] + ['[DONE]']
+                    self._send_events(events)
+                elif is_gemini:
+                    self._send(200, {'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}}],
+                                     'usageMetadata': {'totalTokenCount': total_tokens}})
+                else:
+                    self._send(200, {'choices': [{'message': {'role': 'assistant', 'content': text}}],
+                                     'usage': {'total_tokens': total_tokens}})
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rpm', type=int, default=60)
+    parser.add_argument('--tpm', type=int, default=0, help="0: không giới hạn token.")
+    parser.add_argument('--latency', type=float, default=0.5, help="Thời gian xử lý mỗi request (giây).")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(port=args.port, rpm=args.rpm, tpm=args.tpm, latency=args.latency)
+    print(f"Server LLM giả lập tại {server.url} (RPM {args.rpm}, TPM {args.tpm or 'không giới hạn'})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nDừng server. Thống kê: {dict(server.stats)}")
+
+
+if __name__ == '__main__':
+    main()
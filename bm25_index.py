@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Index từ khóa BM25 chạy trong tiến trình, dùng kết hợp với Semantic Search (hybrid retrieval).
+
+Bi-encoder dễ làm mờ các thuật ngữ chính xác ("lấn biển", "hạn mức", số hiệu điều luật), trong khi
+BM25 khớp đúng từng âm tiết. Văn bản được tách thành âm tiết (legal_text.syllables) cộng với các cặp
+âm tiết liền nhau (bigram, ví dụ 'hạn_mức', 'điều_27') để giữ được từ ghép tiếng Việt. Có thể bật bỏ dấu
+(fold_diacritics) để câu hỏi gõ không dấu vẫn khớp.
+
+Trọng số BM25 của từng cặp (từ, điều luật) được tính sẵn khi build, nên chấm điểm một câu hỏi chỉ là
+cộng các mảng numpy của những từ có trong câu hỏi (dưới 1 ms cho toàn bộ kho).
+
+Kết quả BM25 và Semantic Search được gộp bằng Reciprocal Rank Fusion (reciprocal_rank_fusion)
+trước khi đưa vào Reranker.
+"""
+import math
+import os
+import unicodedata
+from collections import Counter
+
+import numpy as np
+from unidecode import unidecode
+
+from law_structure import LAW_YEARS, STRUCTURE_PATH, load_article_documents
+from legal_text import syllables
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Bỏ dấu tiếng Việt khi tách từ (cả văn bản lẫn câu hỏi)
+BM25_FOLD_DIACRITICS = False
+# Hằng số k của Reciprocal Rank Fusion: điểm = sum(1 / (k + thứ hạng))
+RRF_K = 60
+
+
+def tokenize(text: str, fold_diacritics: bool = BM25_FOLD_DIACRITICS) -> list[str]:
+    """Tách văn bản thành âm tiết và bigram âm tiết (nối bằng '_')."""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFC', text)
+    if fold_diacritics:
+        text = unidecode(text)
+    tokens = syllables(text)
+    return tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def reciprocal_rank_fusion(rankings: list[list[tuple]], k: int = RRF_K, limit: int = None) -> list[tuple[str, float]]:
+    """
+    Gộp nhiều danh sách kết quả đã xếp hạng bằng Reciprocal Rank Fusion.
+
+    Args:
+        rankings: Các danh sách [(id, điểm), ...] đã sắp xếp giảm dần; chỉ thứ hạng được dùng,
+                  nên điểm của các hệ thống khác nhau không cần cùng thang đo.
+        k: Hằng số làm mượt, giảm ảnh hưởng của các vị trí đầu.
+        limit: Số kết quả tối đa trả về (None: tất cả).
+
+    Returns:
+        Danh sách (id, điểm RRF) sắp xếp giảm dần.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, (doc_id, _) in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    results = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    return results[:limit] if limit is not None else results
+
+
+class BM25Index:
+    """
+    Index BM25 trong bộ nhớ trên các điều luật.
+
+    Danh sách đảo được lưu dạng CSR: với từ thứ t, postings_docs[offsets[t]:offsets[t+1]] là các điều luật
+    chứa từ đó và postings_weights cùng đoạn là trọng số BM25 đã tính sẵn.
+    """
+    def __init__(self, documents: list[tuple[str, str]], k1: float = BM25_K1, b: float = BM25_B,
+                 fold_diacritics: bool = BM25_FOLD_DIACRITICS):
+        self.k1 = k1
+        self.b = b
+        self.fold_diacritics = fold_diacritics
+        self.doc_ids = [doc_id for doc_id, _ in documents]
+
+        term_frequencies = [Counter(tokenize(text, fold_diacritics)) for _, text in documents]
+        doc_lengths = np.array([sum(tf.values()) for tf in term_frequencies], dtype=np.float32)
+        avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+        postings = {}
+        for doc_index, tf in enumerate(term_frequencies):
+            for term, count in tf.items():
+                postings.setdefault(term, []).append((doc_index, count))
+
+        num_docs = len(documents)
+        self.vocabulary = {}
+        offsets = [0]
+        docs_parts, weights_parts = [], []
+        for term_index, (term, entries) in enumerate(postings.items()):
+            self.vocabulary[term] = term_index
+            docs = np.array([doc_index for doc_index, _ in entries], dtype=np.int32)
+            tf = np.array([count for _, count in entries], dtype=np.float32)
+            # idf kiểu Lucene, luôn dương kể cả với từ xuất hiện ở hơn nửa số điều luật
+            idf = math.log(1 + (num_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            norm = k1 * (1 - b + b * doc_lengths[docs] / avg_length)
+            docs_parts.append(docs)
+            weights_parts.append((idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32))
+            offsets.append(offsets[-1] + len(entries))
+
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.postings_docs = np.concatenate(docs_parts) if docs_parts else np.zeros(0, dtype=np.int32)
+        self.postings_weights = np.concatenate(weights_parts) if weights_parts else np.zeros(0, dtype=np.float32)
+
+    @classmethod
+    def from_law_structures(cls, years=LAW_YEARS, **kwargs):
+        """Build index từ các điều luật trong file cấu trúc (law_structure.py) của các năm."""
+        available = [year for year in years if os.path.exists(STRUCTURE_PATH.format(year=year))]
+        missing = [STRUCTURE_PATH.format(year=year) for year in years if year not in available]
+        if missing:
+            print(f"Cảnh báo: không tìm thấy {', '.join(missing)}, index BM25 thiếu các luật này.")
+        return cls(load_article_documents(available), **kwargs)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def score(self, query: str) -> np.ndarray:
+        """Điểm BM25 của câu hỏi với mọi điều luật (mảng theo thứ tự doc_ids)."""
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for term in set(tokenize(query, self.fold_diacritics)):
+            term_index = self.vocabulary.get(term)
+            if term_index is None:
+                continue
+            start, end = self.offsets[term_index], self.offsets[term_index + 1]
+            # Mỗi điều luật xuất hiện tối đa một lần trong danh sách đảo của một từ
+            scores[self.postings_docs[start:end]] += self.postings_weights[start:end]
+        return scores
+
+    def search(self, query: str, top_k: int = 5) -> list[tuple[str, float]]:
+        """
+        Tìm top_k điều luật có điểm BM25 cao nhất.
+        Output: Danh sách các tuple (id_điều_luật, điểm_bm25), bỏ qua các điều luật không khớp từ nào.
+        """
+        scores = self.score(query)
+        top_k = min(top_k, len(scores))
+        if top_k <= 0:
+            return []
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.doc_ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+# --- Ví dụ sử dụng và kiểm tra ---
+if __name__ == '__main__':
+    bm25 = BM25Index.from_law_structures()
+    print(f"Đã build index BM25 cho {len(bm25)} điều luật, {len(bm25.vocabulary)} từ.")
+    for test_query in ["tôi muốn biết về lấn biển", "hạn mức giao đất nông nghiệp", "dieu 27 luat dat dai"]:
+        print(f"\nCâu hỏi: '{test_query}'")
+        print("Kết quả (ID, Score):", bm25.search(test_query, top_k=3))
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Các lớp bộ nhớ đệm (cache) dùng chung cho luồng truy vấn online.
+
+- LRUCache: cache trong bộ nhớ, giới hạn số phần tử, loại bỏ phần tử ít dùng gần đây nhất.
+- SqliteCache: cache trên đĩa (SQLite, chế độ WAL) dùng chung giữa nhiều tiến trình / worker,
+  giới hạn số bản ghi mỗi namespace. Mỗi cache gắn với một `namespace` (ví dụ: tên mô hình + build id của index);
+  khóa chính là (namespace, key) và mọi truy vấn đều lọc theo namespace, nên các tiến trình dùng chung một file
+  với mô hình / backend / index khác nhau không đọc nhầm dữ liệu của nhau (tự động vô hiệu hóa). Namespace cũ
+  không bị xóa khi mở cache mà bị dọn khi không được truy cập quá NAMESPACE_MAX_IDLE_DAYS ngày.
+
+Cả hai lớp đều thread-safe (các session Streamlit chạy trên nhiều luồng) và có bộ đếm
+hits / misses / evictions.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Bản ghi của namespace khác không được truy cập quá số ngày này bị xóa khi mở cache
+NAMESPACE_MAX_IDLE_DAYS = 7
+
+
+class LRUCache:
+    """Cache LRU trong bộ nhớ với số phần tử tối đa `max_size`."""
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Trả về giá trị đã cache, hoặc None nếu không có."""
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {'size': len(self._data), 'max_size': self.max_size,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class SqliteCache:
+    """
+    Cache key -> bytes lưu trên đĩa bằng SQLite, giới hạn `max_entries` bản ghi cho mỗi namespace.
+    Khi vượt giới hạn, các bản ghi của namespace này có thời điểm truy cập cũ nhất bị xóa.
+    """
+    def __init__(self, path: str, table: str, namespace: str, max_entries: int = 50000,
+                 max_idle_days: float = NAMESPACE_MAX_IDLE_DAYS):
+        self.path = path
+        self.table = table
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # check_same_thread=False: kết nối được dùng chung giữa các luồng, được bảo vệ bởi self._lock
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Bảng theo định dạng cũ (khóa chính chỉ là key) không tách được namespace: bỏ đi (chỉ là cache)
+        primary_key = [row[1] for row in sorted(self._conn.execute(f"PRAGMA table_info({table})").fetchall(),
+                                                key=lambda row: row[5]) if row[5]]
+        if primary_key and primary_key != ['namespace', 'key']:
+            self._conn.execute(f"DROP TABLE {table}")
+            print(f" -> Đã tạo lại bảng cache {table} trong '{path}' (định dạng cũ không có khóa theo namespace).")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            f"  namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, last_access REAL NOT NULL,"
+            f"  PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table}(namespace, last_access)")
+        # Dọn dữ liệu của các mô hình / index không còn được dùng (theo thời điểm truy cập, không theo namespace
+        # hiện tại, để các worker dùng chung file không xóa dữ liệu của nhau)
+        deleted = self._conn.execute(
+            f"DELETE FROM {table} WHERE namespace != ? AND last_access < ?",
+            (namespace, time.time() - max_idle_days * 86400)
+        ).rowcount
+        if deleted:
+            print(f" -> Đã xóa {deleted} bản ghi cache trong '{path}' (bảng {table}) không được dùng quá "
+                  f"{max_idle_days:g} ngày.")
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(f"SELECT value FROM {self.table} WHERE namespace = ? AND key = ?",
+                                     (self.namespace, key)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE namespace = ? AND key = ?",
+                               (time.time(), self.namespace, key))
+            self.hits += 1
+            return row[0]
+
+    def get_many(self, keys: list[str]) -> dict:
+        """Lấy nhiều khóa trong một truy vấn. Trả về {key: value} cho các khóa tìm thấy."""
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            # SQLite giới hạn số tham số trong một câu lệnh, chia thành từng nhóm
+            for i in range(0, len(keys), 500):
+                group = keys[i:i + 500]
+                placeholders = ",".join("?" * len(group))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE namespace = ? AND key IN ({placeholders})",
+                    [self.namespace] + group
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET last_access = ? WHERE namespace = ? AND key = ?",
+                    [(now, self.namespace, k) for k in found]
+                )
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: dict):
+        """Ghi nhiều cặp key -> bytes trong một transaction, sau đó loại bỏ bản ghi cũ nếu vượt giới hạn."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (namespace, key, value, last_access) VALUES (?, ?, ?, ?)",
+                    [(self.namespace, key, value, now) for key, value in items.items()]
+                )
+                count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table} WHERE namespace = ?",
+                                           (self.namespace,)).fetchone()[0]
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        f"DELETE FROM {self.table} WHERE namespace = ? AND key IN "
+                        f"(SELECT key FROM {self.table} WHERE namespace = ? ORDER BY last_access ASC LIMIT ?)",
+                        (self.namespace, self.namespace, overflow)
+                    )
+                    self.evictions += overflow
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def put(self, key: str, value: bytes):
+        self.put_many({key: value})
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table} WHERE namespace = ?",
+                                      (self.namespace,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        return {'size': len(self), 'max_size': self.max_entries,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
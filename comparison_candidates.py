@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Chọn trước các điều luật 2013 ứng viên cho bước so sánh Luật 2024 vs 2013 (03_extract_comparisons.py).
+
+Thay vì gửi toàn bộ Luật 2013 (~390 KB, ~130 nghìn token) trong mỗi prompt, mỗi điều luật 2024 chỉ được
+so với top-N điều luật 2013 gần nhất, xếp hạng bằng:
+    - BM25 trên các điều luật 2013 (bm25_index.BM25Index), khớp thuật ngữ và cụm từ giữ nguyên giữa hai luật;
+    - Bi-encoder (cùng mô hình với Vector DB) + FAISS trên các đoạn (passage) của điều luật 2013: điểm của
+      một điều luật là độ tương đồng cao nhất giữa một đoạn của nó và một đoạn của điều luật 2024;
+gộp bằng Reciprocal Rank Fusion. Không có mô hình (use_semantic=False, mặc định của 03) thì chỉ dùng BM25.
+
+Chạy benchmarks/bench_comparison_candidates.py để đo số token tiết kiệm được và tỉ lệ điều luật 2013
+đã được đối chiếu trong kho 'comparisons' (extraction_store.py) nằm trong top-N.
+"""
+import numpy as np
+
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from law_structure import LawStructure, load_article_documents
+from legal_text import split_passages
+
+CANDIDATE_TOP_N = 10
+# Số ứng viên mỗi hệ thống đưa vào RRF
+CANDIDATE_POOL_SIZE = 30
+# Cùng cách chia đoạn với 05_build_vector_db.py
+PASSAGE_MAX_SYLLABLES = 200
+
+
+def _passages(content: str) -> list[str]:
+    return [text for _, text in split_passages(content, PASSAGE_MAX_SYLLABLES)] or [content]
+
+
+class CandidateSelector:
+    """Xếp hạng các điều luật 2013 theo độ gần với một điều luật 2024."""
+    def __init__(self, documents: list[tuple[str, str]], model=None):
+        """
+        Args:
+            documents: Các điều luật 2013 [(id, nội dung)].
+            model: Bi-encoder (SentenceTransformer) để xếp hạng ngữ nghĩa; None: chỉ dùng BM25.
+        """
+        self.texts = dict(documents)
+        self.bm25 = BM25Index(documents)
+        self.model = model
+        self.index = None
+        if model is not None:
+            import faiss
+
+            self.passage_owners = []
+            passages = []
+            for law_id, content in documents:
+                for text in _passages(content):
+                    self.passage_owners.append(law_id)
+                    passages.append(text)
+            embeddings = model.encode(passages, batch_size=32, normalize_embeddings=True,
+                                      show_progress_bar=False).astype('float32')
+            self.index = faiss.IndexFlatIP(embeddings.shape[1])
+            self.index.add(embeddings)
+
+    @classmethod
+    def from_law_structure(cls, year: int = 2013, use_semantic: bool = True):
+        """Build từ các điều luật 2013 (law_structure.py); use_semantic=True nạp bi-encoder của Vector DB."""
+        model = None
+        if use_semantic:
+            from inference_backend import load_bi_encoder
+            from semantic_retriever import MODEL_NAME
+            model = load_bi_encoder(MODEL_NAME)
+        return cls(load_article_documents((year,)), model)
+
+    def semantic_ranking(self, content: str, limit: int = CANDIDATE_POOL_SIZE) -> list[tuple[str, float]]:
+        """Xếp hạng theo độ tương đồng cao nhất giữa các đoạn (rỗng nếu không có bi-encoder)."""
+        if self.index is None:
+            return []
+        queries = self.model.encode(_passages(content), normalize_embeddings=True,
+                                    show_progress_bar=False).astype('float32')
+        scores, rows = self.index.search(queries, min(self.index.ntotal, limit * 4))
+        best = {}
+        for row_scores, row_ids in zip(scores, rows):
+            for score, row in zip(row_scores, row_ids):
+                if row < 0:
+                    continue
+                law_id = self.passage_owners[row]
+                if score > best.get(law_id, -np.inf):
+                    best[law_id] = float(score)
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def rankings(self, content: str, pool_size: int = CANDIDATE_POOL_SIZE) -> dict:
+        """Xếp hạng của từng hệ thống: {'bm25': [...], 'semantic': [...]} (bỏ hệ thống không có)."""
+        rankings = {'bm25': self.bm25.search(content, top_k=pool_size)}
+        if self.index is not None:
+            rankings['semantic'] = self.semantic_ranking(content, pool_size)
+        return rankings
+
+    def select(self, content: str, top_n: int = CANDIDATE_TOP_N) -> list[str]:
+        """Top-N ID điều luật 2013 ứng viên cho nội dung một điều luật 2024."""
+        fused = reciprocal_rank_fusion(list(self.rankings(content).values()), limit=top_n)
+        return [law_id for law_id, _ in fused]
+
+    def reference_text(self, law_ids: list[str]) -> str:
+        """Nội dung các điều luật ứng viên, nối lại để đưa vào prompt (mỗi điều bắt đầu bằng 'Điều N.')."""
+        return "\n\n".join(self.texts[law_id].strip() for law_id in law_ids)
+
+
+# --- Ví dụ sử dụng và kiểm tra ---
+if __name__ == '__main__':
+    selector = CandidateSelector.from_law_structure(use_semantic=False)
+    with LawStructure.load(2024) as structure:
+        test_content = structure.article_text('dieu_100_2024')
+    print("Ứng viên cho dieu_100_2024 (BM25):", selector.select(test_content))
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+Kho kết quả trích xuất LLM dạng JSONL chỉ ghi nối (append-only), thay cho hàng trăm file JSON nhỏ trong
+output_json_2013/, output_json_2024/ và comparisons_json/.
+
+Mỗi kho là một file EXTRACTION_DIR/<tên>.jsonl (STORE_NAMES): entities_2013, entities_2024 (02_extract_entities.py) và comparisons
+(03_extract_comparisons.py); mỗi bước của run_pipeline.py ghi một kho riêng nên các bước chạy song song
+không ghi chung file. Mỗi dòng là một bản ghi có khóa là ID điều luật:
+
+    {"id":"dieu_5_2024","data":{...},"source":"<sha1>"}   ghi lại cùng ID là upsert: bản ghi sau cùng được dùng
+    {"id":"dieu_5_2024","deleted":true}                   xóa
+
+    - "source" (source_hash) là dấu vân tay nội dung điều luật mà bản ghi được trích xuất từ đó. Khi văn bản
+      luật được phân tích lại (01_preprocess_pdfs.py), pending_ids() cho biết điều luật nào chưa có bản ghi
+      hoặc có bản ghi trích xuất từ nội dung cũ; 02 / 03 chỉ gửi lại các điều này cho LLM.
+
+    - An toàn khi bị ngắt: mỗi bản ghi được ghi bằng một lệnh write() một dòng hoàn chỉnh (O_APPEND) rồi fsync.
+      Dòng cuối dở dang (tiến trình bị dừng giữa chừng) bị bỏ qua khi đọc và bị cắt bỏ ở lần ghi tiếp theo.
+    - Khi mở, file được quét một lượt để lập chỉ mục ID -> vị trí bản ghi mới nhất; chỉ phần "id" của mỗi dòng
+      được parse. items() đọc tuần tự cả file một lần và chỉ parse các bản ghi mới nhất.
+    - Khi số dòng cũ (bị ghi đè / đã xóa) nhiều hơn số bản ghi, close() ghi lại file gọn (compact).
+
+Dùng từ dòng lệnh:
+    python extraction_store.py stats
+    python extraction_store.py import entities_2024 output_json_2024    # nhập các file JSON cũ (mỗi file một điều)
+    python extraction_store.py export comparisons comparisons_json      # xuất ra file để sửa tay, rồi import lại
+    python extraction_store.py compact entities_2013
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+
+EXTRACTION_DIR = os.getenv("EXTRACTION_DIR", "extractions")
+STORE_NAMES = ('entities_2013', 'entities_2024', 'comparisons')
+
+_ID_PREFIX = '{"id":'
+_DECODER = json.JSONDecoder()
+
+
+def store_path(name: str) -> str:
+    return os.path.join(EXTRACTION_DIR, f"{name}.jsonl")
+
+
+def source_hash(content: str) -> str:
+    """Dấu vân tay (SHA-1) của nội dung nguồn một bản ghi."""
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def _parse_key(line: str):
+    """
+    (ID, là bản ghi xóa) của một dòng mà không parse phần dữ liệu
+    (các dòng do kho ghi luôn bắt đầu bằng '{"id":').
+    """
+    if line.startswith(_ID_PREFIX):
+        record_id, end = _DECODER.raw_decode(line, len(_ID_PREFIX))
+        return record_id, line.startswith(',"deleted":true', end)
+    record = json.loads(line)
+    return record['id'], bool(record.get('deleted'))
+
+
+class ExtractionStore:
+    """
+    Kho bản ghi {ID điều luật: dữ liệu} trên một file JSONL chỉ ghi nối. Hỗ trợ context manager.
+    """
+    def __init__(self, path: str, sync: bool = True):
+        """
+        Args:
+            path: Đường dẫn file .jsonl (được tạo khi ghi lần đầu).
+            sync: fsync sau mỗi lần ghi (tắt khi nhập hàng loạt, put_many luôn fsync một lần ở cuối).
+        """
+        self.path = path
+        self.sync = sync
+        self.index = {}       # ID -> (vị trí byte, độ dài) của bản ghi mới nhất
+        self.lines = 0        # số dòng hợp lệ trong file (kể cả dòng cũ)
+        self._valid_end = 0   # hết dòng hoàn chỉnh cuối cùng
+        self._fd = None
+        self._scan()
+
+    @classmethod
+    def open(cls, name: str, sync: bool = True):
+        """Mở kho theo tên trong STORE_NAMES."""
+        return cls(store_path(name), sync)
+
+    def _scan(self):
+        if not os.path.exists(self.path):
+            return
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for raw_line in f:
+                if not raw_line.endswith(b'\n'):
+                    break  # bản ghi cuối bị ghi dở
+                line = raw_line.decode('utf-8')
+                if line.strip():
+                    record_id, deleted = _parse_key(line)
+                    if deleted:
+                        self.index.pop(record_id, None)
+                    else:
+                        self.index[record_id] = (offset, len(raw_line))
+                    self.lines += 1
+                offset += len(raw_line)
+        self._valid_end = offset
+
+    def __contains__(self, record_id):
+        return record_id in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def ids(self) -> list:
+        return list(self.index)
+
+    def _read(self, record_id):
+        if record_id not in self.index:
+            return None
+        offset, length = self.index[record_id]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def get(self, record_id):
+        """Dữ liệu mới nhất của một ID, None nếu không có."""
+        record = self._read(record_id)
+        return record['data'] if record is not None else None
+
+    def _latest_lines(self):
+        """Dòng (bytes) của mọi bản ghi mới nhất, đọc tuần tự file một lượt (theo thứ tự ghi)."""
+        if not self.index:
+            return
+        latest = {offset for offset, _ in self.index.values()}
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for raw_line in f:
+                if offset >= self._valid_end:
+                    break
+                if offset in latest:
+                    yield raw_line
+                offset += len(raw_line)
+
+    def items(self):
+        """(ID, dữ liệu) của mọi bản ghi mới nhất, đọc tuần tự file một lượt (theo thứ tự ghi)."""
+        for raw_line in self._latest_lines():
+            record = json.loads(raw_line)
+            yield record['id'], record['data']
+
+    def sources(self) -> dict:
+        """{ID: dấu vân tay nội dung nguồn (None nếu bản ghi không lưu)} của mọi bản ghi, đọc file một lượt."""
+        sources = {}
+        for raw_line in self._latest_lines():
+            record = json.loads(raw_line)
+            sources[record['id']] = record.get('source')
+        return sources
+
+    def _append(self, lines: list[str]):
+        if self._fd is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            if os.fstat(self._fd).st_size > self._valid_end:
+                os.truncate(self.path, self._valid_end)  # bỏ bản ghi dở dang của lần chạy bị ngắt
+        offset = self._valid_end
+        chunks, positions = [], []
+        for line in lines:
+            encoded = (line + "\n").encode('utf-8')
+            positions.append((offset, len(encoded)))
+            offset += len(encoded)
+            chunks.append(encoded)
+        remaining = memoryview(b''.join(chunks))
+        while remaining:
+            remaining = remaining[os.write(self._fd, remaining):]
+        if self.sync:
+            os.fsync(self._fd)
+        self._valid_end = offset
+        self.lines += len(lines)
+        return positions
+
+    @staticmethod
+    def _encode(record_id, data, source=None):
+        record = {'id': record_id, 'data': data}
+        if source is not None:
+            record['source'] = source
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+    def _unchanged(self, record_id, data, source):
+        record = self._read(record_id)
+        return record is not None and record['data'] == data and record.get('source') == source
+
+    def put(self, record_id, data, source=None):
+        """
+        Thêm hoặc ghi đè (upsert) bản ghi của một ID. Dữ liệu (và source) giống hệt bản ghi hiện có thì không
+        ghi gì, để chạy lại với kết quả không đổi (cache LLM) giữ nguyên file và run_pipeline.py dừng ở bước này.
+
+        Args:
+            source: Dấu vân tay nội dung đã dùng để trích xuất (source_hash), None: không lưu.
+        """
+        if self._unchanged(record_id, data, source):
+            return
+        self.index[record_id] = self._append([self._encode(record_id, data, source)])[0]
+
+    def put_many(self, items, sources=None):
+        """
+        Upsert nhiều bản ghi bằng một lần ghi (và một lần fsync); bỏ qua bản ghi không đổi như put().
+        sources: {ID: dấu vân tay nội dung nguồn} (tùy chọn).
+        """
+        sources = sources or {}
+        items = [(record_id, data, sources.get(record_id)) for record_id, data in items
+                 if not self._unchanged(record_id, data, sources.get(record_id))]
+        if not items:
+            return
+        sync, self.sync = self.sync, True
+        try:
+            positions = self._append([self._encode(*item) for item in items])
+        finally:
+            self.sync = sync
+        for (record_id, _, _), position in zip(items, positions):
+            self.index[record_id] = position
+
+    def delete(self, record_id):
+        if record_id in self.index:
+            self._append([json.dumps({'id': record_id, 'deleted': True}, ensure_ascii=False, separators=(',', ':'))])
+            del self.index[record_id]
+
+    def compact(self):
+        """Ghi lại file chỉ gồm các bản ghi mới nhất (file tạm rồi đổi tên)."""
+        tmp_path = f"{self.path}.tmp"
+        index, offset = {}, 0
+        with open(tmp_path, 'wb') as out:
+            for raw_line in self._latest_lines():
+                out.write(raw_line)
+                index[_parse_key(raw_line.decode('utf-8'))[0]] = (offset, len(raw_line))
+                offset += len(raw_line)
+            out.flush()
+            os.fsync(out.fileno())
+        self._close_fd()
+        os.replace(tmp_path, self.path)
+        self.index, self.lines, self._valid_end = index, len(index), offset
+
+    def stats(self) -> dict:
+        return {'records': len(self.index), 'lines': self.lines,
+                'bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+
+    def _close_fd(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def close(self):
+        wrote = self._fd is not None
+        self._close_fd()
+        if wrote and self.lines > 2 * len(self.index):
+            self.compact()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def pending_ids(store: ExtractionStore, articles) -> tuple[list, list]:
+    """
+    So sánh kho với nội dung hiện tại của các điều luật.
+
+    Args:
+        articles: Các cặp (ID điều luật, nội dung), ví dụ LawStructure.iter_article_texts().
+
+    Returns:
+        (ID chưa có bản ghi, ID có bản ghi được trích xuất từ nội dung khác), theo thứ tự của articles.
+        Bản ghi không lưu source (ghi trước khi có source_hash, hoặc nhập tay) được coi là còn đúng.
+    """
+    sources = store.sources()
+    missing, stale = [], []
+    for record_id, content in articles:
+        if record_id not in sources:
+            missing.append(record_id)
+        elif sources[record_id] not in (None, source_hash(content)):
+            stale.append(record_id)
+    return missing, stale
+
+
+def import_json_dir(store: ExtractionStore, directory: str) -> int:
+    """Nhập các file <ID>.json (bố cục output_json_* / comparisons_json cũ) vào kho. Trả về số bản ghi."""
+    items = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            items.append((os.path.splitext(os.path.basename(path))[0], json.load(f)))
+    store.put_many(items)
+    return len(items)
+
+
+def export_json_dir(store: ExtractionStore, directory: str) -> int:
+    """Xuất mỗi bản ghi thành file <ID>.json (để xem / sửa tay). Trả về số file."""
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    count = 0
+    for record_id, data in store.items():
+        with open(os.path.join(directory, f"{record_id}.json"), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help="Số bản ghi, số dòng và kích thước của mỗi kho.")
+    for command in ('import', 'export'):
+        subparser = subparsers.add_parser(command)
+        subparser.add_argument('store', choices=STORE_NAMES)
+        subparser.add_argument('directory')
+    subparsers.add_parser('compact').add_argument('store', choices=STORE_NAMES)
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        for name in STORE_NAMES:
+            with ExtractionStore.open(name) as store:
+                print(f"{name:<14} {store.stats()}  ({store.path})")
+    elif args.command == 'import':
+        with ExtractionStore.open(args.store, sync=False) as store:
+            count = import_json_dir(store, args.directory)
+        print(f"Đã nhập {count} file từ '{args.directory}/' vào '{store.path}' ({len(store)} bản ghi).")
+    elif args.command == 'export':
+        with ExtractionStore.open(args.store) as store:
+            print(f"Đã xuất {export_json_dir(store, args.directory)} file vào '{args.directory}/'.")
+    else:
+        with ExtractionStore.open(args.store) as store:
+            store.compact()
+            print(f"Đã compact '{store.path}': {store.stats()}")
+
+
+if __name__ == '__main__':
+    main()
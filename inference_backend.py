@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Chọn backend suy luận (inference) cho Bi-Encoder (SemanticRetriever) và Cross-Encoder (Reranker).
+
+Các backend hỗ trợ (chọn bằng biến môi trường INFERENCE_BACKEND, mặc định 'torch'):
+    - 'torch'     : PyTorch fp32 (như trước đây).
+    - 'onnx'      : ONNX Runtime fp32.
+    - 'onnx-int8' : ONNX Runtime, mô hình được lượng tử hóa động (dynamic quantization) sang int8.
+
+Các backend ONNX đọc mô hình đã được export sẵn trong thư mục ONNX_MODELS_DIR.
+Export một lần cho cả hai mô hình bằng lệnh:
+    python inference_backend.py export --quantization avx512_vnni
+
+Lưu ý: Index FAISS vẫn được build bằng mô hình fp32 (05_build_vector_db.py). Khi dùng backend ONNX
+cho câu hỏi, hãy chạy benchmarks/bench_inference_backends.py để kiểm tra độ lệch so với fp32.
+"""
+import argparse
+import os
+import sys
+
+from sentence_transformers import SentenceTransformer, CrossEncoder
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+ONNX_MODELS_DIR = "models_onnx"
+# Tên file (trong thư mục 'onnx/' của mô hình đã export) cho từng backend ONNX
+ONNX_FILE_NAMES = {
+    'onnx': 'onnx/model.onnx',
+    'onnx-int8': 'onnx/model_qint8.onnx',
+}
+
+
+def onnx_model_dir(model_name: str) -> str:
+    """Thư mục chứa mô hình ONNX đã export của `model_name`."""
+    return os.path.join(ONNX_MODELS_DIR, model_name.replace('/', '__'))
+
+
+def _resolve_backend(backend):
+    backend = backend or INFERENCE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend '{backend}' không hợp lệ. Chọn một trong: {', '.join(BACKENDS)}")
+    return backend
+
+
+def _onnx_kwargs(model_name: str, backend: str) -> dict:
+    model_dir = onnx_model_dir(model_name)
+    file_name = ONNX_FILE_NAMES[backend]
+    if not os.path.exists(os.path.join(model_dir, file_name)):
+        raise FileNotFoundError(
+            f"Không tìm thấy mô hình ONNX '{os.path.join(model_dir, file_name)}'. "
+            f"Vui lòng chạy: python inference_backend.py export"
+        )
+    return {
+        'model_name_or_path': model_dir,
+        'backend': 'onnx',
+        'model_kwargs': {'file_name': file_name, 'provider': 'CPUExecutionProvider'},
+    }
+
+
+def load_bi_encoder(model_name: str, backend: str = None, device: str = None):
+    """Tải Bi-Encoder (SentenceTransformer) theo backend được chọn."""
+    backend = _resolve_backend(backend)
+    if backend == 'torch':
+        return SentenceTransformer(model_name, device=device)
+    kwargs = _onnx_kwargs(model_name, backend)
+    return SentenceTransformer(kwargs.pop('model_name_or_path'), device='cpu', **kwargs)
+
+
+def load_cross_encoder(model_name: str, max_length: int, backend: str = None, device: str = None):
+    """Tải Cross-Encoder theo backend được chọn."""
+    backend = _resolve_backend(backend)
+    if backend == 'torch':
+        return CrossEncoder(model_name, max_length=max_length, device=device)
+    kwargs = _onnx_kwargs(model_name, backend)
+    return CrossEncoder(kwargs.pop('model_name_or_path'), max_length=max_length, device='cpu', **kwargs)
+
+
+def export_onnx_models(model_names: dict, quantization: str = 'avx512_vnni', force: bool = False):
+    """
+    Export các mô hình sang ONNX (fp32) và bản lượng tử hóa int8, lưu vào ONNX_MODELS_DIR.
+
+    Args:
+        model_names (dict): {tên_mô_hình: 'bi' | 'cross'}.
+        quantization (str): Cấu hình lượng tử hóa của sentence-transformers
+                            ('arm64', 'avx2', 'avx512', 'avx512_vnni'), chọn theo CPU triển khai.
+        force (bool): Export lại kể cả khi đã có.
+    """
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    for model_name, kind in model_names.items():
+        model_dir = onnx_model_dir(model_name)
+        fp32_path = os.path.join(model_dir, ONNX_FILE_NAMES['onnx'])
+        int8_path = os.path.join(model_dir, ONNX_FILE_NAMES['onnx-int8'])
+        if not force and os.path.exists(fp32_path) and os.path.exists(int8_path):
+            print(f" - '{model_name}': đã có mô hình ONNX trong '{model_dir}', bỏ qua.")
+            continue
+
+        print(f" - Đang export '{model_name}' sang ONNX...")
+        # Tải với backend='onnx' từ mô hình gốc sẽ tự động chuyển đổi PyTorch -> ONNX
+        if kind == 'bi':
+            model = SentenceTransformer(model_name, backend='onnx', device='cpu')
+        else:
+            model = CrossEncoder(model_name, backend='onnx', device='cpu')
+        model.save_pretrained(model_dir)
+        print(f"   -> Đã lưu ONNX fp32: '{fp32_path}'")
+
+        print(f"   -> Đang lượng tử hóa int8 (cấu hình '{quantization}')...")
+        export_dynamic_quantized_onnx_model(model, quantization, model_dir, file_suffix='qint8')
+        print(f"   -> Đã lưu ONNX int8: '{int8_path}'")
+
+
+if __name__ == '__main__':
+    from semantic_retriever import MODEL_NAME
+    from reranker import RERANKER_MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="Quản lý backend suy luận ONNX cho Bi-Encoder và Cross-Encoder.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help="Export cả hai mô hình sang ONNX fp32 và int8.")
+    export_parser.add_argument('--quantization', default='avx512_vnni',
+                               choices=['arm64', 'avx2', 'avx512', 'avx512_vnni'])
+    export_parser.add_argument('--force', action='store_true', help="Export lại kể cả khi đã có.")
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        try:
+            export_onnx_models({MODEL_NAME: 'bi', RERANKER_MODEL_NAME: 'cross'},
+                               quantization=args.quantization, force=args.force)
+        except ImportError as e:
+            print(f"Lỗi: {e}. Hãy cài đặt: pip install \"sentence-transformers[onnx]\"", file=sys.stderr)
+            sys.exit(1)
+        print("\n--- Hoàn thành export mô hình ONNX! Đặt INFERENCE_BACKEND=onnx hoặc onnx-int8 để sử dụng. ---")
@@ -1,16 +1,50 @@
 # -*- coding: utf-8 -*-
+import argparse
 import os
+import sys
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
 import json
 
+# --- Cấu hình Schema ---
+# Các label được tạo bởi 04a_2_normalize_and_merge_graph.py (sau normalize_label)
+NODE_LABELS = ('DieuLuat', 'KhaiNiem', 'ChuThe', 'HanhViPhapLy', 'DieuKien', 'CheTai')
+
+# Ánh xạ tiền tố của nodeId (phần trước dấu '_' đầu tiên) sang label tương ứng
+ID_PREFIX_TO_LABEL = {
+    'dieu': 'DieuLuat',
+    'dieuluat': 'DieuLuat',
+    'khainiem': 'KhaiNiem',
+    'chuthe': 'ChuThe',
+    'hanhviphaply': 'HanhViPhapLy',
+    'hanhvi': 'HanhViPhapLy',
+    'dieukien': 'DieuKien',
+    'chetai': 'CheTai',
+}
+
+FULLTEXT_INDEX_NAME = 'lawTextIndex'
+
+# Tìm một nút trên tất cả các label đã biết. Mỗi nhánh UNION là một index seek,
+# dùng khi không suy ra được label từ ID hoặc label suy ra không khớp dữ liệu.
+_ANY_LABEL_NODE_QUERY = "CALL {\n" + "\nUNION\n".join(
+    f"MATCH (n:{label} {{nodeId: $node_id}}) RETURN n" for label in NODE_LABELS
+) + "\n}\nRETURN properties(n) AS properties LIMIT 1"
+
 class KGConnector:
     """
     Lớp kết nối và thực hiện các truy vấn trên Knowledge Graph pháp lý.
     Sử dụng context manager ('with' statement) để quản lý kết nối tự động.
     """
-    def __init__(self):
-        """Khởi tạo kết nối đến Neo4j."""
+    def __init__(self, driver=None):
+        """
+        Khởi tạo kết nối đến Neo4j.
+        Có thể truyền vào một `driver` đã tạo sẵn (ví dụ driver giả lập dùng cho benchmark),
+        khi đó bỏ qua việc đọc cấu hình từ file .env.
+        """
+        if driver is not None:
+            self._driver = driver
+            return
+
         load_dotenv()
         uri = os.getenv("NEO4J_URI")
         user = os.getenv("NEO4J_USER")
@@ -60,35 +94,155 @@ class KGConnector:
             print(f"Query: {query}")
             return []
 
+    def _run_schema_statement(self, statement):
+        """Chạy một lệnh schema (CREATE CONSTRAINT/INDEX). Khác với _run_query, lỗi sẽ được ném ra."""
+        with self._driver.session() as session:
+            session.run(statement).consume()
+
+    # --- Quản lý Schema ---
+
+    def ensure_schema(self):
+        """
+        Tạo các ràng buộc/index cần thiết cho truy vấn. Có thể gọi nhiều lần (idempotent)
+        nên được gọi một lần mỗi khi ứng dụng khởi động.
+        - Ràng buộc duy nhất (kèm range index) trên `nodeId` cho mọi label trong NODE_LABELS.
+          Nếu dữ liệu có ID trùng khiến không tạo được ràng buộc, tạo range index thường thay thế.
+        - Full-Text Index `lawTextIndex` dùng bởi keyword_search_laws.
+        """
+        if self._driver is None:
+            print("Lỗi: Không có kết nối Neo4j hợp lệ.")
+            return
+
+        print("Đang kiểm tra và tạo schema cho KG...")
+        for label in NODE_LABELS:
+            try:
+                self._run_schema_statement(
+                    f"CREATE CONSTRAINT {label.lower()}_nodeid_unique IF NOT EXISTS "
+                    f"FOR (n:{label}) REQUIRE n.nodeId IS UNIQUE"
+                )
+            except Exception as e:
+                print(f"Cảnh báo: Không tạo được ràng buộc duy nhất cho :{label}({e}). Tạo range index thay thế.")
+                self._run_schema_statement(
+                    f"CREATE INDEX {label.lower()}_nodeid_range IF NOT EXISTS FOR (n:{label}) ON (n.nodeId)"
+                )
+
+        self._run_schema_statement(
+            f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX_NAME} IF NOT EXISTS "
+            f"FOR (n:DieuLuat) ON EACH [n.name, n.noi_dung]"
+        )
+        # Chờ các index được populate xong trước khi phục vụ truy vấn
+        self._run_schema_statement("CALL db.awaitIndexes(300)")
+        print(" -> Schema đã sẵn sàng.")
+
+    @staticmethod
+    def infer_label(node_id: str):
+        """Suy ra label của nút từ tiền tố ID, ví dụ 'dieu_81_2024' -> 'DieuLuat'. Trả về None nếu không rõ."""
+        if not node_id:
+            return None
+        return ID_PREFIX_TO_LABEL.get(node_id.split('_', 1)[0].lower())
+
+    def explain_node_lookup(self, node_id: str):
+        """
+        Trả về danh sách các toán tử trong query plan (EXPLAIN, không thực thi)
+        của truy vấn get_node_by_id, dùng để kiểm tra truy vấn có dùng index seek hay không.
+        """
+        label = self.infer_label(node_id)
+        query = (f"MATCH (n:{label} {{nodeId: $node_id}}) RETURN properties(n) AS properties"
+                 if label else _ANY_LABEL_NODE_QUERY)
+        with self._driver.session() as session:
+            plan = session.run(f"EXPLAIN {query}", {"node_id": node_id}).consume().plan
+
+        operators = []
+        pending = [plan] if plan else []
+        while pending:
+            step = pending.pop()
+            operators.append(step.get('operatorType', ''))
+            pending.extend(step.get('children', []))
+        return operators
+
+    def check_node_lookups(self, node_ids):
+        """
+        Kiểm tra query plan của get_node_by_id cho từng ID. Trả về {node_id: danh sách toán tử} của các ID
+        mà truy vấn KHÔNG dùng index seek (rỗng nếu schema đã đúng).
+        """
+        failures = {}
+        for node_id in node_ids:
+            operators = self.explain_node_lookup(node_id)
+            if not any('IndexSeek' in op for op in operators):
+                failures[node_id] = operators
+        return failures
+
     # --- Các hàm truy vấn chuyên biệt ---
 
     def get_all_laws_for_vectordb(self):
         """
         Lấy tất cả các nút Điều Luật có nội dung để xây dựng Vector Database.
         Hàm này đã được cập nhật để trả về cả `name` (tên điều luật)
-        để có thể xây dựng "siêu văn bản" (super-document) cho embedding.
+        để có thể xây dựng "siêu văn bản" (super-document) cho embedding,
+        cùng với `ma_dieu` và `phien_ban` để ghi vào kho lưu trữ điều luật cục bộ.
         """
-        print("Đang lấy dữ liệu (ID, name, noi_dung) của tất cả các Điều Luật từ KG...")
+        print("Đang lấy dữ liệu (ID, name, noi_dung, ma_dieu, phien_ban) của tất cả các Điều Luật từ KG...")
         
         # LABEL đã được chuẩn hóa thành 'DieuLuat'
         # Thuộc tính ID đã được chuẩn hóa thành 'nodeId'
         query = """
         MATCH (n:DieuLuat)
         WHERE n.noi_dung IS NOT NULL AND trim(n.noi_dung) <> ''
-        RETURN n.nodeId AS id, n.name AS name, n.noi_dung AS content
+        RETURN n.nodeId AS id, n.name AS name, n.noi_dung AS content,
+               n.ma_dieu AS ma_dieu, n.phien_ban AS phien_ban
         """
         return self._run_query(query)
 
     def get_node_by_id(self, node_id: str):
-        """Lấy toàn bộ thuộc tính của một nút dựa trên nodeId của nó."""
+        """
+        Lấy toàn bộ thuộc tính của một nút dựa trên nodeId của nó.
+        Label được suy ra từ tiền tố ID để Neo4j dùng index seek thay vì quét toàn bộ nút.
+        """
         if not node_id: return None
-        
-        query = "MATCH (n {nodeId: $node_id}) RETURN properties(n) AS properties"
+
         parameters = {"node_id": node_id}
-        result = self._run_query(query, parameters)
-        
+        label = self.infer_label(node_id)
+        if label:
+            query = f"MATCH (n:{label} {{nodeId: $node_id}}) RETURN properties(n) AS properties"
+            result = self._run_query(query, parameters)
+            if result:
+                return result[0]['properties']
+
+        # Không suy ra được label, hoặc tiền tố không khớp label thực tế (ví dụ một số nút 'chetai_...'
+        # mang label HanhViPhapLy): tìm trên tất cả các label, vẫn bằng index seek.
+        result = self._run_query(_ANY_LABEL_NODE_QUERY, parameters)
+
         return result[0]['properties'] if result else None
 
+    def get_nodes_by_ids(self, node_ids: list[str]):
+        """
+        Lấy thuộc tính của nhiều nút Điều Luật chỉ với MỘT truy vấn Cypher (UNWIND),
+        thay vì gọi get_node_by_id lặp lại cho từng ID (N+1 round trips).
+
+        Returns:
+            tuple (nodes, missing_ids):
+                - nodes (dict): {node_id: properties}, giữ đúng thứ tự của `node_ids`.
+                - missing_ids (list): các ID không tìm thấy trong KG (theo thứ tự đầu vào).
+        """
+        # Loại bỏ ID rỗng và trùng lặp nhưng vẫn giữ nguyên thứ tự
+        unique_ids = list(dict.fromkeys(node_id for node_id in node_ids if node_id))
+        if not unique_ids:
+            return {}, []
+
+        query = """
+        UNWIND $node_ids AS node_id
+        MATCH (n:DieuLuat {nodeId: node_id})
+        RETURN node_id, properties(n) AS properties
+        """
+        result = self._run_query(query, {"node_ids": unique_ids})
+        found = {record['node_id']: record['properties'] for record in result}
+
+        nodes = {node_id: found[node_id] for node_id in unique_ids if node_id in found}
+        missing_ids = [node_id for node_id in unique_ids if node_id not in found]
+        if missing_ids:
+            print(f"Cảnh báo: Không tìm thấy {len(missing_ids)} nút trong KG: {missing_ids}")
+        return nodes, missing_ids
+
     def find_comparison_by_law_id(self, law_id_2024: str):
         """
         Tìm kiếm sự so sánh cho một điều luật 2024.
@@ -112,7 +266,21 @@ class KGConnector:
         result = self._run_query(query, parameters)
         
         return result[0] if result else None
-    
+
+    def get_comparison_edges(self):
+        """
+        Lấy toàn bộ quan hệ so sánh 2024 -> 2013 trong KG với MỘT truy vấn,
+        dùng để kiểm tra bảng đối chiếu trong bộ nhớ (article_alignment.py) khớp với đồ thị.
+
+        Returns:
+            set các tuple (id_2024, id_2013, loại thay đổi).
+        """
+        query = """
+        MATCH (new_law:DieuLuat)-[r:SUA_DOI_BO_SUNG|THAY_THE_HOAN_TOAN|GIU_NGUYEN]->(old_law:DieuLuat)
+        RETURN new_law.nodeId AS id_2024, old_law.nodeId AS id_2013, type(r) AS change_type
+        """
+        return {(record['id_2024'], record['id_2013'], record['change_type']) for record in self._run_query(query)}
+
     def find_laws_by_concept_name(self, concept_name: str, law_year: int = None, limit: int = 10):
         """
         Tìm các điều luật liên quan đến một khái niệm, chủ thể, hoặc hành vi.
@@ -149,7 +317,7 @@ class KGConnector:
     def keyword_search_laws(self, keyword: str, law_year: int = None, limit: int = 5):
         """
         Tìm kiếm từ khóa bằng Full-Text Index để có hiệu năng cao nhất.
-        Yêu cầu: Đã tạo index bằng lệnh:
+        Yêu cầu: Đã tạo index (ensure_schema() tự tạo nếu chưa có):
         CREATE FULLTEXT INDEX lawTextIndex FOR (n:DieuLuat) ON EACH [n.name, n.noi_dung]
         """
         print(f"Đang tìm kiếm từ khóa (Full-Text): '{keyword}'...")
@@ -180,8 +348,38 @@ class KGConnector:
 
 # --- VÍ DỤ SỬ DỤNG VÀ KIỂM TRA ---
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Kiểm tra KGConnector trên Neo4j đang cấu hình trong .env.")
+    parser.add_argument('--check-schema', action='store_true',
+                        help="Chỉ tạo schema và kiểm tra truy vấn theo ID dùng index seek; "
+                             "thoát với mã 1 nếu không (dùng trong CI / sau khi import dữ liệu).")
+    args = parser.parse_args()
+    schema_test_ids = ["dieu_27_2024", "chuthe_nhanuoc", "khainiem_datnongnghiep"]
+
+    if args.check_schema:
+        try:
+            with KGConnector() as kg:
+                kg.ensure_schema()
+                failures = kg.check_node_lookups(schema_test_ids)
+        except Exception as e:
+            print(f"LỖI: Không kiểm tra được schema: {e}")
+            sys.exit(1)
+        for node_id, operators in failures.items():
+            print(f"LỖI: truy vấn '{node_id}' không dùng index seek: {operators}")
+        if failures:
+            sys.exit(1)
+        print(f"OK: {len(schema_test_ids)} truy vấn theo ID đều dùng index seek.")
+        sys.exit(0)
+
     try:
         with KGConnector() as kg:
+            # 0. Tạo schema và kiểm tra truy vấn theo ID dùng index seek
+            kg.ensure_schema()
+            print("\n0. Test: Query plan của get_node_by_id")
+            failures = kg.check_node_lookups(schema_test_ids)
+            for test_id in schema_test_ids:
+                status = f"LỖI: không dùng index {failures[test_id]}" if test_id in failures else "OK (index seek)"
+                print(f"   -> {test_id}: {status}")
+
             # 1. Test lấy dữ liệu cho VectorDB
             all_laws = kg.get_all_laws_for_vectordb()
             print(f"\n1. Tìm thấy {len(all_laws)} điều luật có nội dung để tạo VectorDB.")
@@ -198,6 +396,14 @@ if __name__ == '__main__':
                 print(json.dumps(details, indent=2, ensure_ascii=False))
             else:
                 print(f"   -> Không tìm thấy thông tin cho '{test_node_id}'.")
+
+            # 2b. Test lấy nhiều nút trong một truy vấn
+            test_node_ids = ["dieu_27_2024", "dieu_81_2024", "dieu_khong_ton_tai"]
+            print(f"\n2b. Test: Lấy chi tiết nhiều nút {test_node_ids}")
+            nodes, missing = kg.get_nodes_by_ids(test_node_ids)
+            for node_id, props in nodes.items():
+                print(f"   -> {node_id}: {props.get('name', 'N/A')}")
+            print(f"   -> Không tìm thấy: {missing}")
             
             # 3. Test tìm kiếm so sánh
             test_comparison_id = "dieu_81_2024"
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Phân tích cấu trúc văn bản luật (Chương / Mục / Điều / Khoản / Điểm) trong một lượt đọc từng dòng,
+ghi thành một file JSONL gọn cho mỗi luật thay cho hàng trăm file nhỏ trong chunks_20xx.
+
+Mỗi dòng JSONL là một nút:
+    {"id": "dieu_10_2024", "type": "dieu", "number": "10", "title": "Xác định loại đất",
+     "parent": "chuong_I_2024", "start": 1234, "end": 2345, "byte_start": 1500, "byte_end": 2800}
+    - type: 'chuong', 'muc', 'dieu', 'khoan', 'diem'; nút gốc 'luat' (dòng cuối) lưu file văn bản nguồn.
+    - start / end: vị trí ký tự [start, end) trong LuatDatDai20xx_full.txt; byte_start / byte_end: vị trí
+      byte tương ứng, dùng để đọc trực tiếp (mmap) mà không phải đọc lại cả văn bản.
+    - Các nút được ghi ngay khi đóng (nút con trước nút cha), nên không cần giữ cả cây trong bộ nhớ.
+
+Khác với `re.split(r'(Điều \\d+\\.)', text)` cũ:
+    - tiêu đề chỉ được nhận ở đầu dòng và theo đúng thứ tự số hiệu, nên các dẫn chiếu trong câu
+      ("theo quy định tại Điều 45.") và các điều được trích dẫn trong điều khoản sửa đổi luật khác
+      (“Điều 129. ...) không còn cắt đôi điều luật;
+    - số hiệu bị PDF tách chữ số ("Điều 1 1.", "Điều 1 10.") được nhận đúng là Điều 11, Điều 110.
+
+Đọc lại: LawStructure (articles(), article_text(), text()); load_article_documents() cho các bước đọc
+nội dung từng điều luật (BM25, trích xuất LLM 02 / 03, đối chiếu cục bộ 03_2).
+"""
+import json
+import mmap
+import os
+import re
+import shutil
+
+from legal_text import CLAUSE_START_PATTERN, POINT_START_PATTERN
+
+FULL_TEXT_PATH = "LuatDatDai{year}_full.txt"
+STRUCTURE_PATH = "LuatDatDai{year}_structure.jsonl"
+LAW_YEARS = (2013, 2024)
+
+CHAPTER_PATTERN = re.compile(r'^Chương\s+([IVXLC]+|\d+)\.?\s*$')
+SECTION_PATTERN = re.compile(r'^Mục\s+(\d+)\.\s*(.*)$')
+# Chữ số có thể bị PDF tách bằng khoảng trắng: "Điều 1 10."
+ARTICLE_PATTERN = re.compile(r'^Điều\s+(\d(?: ?\d)*)\.\s*(.*)$')
+_ARTICLE_PREFIX_PATTERN = re.compile(r'^\s*Điều\s+\d(?: ?\d)*\.\s*')
+# Thứ tự ký hiệu điểm trong văn bản pháp luật
+POINT_LABELS = 'abcdđeghiklmnopqrstuvxy'
+
+# Cấp của mỗi loại nút: một nút mới đóng mọi nút đang mở cùng cấp hoặc sâu hơn
+LEVELS = {'luat': -1, 'chuong': 0, 'muc': 1, 'dieu': 2, 'khoan': 3, 'diem': 4}
+
+
+def iter_lines_with_offsets(path):
+    """(vị trí ký tự, vị trí byte, dòng) của từng dòng trong file UTF-8, đọc tuần tự."""
+    char_offset = byte_offset = 0
+    with open(path, 'rb') as f:
+        for raw_line in f:
+            line = raw_line.decode('utf-8')
+            yield char_offset, byte_offset, line
+            char_offset += len(line)
+            byte_offset += len(raw_line)
+
+
+class _StructureParser:
+    """Máy trạng thái của parse_law_structure: giữ ngăn xếp các nút đang mở và số hiệu chờ đợi."""
+    def __init__(self, law_year):
+        self.law_year = law_year
+        self.stack = []
+        self.next_article = 1
+        self.next_clause = 1
+        self.next_point = 0
+
+    def _node_id(self, node_type, number):
+        if node_type == 'chuong':
+            return f"chuong_{number}_{self.law_year}"
+        if node_type == 'muc':
+            chapter = next((node['number'] for node in self.stack if node['type'] == 'chuong'), '0')
+            return f"chuong_{chapter}_muc_{number}_{self.law_year}"
+        if node_type == 'dieu':
+            return f"dieu_{number}_{self.law_year}"
+        return f"{self.stack[-1]['id']}_{'khoan' if node_type == 'khoan' else 'diem'}_{number}"
+
+    def close(self, level, char_offset, byte_offset):
+        """Đóng các nút đang mở có cấp >= level; trả về các nút đã đóng (nút sâu nhất trước)."""
+        closed = []
+        while self.stack and LEVELS[self.stack[-1]['type']] >= level:
+            node = self.stack.pop()
+            node.pop('_collect_title', None)
+            node['end'], node['byte_end'] = char_offset, byte_offset
+            closed.append(node)
+        return closed
+
+    def open(self, node_type, number, title, char_offset, byte_offset):
+        closed = self.close(LEVELS[node_type], char_offset, byte_offset)
+        node = {
+            'id': self._node_id(node_type, number),
+            'type': node_type,
+            'number': number,
+            'title': title,
+            'parent': self.stack[-1]['id'] if self.stack else None,
+            'start': char_offset,
+            'byte_start': byte_offset,
+        }
+        if node_type in ('chuong', 'muc'):
+            # Tên chương / mục có thể xuống dòng, được nối cho tới tiêu đề tiếp theo
+            node['_collect_title'] = True
+        self.stack.append(node)
+        return closed
+
+    def _current(self, node_type):
+        return any(node['type'] == node_type for node in self.stack)
+
+    def feed(self, char_offset, byte_offset, line):
+        """Xử lý một dòng; trả về các nút vừa đóng."""
+        text = line.strip()
+        match = CHAPTER_PATTERN.match(text)
+        if match:
+            return self.open('chuong', match.group(1), "", char_offset, byte_offset)
+        match = SECTION_PATTERN.match(text)
+        if match and match.group(2) == match.group(2).upper():
+            return self.open('muc', match.group(1), match.group(2), char_offset, byte_offset)
+        match = ARTICLE_PATTERN.match(text)
+        if match:
+            number = int(match.group(1).replace(' ', ''))
+            # Cho phép thiếu một điều (tiêu đề hỏng), không nhận số lùi hay nhảy xa (dẫn chiếu trong câu)
+            if self.next_article <= number <= self.next_article + 1:
+                self.next_article = number + 1
+                self.next_clause = 1
+                return self.open('dieu', str(number), match.group(2).strip(), char_offset, byte_offset)
+        if self._current('dieu'):
+            match = CLAUSE_START_PATTERN.match(line)
+            # Cho phép thiếu một khoản (số khoản ở đầu trang bị mất khi trích xuất PDF)
+            if match and self.next_clause <= int(match.group(1)) <= self.next_clause + 1:
+                self.next_clause = int(match.group(1)) + 1
+                self.next_point = 0
+                return self.open('khoan', match.group(1), "", char_offset, byte_offset)
+        if self._current('khoan'):
+            match = POINT_START_PATTERN.match(line)
+            if (match and self.next_point < len(POINT_LABELS)
+                    and match.group(1) == POINT_LABELS[self.next_point]):
+                self.next_point += 1
+                return self.open('diem', match.group(1), "", char_offset, byte_offset)
+        if self.stack and self.stack[-1].get('_collect_title') and text:
+            self.stack[-1]['title'] = f"{self.stack[-1]['title']} {text}".strip()
+        return []
+
+
+def parse_law_structure(lines, law_year):
+    """
+    Phân tích cấu trúc từ các dòng (vị trí ký tự, vị trí byte, dòng) theo thứ tự (iter_lines_with_offsets).
+
+    Yields:
+        Các nút (dict) theo thứ tự đóng: mỗi nút được trả về ngay khi biết vị trí kết thúc,
+        nút con trước nút cha; nút gốc 'luat' (toàn bộ văn bản) ở cuối cùng.
+    """
+    parser = _StructureParser(law_year)
+    char_count = byte_count = 0
+    for char_offset, byte_offset, line in lines:
+        yield from parser.feed(char_offset, byte_offset, line)
+        char_count = char_offset + len(line)
+        byte_count = byte_offset + len(line.encode('utf-8'))
+    yield from parser.close(LEVELS['chuong'], char_count, byte_count)
+    yield {'id': f"luat_{law_year}", 'type': 'luat', 'number': str(law_year), 'title': "", 'parent': None,
+           'start': 0, 'end': char_count, 'byte_start': 0, 'byte_end': byte_count}
+
+
+def build_law_structure(law_year, text_path=None, output_path=None):
+    """
+    Đọc LuatDatDai{năm}_full.txt một lượt và ghi dần file cấu trúc JSONL (file tạm rồi đổi tên).
+
+    Returns:
+        Số nút mỗi loại, ví dụ {'chuong': 16, 'dieu': 260, ...}.
+    """
+    text_path = text_path or FULL_TEXT_PATH.format(year=law_year)
+    output_path = output_path or STRUCTURE_PATH.format(year=law_year)
+    counts = {}
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for node in parse_law_structure(iter_lines_with_offsets(text_path), law_year):
+            if node['type'] == 'luat':
+                # Đường dẫn tương đối so với file cấu trúc, để đọc lại từ thư mục khác
+                node['source'] = os.path.relpath(text_path, os.path.dirname(os.path.abspath(output_path)))
+            else:
+                counts[node['type']] = counts.get(node['type'], 0) + 1
+            f.write(json.dumps(node, ensure_ascii=False, separators=(',', ':')) + "\n")
+    os.replace(tmp_path, output_path)
+    return counts
+
+
+class LawStructure:
+    """
+    Đọc file cấu trúc của một luật và lấy nội dung các nút theo vị trí byte (mmap file văn bản nguồn),
+    không cần mở từng file điều luật. Hỗ trợ context manager.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.nodes = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                node = json.loads(line)
+                self.nodes[node['id']] = node
+        self.root = next(node for node in self.nodes.values() if node['type'] == 'luat')
+        self.text_path = os.path.join(os.path.dirname(os.path.abspath(path)), self.root['source'])
+        self._file = open(self.text_path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        if len(self._mm) != self.root['byte_end']:
+            self.close()
+            raise ValueError(f"'{self.text_path}' đã thay đổi sau khi tạo '{path}'. "
+                             f"Vui lòng chạy lại 01_preprocess_pdfs.py.")
+
+    @classmethod
+    def load(cls, law_year):
+        return cls(STRUCTURE_PATH.format(year=law_year))
+
+    def close(self):
+        if getattr(self, '_mm', None) is not None:
+            self._mm.close()
+            self._mm = None
+        if getattr(self, '_file', None) is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __contains__(self, node_id):
+        return node_id in self.nodes
+
+    def nodes_of_type(self, node_type):
+        """Các nút một loại theo thứ tự xuất hiện trong văn bản."""
+        return sorted((node for node in self.nodes.values() if node['type'] == node_type),
+                      key=lambda node: node['start'])
+
+    def articles(self):
+        return self.nodes_of_type('dieu')
+
+    def children(self, node_id):
+        return sorted((node for node in self.nodes.values() if node['parent'] == node_id),
+                      key=lambda node: node['start'])
+
+    def text(self, node_id):
+        """Văn bản gốc của một nút (kể cả dòng tiêu đề)."""
+        node = self.nodes[node_id]
+        return self._mm[node['byte_start']:node['byte_end']].decode('utf-8')
+
+    def article_text(self, law_id):
+        """
+        Nội dung điều luật dạng "Điều N.\n\n<nội dung>" (như các file chunks_20xx trước đây), None nếu không có.
+        """
+        if law_id not in self.nodes:
+            return None
+        content = _ARTICLE_PREFIX_PATTERN.sub('', self.text(law_id), count=1).strip()
+        return f"Điều {self.nodes[law_id]['number']}.\n\n{content}"
+
+    def iter_article_texts(self):
+        """(id điều luật, nội dung) của mọi điều luật theo thứ tự."""
+        for node in self.articles():
+            yield node['id'], self.article_text(node['id'])
+
+
+def load_article_documents(years=LAW_YEARS) -> list[tuple[str, str]]:
+    """Nội dung mọi điều luật của các năm (theo thứ tự năm, rồi thứ tự điều). Trả về danh sách (id, nội dung)."""
+    documents = []
+    for year in years:
+        with LawStructure.load(year) as structure:
+            documents.extend(structure.iter_article_texts())
+    return documents
+
+
+
+def copy_law_structure(law_year, output_dir, max_articles=None):
+    """
+    Sao chép văn bản đầy đủ và file cấu trúc của một luật vào output_dir (ví dụ thư mục làm việc của benchmark),
+    chỉ giữ max_articles điều luật đầu tiên cùng các khoản / điểm của chúng (None: giữ tất cả).
+    """
+    text_path = FULL_TEXT_PATH.format(year=law_year)
+    shutil.copy(text_path, os.path.join(output_dir, text_path))
+    with LawStructure.load(law_year) as structure:
+        kept = {node['id'] for node in structure.articles()[:max_articles]}
+        nodes = [node for node in structure.nodes.values()
+                 if node['id'] in kept or node['id'].split('_khoan_')[0] in kept]
+        # Văn bản nguồn nằm cạnh file cấu trúc trong output_dir
+        nodes.append(dict(structure.root, source=text_path))
+    with open(os.path.join(output_dir, STRUCTURE_PATH.format(year=law_year)), 'w', encoding='utf-8') as f:
+        for node in nodes:
+            f.write(json.dumps(node, ensure_ascii=False, separators=(',', ':')) + "\n")
+
+
+# --- Ví dụ sử dụng và kiểm tra ---
+if __name__ == '__main__':
+    for year in (2024, 2013):
+        print(f"Luật {year}: {build_law_structure(year)} -> {STRUCTURE_PATH.format(year=year)}")
+    with LawStructure.load(2024) as structure:
+        print(structure.article_text('dieu_11_2024')[:200])
+        print([node['id'] for node in structure.children('dieu_3_2024')][:5])
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Các hàm tiện ích xử lý văn bản điều luật: tách khoản (clause) và tách âm tiết.
+
+Nội dung một điều luật (law_structure.LawStructure.article_text) có dạng:
+    Điều 10.
+
+    Xác định loại đất
+    1. Việc xác định loại đất dựa trên ...
+    a) Giấy chứng nhận ...
+    2. Đối với trường hợp ...
+Phần trước khoản đầu tiên được coi là tiêu đề (số hiệu + tên điều luật).
+"""
+import re
+
+# Dòng bắt đầu một khoản: "1. ", "12. "
+CLAUSE_START_PATTERN = re.compile(r'^\s*(\d{1,3})\.\s+(?=\S)', re.MULTILINE)
+# Dòng bắt đầu một điểm trong khoản: "a) ", "đ) "
+POINT_START_PATTERN = re.compile(r'^\s*([a-zđ])\)\s+(?=\S)', re.MULTILINE)
+# Âm tiết tiếng Việt / số (bỏ dấu câu)
+_SYLLABLE_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def split_clauses(content: str):
+    """
+    Tách nội dung điều luật thành tiêu đề và danh sách các khoản.
+
+    Returns:
+        tuple (header, clauses): header là phần trước khoản đầu tiên,
+        clauses là danh sách chuỗi, mỗi chuỗi là một khoản (kèm các điểm a, b, c... bên trong).
+        Nếu điều luật không chia khoản, header rỗng và clauses là [toàn bộ nội dung].
+    """
+    if not content:
+        return "", []
+
+    # Chỉ nhận các khoản đánh số tăng dần liên tục từ 1, để tránh nhầm với các dòng
+    # bắt đầu bằng số trong nội dung (ví dụ ngày tháng, số liệu bị xuống dòng)
+    clause_starts = []
+    expected = 1
+    for m in CLAUSE_START_PATTERN.finditer(content):
+        if int(m.group(1)) == expected:
+            clause_starts.append(m.start())
+            expected += 1
+    if not clause_starts:
+        return "", [content.strip()]
+
+    header = content[:clause_starts[0]].strip()
+    bounds = clause_starts + [len(content)]
+    clauses = [content[bounds[i]:bounds[i + 1]].strip() for i in range(len(clause_starts))]
+    return header, [c for c in clauses if c]
+
+
+def syllables(text: str) -> list[str]:
+    """Tách văn bản thành danh sách âm tiết viết thường (bỏ dấu câu)."""
+    return _SYLLABLE_PATTERN.findall(text.lower()) if text else []
+
+
+def split_points(clause: str):
+    """
+    Tách một khoản thành phần dẫn và danh sách các điểm (a), b), c)...).
+
+    Returns:
+        tuple (lead, points): lead là phần trước điểm đầu tiên (gồm số khoản),
+        points là danh sách (ký hiệu điểm, nội dung điểm). Nếu khoản không chia điểm, points rỗng.
+    """
+    points = [(m.group(1), m.start()) for m in POINT_START_PATTERN.finditer(clause)]
+    # Các điểm phải bắt đầu từ 'a', tránh nhầm với dòng bị xuống dòng trong câu
+    if not points or points[0][0] != 'a':
+        return clause.strip(), []
+    lead = clause[:points[0][1]].strip()
+    bounds = [start for _, start in points] + [len(clause)]
+    return lead, [(label, clause[bounds[i]:bounds[i + 1]].strip()) for i, (label, _) in enumerate(points)]
+
+
+def split_passages(content: str, max_syllables: int = 200):
+    """
+    Tách điều luật thành các đoạn (passage) để embedding: mỗi khoản là một đoạn;
+    khoản dài hơn `max_syllables` âm tiết và có chia điểm thì mỗi điểm là một đoạn
+    (kèm phần dẫn của khoản để giữ ngữ cảnh).
+
+    Returns:
+        list các tuple (nhãn, nội dung). Nhãn theo cách trích dẫn thông dụng:
+        'K2' (khoản 2), 'K2c' (điểm c khoản 2), '' (điều luật không chia khoản).
+    """
+    _, clauses = split_clauses(content)
+    passages = []
+    for number, clause in enumerate(clauses, start=1):
+        label = f"K{number}" if len(clauses) > 1 or CLAUSE_START_PATTERN.match(clause) else ""
+        lead, points = split_points(clause)
+        if not points or len(syllables(clause)) <= max_syllables:
+            passages.append((label, clause))
+            continue
+        for point_label, point in points:
+            passages.append((f"{label}{point_label}", f"{lead}\n{point}"))
+    return passages
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Cache phản hồi LLM trên đĩa cho pipeline trích xuất offline (02_extract_entities.py, 03_extract_comparisons.py).
+
+Khóa là hash SHA-256 của (nhà cung cấp, mô hình, prompt, tham số sinh), giá trị là văn bản thô LLM trả về
+(trước khi parse JSON). llm_client.AsyncLLMClient (và qua đó llm_callers.call_gemini_api / call_openai_api)
+tra cache trước mọi lời gọi mạng. Kết quả đã parse nằm trong kho extractions/*.jsonl (extraction_store.py), nơi
+02 / 03 bỏ qua các điều luật đã có bản ghi với nội dung không đổi; khi chỉ sửa phần parse kết quả, chạy lại
+script với --overwrite để parse lại mọi điều luật mà không tốn lời gọi API nào. Khi đổi prompt / mô hình /
+tham số, khóa thay đổi nên LLM được gọi lại.
+
+Khác với caching.SqliteCache, bản ghi không bị xóa tự động (không có namespace hay giới hạn số bản ghi):
+dữ liệu này tốn tiền để tạo lại, nên chỉ được dọn bằng CLI.
+
+CLI (từ thư mục gốc của dự án):
+    python llm_cache.py stats
+    python llm_cache.py list --model gemini-2.0-flash --limit 20
+    python llm_cache.py show 3fa2c1          # tiền tố của khóa
+    python llm_cache.py prune --older-than 30 [--model gemini-2.0-flash] [--dry-run]
+    python llm_cache.py prune --unused-for 30
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "cache/llm_responses.sqlite")
+# Đặt LLM_CACHE=0 để tắt cache (mọi lời gọi đều đi qua mạng)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+PROMPT_PREVIEW_CHARS = 200
+
+
+def cache_key(provider: str, model: str, prompt: str, params: dict = None) -> str:
+    """Hash SHA-256 của (nhà cung cấp, mô hình, prompt, tham số sinh) ở dạng JSON chuẩn hóa."""
+    payload = json.dumps({'provider': provider, 'model': model, 'prompt': prompt, 'params': params or {}},
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """Bảng SQLite key -> phản hồi thô, kèm mô hình, xem trước prompt và thời điểm tạo / dùng gần nhất."""
+    def __init__(self, path: str = LLM_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # check_same_thread=False: kết nối được dùng chung giữa các luồng, được bảo vệ bởi self._lock
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            "  key TEXT PRIMARY KEY, provider TEXT NOT NULL, model TEXT NOT NULL, params TEXT NOT NULL,"
+            "  prompt_chars INTEGER NOT NULL, prompt_preview TEXT NOT NULL, response TEXT NOT NULL,"
+            "  created REAL NOT NULL, last_access REAL NOT NULL, hit_count INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def get(self, key: str):
+        """Trả về phản hồi đã cache, hoặc None nếu không có."""
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_access = ?, hit_count = hit_count + 1 WHERE key = ?",
+                               (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, provider: str, model: str, prompt: str, params: dict, response: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses "
+                "(key, provider, model, params, prompt_chars, prompt_preview, response, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, json.dumps(params or {}, ensure_ascii=False, sort_keys=True),
+                 len(prompt), prompt[:PROMPT_PREVIEW_CHARS], response, now, now)
+            )
+
+    def entries(self, model: str = None, limit: int = 50) -> list[dict]:
+        """Các bản ghi mới nhất (không kèm phản hồi đầy đủ), lọc theo mô hình nếu có."""
+        query = ("SELECT key, provider, model, prompt_chars, length(response), created, last_access, hit_count, "
+                 "prompt_preview FROM llm_responses")
+        args = []
+        if model:
+            query += " WHERE model = ?"
+            args.append(model)
+        query += " ORDER BY created DESC LIMIT ?"
+        args.append(limit)
+        columns = ['key', 'provider', 'model', 'prompt_chars', 'response_chars', 'created', 'last_access',
+                   'hit_count', 'prompt_preview']
+        with self._lock:
+            return [dict(zip(columns, row)) for row in self._conn.execute(query, args).fetchall()]
+
+    def find(self, key_prefix: str) -> list[dict]:
+        """Các bản ghi đầy đủ có khóa bắt đầu bằng key_prefix."""
+        columns = ['key', 'provider', 'model', 'params', 'prompt_chars', 'prompt_preview', 'response',
+                   'created', 'last_access', 'hit_count']
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(columns)} FROM llm_responses WHERE key LIKE ?",
+                                      (key_prefix + '%',)).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def prune(self, older_than_days: float = None, unused_for_days: float = None, model: str = None,
+              dry_run: bool = False) -> int:
+        """
+        Xóa các bản ghi tạo trước older_than_days ngày và / hoặc không được dùng trong unused_for_days ngày,
+        lọc theo mô hình nếu có. Không truyền điều kiện nào thì xóa tất cả (của mô hình đó).
+
+        Returns:
+            Số bản ghi đã xóa (hoặc sẽ bị xóa nếu dry_run).
+        """
+        conditions, args = [], []
+        now = time.time()
+        if older_than_days is not None:
+            conditions.append("created < ?")
+            args.append(now - older_than_days * 86400)
+        if unused_for_days is not None:
+            conditions.append("last_access < ?")
+            args.append(now - unused_for_days * 86400)
+        if model:
+            conditions.append("model = ?")
+            args.append(model)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            if dry_run:
+                return self._conn.execute(f"SELECT COUNT(*) FROM llm_responses{where}", args).fetchone()[0]
+            deleted = self._conn.execute(f"DELETE FROM llm_responses{where}", args).rowcount
+            if deleted:
+                self._conn.execute("VACUUM")
+            return deleted
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        """Số bản ghi theo mô hình, dung lượng file và hits / misses của tiến trình hiện tại."""
+        with self._lock:
+            by_model = self._conn.execute(
+                "SELECT provider, model, COUNT(*), SUM(length(response)), SUM(hit_count) "
+                "FROM llm_responses GROUP BY provider, model").fetchall()
+        return {
+            'path': self.path,
+            'size_mb': round(os.path.getsize(self.path) / 2 ** 20, 2) if os.path.exists(self.path) else 0.0,
+            'entries': sum(row[2] for row in by_model),
+            'models': {f"{provider}/{model}": {'entries': count, 'response_chars': chars, 'hits': hits}
+                       for provider, model, count, chars, hits in by_model},
+            'hits': self.hits, 'misses': self.misses,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Cache dùng chung của tiến trình tại LLM_CACHE_PATH, None nếu cache bị tắt (LLM_CACHE=0)."""
+    global _default_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMResponseCache(LLM_CACHE_PATH)
+    return _default_cache
+
+
+def _format_time(timestamp: float) -> str:
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default=LLM_CACHE_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help="Số bản ghi theo mô hình và dung lượng.")
+    list_parser = commands.add_parser('list', help="Các bản ghi mới nhất.")
+    list_parser.add_argument('--model')
+    list_parser.add_argument('--limit', type=int, default=20)
+    show_parser = commands.add_parser('show', help="Xem đầy đủ một bản ghi theo tiền tố khóa.")
+    show_parser.add_argument('key_prefix')
+    prune_parser = commands.add_parser('prune', help="Xóa bản ghi theo tuổi / lần dùng cuối / mô hình.")
+    prune_parser.add_argument('--older-than', type=float, help="Tạo trước số ngày này.")
+    prune_parser.add_argument('--unused-for', type=float, help="Không được dùng trong số ngày này.")
+    prune_parser.add_argument('--model')
+    prune_parser.add_argument('--all', action='store_true', help="Cho phép xóa khi không có điều kiện nào.")
+    prune_parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    cache = LLMResponseCache(args.path)
+    if args.command == 'stats':
+        print(json.dumps(cache.stats(), ensure_ascii=False, indent=2))
+    elif args.command == 'list':
+        for entry in cache.entries(args.model, args.limit):
+            preview = " ".join(entry['prompt_preview'].split())[:80]
+            print(f"{entry['key'][:12]}  {entry['model']:<20} {_format_time(entry['created'])}  "
+                  f"prompt {entry['prompt_chars']:>7} ký tự, phản hồi {entry['response_chars']:>6} ký tự, "
+                  f"{entry['hit_count']} hit  | {preview}")
+    elif args.command == 'show':
+        matches = cache.find(args.key_prefix)
+        if len(matches) != 1:
+            print(f"Có {len(matches)} bản ghi khớp tiền tố '{args.key_prefix}'.")
+            for entry in matches[:10]:
+                print(f"  {entry['key']}")
+            return
+        entry = matches[0]
+        for field in ('key', 'provider', 'model', 'params', 'prompt_chars', 'hit_count'):
+            print(f"{field}: {entry[field]}")
+        print(f"created: {_format_time(entry['created'])}, last_access: {_format_time(entry['last_access'])}")
+        print(f"\n--- Prompt (đầu) ---\n{entry['prompt_preview']}\n\n--- Phản hồi ---\n{entry['response']}")
+    elif args.command == 'prune':
+        if args.older_than is None and args.unused_for is None and not args.model and not args.all:
+            parser.error("prune cần --older-than, --unused-for, --model hoặc --all")
+        count = cache.prune(args.older_than, args.unused_for, args.model, dry_run=args.dry_run)
+        print(f"{'Sẽ xóa' if args.dry_run else 'Đã xóa'} {count} bản ghi.")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@ import time
 from dotenv import load_dotenv
 import google.generativeai as genai
 import openai
+from llm_client import generate_sync, stream_sync
 
 # Tải các biến môi trường từ file .env
 load_dotenv()
@@ -36,52 +37,59 @@ else:
 def call_gemini_api(prompt: str) -> str:
     """
     Gửi một prompt đến Google Gemini API và trả về kết quả dạng text.
-    Bao gồm xử lý lỗi cơ bản và thử lại.
+    Đi qua llm_client: tra cache phản hồi trên đĩa trước (llm_cache.py), dùng chung pool kết nối
+    và giới hạn quota với mọi luồng khác, thử lại với backoff + jitter (tôn trọng Retry-After).
     """
-    if not gemini_model:
+    if not GOOGLE_API_KEY:
         raise ValueError("Gemini API key chưa được cấu hình.")
-    
-    retries = 3
-    for i in range(retries):
-        try:
-            response = gemini_model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            print(f"Lỗi khi gọi Gemini API (lần {i+1}/{retries}): {e}")
-            if i < retries - 1:
-                print("Đang thử lại sau 5 giây...")
-                time.sleep(5)
-            else:
-                print("Không thể kết nối đến Gemini API sau nhiều lần thử.")
-                raise  # Ném lại lỗi sau khi đã thử hết số lần
+    return generate_sync(prompt, provider='gemini')
 
 def call_openai_api(prompt: str, model: str = "gpt-3.5-turbo") -> str:
     """
-    Gửi một prompt đến OpenAI API (ChatCompletion) và trả về kết quả dạng text.
-    Bao gồm xử lý lỗi cơ bản và thử lại.
+    Gửi một prompt đến OpenAI API (Chat Completions) và trả về kết quả dạng text.
+    Đi qua llm_client như call_gemini_api.
     """
     if not OPENAI_API_KEY:
         raise ValueError("OpenAI API key chưa được cấu hình.")
+    return generate_sync(prompt, provider='openai', model=model)
 
-    retries = 3
-    for i in range(retries):
-        try:
-            response = openai.ChatCompletion.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful legal assistant."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.choices[0].message['content'].strip()
-        except Exception as e:
-            print(f"Lỗi khi gọi OpenAI API (lần {i+1}/{retries}): {e}")
-            if i < retries - 1:
-                print("Đang thử lại sau 5 giây...")
-                time.sleep(5)
-            else:
-                print("Không thể kết nối đến OpenAI API sau nhiều lần thử.")
-                raise
+def _timed_stream(name: str, chunks):
+    """
+    Bọc một generator các đoạn văn bản để ghi lại thời gian đến token đầu tiên (TTFT)
+    và tổng thời gian sinh câu trả lời.
+    """
+    start = time.perf_counter()
+    first_token_time = None
+    num_chars = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if first_token_time is None:
+            first_token_time = time.perf_counter() - start
+        num_chars += len(chunk)
+        yield chunk
+    total_time = time.perf_counter() - start
+    ttft = f"{first_token_time:.2f}s" if first_token_time is not None else "không có token"
+    print(f"[LLM] {name}: TTFT {ttft}, tổng {total_time:.2f}s, {num_chars} ký tự")
+
+
+def stream_gemini_api(prompt: str):
+    """
+    Giống call_gemini_api nhưng trả về generator các đoạn văn bản ngay khi Gemini sinh ra,
+    để giao diện hiển thị dần câu trả lời (ví dụ st.write_stream).
+    Đi qua llm_client như call_gemini_api (cùng quota, backoff và cache); chỉ thử lại khi chưa nhận được
+    token nào, vì phần đã hiển thị không thể rút lại.
+    """
+    if not GOOGLE_API_KEY:
+        raise ValueError("Gemini API key chưa được cấu hình.")
+    return _timed_stream("Gemini", stream_sync(prompt, provider='gemini'))
+
+
+def stream_openai_api(prompt: str, model: str = "gpt-3.5-turbo"):
+    """Giống call_openai_api nhưng trả về generator các đoạn văn bản (stream=True)."""
+    if not OPENAI_API_KEY:
+        raise ValueError("OpenAI API key chưa được cấu hình.")
+    return _timed_stream(f"OpenAI ({model})", stream_sync(prompt, provider='openai', model=model))
 
 # Test file này một cách độc lập
 if __name__ == '__main__':
@@ -93,6 +101,10 @@ if __name__ == '__main__':
             print("--- Testing Gemini ---")
             gemini_response = call_gemini_api(test_prompt)
             print(f"Gemini response: {gemini_response}")
+            print("--- Testing Gemini (streaming) ---")
+            for chunk in stream_gemini_api(test_prompt):
+                print(chunk, end="", flush=True)
+            print()
         except Exception as e:
             print(f"Lỗi test Gemini: {e}")
 
@@ -102,5 +114,9 @@ if __name__ == '__main__':
             print("\n--- Testing OpenAI (gpt-3.5-turbo) ---")
             openai_response = call_openai_api(test_prompt)
             print(f"OpenAI response: {openai_response}")
+            print("\n--- Testing OpenAI (streaming) ---")
+            for chunk in stream_openai_api(test_prompt):
+                print(chunk, end="", flush=True)
+            print()
         except Exception as e:
             print(f"Lỗi test OpenAI: {e}")
\ No newline at end of file
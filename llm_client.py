@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+"""
+Client LLM bất đồng bộ (asyncio + httpx) cho Gemini và OpenAI.
+
+    - Một httpx.AsyncClient dùng chung, các request tái sử dụng kết nối trong pool.
+    - Giới hạn tốc độ bằng token bucket theo quota của từng nhà cung cấp: số request / phút và
+      số token / phút. Request chỉ được gửi khi còn quota, nên thông lượng bám sát quota mà không
+      gây ra hàng loạt lỗi 429.
+    - Thử lại với exponential backoff + jitter cho lỗi 429 / 5xx / lỗi mạng; nếu server trả về
+      Retry-After (hoặc retryDelay trong body lỗi của Gemini), chờ ít nhất khoảng đó và tạm dừng
+      mọi request khác của cùng nhà cung cấp.
+    - stream(): như generate() nhưng trả về từng đoạn văn bản ngay khi mô hình sinh ra (SSE), đi qua cùng
+      limiter và backoff; chỉ thử lại khi chưa nhận được token nào.
+    - generate_sync() / stream_sync(): hàm đồng bộ cho code cũ (llm_callers.call_* / stream_*), chạy
+      trên một event loop nền dùng chung, nên các luồng khác nhau vẫn chung pool kết nối và limiter.
+    - Phản hồi được cache trên đĩa theo hash(mô hình, prompt, tham số) (llm_cache.py): chạy lại pipeline
+      với cùng prompt không tốn lời gọi API.
+
+Quota cấu hình qua biến môi trường (xem các hằng số bên dưới) cho khớp với tài khoản đang dùng.
+
+Ví dụ dùng trong script bất đồng bộ:
+
+    async with AsyncLLMClient() as client:
+        texts = await asyncio.gather(*(client.generate(p) for p in prompts))
+"""
+import asyncio
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+import httpx
+from dotenv import load_dotenv
+
+from llm_cache import cache_key, get_default_cache
+
+load_dotenv()
+
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+GEMINI_MODEL_NAME = 'gemini-2.0-flash'
+OPENAI_MODEL_NAME = 'gpt-3.5-turbo'
+# Có thể trỏ tới server giả lập / proxy (xem benchmarks/fake_llm_server.py)
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com")
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://api.openai.com")
+
+# --- Quota (mặc định: gói miễn phí của gemini-2.0-flash, tier 1 của OpenAI) ---
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", 15))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", 1_000_000))
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", 500))
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", 200_000))
+# Phần quota được phép dùng dồn ngay lập tức; phần còn lại được cấp đều trong phút,
+# để trong bất kỳ cửa sổ 60 giây nào cũng không vượt quá quota
+LIMITER_BURST_FRACTION = 0.1
+
+# --- Kết nối và thử lại ---
+LLM_MAX_CONNECTIONS = 20
+LLM_TIMEOUT = 300
+LLM_MAX_RETRIES = 6
+LLM_BACKOFF_BASE = 1.0
+LLM_BACKOFF_MAX = 60.0
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# Lỗi mạng tạm thời (không gồm lỗi tạo request như header không hợp lệ)
+RETRYABLE_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+# Số token đầu ra dự tính khi không truyền max_output_tokens (dùng để giữ chỗ quota token)
+DEFAULT_OUTPUT_TOKENS = 1024
+
+
+class LLMAPIError(Exception):
+    """Lỗi từ API LLM (status HTTP khác 200 hoặc đã thử lại hết số lần)."""
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def estimate_tokens(text: str) -> int:
+    """Ước lượng số token (tiếng Việt có dấu ~3 ký tự / token), dùng để giữ chỗ quota trước khi gửi."""
+    return len(text) // 3 + 1
+
+
+def parse_retry_after(value) -> float:
+    """Giá trị header Retry-After (số giây hoặc HTTP-date) -> số giây, None nếu không đọc được."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: float = None, base: float = LLM_BACKOFF_BASE,
+                  cap: float = LLM_BACKOFF_MAX) -> float:
+    """Exponential backoff với full jitter; không ngắn hơn Retry-After của server."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    return max(delay, retry_after) if retry_after is not None else delay
+
+
+class TokenBucket:
+    """
+    Token bucket cấp `per_minute` đơn vị mỗi phút: tối đa LIMITER_BURST_FRACTION quota được dùng
+    dồn, phần còn lại được cấp đều. Một yêu cầu lớn hơn dung lượng bucket được phép khi bucket đầy
+    (bucket âm, các yêu cầu sau phải chờ bù lại).
+    """
+    def __init__(self, per_minute: float, burst_fraction: float = LIMITER_BURST_FRACTION):
+        self.capacity = max(1.0, per_minute * burst_fraction)
+        self.rate = per_minute * (1 - burst_fraction) / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Số giây cần chờ đến khi lấy được `amount` đơn vị."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def consume(self, amount: float):
+        self.level -= amount
+
+    def adjust(self, delta: float):
+        """Điều chỉnh sau khi biết số lượng thực tế (delta > 0: đã dùng nhiều hơn dự tính)."""
+        self.level = min(self.capacity, self.level - delta)
+
+
+class RateLimiter:
+    """Giới hạn đồng thời theo request / phút và token / phút của một nhà cung cấp."""
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int = None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.paused_until = 0.0
+        self._lock = None
+
+    async def acquire(self, tokens: int):
+        """Chờ đến khi đủ quota cho một request dùng `tokens` token (các request được phục vụ theo thứ tự)."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = max(self.paused_until - now, self.requests.wait_time(1, now),
+                           self.tokens.wait_time(tokens, now) if self.tokens else 0.0)
+                if wait <= 0:
+                    self.requests.consume(1)
+                    if self.tokens:
+                        self.tokens.consume(tokens)
+                    return
+                await asyncio.sleep(wait)
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        if self.tokens and actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def pause(self, seconds: float):
+        """Tạm dừng mọi request của nhà cung cấp này (sau khi bị 429)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def _gemini_request(model: str, prompt: str, params: dict, stream: bool = False):
+    if stream:
+        url = f"{GEMINI_API_BASE}/v1beta/models/{model}:streamGenerateContent?alt=sse"
+    else:
+        url = f"{GEMINI_API_BASE}/v1beta/models/{model}:generateContent"
+    headers = {'x-goog-api-key': GOOGLE_API_KEY} if GOOGLE_API_KEY else {}
+    body = {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+    generation_config = {key: value for key, value in params.items() if key != 'system_prompt'}
+    if generation_config:
+        body['generationConfig'] = {'maxOutputTokens' if key == 'max_output_tokens' else key: value
+                                    for key, value in generation_config.items()}
+    return url, headers, body
+
+
+def _gemini_response(data: dict):
+    candidates = data.get('candidates') or []
+    parts = candidates[0].get('content', {}).get('parts', []) if candidates else []
+    if not parts:
+        raise LLMAPIError(f"Gemini không trả về nội dung (promptFeedback: {data.get('promptFeedback')}).")
+    return "".join(part.get('text', '') for part in parts), data.get('usageMetadata', {}).get('totalTokenCount')
+
+
+def _gemini_stream_chunk(data: dict):
+    """Một sự kiện SSE của streamGenerateContent -> (đoạn văn bản, tổng token nếu có)."""
+    candidates = data.get('candidates') or []
+    # Chunk bị chặn bởi bộ lọc an toàn không có parts
+    parts = candidates[0].get('content', {}).get('parts', []) if candidates else []
+    return "".join(part.get('text', '') for part in parts), data.get('usageMetadata', {}).get('totalTokenCount')
+
+
+def _openai_request(model: str, prompt: str, params: dict, stream: bool = False):
+    url = f"{OPENAI_API_BASE}/v1/chat/completions"
+    headers = {'Authorization': f"Bearer {OPENAI_API_KEY}"} if OPENAI_API_KEY else {}
+    body = {
+        'model': model,
+        'messages': [
+            {"role": "system", "content": params.get('system_prompt', "You are a helpful legal assistant.")},
+            {"role": "user", "content": prompt}
+        ],
+    }
+    for key, value in params.items():
+        if key == 'max_output_tokens':
+            body['max_tokens'] = value
+        elif key != 'system_prompt':
+            body[key] = value
+    if stream:
+        body['stream'] = True
+    return url, headers, body
+
+
+def _openai_response(data: dict):
+    return data['choices'][0]['message']['content'].strip(), data.get('usage', {}).get('total_tokens')
+
+
+def _openai_stream_chunk(data: dict):
+    choices = data.get('choices') or []
+    text = (choices[0].get('delta', {}).get('content') or '') if choices else ''
+    return text, (data.get('usage') or {}).get('total_tokens')
+
+
+# provider -> (mô hình mặc định, tạo request, đọc phản hồi, đọc một sự kiện của luồng phản hồi)
+PROVIDERS = {
+    'gemini': (GEMINI_MODEL_NAME, _gemini_request, _gemini_response, _gemini_stream_chunk),
+    'openai': (OPENAI_MODEL_NAME, _openai_request, _openai_response, _openai_stream_chunk),
+}
+
+
+async def _sse_events(response):
+    """Các sự kiện `data: {...}` (JSON) của một phản hồi text/event-stream; OpenAI kết thúc bằng `data: [DONE]`."""
+    async for line in response.aiter_lines():
+        if not line.startswith('data:'):
+            continue
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            return
+        if data:
+            yield json.loads(data)
+
+
+def _retry_delay_from_body(response) -> float:
+    """Gemini trả thời gian chờ trong body lỗi 429: error.details[].retryDelay = '27s'."""
+    try:
+        for detail in response.json().get('error', {}).get('details', []):
+            if str(detail.get('retryDelay', '')).endswith('s'):
+                return float(detail['retryDelay'][:-1])
+    except (ValueError, AttributeError):
+        pass
+    return None
+
+
+class AsyncLLMClient:
+    """
+    Client bất đồng bộ dùng chung pool kết nối và limiter cho mọi request.
+    Phải được dùng trong cùng một event loop (httpx.AsyncClient gắn với loop tạo ra nó).
+
+    Phản hồi được tra / ghi vào cache trên đĩa (llm_cache.py) trước mọi lời gọi mạng; truyền
+    use_cache=False (hoặc đặt LLM_CACHE=0) để luôn gọi API.
+    """
+    def __init__(self, max_connections: int = LLM_MAX_CONNECTIONS, timeout: float = LLM_TIMEOUT,
+                 max_retries: int = LLM_MAX_RETRIES, limiters: dict = None, cache=None, use_cache: bool = True):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.limiters = limiters or {
+            'gemini': RateLimiter(GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE),
+            'openai': RateLimiter(OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE),
+        }
+        self.cache = (cache or get_default_cache()) if use_cache else None
+        self.stats = Counter()
+        self._http = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections))
+        return self._http
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+        return False
+
+    async def generate(self, prompt: str, provider: str = 'gemini', model: str = None, **params) -> str:
+        """
+        Gửi prompt và trả về văn bản kết quả.
+
+        Args:
+            provider: 'gemini' hoặc 'openai'.
+            model: Tên mô hình (mặc định GEMINI_MODEL_NAME / OPENAI_MODEL_NAME).
+            params: Tham số sinh (temperature, max_output_tokens, ...) và system_prompt (OpenAI).
+        """
+        default_model, build_request, parse_response, _ = PROVIDERS[provider]
+        model = model or default_model
+        if self.cache is not None:
+            key = cache_key(provider, model, prompt, params)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                return cached
+        url, headers, body = build_request(model, prompt, params)
+        limiter = self.limiters[provider]
+        estimated_tokens = estimate_tokens(prompt) + params.get('max_output_tokens', DEFAULT_OUTPUT_TOKENS)
+
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire(estimated_tokens)
+            self.stats['requests'] += 1
+            retry_after = None
+            try:
+                response = await self.http.post(url, headers=headers, json=body)
+            except RETRYABLE_ERRORS as e:
+                self.stats['transport_errors'] += 1
+                error = LLMAPIError(f"Lỗi kết nối {provider}: {e!r}")
+            else:
+                if response.status_code == 200:
+                    text, used_tokens = parse_response(response.json())
+                    limiter.reconcile(estimated_tokens, used_tokens)
+                    if self.cache is not None:
+                        self.cache.put(key, provider, model, prompt, params, text)
+                    return text
+                error, retry_after = self._error_response(provider, limiter, response, attempt)
+            await self._wait_before_retry(error, attempt, retry_after)
+
+    async def stream(self, prompt: str, provider: str = 'gemini', model: str = None, **params):
+        """
+        Như generate() nhưng là async generator trả về từng đoạn văn bản ngay khi mô hình sinh ra.
+
+        Mỗi lần mở luồng đi qua cùng limiter, thử lại với backoff và tôn trọng Retry-After / 429 như generate(),
+        nhưng chỉ khi chưa nhận được token nào: lỗi xảy ra giữa chừng được ném ra (phần đã hiển thị không thể
+        rút lại). Câu trả lời đầy đủ được ghi vào cache; nếu trúng cache, cả câu trả lời được trả về một lần.
+        """
+        default_model, build_request, _, parse_chunk = PROVIDERS[provider]
+        model = model or default_model
+        if self.cache is not None:
+            key = cache_key(provider, model, prompt, params)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                yield cached
+                return
+        url, headers, body = build_request(model, prompt, params, stream=True)
+        limiter = self.limiters[provider]
+        estimated_tokens = estimate_tokens(prompt) + params.get('max_output_tokens', DEFAULT_OUTPUT_TOKENS)
+
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire(estimated_tokens)
+            self.stats['requests'] += 1
+            retry_after = None
+            parts = []
+            try:
+                async with self.http.stream('POST', url, headers=headers, json=body) as response:
+                    if response.status_code == 200:
+                        used_tokens = None
+                        async for event in _sse_events(response):
+                            text, tokens = parse_chunk(event)
+                            used_tokens = tokens if tokens is not None else used_tokens
+                            if text:
+                                parts.append(text)
+                                yield text
+                        limiter.reconcile(estimated_tokens, used_tokens)
+                        if self.cache is not None and parts:
+                            self.cache.put(key, provider, model, prompt, params, "".join(parts))
+                        return
+                    await response.aread()
+                    error, retry_after = self._error_response(provider, limiter, response, attempt)
+            except RETRYABLE_ERRORS as e:
+                if parts:
+                    raise LLMAPIError(f"Luồng phản hồi {provider} bị ngắt giữa chừng: {e!r}") from e
+                self.stats['transport_errors'] += 1
+                error = LLMAPIError(f"Lỗi kết nối {provider}: {e!r}")
+            await self._wait_before_retry(error, attempt, retry_after)
+
+    def _error_response(self, provider: str, limiter: RateLimiter, response, attempt: int):
+        """
+        Phản hồi lỗi -> (LLMAPIError, retry_after); ném lỗi ngay nếu không nên thử lại. Lỗi 429 tạm dừng
+        mọi request của nhà cung cấp trong khoảng Retry-After (hoặc một khoảng backoff).
+        """
+        error = LLMAPIError(f"{provider} trả về HTTP {response.status_code}: {response.text[:300]}",
+                            response.status_code)
+        if response.status_code not in RETRYABLE_STATUS:
+            raise error
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if retry_after is None:
+            retry_after = _retry_delay_from_body(response)
+        if response.status_code == 429:
+            self.stats['rate_limited'] += 1
+            limiter.pause(retry_after if retry_after is not None else backoff_delay(attempt))
+        else:
+            self.stats['server_errors'] += 1
+        return error, retry_after
+
+    async def _wait_before_retry(self, error: LLMAPIError, attempt: int, retry_after: float = None):
+        """Chờ backoff trước lần thử tiếp theo; ném `error` nếu đã hết số lần thử."""
+        if attempt == self.max_retries:
+            raise error
+        delay = backoff_delay(attempt, retry_after)
+        self.stats['retries'] += 1
+        print(f"{error} -> thử lại sau {delay:.1f}s (lần {attempt + 1}/{self.max_retries})")
+        await asyncio.sleep(delay)
+
+
+# --- Cầu nối đồng bộ: một event loop nền và một client dùng chung cho cả tiến trình ---
+_background_loop = None
+_background_client = None
+_background_lock = threading.Lock()
+
+
+def _get_background_client():
+    global _background_loop, _background_client
+    with _background_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, name="llm-client-loop", daemon=True).start()
+            _background_client = AsyncLLMClient()
+    return _background_loop, _background_client
+
+
+def generate_sync(prompt: str, provider: str = 'gemini', model: str = None, **params) -> str:
+    """
+    Phiên bản đồng bộ của AsyncLLMClient.generate, an toàn khi gọi từ nhiều luồng: mọi lời gọi chạy
+    trên cùng một event loop nền nên dùng chung pool kết nối và quota.
+    """
+    loop, client = _get_background_client()
+    return asyncio.run_coroutine_threadsafe(client.generate(prompt, provider, model, **params), loop).result()
+
+
+def stream_sync(prompt: str, provider: str = 'gemini', model: str = None, **params):
+    """
+    Phiên bản đồng bộ của AsyncLLMClient.stream: generator các đoạn văn bản, mỗi đoạn được lấy từ luồng
+    chạy trên event loop nền (dùng chung pool kết nối, quota và backoff với generate_sync).
+    """
+    loop, client = _get_background_client()
+    chunks = client.stream(prompt, provider, model, **params)
+    try:
+        while True:
+            try:
+                chunk = asyncio.run_coroutine_threadsafe(chunks.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        # Người dùng dừng đọc giữa chừng: đóng luồng (và kết nối HTTP) trên event loop nền
+        asyncio.run_coroutine_threadsafe(chunks.aclose(), loop).result()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Chuẩn hóa ID / label / tên thuộc tính dùng chung cho các bước tạo CSV (04_2, 04_3) và gộp đồ thị (04a_2).
+
+Mỗi chuỗi khác nhau chỉ được chuẩn hóa (unidecode + regex) một lần trong một tiến trình:
+    - Các hàm cho từng giá trị (normalize_id, normalize_label, normalize_string) ghi nhớ kết quả theo chuỗi đầu vào,
+      nên tên thuộc tính / label lặp lại ở mọi thực thể và ID xuất hiện ở cả Node lẫn Edge chỉ tốn một lần.
+    - map_unique áp một hàm lên một cột pandas theo các giá trị phân biệt (pd.factorize, như mã của kiểu
+      category) rồi trải kết quả về các dòng bằng một phép lấy theo chỉ số NumPy, thay cho `.apply` từng dòng.
+
+Kết quả giống hệt các hàm cũ trong từng script; kiểm tra và đo bằng benchmarks/bench_normalization.py.
+"""
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from unidecode import unidecode
+
+_NON_ALNUM_PATTERN = re.compile(r'[^a-zA-Z0-9]+')
+_ID_SEPARATOR_PATTERN = re.compile(r'[\s\W]+')
+_LABEL_SEPARATOR_PATTERN = re.compile(r'[\s_-]+')
+
+
+@lru_cache(maxsize=None)
+def _normalize_string(s: str, case: str) -> str:
+    s = _NON_ALNUM_PATTERN.sub('_', unidecode(s.strip())).strip('_')
+    if case == 'snake': return s.lower()
+    if case == 'pascal': return "".join(word.capitalize() for word in s.split('_') if word)
+    if case == 'upper': return s.upper()
+    return s
+
+
+def normalize_string(s: str, case='snake') -> str:
+    """
+    Bỏ dấu, thay các ký tự không phải chữ / số bằng '_' rồi đổi kiểu chữ (04_2_process_and_transform_to_csv.py).
+    case: 'snake' ("Hành vi" -> "hanh_vi"), 'pascal' ("HanhVi"), 'upper' ("HANH_VI"), khác: giữ nguyên.
+    """
+    if not isinstance(s, str) or not s: return ""
+    return _normalize_string(s, case)
+
+
+@lru_cache(maxsize=None)
+def _normalize_id(entity_id: str) -> str:
+    return _ID_SEPARATOR_PATTERN.sub('_', unidecode(entity_id).lower()).strip('_')
+
+
+def normalize_id(entity_id) -> str:
+    """ID nút / cạnh khi gộp đồ thị (04a_2): bỏ dấu, chữ thường, khoảng trắng / ký tự đặc biệt -> '_'."""
+    if not isinstance(entity_id, str): return ""
+    return _normalize_id(entity_id)
+
+
+@lru_cache(maxsize=None)
+def _normalize_label(label: str) -> str:
+    return "".join(word.capitalize() for word in _LABEL_SEPARATOR_PATTERN.split(unidecode(label)))
+
+
+def normalize_label(label) -> str:
+    """Label dạng PascalCase không dấu: "ĐiềuLuật" -> "Dieuluat", "hanh vi phap ly" -> "HanhViPhapLy"."""
+    if not isinstance(label, str): return "UnknownLabel"
+    return _normalize_label(label)
+
+
+def map_unique(series: pd.Series, func) -> pd.Series:
+    """
+    Tương đương series.apply(func) nhưng func chỉ được gọi một lần cho mỗi giá trị phân biệt
+    (giá trị thiếu NaN / None được gọi một lần với NaN).
+    """
+    codes, uniques = pd.factorize(series)
+    values = np.empty(len(uniques) + 1, dtype=object)
+    values[:-1] = [func(value) for value in uniques]
+    values[-1] = func(np.nan)
+    # Mã -1 (giá trị thiếu) lấy phần tử cuối
+    return pd.Series(values[codes], index=series.index, name=series.name)
+
+
+_CACHED_FUNCTIONS = {'normalize_string': _normalize_string, 'normalize_id': _normalize_id,
+                     'normalize_label': _normalize_label}
+
+
+def cache_info() -> dict:
+    """Số lần tra trúng / trượt của bộ nhớ đệm mỗi hàm chuẩn hóa."""
+    return {name: func.cache_info() for name, func in _CACHED_FUNCTIONS.items()}
+
+
+def clear_caches():
+    for func in _CACHED_FUNCTIONS.values():
+        func.cache_clear()
+
+
+# --- Ví dụ sử dụng và kiểm tra ---
+if __name__ == '__main__':
+    print(normalize_string("Hành vi pháp lý", 'pascal'), normalize_string("Thu hồi đất", 'upper'))
+    print(normalize_id("chuthe_uybanNDcấptinh"), normalize_label("Khái niệm"))
+    ids = pd.Series(["chuthe_Nhà nước", None, "chuthe_Nhà nước", "dieu_5_2024"])
+    print(map_unique(ids, normalize_id).tolist(), cache_info()['normalize_id'])
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Trích xuất văn bản PDF song song theo trang cho các script tiền xử lý (00_preprocess_pdfs_to_txt.py,
+01_preprocess_pdfs.py).
+
+    - Các trang được chia thành từng nhóm (PAGES_PER_TASK) và trích xuất trong một ProcessPoolExecutor;
+      mỗi tiến trình con tự mở file PDF (PdfReader không pickle được).
+    - clean_page_text được áp dụng cho từng trang ngay trong tiến trình con.
+    - Kết quả được lấy ra theo đúng thứ tự trang và ghi thẳng xuống đĩa (stream_pdfs_to_files), nên không
+      cần giữ cả văn bản trong bộ nhớ và không có phép nối chuỗi `text += ...` bậc hai.
+    - Nhiều file PDF (hai luật, các nghị định sau này) dùng chung một pool: các nhóm trang của mọi file được
+      gửi cùng lúc, nên trong khi file đầu đang được ghi, pool vẫn trích xuất các file sau.
+
+Kết quả giống pdf_to_text + clean_text cũ (kể cả strip() đầu / cuối văn bản), trừ một lỗi được sửa: cách cũ
+nối các trang rồi mới làm sạch, nên regex của footer "about:blank 1/159" ăn luôn chữ số đầu trang sau
+("about:blank 1/159" + "7. Chi phí..." -> ". Chi phí..."), làm mất số thứ tự khoản ở đầu trang.
+Kiểm tra bằng benchmarks/bench_pdf_extraction.py.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from PyPDF2 import PdfReader
+
+PAGES_PER_TASK = 8
+MAX_WORKERS = os.cpu_count() or 1
+
+
+def clean_page_text(text):
+    """Loại bỏ header/footer của trình duyệt khi in PDF ("about:blank 1/59", ngày giờ in) trong một trang."""
+    text = re.sub(r'about:blank\s*\d+/\d+', '', text)
+    text = re.sub(r'\d+/\d+/\d+, \d+:\d+ [AP]M', '', text)
+    return text
+
+
+def count_pages(pdf_path):
+    return len(PdfReader(pdf_path).pages)
+
+
+@lru_cache(maxsize=8)
+def _open_reader(pdf_path):
+    """Mỗi tiến trình con chỉ đọc cấu trúc của một file PDF một lần cho mọi nhóm trang của file đó."""
+    return PdfReader(pdf_path)
+
+
+def extract_page_range(pdf_path, start, end):
+    """Văn bản đã làm sạch của các trang [start, end) (chạy trong tiến trình con)."""
+    reader = _open_reader(pdf_path)
+    return [clean_page_text(reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+def _submit_pdf(executor, pdf_path, pages_per_task):
+    num_pages = count_pages(pdf_path)
+    return [executor.submit(extract_page_range, pdf_path, start, min(start + pages_per_task, num_pages))
+            for start in range(0, num_pages, pages_per_task)]
+
+
+def _iter_results(futures):
+    """Các trang theo thứ tự; mỗi nhóm được giải phóng ngay sau khi dùng."""
+    for future in futures:
+        yield from future.result()
+
+
+class StrippedWriter:
+    """Ghi các đoạn văn bản liên tiếp sao cho kết quả bằng "".join(đoạn).strip() mà không giữ cả văn bản."""
+    def __init__(self, f):
+        self.f = f
+        self.started = False
+        self.pending = ""  # khoảng trắng cuối chưa ghi (có thể là cuối văn bản)
+        self.chars = 0
+
+    def write(self, chunk):
+        if not self.started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                return
+            self.started = True
+        stripped = chunk.rstrip()
+        if stripped:
+            self.f.write(self.pending + stripped)
+            self.chars += len(self.pending) + len(stripped)
+            self.pending = chunk[len(stripped):]
+        else:
+            self.pending += chunk
+
+
+def iter_pdf_pages(pdf_path, executor=None, pages_per_task=PAGES_PER_TASK):
+    """Văn bản đã làm sạch của từng trang, theo thứ tự (trích xuất song song trong executor)."""
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as own_executor:
+            yield from _iter_results(_submit_pdf(own_executor, pdf_path, pages_per_task))
+        return
+    yield from _iter_results(_submit_pdf(executor, pdf_path, pages_per_task))
+
+
+def pdf_to_clean_text(pdf_path, executor=None):
+    """Toàn bộ văn bản đã làm sạch (tương đương clean_text(pdf_to_text(pdf_path)) cũ)."""
+    return "".join(iter_pdf_pages(pdf_path, executor)).strip()
+
+
+def pdfs_to_clean_texts(pdf_paths, max_workers=MAX_WORKERS, pages_per_task=PAGES_PER_TASK):
+    """Như pdf_to_clean_text cho nhiều file, trích xuất đồng thời trong một pool. Trả về {đường dẫn: văn bản}."""
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        submitted = {pdf_path: _submit_pdf(executor, pdf_path, pages_per_task) for pdf_path in pdf_paths}
+        return {pdf_path: "".join(_iter_results(futures)).strip() for pdf_path, futures in submitted.items()}
+
+
+def stream_pdfs_to_files(jobs, max_workers=MAX_WORKERS, pages_per_task=PAGES_PER_TASK):
+    """
+    Trích xuất nhiều PDF đồng thời trong một pool và ghi mỗi file văn bản theo thứ tự trang.
+
+    Args:
+        jobs: {đường dẫn PDF: đường dẫn file .txt đầu ra}.
+
+    Returns:
+        {đường dẫn PDF: (số trang, số ký tự đã ghi)}.
+    """
+    stats = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # Gửi tất cả các nhóm trang của mọi file trước để pool luôn có việc
+        submitted = {pdf_path: _submit_pdf(executor, pdf_path, pages_per_task) for pdf_path in jobs}
+        for pdf_path, futures in submitted.items():
+            num_pages = 0
+            with open(jobs[pdf_path], 'w', encoding='utf-8') as f:
+                writer = StrippedWriter(f)
+                for page_text in _iter_results(futures):
+                    writer.write(page_text)
+                    num_pages += 1
+            stats[pdf_path] = (num_pages, writer.chars)
+    return stats
+
+
+# --- Ví dụ sử dụng và kiểm tra ---
+if __name__ == '__main__':
+    for page_number, page_text in enumerate(iter_pdf_pages('LuatDatDai2024.pdf'), start=1):
+        if page_number <= 2:
+            print(f"--- Trang {page_number} ---\n{page_text[:300]}")
+    print(f"Tổng số trang: {page_number}")
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Các hàm tiện ích xử lý câu hỏi của người dùng, dùng chung giữa app.py và các thành phần truy xuất."""
+import re
+
+def clean_query(query: str) -> str:
+    """
+    Hàm làm sạch câu hỏi của người dùng trước khi xử lý.
+    """
+    if not isinstance(query, str):
+        return ""
+    
+    cleaned = query.lower()
+    trigger_words = [
+        "ok google", "hey siri", "alexa", "cho tôi hỏi", "cho mình hỏi", 
+        "giúp tôi với", "giải thích", "định nghĩa", "là gì", "[help]"
+    ]
+    for word in trigger_words:
+        cleaned = cleaned.replace(word, "")
+    
+    cleaned = re.sub(r'[^a-zA-Z0-9àáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ\s]', '', cleaned)
+    cleaned = " ".join(cleaned.split())
+    return cleaned.strip()
+
+
+# --- Nhận diện trích dẫn điều luật trực tiếp trong câu hỏi ---
+# "Điều 81", "khoản 3 điều 45", "điểm a khoản 2 điều 3", "K1, Đ3", "K1a, Đ176" (khoản 1 điểm a), "Điều 3, 4 và 5"
+# (các dạng viết tắt như trong bộ đánh giá)
+_ARTICLE_REFERENCE_PATTERN = re.compile(
+    r'(?<!\w)'
+    r'(?:(?:điểm|diem)\s+[a-zđ]\s*,?\s*)?'
+    r'(?:(?:khoản|khoan|k)\s*(?P<clause>\d{1,3})[a-zđ]?\s*,?\s*)?'
+    r'(?:điều|dieu|đ)\s*'
+    r'(?P<articles>\d{1,3}(?:(?:\s*(?:,|và|va)\s*|\s+)\d{1,3}(?!\d)(?!\s*(?:năm|tháng|ngày|%)))*)'
+    r'(?!\d)',
+    re.IGNORECASE)
+# "Luật 2024", "Luật Đất đai 2013", "LĐĐ 2013", "năm 2024", "2013"
+_LAW_YEAR_PATTERN = re.compile(
+    r'(?<!\w)(?:(?:luật\s+đất\s+đai|luat\s+dat\s+dai|luật|luat|lđđ|ldd|năm|nam)\s*)?(?P<year>2013|2024)(?!\d)',
+    re.IGNORECASE)
+# Dấu phẩy có thể đã bị clean_query bỏ ("Điều 3, 4 và 5" -> "điều 3 4 và 5") nên khoảng trắng cũng là dấu phân cách
+_ARTICLE_LIST_SEPARATOR_PATTERN = re.compile(r'\s*(?:,|và|va)\s*|\s+', re.IGNORECASE)
+_LAW_ID_PATTERN = re.compile(r'^dieu_(\d+)_(\d{4})$')
+# Các âm tiết không mang nội dung tìm kiếm khi đứng cạnh một trích dẫn ("Điều 81 Luật 2024 quy định gì?")
+_REFERENCE_FILLER_SYLLABLES = {
+    'theo', 'tại', 'của', 'trong', 'về', 'và', 'với', 'giữa', 'thì', 'là', 'gì', 'nào', 'như', 'thế', 'ra', 'sao',
+    'quy', 'định', 'nội', 'dung', 'nói', 'nêu', 'cho', 'biết', 'hỏi', 'tôi', 'mình', 'xem', 'tra', 'cứu', 'cụ', 'thể',
+    'luật', 'đất', 'đai', 'điều', 'khoản', 'điểm', 'so', 'sánh', 'các', 'những', 'này', 'đó', 'ở', 'bộ',
+}
+# Số âm tiết có nội dung tối thiểu để phần còn lại của câu hỏi được đưa vào tìm kiếm ngữ nghĩa
+MIN_REMAINDER_SYLLABLES = 2
+
+
+def parse_article_references(query: str):
+    """
+    Tìm các trích dẫn điều luật (điều / khoản / năm ban hành) được nêu trực tiếp trong câu hỏi.
+
+    Mỗi số hiệu điều luật được gắn với năm (2013 / 2024) xuất hiện đầu tiên sau nó, nếu không có thì năm
+    gần nhất phía trước, nếu không có nữa thì năm là None (khớp cả hai phiên bản luật).
+
+    Returns:
+        tuple (references, remainder): references là danh sách (số điều, số khoản hoặc None, năm hoặc None)
+        theo thứ tự xuất hiện; remainder là phần còn lại của câu hỏi sau khi bỏ các trích dẫn.
+    """
+    if not isinstance(query, str) or not query:
+        return [], ""
+    article_matches = list(_ARTICLE_REFERENCE_PATTERN.finditer(query))
+    if not article_matches:
+        return [], query
+    year_matches = list(_LAW_YEAR_PATTERN.finditer(query))
+
+    references = []
+    for m in article_matches:
+        year = next((int(y.group('year')) for y in year_matches if y.start() >= m.end()), None)
+        if year is None:
+            year = next((int(y.group('year')) for y in reversed(year_matches) if y.end() <= m.start()), None)
+        clause = int(m.group('clause')) if m.group('clause') else None
+        for number in _ARTICLE_LIST_SEPARATOR_PATTERN.split(m.group('articles')):
+            references.append((int(number), clause, year))
+
+    spans = sorted([m.span() for m in article_matches] + [y.span() for y in year_matches])
+    parts, position = [], 0
+    for start, end in spans:
+        if start >= position:
+            parts.append(query[position:start])
+            position = end
+    parts.append(query[position:])
+    remainder = " ".join(" ".join(parts).replace(',', ' ').split())
+    return list(dict.fromkeys(references)), remainder
+
+
+def has_search_content(text: str) -> bool:
+    """Phần còn lại của câu hỏi có đủ nội dung để tìm kiếm ngữ nghĩa hay không."""
+    words = re.findall(r'\w+', text.lower()) if text else []
+    return sum(1 for w in words if w not in _REFERENCE_FILLER_SYLLABLES and not w.isdigit()) >= MIN_REMAINDER_SYLLABLES
+
+
+def build_article_id_map(law_ids) -> dict:
+    """Bảng tra {(số điều, năm): id điều luật} từ danh sách ID dạng 'dieu_<số>_<năm>'."""
+    id_map = {}
+    for law_id in law_ids:
+        m = _LAW_ID_PATTERN.match(law_id) if law_id else None
+        if m:
+            id_map[(int(m.group(1)), int(m.group(2)))] = law_id
+    return id_map
+
+
+def resolve_article_references(references, article_id_map: dict) -> list[tuple[str, int]]:
+    """
+    Chuyển các trích dẫn từ parse_article_references thành ID điều luật có trong article_id_map.
+    Trích dẫn không ghi năm được khớp với mọi phiên bản luật có điều luật đó.
+
+    Returns:
+        Danh sách (id điều luật, số khoản hoặc None), không trùng lặp, theo thứ tự trích dẫn.
+    """
+    resolved = {}
+    years = sorted({year for _, year in article_id_map})
+    for article, clause, year in references:
+        for candidate_year in ([year] if year is not None else years):
+            law_id = article_id_map.get((article, candidate_year))
+            if law_id and law_id not in resolved:
+                resolved[law_id] = clause
+    return list(resolved.items())
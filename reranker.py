@@ -1,9 +1,77 @@
-from sentence_transformers import CrossEncoder
 import torch
+import hashlib
+import struct
+import sys
+import numpy as np
+from caching import LRUCache, SqliteCache
+from inference_backend import load_cross_encoder, INFERENCE_BACKEND
+from legal_text import split_clauses, syllables
 
 # --- Cấu hình ---
 # Chọn một mô hình Cross-Encoder được huấn luyện cho tiếng Việt
 RERANKER_MODEL_NAME = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+RERANKER_MAX_LENGTH = 512
+
+# --- Cấu hình micro-batch ---
+# Các cặp được sắp xếp theo độ dài token rồi gom thành micro-batch sao cho
+# (số cặp * độ dài cặp dài nhất trong batch) không vượt quá RERANK_MAX_BATCH_TOKENS:
+# cặp ngắn được gom thành batch lớn, cặp dài chia thành batch nhỏ, giảm token padding.
+RERANK_MAX_BATCH_TOKENS = 8192
+RERANK_MAX_BATCH_SIZE = 64
+
+# --- Cấu hình cache điểm rerank ---
+RERANK_CACHE_MEMORY_SIZE = 20000
+# Cache trên đĩa dùng chung giữa các session và worker. Đặt None để tắt.
+RERANK_CACHE_PATH = "cache/rerank_scores.sqlite"
+RERANK_CACHE_DISK_SIZE = 500000
+
+class RerankScoreCache:
+    """
+    Cache điểm Cross-Encoder cho từng cặp (câu hỏi, điều luật).
+    Khóa gồm: namespace (tên mô hình, backend suy luận và max_length), câu hỏi, ID điều luật và hash nội dung
+    điều luật, nên điểm chỉ được dùng lại cho đúng mô hình / backend / max_length đã tính ra nó, và khi điều luật
+    được nạp lại với nội dung khác thì điểm cũ tự động không còn được dùng. Trên đĩa, bản ghi còn được lọc theo
+    namespace (caching.SqliteCache) và bị dọn khi namespace không còn được dùng.
+    """
+    def __init__(self, namespace: str, memory_size: int = RERANK_CACHE_MEMORY_SIZE,
+                 disk_path: str = RERANK_CACHE_PATH, disk_size: int = RERANK_CACHE_DISK_SIZE):
+        self.namespace = namespace
+        self.memory = LRUCache(memory_size)
+        self.disk = SqliteCache(disk_path, 'rerank_scores', namespace, disk_size) if disk_path else None
+
+    def make_key(self, query: str, doc_id: str, content: str) -> str:
+        content_hash = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        return hashlib.sha1(
+            f"{self.namespace}\x1f{query.strip()}\x1f{doc_id}\x1f{content_hash}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: list[str]) -> dict:
+        found = {}
+        disk_lookup = []
+        for key in keys:
+            score = self.memory.get(key)
+            if score is not None:
+                found[key] = score
+            else:
+                disk_lookup.append(key)
+        if self.disk is not None and disk_lookup:
+            for key, blob in self.disk.get_many(disk_lookup).items():
+                score = struct.unpack('<f', blob)[0]
+                self.memory.put(key, score)
+                found[key] = score
+        return found
+
+    def put_many(self, items: dict):
+        for key, score in items.items():
+            self.memory.put(key, score)
+        if self.disk is not None:
+            self.disk.put_many({key: struct.pack('<f', score) for key, score in items.items()})
+
+    def stats(self) -> dict:
+        return {
+            'namespace': self.namespace,
+            'memory': self.memory.stats(),
+            'disk': self.disk.stats() if self.disk is not None else None,
+        }
 
 class Reranker:
     _instance = None
@@ -19,16 +87,25 @@ class Reranker:
             
         print("Đang khởi tạo Reranker (chỉ chạy một lần)...")
         try:
-            device = 'cuda' if torch.cuda.is_available() else 'cpu'
-            # Tải mô hình Cross-Encoder. 
+            device = 'cuda' if torch.cuda.is_available() and INFERENCE_BACKEND == 'torch' else 'cpu'
+            # Tải mô hình Cross-Encoder theo backend suy luận được chọn (PyTorch / ONNX / ONNX int8).
             # max_length cho phép xử lý các đoạn văn bản dài hơn.
-            self.model = CrossEncoder(RERANKER_MODEL_NAME, max_length=512, device=device)
-            print(f" -> Tải mô hình Reranker '{RERANKER_MODEL_NAME}' trên '{device}' thành công.")
+            self.model = load_cross_encoder(RERANKER_MODEL_NAME, max_length=RERANKER_MAX_LENGTH, device=device)
+            print(f" -> Tải mô hình Reranker '{RERANKER_MODEL_NAME}' (backend: {INFERENCE_BACKEND}) trên '{device}' thành công.")
         except Exception as e:
             print(f"Lỗi nghiêm trọng khi tải mô hình Reranker: {e}")
             self.model = None
             raise
 
+        self.tokens_processed = 0
+        namespace = f"{RERANKER_MODEL_NAME}[{INFERENCE_BACKEND}]@{RERANKER_MAX_LENGTH}/clause-fit"
+        try:
+            self.score_cache = RerankScoreCache(namespace, disk_path=RERANK_CACHE_PATH)
+        except Exception as e:
+            # Cache chỉ để tăng tốc, lỗi cache không được làm hỏng việc rerank
+            print(f" -> CẢNH BÁO: Không khởi tạo được cache đĩa cho Reranker ({e}), chỉ dùng cache trong bộ nhớ.")
+            self.score_cache = RerankScoreCache(namespace, disk_path=None)
+
     def rerank(self, query: str, documents: list[dict]):
         """
         Sắp xếp lại một danh sách các tài liệu dựa trên mức độ liên quan với câu hỏi.
@@ -46,23 +123,116 @@ class Reranker:
         if not self.model or not documents:
             return []
 
-        # Cross-Encoder yêu cầu một danh sách các cặp [query, document_content]
-        pairs = [[query, doc['content']] for doc in documents]
-        
-        print(f" -> Reranking {len(pairs)} tài liệu...")
-        
-        # model.predict() sẽ trả về một danh sách các điểm số
-        scores = self.model.predict(pairs, show_progress_bar=False)
+        # Tra cache trước, chỉ các cặp chưa từng được chấm điểm mới phải qua Cross-Encoder
+        keys = [self.score_cache.make_key(query, doc['id'], doc['content']) for doc in documents]
+        cached_scores = self.score_cache.get_many(keys)
+        pending = [i for i, key in enumerate(keys) if key not in cached_scores]
+
+        print(f" -> Reranking {len(documents)} tài liệu ({len(documents) - len(pending)} điểm lấy từ cache)...")
+
+        if pending:
+            scores = self.predict_scores(query, [documents[i]['content'] for i in pending])
+            new_scores = {keys[i]: float(score) for i, score in zip(pending, scores)}
+            try:
+                self.score_cache.put_many(new_scores)
+            except Exception as e:
+                print(f"CẢNH BÁO: Không ghi được cache điểm rerank: {e}", file=sys.stderr)
+            cached_scores.update(new_scores)
 
         # Gắn điểm số vào lại các tài liệu
-        for i, doc in enumerate(documents):
-            doc['rerank_score'] = scores[i]
+        for key, doc in zip(keys, documents):
+            doc['rerank_score'] = cached_scores[key]
             
         # Sắp xếp danh sách tài liệu dựa trên điểm rerank_score, từ cao đến thấp
         sorted_documents = sorted(documents, key=lambda x: x['rerank_score'], reverse=True)
         
         return sorted_documents
 
+    def predict_scores(self, query: str, contents: list[str]) -> np.ndarray:
+        """
+        Chấm điểm Cross-Encoder cho các cặp (query, content), không qua cache.
+        1. Điều luật dài hơn giới hạn token được cắt gọn: giữ tiêu đề và các khoản
+           liên quan nhất tới câu hỏi (xem _fit_to_budget).
+        2. Sắp xếp các cặp theo độ dài token và gom thành micro-batch để giảm padding.
+        3. Trả về điểm theo đúng thứ tự đầu vào.
+        """
+        if not contents:
+            return np.zeros(0, dtype='float32')
+
+        tokenizer = self.model.tokenizer
+        query_length = len(tokenizer(query, add_special_tokens=False)['input_ids'])
+        # 3 token đặc biệt cho một cặp: [CLS] query [SEP] content [SEP]
+        content_budget = max(1, RERANKER_MAX_LENGTH - query_length - 3)
+
+        texts, lengths = [], []
+        for content in contents:
+            text, content_length = self._fit_to_budget(query, content, content_budget)
+            texts.append(text)
+            lengths.append(min(RERANKER_MAX_LENGTH, query_length + content_length + 3))
+
+        order = sorted(range(len(texts)), key=lambda i: lengths[i])
+        scores = np.zeros(len(texts), dtype='float32')
+        batch = []
+        for position, i in enumerate(order):
+            batch.append(i)
+            next_length = lengths[order[position + 1]] if position + 1 < len(order) else None
+            # Đóng batch nếu thêm cặp kế tiếp (dài hơn hoặc bằng) sẽ vượt ngân sách token
+            if (next_length is None or len(batch) >= RERANK_MAX_BATCH_SIZE
+                    or (len(batch) + 1) * next_length > RERANK_MAX_BATCH_TOKENS):
+                pairs = [[query, texts[j]] for j in batch]
+                # model.predict() sẽ trả về một danh sách các điểm số
+                batch_scores = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+                scores[batch] = np.asarray(batch_scores, dtype='float32')
+                self.tokens_processed += len(batch) * lengths[batch[-1]]
+                batch = []
+        return scores
+
+    def _fit_to_budget(self, query: str, content: str, budget: int):
+        """
+        Cắt gọn một điều luật cho vừa `budget` token mà không làm mất phần liên quan:
+        giữ tiêu đề, chọn các khoản có nhiều âm tiết chung với câu hỏi nhất cho tới khi hết ngân sách,
+        rồi ghép lại theo đúng thứ tự xuất hiện trong điều luật.
+
+        Returns:
+            tuple (text, số_token_của_text).
+        """
+        tokenizer = self.model.tokenizer
+        content_length = len(tokenizer(content, add_special_tokens=False)['input_ids'])
+        if content_length <= budget:
+            return content, content_length
+
+        header, clauses = split_clauses(content)
+        if len(clauses) < 2:
+            # Không có cấu trúc khoản để chọn lọc, để tokenizer cắt phần cuối như mặc định
+            return content, budget
+        clause_lengths = [len(ids) for ids in tokenizer(clauses, add_special_tokens=False)['input_ids']]
+        header_length = len(tokenizer(header, add_special_tokens=False)['input_ids']) if header else 0
+        if header_length >= budget:
+            return content, budget
+
+        query_syllables = set(syllables(query))
+        relevance = [len(query_syllables.intersection(syllables(clause))) for clause in clauses]
+        # Ưu tiên khoản liên quan nhất; cùng mức liên quan thì ưu tiên khoản xuất hiện trước
+        ranked = sorted(range(len(clauses)), key=lambda i: (-relevance[i], i))
+
+        selected = []
+        used = header_length
+        for i in ranked:
+            if used + clause_lengths[i] + 1 <= budget:
+                selected.append(i)
+                used += clause_lengths[i] + 1
+        if not selected:
+            # Khoản liên quan nhất dài hơn ngân sách: vẫn giữ nó, phần cuối sẽ bị tokenizer cắt
+            selected = [ranked[0]]
+            used = budget
+
+        text = "\n".join(([header] if header else []) + [clauses[i] for i in sorted(selected)])
+        return text, min(used, budget)
+
+    def cache_stats(self) -> dict:
+        """Bộ đếm hits/misses/evictions của cache điểm rerank và tổng số token đã xử lý."""
+        return {**self.score_cache.stats(), 'tokens_processed': self.tokens_processed}
+
 # --- Ví dụ sử dụng ---
 if __name__ == '__main__':
     try:
@@ -1,63 +1,108 @@
 # file: retrieval_pipeline.py
 
 from semantic_retriever import SemanticRetriever
+from bm25_index import BM25Index, reciprocal_rank_fusion
 from reranker import Reranker
 from kg_connector import KGConnector
+from query_utils import parse_article_references, resolve_article_references, has_search_content
 
 class ComprehensiveRetriever:
     def __init__(self):
         # ... (phần khởi tạo giữ nguyên)
         self.kg_connector = KGConnector()
+        try:
+            self.kg_connector.ensure_schema()
+        except Exception as e:
+            # Lỗi DDL hoặc hết thời gian chờ index không chặn khởi tạo: truy vấn vẫn chạy, chỉ chậm hơn
+            print(f"Cảnh báo: Không tạo/kiểm tra được schema KG ({e}). Tiếp tục khởi tạo.")
         self.semantic_retriever = SemanticRetriever()
+        self.bm25_index = BM25Index.from_law_structures()
         self.reranker = Reranker()
 
+    def _fetch_docs(self, law_ids: list[str]) -> dict:
+        """
+        Lấy nội dung chi tiết các điều luật từ kho lưu trữ cục bộ, chỉ những ID không có trong kho
+        mới được lấy từ KG (trong một truy vấn duy nhất). Trả về {id: tài liệu}.
+        """
+        nodes, missing_ids = self.semantic_retriever.get_articles(law_ids)
+        if missing_ids:
+            kg_nodes, _ = self.kg_connector.get_nodes_by_ids(missing_ids)
+            nodes.update(kg_nodes)
+        docs = {}
+        for law_id in law_ids:
+            node_properties = nodes.get(law_id)
+            if node_properties:
+                docs[law_id] = {
+                    'id': law_id,
+                    'name': node_properties.get('name', ''),
+                    'content': f"Tên điều luật: {node_properties.get('name', '')}. Nội dung: {node_properties.get('noi_dung', '')}",
+                }
+        return docs
+
     def retrieve(self, query: str, initial_k: int = 20, final_k: int = 5):
         """
-        Thực hiện pipeline truy xuất hoàn chỉnh: Search -> Rerank.
+        Thực hiện pipeline truy xuất hoàn chỉnh: Search (ngữ nghĩa + BM25, gộp bằng RRF) -> Rerank.
+        Các điều luật được trích dẫn trực tiếp trong câu hỏi ("Điều 81 Luật 2024") được lấy thẳng theo ID,
+        đứng đầu kết quả và có rerank_score = None.
 
         Args:
             query (str): Câu hỏi của người dùng.
-            initial_k (int): Số lượng ứng viên ban đầu cần lấy từ Semantic Search.
+            initial_k (int): Số lượng ứng viên ban đầu (sau khi gộp Semantic Search và BM25).
             final_k (int): Số lượng kết quả cuối cùng sau khi đã rerank.
         """
         print(f"\n===== Bắt đầu Pipeline Truy xuất cho câu hỏi: '{query}' =====")
+
+        # --- Giai đoạn 0: Trích dẫn trực tiếp (không cần embedding / rerank) ---
+        search_query = query
+        direct_docs = []
+        references, remainder = parse_article_references(query)
+        direct_hits = resolve_article_references(references, self.semantic_retriever.article_id_map)
+        if direct_hits:
+            docs = self._fetch_docs([law_id for law_id, _ in direct_hits])
+            direct_docs = [{**docs[law_id], 'cited_clause': clause, 'rerank_score': None}
+                           for law_id, clause in direct_hits if law_id in docs]
+        if direct_docs:
+            print(f"\n[Bước 0] Trích dẫn trực tiếp: {', '.join(doc['id'] for doc in direct_docs)}")
+            if not has_search_content(remainder):
+                return direct_docs
+            search_query = remainder
+        direct_ids = {doc['id'] for doc in direct_docs}
         
         # --- Giai đoạn 1: Tìm kiếm ứng viên (Candidate Retrieval) ---
-        print(f"\n[Bước 1] Tìm kiếm ngữ nghĩa để lấy top {initial_k} ứng viên...")
+        print(f"\n[Bước 1] Tìm kiếm ngữ nghĩa và BM25 để lấy top {initial_k} ứng viên...")
         
         # *** THAY ĐỔI Ở ĐÂY ***
         # Truyền giá trị `initial_k` vào hàm search của retriever
-        candidate_ids_with_scores = self.semantic_retriever.search(query, top_k=initial_k)
+        semantic_results = self.semantic_retriever.search(search_query, top_k=initial_k)
+        lexical_results = self.bm25_index.search(search_query, top_k=initial_k)
+        # Gộp hai danh sách theo thứ hạng (Reciprocal Rank Fusion), giữ initial_k ứng viên cho Reranker
+        candidate_ids_with_scores = [(law_id, score) for law_id, score
+                                     in reciprocal_rank_fusion([semantic_results, lexical_results], limit=initial_k)
+                                     if law_id not in direct_ids]
         
         if not candidate_ids_with_scores:
-            print("Không tìm thấy ứng viên nào từ Semantic Search.")
-            return []
+            print("Không tìm thấy ứng viên nào từ Semantic Search và BM25.")
+            return direct_docs
             
         print(f" -> Tìm thấy {len(candidate_ids_with_scores)} ứng viên.")
+        semantic_scores = dict(semantic_results)
 
-        # Lấy nội dung chi tiết của các ứng viên từ KG
-        candidate_docs = []
-        for law_id, semantic_score in candidate_ids_with_scores:
-            node_properties = self.kg_connector.get_node_by_id(law_id)
-            if node_properties:
-                candidate_docs.append({
-                    'id': law_id,
-                    'name': node_properties.get('name', ''),
-                    'content': f"Tên điều luật: {node_properties.get('name', '')}. Nội dung: {node_properties.get('noi_dung', '')}",
-                    'semantic_score': semantic_score
-                })
+        docs = self._fetch_docs([law_id for law_id, _ in candidate_ids_with_scores])
+        candidate_docs = [{**docs[law_id], 'semantic_score': semantic_scores.get(law_id), 'rrf_score': rrf_score}
+                          for law_id, rrf_score in candidate_ids_with_scores if law_id in docs]
 
         # --- Giai đoạn 2: Sắp xếp lại (Reranking) ---
         print(f"\n[Bước 2] Sắp xếp lại {len(candidate_docs)} ứng viên bằng Cross-Encoder...")
-        reranked_docs = self.reranker.rerank(query, candidate_docs)
+        reranked_docs = self.reranker.rerank(search_query, candidate_docs)
 
         # *** THAY ĐỔI Ở ĐÂY ***
-        # Lấy `final_k` kết quả cuối cùng
-        final_results = reranked_docs[:final_k]
+        # Lấy `final_k` kết quả cuối cùng (sau các điều luật được trích dẫn trực tiếp)
+        final_results = direct_docs + reranked_docs[:max(final_k - len(direct_docs), 0)]
         
         print(f"\n===== Kết quả cuối cùng (Top {final_k} sau Reranking) =====")
         for doc in final_results:
-             print(f"- ID: {doc['id']}, Name: {doc['name']}, Rerank Score: {doc.get('rerank_score'):.4f}")
+             score = "trích dẫn trực tiếp" if doc.get('rerank_score') is None else f"{doc['rerank_score']:.4f}"
+             print(f"- ID: {doc['id']}, Name: {doc['name']}, Rerank Score: {score}")
              
         return final_results
         
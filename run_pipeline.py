@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+Chạy pipeline xây dựng dữ liệu offline (01_ ... 04a_) như một DAG tăng dần.
+
+    - Mỗi bước khai báo script, tham số, đầu vào và đầu ra (file hoặc thư mục). Script của bước luôn là
+      một đầu vào, nên sửa code / từ điển đồng nghĩa trong script cũng làm bước đó chạy lại.
+    - Phụ thuộc giữa các bước được suy ra từ đầu vào / đầu ra: bước B chạy sau bước A nếu B đọc file A ghi.
+    - Đầu vào được lấy dấu vân tay bằng SHA-256 nội dung (hash của từng file được ghi nhớ theo kích thước +
+      mtime, nên file không đổi không bị đọc lại). Một bước chỉ chạy lại khi dấu vân tay đầu vào khác lần
+      chạy thành công trước hoặc thiếu đầu ra. Bước trước chạy lại nhưng đầu ra giống hệt (ví dụ sửa
+      comment trong script) thì các bước sau không chạy lại.
+    - Các bước độc lập chạy song song trong các tiến trình riêng (trích xuất 2013 / 2024 và so sánh;
+      gộp Node / Edge). Các bước gọi LLM chạy đồng thời được chia đều quota GEMINI_* / OPENAI_* để
+      tổng tốc độ không vượt quota của tài khoản.
+    - Cuối cùng in báo cáo thời gian từng bước. Log mỗi bước ở PIPELINE_LOG_DIR/<bước>.log.
+
+Trạng thái (dấu vân tay của lần chạy thành công gần nhất) lưu ở PIPELINE_STATE_PATH. Với một cây dữ liệu
+đã được xây dựng thủ công, chạy `--adopt` một lần để ghi nhận trạng thái hiện tại mà không chạy lại gì
+(nếu không, lần chạy đầu sẽ chạy lại mọi bước).
+
+Các bước LLM (02 / 03) đọc điều luật từ LuatDatDai20xx_structure.jsonl + LuatDatDai20xx_full.txt (law_structure.py):
+chạy lại 01 mà nội dung các file này không đổi thì không kéo theo các bước sau. Các bước này chạy với
+`--overwrite` để sửa prompt trong script cũng cập nhật mọi điều luật; prompt không đổi được lấy từ cache LLM
+(llm_cache.py), nên chỉ điều luật có nội dung hoặc prompt thay đổi mới gọi API.
+
+Không nằm trong DAG: 00_preprocess_pdfs_to_txt.py (01 đã tạo file văn bản đầy đủ), các bước thủ công /
+thay thế 03_1_*, 03_2_*, 04_0_merge_json.py (các bước 04_x đọc thẳng từ kho trích xuất, analysis/*_merged.json
+chỉ để xem), 04a_4_finalize_for_import.py, và 05_* (đọc từ Neo4j sau khi import).
+
+Cách chạy:
+    python run_pipeline.py --adopt            # lần đầu trên cây dữ liệu hiện có
+    python run_pipeline.py                    # chạy các bước có đầu vào thay đổi
+    python run_pipeline.py --dry-run          # chỉ xem bước nào sẽ chạy
+    python run_pipeline.py --force csv vectordb_data
+    python run_pipeline.py --only entities_2024 --jobs 1
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+PIPELINE_STATE_PATH = os.getenv("PIPELINE_STATE_PATH", "cache/pipeline_state.json")
+PIPELINE_LOG_DIR = os.getenv("PIPELINE_LOG_DIR", "cache/pipeline_logs")
+PIPELINE_JOBS = int(os.getenv("PIPELINE_JOBS", max(2, os.cpu_count() or 1)))
+# Quota của llm_client.py được chia cho các bước LLM chạy đồng thời
+LLM_QUOTA_VARIABLES = ('GEMINI_REQUESTS_PER_MINUTE', 'GEMINI_TOKENS_PER_MINUTE',
+                       'OPENAI_REQUESTS_PER_MINUTE', 'OPENAI_TOKENS_PER_MINUTE')
+
+LLM_CODE = ['llm_client.py', 'llm_cache.py']
+# Kho kết quả trích xuất (extraction_store.py): mỗi bước LLM ghi một file JSONL riêng
+ENTITIES_2013 = 'extractions/entities_2013.jsonl'
+ENTITIES_2024 = 'extractions/entities_2024.jsonl'
+COMPARISONS = 'extractions/comparisons.jsonl'
+EXTRACTIONS = [ENTITIES_2013, ENTITIES_2024, COMPARISONS, 'extraction_store.py']
+STRUCTURE_FILES = ['LuatDatDai2013_full.txt', 'LuatDatDai2024_full.txt',
+                   'LuatDatDai2013_structure.jsonl', 'LuatDatDai2024_structure.jsonl', 'law_structure.py']
+# Nội dung điều luật của một năm (law_structure.py) mà các bước LLM đọc
+LAW_2013 = ['LuatDatDai2013_full.txt', 'LuatDatDai2013_structure.jsonl', 'law_structure.py']
+LAW_2024 = ['LuatDatDai2024_full.txt', 'LuatDatDai2024_structure.jsonl', 'law_structure.py']
+
+
+class Stage:
+    """Một bước của pipeline: `python <script> <args>` đọc `inputs` và ghi `outputs`."""
+    def __init__(self, name, script, inputs, outputs, args=(), llm=False):
+        self.name = name
+        self.script = script
+        self.args = list(args)
+        self.inputs = [script] + list(inputs)
+        self.outputs = list(outputs)
+        self.llm = llm
+
+    def command(self):
+        return [sys.executable, self.script] + self.args
+
+
+STAGES = [
+    Stage('pdf', '01_preprocess_pdfs.py',
+          inputs=['LuatDatDai2024.pdf', 'LuatDatDai2013.pdf', 'pdf_extraction.py', 'law_structure.py', 'legal_text.py'],
+          outputs=STRUCTURE_FILES[:4]),
+    Stage('entities_2024', '02_extract_entities.py', args=['--year', '2024', '--overwrite'],
+          inputs=LAW_2024 + ['extraction_store.py'] + LLM_CODE, outputs=[ENTITIES_2024], llm=True),
+    Stage('entities_2013', '02_extract_entities.py', args=['--year', '2013', '--overwrite'],
+          inputs=LAW_2013 + ['extraction_store.py'] + LLM_CODE, outputs=[ENTITIES_2013], llm=True),
+    Stage('comparisons', '03_extract_comparisons.py', args=['--overwrite'],
+          inputs=STRUCTURE_FILES + ['comparison_candidates.py', 'bm25_index.py', 'legal_text.py',
+                                    'extraction_store.py'] + LLM_CODE,
+          outputs=[COMPARISONS], llm=True),
+    Stage('validate_json', '04_1_validate_output_and_comparision_json.py',
+          inputs=EXTRACTIONS + STRUCTURE_FILES, outputs=[]),
+    Stage('csv', '04_2_process_and_transform_to_csv.py',
+          inputs=EXTRACTIONS + STRUCTURE_FILES + ['normalization.py'],
+          outputs=['final_csv/nodes_final.csv', 'final_csv/relationships_final.csv']),
+    Stage('vectordb_data', '04_3_create_vectordb_data.py',
+          inputs=[ENTITIES_2013, ENTITIES_2024, 'extraction_store.py', 'normalization.py'] + STRUCTURE_FILES,
+          outputs=['final_csv/data_for_vectordb.csv']),
+    Stage('synonym_list', '04a_1_helper_create_synonym_list.py',
+          inputs=[ENTITIES_2024, ENTITIES_2013, 'extraction_store.py'],
+          outputs=['entities_for_review.csv']),
+    Stage('comparison_edges', '04a_3_process_comparisons.py',
+          inputs=[COMPARISONS, 'extraction_store.py'], outputs=['result_final/graph_edges_comparison.csv']),
+    Stage('graph_nodes', '04a_2_normalize_and_merge_graph.py', args=['--part', 'nodes'],
+          inputs=['result_final/graph_nodes_2013.csv', 'result_final/graph_nodes_2024.csv', 'normalization.py'],
+          outputs=['result_final/nodes_final.csv']),
+    Stage('graph_edges', '04a_2_normalize_and_merge_graph.py', args=['--part', 'edges'],
+          inputs=['result_final/graph_edges_2013.csv', 'result_final/graph_edges_2024.csv',
+                  'result_final/graph_edges_comparison.csv', 'normalization.py'],
+          outputs=['result_final/relationships_final.csv']),
+    Stage('validate_graph', '04a_4a_validate_import_files.py',
+          inputs=['result_final/nodes_final.csv', 'result_final/relationships_final.csv'], outputs=[]),
+]
+
+
+def _overlaps(path_a, path_b):
+    """Hai đường dẫn trùng nhau hoặc một đường dẫn nằm trong thư mục kia."""
+    path_a, path_b = os.path.normpath(path_a), os.path.normpath(path_b)
+    return path_a == path_b or path_a.startswith(path_b + os.sep) or path_b.startswith(path_a + os.sep)
+
+
+def stage_dependencies(stages):
+    """{tên bước: [tên các bước ghi ra đầu vào của nó]}, theo thứ tự khai báo (thứ tự khai báo là thứ tự tô-pô)."""
+    dependencies = {}
+    for index, stage in enumerate(stages):
+        dependencies[stage.name] = [
+            upstream.name for upstream in stages[:index]
+            if any(_overlaps(output, path) for output in upstream.outputs for path in stage.inputs)]
+    return dependencies
+
+
+def _iter_files(path):
+    if os.path.isdir(path):
+        for directory, subdirectories, filenames in os.walk(path):
+            subdirectories.sort()
+            for filename in sorted(filenames):
+                yield os.path.join(directory, filename)
+    elif os.path.exists(path):
+        yield path
+
+
+class Fingerprinter:
+    """SHA-256 nội dung của file / thư mục; hash từng file được ghi nhớ theo (kích thước, mtime)."""
+    def __init__(self, file_hashes=None):
+        self.file_hashes = file_hashes if file_hashes is not None else {}
+        self.hashed_bytes = 0
+
+    def file_hash(self, path):
+        stat = os.stat(path)
+        cached = self.file_hashes.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self.hashed_bytes += stat.st_size
+        self.file_hashes[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def fingerprint(self, paths):
+        """Dấu vân tay của một danh sách đường dẫn (đường dẫn không tồn tại cũng được tính)."""
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(f"{path}\0{'' if os.path.exists(path) else 'missing'}\n".encode('utf-8'))
+            for file_path in _iter_files(path):
+                digest.update(f"{file_path}\0{self.file_hash(file_path)}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+
+def load_state(path=PIPELINE_STATE_PATH):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'stages': {}, 'files': {}}
+
+
+def save_state(state, path=PIPELINE_STATE_PATH):
+    """Ghi file tạm rồi đổi tên, để lần chạy bị ngắt giữa chừng vẫn giữ các bước đã xong."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(f"{path}.tmp", path)
+
+
+def is_up_to_date(stage, state, input_fingerprint):
+    recorded = state['stages'].get(stage.name)
+    return (recorded is not None and recorded['inputs'] == input_fingerprint
+            and all(os.path.exists(output) for output in stage.outputs))
+
+
+def llm_environment(concurrent_llm_stages):
+    """Biến môi trường chia quota LLM cho các bước LLM chạy đồng thời."""
+    import llm_client
+
+    env = dict(os.environ, PYTHONUNBUFFERED='1')
+    for variable in LLM_QUOTA_VARIABLES:
+        env[variable] = str(max(1, getattr(llm_client, variable) // max(concurrent_llm_stages, 1)))
+    return env
+
+
+def run_stage(stage, env):
+    """Chạy một bước trong tiến trình riêng, ghi log; trả về (mã thoát, thời gian)."""
+    if not os.path.exists(PIPELINE_LOG_DIR):
+        os.makedirs(PIPELINE_LOG_DIR, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(PIPELINE_LOG_DIR, f"{stage.name}.log"), 'w', encoding='utf-8') as log:
+        returncode = subprocess.run(stage.command(), stdout=log, stderr=subprocess.STDOUT, env=env).returncode
+    return returncode, time.perf_counter() - start
+
+
+def print_log_tail(stage, lines=20):
+    with open(os.path.join(PIPELINE_LOG_DIR, f"{stage.name}.log"), 'r', encoding='utf-8', errors='replace') as f:
+        for line in f.readlines()[-lines:]:
+            print(f"    | {line.rstrip()}")
+
+
+def run_pipeline(stages, jobs=PIPELINE_JOBS, force=(), dry_run=False, adopt=False):
+    """
+    Chạy các bước theo DAG. Trả về {tên bước: (trạng thái, thời gian, ghi chú)} theo thứ tự khai báo.
+
+    Trạng thái: 'chạy', 'cập nhật' (bỏ qua), 'lỗi', 'bỏ qua' (bước trước lỗi), 'sẽ chạy' (dry-run).
+    """
+    state = load_state()
+    fingerprinter = Fingerprinter(state['files'])
+    selected = {stage.name for stage in stages}
+    dependencies = {name: [dep for dep in deps if dep in selected]
+                    for name, deps in stage_dependencies(STAGES).items() if name in selected}
+    results = {}
+    pending = list(stages)
+    running = {}
+    remaining_llm = sum(stage.llm for stage in stages)
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        while pending or running:
+            for stage in list(pending):
+                deps = [results.get(dep) for dep in dependencies[stage.name]]
+                if any(result is None for result in deps):
+                    continue
+                if any(result[0] in ('lỗi', 'bỏ qua') for result in deps):
+                    results[stage.name] = ('bỏ qua', 0.0, "bước trước bị lỗi")
+                    pending.remove(stage)
+                    remaining_llm -= stage.llm
+                    continue
+                upstream = [dep for dep in dependencies[stage.name] if results[dep][0] == 'sẽ chạy']
+                if upstream:
+                    results[stage.name] = ('sẽ chạy', 0.0, f"nếu đầu ra của {', '.join(upstream)} thay đổi")
+                    pending.remove(stage)
+                    continue
+                if len(running) >= jobs:
+                    break
+                pending.remove(stage)
+                input_fingerprint = fingerprinter.fingerprint(stage.inputs)
+                if adopt:
+                    if all(os.path.exists(output) for output in stage.outputs):
+                        state['stages'][stage.name] = {'inputs': input_fingerprint,
+                                                       'outputs': fingerprinter.fingerprint(stage.outputs)}
+                        results[stage.name] = ('cập nhật', 0.0, "đã ghi nhận trạng thái hiện tại")
+                    else:
+                        results[stage.name] = ('sẽ chạy', 0.0, "thiếu đầu ra, không ghi nhận")
+                elif stage.name not in force and is_up_to_date(stage, state, input_fingerprint):
+                    results[stage.name] = ('cập nhật', 0.0, "")
+                    remaining_llm -= stage.llm
+                elif dry_run:
+                    reason = "bắt buộc" if stage.name in force else (
+                        "chưa chạy lần nào" if stage.name not in state['stages'] else "đầu vào thay đổi / thiếu đầu ra")
+                    results[stage.name] = ('sẽ chạy', 0.0, reason)
+                else:
+                    env = llm_environment(remaining_llm) if stage.llm else dict(os.environ, PYTHONUNBUFFERED='1')
+                    print(f"▶ {stage.name}: {' '.join(stage.command()[1:])}")
+                    running[executor.submit(run_stage, stage, env)] = (stage, input_fingerprint)
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, input_fingerprint = running.pop(future)
+                remaining_llm -= stage.llm
+                returncode, elapsed = future.result()
+                if returncode != 0:
+                    results[stage.name] = ('lỗi', elapsed, f"mã thoát {returncode}")
+                    print(f"✗ {stage.name} lỗi sau {elapsed:.1f}s (log: {PIPELINE_LOG_DIR}/{stage.name}.log):")
+                    print_log_tail(stage)
+                    continue
+                previous_outputs = state['stages'].get(stage.name, {}).get('outputs')
+                output_fingerprint = fingerprinter.fingerprint(stage.outputs)
+                state['stages'][stage.name] = {'inputs': input_fingerprint, 'outputs': output_fingerprint,
+                                               'finished_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                                               'duration': round(elapsed, 3)}
+                note = "đầu ra không đổi" if stage.outputs and previous_outputs == output_fingerprint else ""
+                results[stage.name] = ('chạy', elapsed, note)
+                print(f"✓ {stage.name} xong trong {elapsed:.1f}s {note}".rstrip())
+                save_state(state)
+
+    if not dry_run:
+        save_state(state)
+    print(f"(đã hash {fingerprinter.hashed_bytes / 1e6:.1f} MB nội dung file thay đổi)")
+    return {stage.name: results[stage.name] for stage in stages}
+
+
+def print_report(results, wall_time):
+    print(f"\n{'bước':<18} | {'trạng thái':<10} | {'thời gian (s)':>13} | ghi chú")
+    for name, (status, elapsed, note) in results.items():
+        print(f"{name:<18} | {status:<10} | {elapsed:>13.1f} | {note}")
+    total = sum(elapsed for _, elapsed, _ in results.values())
+    print(f"Tổng thời gian các bước {total:.1f}s, thời gian thực {wall_time:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    names = [stage.name for stage in STAGES]
+    parser.add_argument('--only', nargs='+', choices=names, metavar='BƯỚC',
+                        help="Chỉ xét các bước này (coi các bước trước là đã cập nhật).")
+    parser.add_argument('--force', nargs='+', choices=names, default=[], metavar='BƯỚC',
+                        help="Chạy lại các bước này dù đầu vào không đổi.")
+    parser.add_argument('--jobs', type=int, default=PIPELINE_JOBS, help="Số bước chạy song song tối đa.")
+    parser.add_argument('--dry-run', action='store_true', help="Chỉ liệt kê các bước sẽ chạy.")
+    parser.add_argument('--adopt', action='store_true',
+                        help="Ghi nhận trạng thái hiện tại của mọi bước là đã cập nhật, không chạy gì.")
+    parser.add_argument('--list', action='store_true', help="In các bước và phụ thuộc.")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, deps in stage_dependencies(STAGES).items():
+            print(f"{name:<18} <- {', '.join(deps) or '-'}")
+        return
+
+    stages = [stage for stage in STAGES if not args.only or stage.name in args.only]
+    start = time.perf_counter()
+    results = run_pipeline(stages, args.jobs, set(args.force), args.dry_run, args.adopt)
+    print_report(results, time.perf_counter() - start)
+    if any(status == 'lỗi' for status, _, _ in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,212 @@
 import json
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import os
 import sys
+import threading
+from article_store import ArticleStore
+from caching import LRUCache, SqliteCache
+from query_utils import clean_query, build_article_id_map
+from inference_backend import load_bi_encoder, INFERENCE_BACKEND
+from vector_index import configure_search, SEARCH_PARAMS
+from vector_db_snapshot import (resolve_vector_db_files, read_current_build_id, verify_snapshot,
+                                file_checksum, VECTOR_DB_DIR)
 
 # --- Cấu hình (PHẢI KHỚP VỚI FILE BUILD) ---
 MODEL_NAME = 'bkai-foundation-models/vietnamese-bi-encoder'
-FAISS_INDEX_PATH = "faiss_index.bin"
-LAW_IDS_PATH = "law_ids.json"
+# Chu kỳ (giây) kiểm tra snapshot mới trong VECTOR_DB_DIR khi bật tự động tải lại
+SNAPSHOT_POLL_INTERVAL = 30
+
+# --- Cấu hình gộp điểm khi index theo khoản (granularity 'clause') ---
+# 'max': điểm của điều luật là điểm cao nhất trong các khoản của nó.
+# 'sum_top_n': tổng điểm của PASSAGE_TOP_N khoản cao nhất (vượt ngưỡng), ưu tiên điều luật có nhiều khoản liên quan.
+PASSAGE_AGGREGATION = 'max'
+PASSAGE_TOP_N = 2
+# Số đoạn lấy từ FAISS = top_k * hệ số này, để sau khi gộp vẫn đủ top_k điều luật khác nhau
+PASSAGE_OVERFETCH = 8
+
+# --- Cấu hình cache embedding của câu hỏi ---
+QUERY_CACHE_MEMORY_SIZE = 2048
+# Cache trên đĩa dùng chung giữa các session Streamlit và các worker. Đặt None để tắt.
+QUERY_CACHE_PATH = "cache/query_embeddings.sqlite"
+QUERY_CACHE_DISK_SIZE = 100000
+
+def aggregate_passage_hits(row_indices, row_scores, vector_ids, top_k: int, score_threshold: float,
+                           aggregation: str = PASSAGE_AGGREGATION, top_n: int = PASSAGE_TOP_N):
+    """
+    Gộp kết quả FAISS ở mức đoạn (khoản/điểm) thành điểm của điều luật.
+
+    Args:
+        row_indices, row_scores: Một dòng kết quả của index.search (đã sắp xếp giảm dần theo điểm).
+        vector_ids (list[str]): ID điều luật của từng vector trong index.
+        aggregation (str): 'max' hoặc 'sum_top_n'.
+    Returns:
+        Danh sách tuple (id_điều_luật, điểm) giảm dần theo điểm, tối đa top_k phần tử.
+    """
+    passage_scores = {}
+    for i, score in zip(row_indices, row_scores):
+        if i >= 0 and score >= score_threshold:
+            passage_scores.setdefault(vector_ids[i], []).append(float(score))
+
+    if aggregation == 'max':
+        article_scores = {law_id: scores[0] for law_id, scores in passage_scores.items()}
+    elif aggregation == 'sum_top_n':
+        article_scores = {law_id: sum(scores[:top_n]) for law_id, scores in passage_scores.items()}
+    else:
+        raise ValueError(f"Cách gộp điểm '{aggregation}' không hợp lệ. Chọn 'max' hoặc 'sum_top_n'.")
+
+    return sorted(article_scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+class QueryEmbeddingCache:
+    """
+    Cache vector embedding của câu hỏi, khóa là câu hỏi đã chuẩn hóa bằng clean_query
+    (nên các câu hỏi gần trùng nhau như khác hoa/thường, dấu câu, "cho tôi hỏi"... dùng chung một vector).
+    Gồm hai tầng: LRU trong bộ nhớ và (tùy chọn) SQLite trên đĩa.
+    `namespace` gồm tên mô hình, backend suy luận và build id của index: mọi tra cứu trên đĩa đều lọc theo
+    namespace, nên khi một trong các giá trị này thay đổi (hoặc worker khác dùng chung file với giá trị khác),
+    vector cũ không bao giờ được dùng lại; chúng bị dọn sau caching.NAMESPACE_MAX_IDLE_DAYS ngày không truy cập.
+    """
+    def __init__(self, namespace: str, memory_size: int = QUERY_CACHE_MEMORY_SIZE,
+                 disk_path: str = QUERY_CACHE_PATH, disk_size: int = QUERY_CACHE_DISK_SIZE):
+        self.namespace = namespace
+        self.memory = LRUCache(memory_size)
+        self.disk = SqliteCache(disk_path, 'query_embeddings', namespace, disk_size) if disk_path else None
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return clean_query(query)
+
+    def get_many(self, keys: list[str]) -> dict:
+        """Trả về {key: vector} cho các khóa (đã chuẩn hóa) có trong cache."""
+        found = {}
+        disk_lookup = []
+        for key in keys:
+            vector = self.memory.get(key)
+            if vector is not None:
+                found[key] = vector
+            else:
+                disk_lookup.append(key)
+        if self.disk is not None and disk_lookup:
+            for key, blob in self.disk.get_many(disk_lookup).items():
+                vector = np.frombuffer(blob, dtype='float32')
+                self.memory.put(key, vector)
+                found[key] = vector
+        return found
+
+    def put_many(self, items: dict):
+        """Lưu {key: vector} vào cả hai tầng cache."""
+        for key, vector in items.items():
+            self.memory.put(key, vector)
+        if self.disk is not None:
+            self.disk.put_many({key: vector.astype('float32').tobytes() for key, vector in items.items()})
+
+    def stats(self) -> dict:
+        return {
+            'namespace': self.namespace,
+            'memory': self.memory.stats(),
+            'disk': self.disk.stats() if self.disk is not None else None,
+        }
+
+class VectorDBState:
+    """
+    Một phiên bản Vector Database đã được tải: index, danh sách ID, kho lưu trữ điều luật và
+    cache embedding câu hỏi tương ứng. Không bị thay đổi sau khi tạo; khi có snapshot mới,
+    SemanticRetriever tạo một VectorDBState mới và thay tham chiếu. Các truy vấn đang chạy vẫn giữ
+    tham chiếu tới phiên bản cũ, phiên bản cũ được giải phóng khi không còn truy vấn nào dùng.
+    """
+    def __init__(self, build_id, index, law_ids, granularity, index_config, article_store, query_cache):
+        self.build_id = build_id
+        self.index = index
+        self.law_ids = law_ids
+        self.granularity = granularity
+        self.index_config = index_config
+        self.article_store = article_store
+        self.query_cache = query_cache
+        # Bảng tra (số điều, năm) -> ID điều luật cho các câu hỏi trích dẫn trực tiếp điều luật
+        self.article_id_map = build_article_id_map(dict.fromkeys(law_ids))
+
+    @classmethod
+    def load(cls, files: dict):
+        """Tải Vector Database từ các file trả về bởi resolve_vector_db_files()."""
+        if not os.path.exists(files['index']) or not os.path.exists(files['law_ids']):
+            raise FileNotFoundError(
+                f"Không tìm thấy file '{files['index']}' hoặc '{files['law_ids']}'. "
+                f"Vui lòng chạy script 05_build_vector_db.py trước."
+            )
+
+        # Snapshot có checksum trong meta: kiểm tra trước khi tải để không dùng file bị hỏng
+        meta = {}
+        if files['build_id']:
+            print(f" - Đang kiểm tra snapshot '{files['build_id']}'...")
+            meta = verify_snapshot(files['dir'])
+            build_id = files['build_id']
+        else:
+            if os.path.exists(files['meta']):
+                with open(files['meta'], 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            # Bố cục cũ (không có snapshot): build id là checksum của file index
+            build_id = file_checksum(files['index'])[:16]
+        if meta.get('model', MODEL_NAME) != MODEL_NAME:
+            raise ValueError(f"Index được build bằng mô hình '{meta['model']}', khác với '{MODEL_NAME}'.")
+
+        # Tải FAISS index
+        print(f" - Đang tải FAISS index từ '{files['index']}'...")
+        index = faiss.read_index(files['index'])
+        print(f"   -> Tải FAISS index thành công. Chứa {index.ntotal} vector.")
+
+        # Tải danh sách ID
+        print(f" - Đang tải danh sách ID từ '{files['law_ids']}'...")
+        with open(files['law_ids'], 'r', encoding='utf-8') as f:
+            law_ids = json.load(f)
+        print(f"   -> Tải danh sách ID thành công. Chứa {len(law_ids)} ID.")
+
+        # Kiểm tra tính nhất quán quan trọng
+        # (vị trí trong law_ids.json là ID của vector; vị trí null là vector đã bị xóa khi build tăng dần)
+        if index.ntotal != sum(1 for law_id in law_ids if law_id is not None):
+            print("\nCẢNH BÁO NGHIÊM TRỌNG: Số lượng vector trong index và số lượng ID không khớp!")
+            raise ValueError("Dữ liệu index và ID không đồng bộ.")
+
+        # Độ chi tiết và loại index (index cũ không có file meta là IndexFlatIP theo điều luật)
+        granularity = meta.get('granularity', 'article')
+        index_config = meta.get('index', {'type': 'flat', 'params': {}})
+        # Tham số lúc truy vấn (nprobe / efSearch) không được lưu trong faiss_index.bin
+        configure_search(index, index_config['type'], index_config['params'])
+        search_params = {name: index_config['params'][name] for name in SEARCH_PARAMS.get(index_config['type'], ())}
+        print(f" - Độ chi tiết index: '{granularity}', loại index: '{index_config['type']}' {search_params}.")
+
+        # Khởi tạo cache embedding câu hỏi, gắn với mô hình và phiên bản index hiện tại
+        namespace = f"{MODEL_NAME}[{INFERENCE_BACKEND}]@{build_id}"
+        try:
+            query_cache = QueryEmbeddingCache(namespace, disk_path=QUERY_CACHE_PATH)
+            print(f" - Cache embedding câu hỏi: namespace '{query_cache.namespace}'.")
+        except Exception as e:
+            # Cache chỉ để tăng tốc, lỗi cache không được làm hỏng việc tìm kiếm
+            print(f" - CẢNH BÁO: Không khởi tạo được cache đĩa ({e}), chỉ dùng cache trong bộ nhớ.")
+            query_cache = QueryEmbeddingCache(namespace, disk_path=None)
+
+        # Tải kho lưu trữ nội dung điều luật (không bắt buộc)
+        article_store = None
+        if os.path.exists(files['article_store']):
+            print(f" - Đang mở kho lưu trữ điều luật '{files['article_store']}'...")
+            store = ArticleStore(files['article_store'])
+            if store.ids != [law_id for law_id in dict.fromkeys(law_ids) if law_id is not None]:
+                store.close()
+                print(f"   -> CẢNH BÁO: Kho lưu trữ không khớp với '{files['law_ids']}', bỏ qua. "
+                      f"Vui lòng chạy 05a_build_article_store.py.")
+            else:
+                article_store = store
+                print(f"   -> Mở kho lưu trữ thành công. Chứa {len(store)} điều luật.")
+        else:
+            print(f" - Không tìm thấy '{files['article_store']}', nội dung điều luật sẽ được lấy từ Neo4j.")
+
+        return cls(build_id, index, law_ids, granularity, index_config, article_store, query_cache)
 
 class SemanticRetriever:
     """
     Lớp để tải index và thực hiện tìm kiếm ngữ nghĩa (semantic search).
     Khởi tạo một lần và tái sử dụng cho nhiều truy vấn.
+    Index được đọc từ snapshot hiện tại trong VECTOR_DB_DIR (hoặc các file ở thư mục gốc nếu chưa có
+    snapshot) và có thể được tải lại nóng khi có snapshot mới (xem reload, start_auto_reload).
     """
     _instance = None
 
@@ -32,37 +225,26 @@ class SemanticRetriever:
 
         print("Đang khởi tạo Semantic Retriever (chỉ chạy một lần)...")
         self.model = None
-        self.index = None
-        self.law_ids = None
+        self._state = None
+        self._reload_lock = threading.Lock()
+        self._reload_thread = None
+        self._stop_reload = threading.Event()
 
         try:
-            # Kiểm tra sự tồn tại của các file cần thiết
-            if not os.path.exists(FAISS_INDEX_PATH) or not os.path.exists(LAW_IDS_PATH):
+            files = resolve_vector_db_files()
+            # Kiểm tra sự tồn tại của các file cần thiết trước khi tải mô hình
+            if not os.path.exists(files['index']) or not os.path.exists(files['law_ids']):
                 raise FileNotFoundError(
-                    f"Không tìm thấy file '{FAISS_INDEX_PATH}' hoặc '{LAW_IDS_PATH}'. "
-                    f"Vui lòng chạy script build_vector_database_from_kg.py trước."
+                    f"Không tìm thấy file '{files['index']}' hoặc '{files['law_ids']}'. "
+                    f"Vui lòng chạy script 05_build_vector_db.py trước."
                 )
 
             # Tải mô hình embedding
-            print(f" - Đang tải mô hình: '{MODEL_NAME}'...")
-            self.model = SentenceTransformer(MODEL_NAME)
+            print(f" - Đang tải mô hình: '{MODEL_NAME}' (backend: {INFERENCE_BACKEND})...")
+            self.model = load_bi_encoder(MODEL_NAME)
             print("   -> Tải mô hình thành công.")
 
-            # Tải FAISS index
-            print(f" - Đang tải FAISS index từ '{FAISS_INDEX_PATH}'...")
-            self.index = faiss.read_index(FAISS_INDEX_PATH)
-            print(f"   -> Tải FAISS index thành công. Chứa {self.index.ntotal} vector.")
-
-            # Tải danh sách ID
-            print(f" - Đang tải danh sách ID từ '{LAW_IDS_PATH}'...")
-            with open(LAW_IDS_PATH, 'r', encoding='utf-8') as f:
-                self.law_ids = json.load(f)
-            print(f"   -> Tải danh sách ID thành công. Chứa {len(self.law_ids)} ID.")
-
-            # Kiểm tra tính nhất quán quan trọng
-            if self.index.ntotal != len(self.law_ids):
-                print("\nCẢNH BÁO NGHIÊM TRỌNG: Số lượng vector trong index và số lượng ID không khớp!")
-                raise ValueError("Dữ liệu index và ID không đồng bộ.")
+            self._state = VectorDBState.load(files)
 
             print("\n>>> Semantic Retriever đã sẵn sàng. <<<")
 
@@ -70,10 +252,84 @@ class SemanticRetriever:
             print(f"Lỗi nghiêm trọng khi khởi tạo SemanticRetriever: {e}", file=sys.stderr)
             # Đặt các thuộc tính về None để hàm search biết không thể hoạt động
             self.model = None
-            self.index = None
-            self.law_ids = None
+            self._state = None
             raise  # Ném lại lỗi để ứng dụng chính biết và dừng lại nếu cần
 
+    # Các thuộc tính của phiên bản index đang dùng
+    @property
+    def index(self):
+        return self._state.index if self._state else None
+
+    @property
+    def law_ids(self):
+        return self._state.law_ids if self._state else None
+
+    @property
+    def article_store(self):
+        return self._state.article_store if self._state else None
+
+    @property
+    def index_build_id(self):
+        return self._state.build_id if self._state else None
+
+    @property
+    def granularity(self):
+        return self._state.granularity if self._state else None
+
+    @property
+    def index_config(self):
+        return self._state.index_config if self._state else None
+
+    @property
+    def query_cache(self):
+        return self._state.query_cache if self._state else None
+
+    @property
+    def article_id_map(self):
+        return self._state.article_id_map if self._state else {}
+
+    def reload(self) -> bool:
+        """
+        Chuyển sang snapshot mà VECTOR_DB_DIR/CURRENT đang trỏ tới, nếu khác snapshot đang dùng.
+        Snapshot mới được tải đầy đủ trước khi thay tham chiếu, nên các truy vấn không bị chặn;
+        nếu tải lỗi, phiên bản đang dùng được giữ nguyên.
+
+        Returns:
+            True nếu đã chuyển sang snapshot mới.
+        """
+        with self._reload_lock:
+            build_id = read_current_build_id()
+            if build_id is None or build_id == self.index_build_id:
+                return False
+            print(f"Phát hiện snapshot mới '{build_id}', đang tải...")
+            new_state = VectorDBState.load(resolve_vector_db_files())
+            old_build_id = self.index_build_id
+            # Gán tham chiếu là thao tác nguyên tử; bản cũ được giải phóng khi các truy vấn đang chạy kết thúc
+            self._state = new_state
+            print(f">>> Đã chuyển Vector Database từ '{old_build_id}' sang '{new_state.build_id}'. <<<")
+            return True
+
+    def start_auto_reload(self, interval: float = SNAPSHOT_POLL_INTERVAL):
+        """Chạy một luồng nền kiểm tra snapshot mới mỗi `interval` giây và tải lại nóng."""
+        if self._reload_thread is not None and self._reload_thread.is_alive():
+            return
+        self._stop_reload.clear()
+
+        def _poll():
+            while not self._stop_reload.wait(interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"CẢNH BÁO: Không tải được snapshot mới, tiếp tục dùng '{self.index_build_id}': {e}",
+                          file=sys.stderr)
+
+        self._reload_thread = threading.Thread(target=_poll, name='vector-db-reload', daemon=True)
+        self._reload_thread.start()
+        print(f" - Tự động tải lại snapshot mới trong '{VECTOR_DB_DIR}' (mỗi {interval} giây).")
+
+    def stop_auto_reload(self):
+        self._stop_reload.set()
+
     def search(self, query: str, top_k: int = 5, score_threshold: float = 0.3):
         """
         Thực hiện tìm kiếm ngữ nghĩa.
@@ -84,25 +340,107 @@ class SemanticRetriever:
         Output: 
             - Danh sách các tuple (id_điều_luật, điểm_tương_đồng).
         """
-        if not all([self.model, self.index, self.law_ids]):
+        return self.search_batch([query], top_k=top_k, score_threshold=score_threshold)[0]
+
+    def search_batch(self, queries: list[str], top_k: int = 5, score_threshold: float = 0.3,
+                     aggregation: str = None):
+        """
+        Tìm kiếm ngữ nghĩa cho nhiều câu hỏi cùng lúc: encode tất cả câu hỏi trong một batch
+        và gọi FAISS search đúng một lần cho cả ma trận truy vấn.
+        Với index theo khoản, các đoạn trúng được gộp thành điểm điều luật (xem aggregate_passage_hits).
+        Input:
+            - queries (list[str]): Danh sách câu hỏi.
+            - top_k, score_threshold: như hàm search.
+            - aggregation (str): Cách gộp điểm khi index theo khoản, mặc định PASSAGE_AGGREGATION.
+        Output:
+            - Danh sách (cùng thứ tự với queries), mỗi phần tử là danh sách các tuple
+              (id_điều_luật, điểm_tương_đồng) của câu hỏi tương ứng.
+        """
+        # Giữ tham chiếu tới phiên bản index hiện tại trong suốt truy vấn (có thể bị thay khi tải lại nóng)
+        state = self._state
+        if self.model is None or state is None:
             print("Lỗi: Retriever chưa được khởi tạo đúng cách.", file=sys.stderr)
+            return [[] for _ in queries]
+        if not queries:
             return []
 
-        # Chuyển câu hỏi thành vector, đảm bảo chuẩn hóa giống như lúc build index
-        query_vector = self.model.encode([query], normalize_embeddings=True)
-        
-        # Tìm kiếm trong index
-        # faiss trả về (distances, indices)
-        scores, indices = self.index.search(query_vector.astype('float32'), top_k)
-        
-        # Lấy ra các ID và điểm số tương ứng
-        results = []
-        for i, score in zip(indices[0], scores[0]):
-            # Lọc bỏ các kết quả có điểm tương đồng thấp hơn ngưỡng
-            if score >= score_threshold:
-                results.append((self.law_ids[i], float(score)))
-        
-        return results
+        search_k = top_k
+        if state.granularity == 'clause':
+            search_k = min(top_k * PASSAGE_OVERFETCH, state.index.ntotal)
+        # Index rỗng (ntotal = 0) hoặc top_k <= 0: faiss không chấp nhận k <= 0
+        if search_k <= 0:
+            return [[] for _ in queries]
+
+        query_vectors = self.encode_queries(queries, state.query_cache)
+
+        # Tìm kiếm trong index cho toàn bộ ma trận truy vấn
+        # faiss trả về (distances, indices), mỗi dòng ứng với một câu hỏi
+        scores, indices = state.index.search(np.ascontiguousarray(query_vectors, dtype='float32'), search_k)
+
+        if state.granularity == 'clause':
+            return [
+                aggregate_passage_hits(row_indices, row_scores, state.law_ids, top_k, score_threshold,
+                                       aggregation or PASSAGE_AGGREGATION)
+                for row_indices, row_scores in zip(indices, scores)
+            ]
+
+        # Lấy ra các ID và điểm số tương ứng cho từng câu hỏi
+        all_results = []
+        for row_indices, row_scores in zip(indices, scores):
+            results = []
+            for i, score in zip(row_indices, row_scores):
+                # Lọc bỏ các kết quả có điểm tương đồng thấp hơn ngưỡng (i = -1 khi index không đủ k kết quả)
+                if i >= 0 and score >= score_threshold:
+                    results.append((state.law_ids[i], float(score)))
+            all_results.append(results)
+
+        return all_results
+
+    def encode_queries(self, queries: list[str], query_cache=None) -> np.ndarray:
+        """
+        Chuyển các câu hỏi thành ma trận vector (đã chuẩn hóa L2), dùng cache embedding
+        (mặc định là cache của phiên bản index đang dùng).
+        Chỉ các câu hỏi chưa có trong cache mới được encode, tất cả trong MỘT batch
+        (được pad theo câu dài nhất). Văn bản được encode là câu hỏi đã chuẩn hóa (khóa cache)
+        nên kết quả không phụ thuộc vào việc cache trúng hay trượt.
+        """
+        query_cache = query_cache or self.query_cache
+        keys = [QueryEmbeddingCache.normalize(q) or q for q in queries]
+        cached = query_cache.get_many(list(dict.fromkeys(keys))) if query_cache else {}
+
+        to_encode = [key for key in dict.fromkeys(keys) if key not in cached]
+        if to_encode:
+            # Đảm bảo chuẩn hóa giống như lúc build index
+            vectors = self.model.encode(
+                to_encode, batch_size=len(to_encode), normalize_embeddings=True, show_progress_bar=False
+            ).astype('float32')
+            new_items = dict(zip(to_encode, vectors))
+            if query_cache:
+                try:
+                    query_cache.put_many(new_items)
+                except Exception as e:
+                    print(f"CẢNH BÁO: Không ghi được cache embedding: {e}", file=sys.stderr)
+            cached.update(new_items)
+
+        return np.stack([cached[key] for key in keys])
+
+    def cache_stats(self) -> dict:
+        """Bộ đếm hits/misses/evictions của cache embedding câu hỏi."""
+        return self.query_cache.stats() if self.query_cache else {}
+
+    def get_articles(self, law_ids: list[str]):
+        """
+        Lấy nội dung (name, noi_dung, ma_dieu, phien_ban) của các điều luật từ kho lưu trữ cục bộ.
+        Cùng định dạng trả về với KGConnector.get_nodes_by_ids.
+
+        Returns:
+            tuple (nodes, missing_ids): các ID không có trong kho (hoặc khi chưa có kho)
+            được trả về trong missing_ids để bên gọi lấy bổ sung từ Neo4j.
+        """
+        article_store = self.article_store
+        if article_store is None:
+            return {}, list(dict.fromkeys(law_ids))
+        return article_store.get_many(law_ids)
 
 # --- Ví dụ sử dụng và kiểm tra ---
 if __name__ == '__main__':
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Quản lý các phiên bản (snapshot) của Vector Database.
+
+Mỗi lần build tạo một thư mục snapshot bất biến:
+
+    vector_db/
+        CURRENT                      <- chứa build id của snapshot đang dùng
+        snapshots/
+            20250101T120000-a1b2c3/
+                faiss_index.bin
+                law_ids.json
+                article_store.bin
+                vector_db_manifest.json
+                vector_db_meta.json  <- mô hình, cấu hình index, build id, thời điểm build, checksum các file
+
+Snapshot được ghi vào thư mục tạm rồi đổi tên (rename là thao tác nguyên tử), sau đó con trỏ
+CURRENT mới được cập nhật (cũng bằng ghi file tạm + os.replace). Nếu quá trình build bị dừng giữa
+chừng, CURRENT vẫn trỏ tới snapshot cũ còn nguyên vẹn.
+
+Khi chưa có thư mục 'vector_db/', các file ở thư mục gốc (bố cục cũ) được dùng.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+VECTOR_DB_DIR = "vector_db"
+CURRENT_POINTER_NAME = "CURRENT"
+SNAPSHOTS_DIR_NAME = "snapshots"
+# Số snapshot giữ lại sau mỗi lần build (kể cả snapshot hiện tại)
+SNAPSHOT_KEEP = 3
+
+# Tên các file trong một snapshot (trùng với tên file của bố cục cũ ở thư mục gốc)
+FAISS_INDEX_FILE = "faiss_index.bin"
+LAW_IDS_FILE = "law_ids.json"
+ARTICLE_STORE_FILE = "article_store.bin"
+MANIFEST_FILE = "vector_db_manifest.json"
+META_FILE = "vector_db_meta.json"
+
+_TMP_PREFIX = ".tmp-"
+_STALE_TMP_SECONDS = 24 * 3600
+
+
+def file_checksum(path: str) -> str:
+    """Checksum sha256 của một file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fsync_dir(path: str):
+    """Đảm bảo thao tác đổi tên trong thư mục đã được ghi xuống đĩa (bỏ qua trên Windows)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def snapshots_dir(vector_db_dir: str = VECTOR_DB_DIR) -> str:
+    return os.path.join(vector_db_dir, SNAPSHOTS_DIR_NAME)
+
+
+def snapshot_dir(build_id: str, vector_db_dir: str = VECTOR_DB_DIR) -> str:
+    return os.path.join(snapshots_dir(vector_db_dir), build_id)
+
+
+def read_current_build_id(vector_db_dir: str = VECTOR_DB_DIR):
+    """Build id của snapshot hiện tại, hoặc None nếu chưa có snapshot nào."""
+    try:
+        with open(os.path.join(vector_db_dir, CURRENT_POINTER_NAME), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def set_current_build_id(build_id: str, vector_db_dir: str = VECTOR_DB_DIR):
+    """Trỏ CURRENT tới snapshot `build_id` (nguyên tử)."""
+    if not os.path.isdir(snapshot_dir(build_id, vector_db_dir)):
+        raise FileNotFoundError(f"Không tìm thấy snapshot '{build_id}'.")
+    pointer_path = os.path.join(vector_db_dir, CURRENT_POINTER_NAME)
+    tmp_path = f"{pointer_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(build_id)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, pointer_path)
+    _fsync_dir(vector_db_dir)
+
+
+def list_snapshots(vector_db_dir: str = VECTOR_DB_DIR) -> list[str]:
+    """Build id của các snapshot đã hoàn tất, từ cũ đến mới."""
+    root = snapshots_dir(vector_db_dir)
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root)
+                  if not name.startswith(_TMP_PREFIX) and os.path.isdir(os.path.join(root, name)))
+
+
+def prune_snapshots(keep: int = SNAPSHOT_KEEP, vector_db_dir: str = VECTOR_DB_DIR) -> list[str]:
+    """
+    Xóa các snapshot cũ, giữ lại `keep` snapshot mới nhất và luôn giữ snapshot hiện tại.
+    Các thư mục tạm còn sót lại từ lần build bị dừng (cũ hơn một ngày, để không xóa nhầm
+    một lần build khác đang chạy) cũng bị xóa. Trả về danh sách build id đã xóa.
+    """
+    current = read_current_build_id(vector_db_dir)
+    snapshots = list_snapshots(vector_db_dir)
+    removed = [build_id for build_id in snapshots[:max(0, len(snapshots) - keep)] if build_id != current]
+    for build_id in removed:
+        # Tiến trình khác có thể vẫn đang mmap file trong snapshot cũ; trên Linux file vẫn đọc được đến khi đóng
+        shutil.rmtree(snapshot_dir(build_id, vector_db_dir), ignore_errors=True)
+
+    root = snapshots_dir(vector_db_dir)
+    if os.path.isdir(root):
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name.startswith(_TMP_PREFIX) and time.time() - os.path.getmtime(path) > _STALE_TMP_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
+    return removed
+
+
+def load_snapshot_meta(path: str) -> dict:
+    with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def verify_snapshot(path: str) -> dict:
+    """Kiểm tra checksum các file trong snapshot. Trả về meta, ném ValueError nếu có file bị hỏng / thiếu."""
+    meta = load_snapshot_meta(path)
+    for name, expected in meta.get('checksums', {}).items():
+        file_path = os.path.join(path, name)
+        if not os.path.exists(file_path):
+            raise ValueError(f"Snapshot '{path}' thiếu file '{name}'.")
+        if file_checksum(file_path) != expected:
+            raise ValueError(f"Checksum của '{file_path}' không khớp, snapshot bị hỏng.")
+    return meta
+
+
+def resolve_vector_db_files(vector_db_dir: str = VECTOR_DB_DIR) -> dict:
+    """
+    Đường dẫn các file của Vector Database đang dùng.
+
+    Returns:
+        dict gồm 'build_id' (None với bố cục cũ), 'dir' và đường dẫn các file
+        ('index', 'law_ids', 'article_store', 'manifest', 'meta').
+    """
+    build_id = read_current_build_id(vector_db_dir)
+    directory = snapshot_dir(build_id, vector_db_dir) if build_id else "."
+    return {
+        'build_id': build_id,
+        'dir': directory,
+        'index': os.path.join(directory, FAISS_INDEX_FILE),
+        'law_ids': os.path.join(directory, LAW_IDS_FILE),
+        'article_store': os.path.join(directory, ARTICLE_STORE_FILE),
+        'manifest': os.path.join(directory, MANIFEST_FILE),
+        'meta': os.path.join(directory, META_FILE),
+    }
+
+
+def new_build_id() -> str:
+    """Build id dạng '<thời điểm UTC>-<ngẫu nhiên>', sắp xếp theo tên cũng là theo thời gian."""
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:6]}"
+
+
+class SnapshotWriter:
+    """
+    Ghi một snapshot mới. Dùng như context manager:
+
+        with SnapshotWriter() as writer:
+            faiss.write_index(index, writer.path(FAISS_INDEX_FILE))
+            ...
+            writer.commit(meta)
+
+    Nếu có lỗi trước khi commit(), thư mục tạm bị xóa và CURRENT không thay đổi.
+    """
+    def __init__(self, vector_db_dir: str = VECTOR_DB_DIR, build_id: str = None, keep: int = SNAPSHOT_KEEP):
+        self.vector_db_dir = vector_db_dir
+        self.build_id = build_id or new_build_id()
+        self.keep = keep
+        self.tmp_dir = os.path.join(snapshots_dir(vector_db_dir), f"{_TMP_PREFIX}{self.build_id}")
+        self.final_dir = snapshot_dir(self.build_id, vector_db_dir)
+        self.committed = False
+
+    def __enter__(self):
+        os.makedirs(self.tmp_dir)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if not self.committed:
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        return False
+
+    def path(self, name: str) -> str:
+        """Đường dẫn để ghi file `name` vào snapshot đang tạo."""
+        return os.path.join(self.tmp_dir, name)
+
+    def commit(self, meta: dict) -> str:
+        """
+        Ghi meta (kèm build id, thời điểm build, checksum các file), đổi tên thư mục tạm thành snapshot,
+        trỏ CURRENT tới snapshot mới và dọn các snapshot cũ. Trả về đường dẫn snapshot.
+        """
+        checksums = {}
+        for name in sorted(os.listdir(self.tmp_dir)):
+            file_path = self.path(name)
+            # Đảm bảo dữ liệu của từng file đã xuống đĩa trước khi snapshot được công bố
+            with open(file_path, 'r+b') as f:
+                os.fsync(f.fileno())
+            checksums[name] = file_checksum(file_path)
+
+        meta = {
+            **meta,
+            'build_id': self.build_id,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'checksums': checksums,
+        }
+        with open(self.path(META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_dir(self.tmp_dir)
+
+        os.rename(self.tmp_dir, self.final_dir)
+        _fsync_dir(snapshots_dir(self.vector_db_dir))
+        self.committed = True
+
+        set_current_build_id(self.build_id, self.vector_db_dir)
+        prune_snapshots(self.keep, self.vector_db_dir)
+        return self.final_dir
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Tạo và cấu hình index FAISS cho Vector Database.
+
+Các loại index hỗ trợ (tất cả dùng Inner Product, tương đương Cosine khi vector đã chuẩn hóa L2):
+    - 'flat'     : IndexFlatIP, tìm kiếm vét cạn, chính xác tuyệt đối (mặc định, phù hợp vài nghìn vector).
+    - 'hnsw'     : IndexHNSWFlat, đồ thị HNSW. Tham số: M, efConstruction (lúc build), efSearch (lúc truy vấn).
+    - 'ivf_flat' : IndexIVFFlat, chia cụm (k-means). Tham số: nlist (lúc build), nprobe (lúc truy vấn).
+    - 'ivf_pq'   : IndexIVFPQ, chia cụm + nén vector bằng Product Quantization.
+                   Tham số: nlist, m (số sub-vector, phải chia hết số chiều), nbits, nprobe.
+
+Cấu hình (loại index + tham số) được lưu trong file meta cạnh 'faiss_index.bin' để
+SemanticRetriever đặt lại đúng tham số truy vấn (nprobe / efSearch) khi tải index.
+
+Khi truyền `ids` cho build_index, mỗi vector mang một ID (int64) do bên gọi quản lý và kết quả
+tìm kiếm trả về các ID này thay vì số thứ tự dòng; nhờ đó có thể thêm / xóa vector mà không
+phải build lại toàn bộ (xem add_vectors, remove_vectors). Index flat / HNSW được bọc trong
+IndexIDMap2, index IVF tự lưu ID trong các danh sách đảo.
+"""
+import math
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ('flat', 'hnsw', 'ivf_flat', 'ivf_pq')
+
+# Tham số mặc định. nlist = None nghĩa là tự chọn theo số vector (~4 * sqrt(N)).
+DEFAULT_INDEX_PARAMS = {
+    'flat': {},
+    'hnsw': {'M': 32, 'efConstruction': 200, 'efSearch': 128},
+    'ivf_flat': {'nlist': None, 'nprobe': 16},
+    'ivf_pq': {'nlist': None, 'nprobe': 16, 'm': 64, 'nbits': 8},
+}
+# Tham số chỉ dùng lúc truy vấn, có thể thay đổi mà không cần build lại index
+SEARCH_PARAMS = {'hnsw': ('efSearch',), 'ivf_flat': ('nprobe',), 'ivf_pq': ('nprobe',)}
+
+# FAISS khuyến nghị tối thiểu ~39 vector huấn luyện cho mỗi cụm
+_MIN_POINTS_PER_CENTROID = 39
+
+
+def resolve_index_params(index_type: str, num_vectors: int, params: dict = None) -> dict:
+    """Gộp tham số người dùng với tham số mặc định và tự chọn nlist nếu cần."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Loại index '{index_type}' không hợp lệ. Chọn một trong: {', '.join(INDEX_TYPES)}")
+    unknown = set(params or {}) - set(DEFAULT_INDEX_PARAMS[index_type])
+    if unknown:
+        raise ValueError(f"Tham số không hợp lệ cho index '{index_type}': {', '.join(sorted(unknown))}")
+
+    resolved = {**DEFAULT_INDEX_PARAMS[index_type], **(params or {})}
+    if 'nlist' in resolved:
+        if resolved['nlist'] is None:
+            resolved['nlist'] = int(4 * math.sqrt(num_vectors))
+        # Không tạo nhiều cụm hơn số vector huấn luyện cho phép
+        resolved['nlist'] = max(1, min(resolved['nlist'], num_vectors // _MIN_POINTS_PER_CENTROID))
+    return resolved
+
+
+def build_index(embeddings, index_type: str = 'flat', params: dict = None, ids=None):
+    """
+    Tạo index FAISS từ ma trận embeddings (float32, đã chuẩn hóa L2), huấn luyện nếu cần và thêm vector.
+    Nếu có `ids` (cùng số dòng với embeddings), index được gắn ID cho từng vector.
+
+    Returns:
+        tuple (index, resolved_params): index đã sẵn sàng truy vấn và tham số thực tế đã dùng
+        (để lưu vào file meta).
+    """
+    embeddings = embeddings.astype('float32')
+    num_vectors, dimension = embeddings.shape
+    params = resolve_index_params(index_type, num_vectors, params)
+
+    if index_type == 'flat':
+        index = faiss.IndexFlatIP(dimension)
+    elif index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dimension, params['M'], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params['efConstruction']
+    else:
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == 'ivf_flat':
+            index = faiss.IndexIVFFlat(quantizer, dimension, params['nlist'], faiss.METRIC_INNER_PRODUCT)
+        else:
+            if dimension % params['m'] != 0:
+                raise ValueError(f"Tham số m={params['m']} phải là ước của số chiều vector ({dimension}).")
+            if num_vectors < 2 ** params['nbits']:
+                raise ValueError(f"IVF-PQ với nbits={params['nbits']} cần ít nhất {2 ** params['nbits']} vector "
+                                 f"để huấn luyện (hiện có {num_vectors}).")
+            index = faiss.IndexIVFPQ(quantizer, dimension, params['nlist'], params['m'], params['nbits'],
+                                     faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+
+    if ids is None:
+        index.add(embeddings)
+    else:
+        if index_type in ('flat', 'hnsw'):
+            index = faiss.IndexIDMap2(index)
+        index.add_with_ids(embeddings, np.asarray(ids, dtype='int64'))
+    configure_search(index, index_type, params)
+    return index, params
+
+
+def add_vectors(index, embeddings, ids):
+    """Thêm vector kèm ID vào index đã gắn ID (tạo bởi build_index(..., ids=...))."""
+    if len(ids):
+        index.add_with_ids(embeddings.astype('float32'), np.asarray(ids, dtype='int64'))
+
+
+def remove_vectors(index, index_type: str, params: dict, ids):
+    """
+    Xóa các vector có ID trong `ids` khỏi index đã gắn ID.
+
+    Flat và IVF hỗ trợ xóa trực tiếp. HNSW không hỗ trợ xóa nút khỏi đồ thị, nên đồ thị được
+    dựng lại từ các vector còn lại (đọc lại từ index, không cần embedding lại).
+
+    Returns:
+        Index sau khi xóa (có thể là đối tượng mới với HNSW).
+    """
+    ids = np.asarray(list(ids), dtype='int64')
+    if not len(ids):
+        return index
+    if index_type != 'hnsw':
+        index.remove_ids(faiss.IDSelectorBatch(ids))
+        return index
+
+    index = faiss.downcast_index(index)
+    all_ids = faiss.vector_to_array(index.id_map)
+    keep_ids = all_ids[~np.isin(all_ids, ids)]
+    if not len(keep_ids):
+        raise ValueError("Không thể xóa toàn bộ vector khỏi index HNSW.")
+    kept_vectors = np.vstack([index.reconstruct(int(i)) for i in keep_ids])
+    new_index, _ = build_index(kept_vectors, index_type, params, ids=keep_ids)
+    return new_index
+
+
+def configure_search(index, index_type: str, params: dict):
+    """Đặt các tham số lúc truy vấn (efSearch / nprobe) cho index vừa build hoặc vừa tải từ file."""
+    if index_type == 'hnsw':
+        index = faiss.downcast_index(index)
+        if isinstance(index, faiss.IndexIDMap2):
+            index = faiss.downcast_index(index.index)
+        index.hnsw.efSearch = int(params['efSearch'])
+    elif index_type in ('ivf_flat', 'ivf_pq'):
+        faiss.extract_index_ivf(index).nprobe = int(params['nprobe'])
+
+
+def parse_index_params(items: list[str]) -> dict:
+    """Đọc tham số dạng ['nlist=1024', 'nprobe=32'] từ dòng lệnh thành dict số nguyên."""
+    params = {}
+    for item in items or []:
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"Tham số '{item}' phải có dạng tên=giá_trị.")
+        params[key.strip()] = int(value)
+    return params